@@ -4,10 +4,14 @@ from __future__ import annotations
 
 import subprocess
 import os
+import tempfile
+import threading
 from enum import Enum
-from typing import Optional, Tuple
+from typing import Callable, Optional, Tuple
 from pathlib import Path
 
+from Agent.core.logging.tracing import span
+
 
 _GIT_TIMEOUT_SECONDS = 60
 
@@ -92,15 +96,16 @@ def run_git(command: str, *args: str, cwd: Optional[str] = None) -> str:
     
     try:
         # 不使用 text=True 或 encoding，直接获取 bytes
-        result = subprocess.run(
-            full_cmd,
-            cwd=cwd,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            check=False,
-            timeout=_GIT_TIMEOUT_SECONDS,
-            env=_git_env(),
-        )
+        with span("git", command=command, args=" ".join(args)[:200]):
+            result = subprocess.run(
+                full_cmd,
+                cwd=cwd,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                check=False,
+                timeout=_GIT_TIMEOUT_SECONDS,
+                env=_git_env(),
+            )
     except Exception as e:
         raise RuntimeError(f"Failed to execute git command: {e}")
 
@@ -148,6 +153,72 @@ def _run_git_quiet(command: str, *args: str, cwd: Optional[str] = None) -> subpr
     )
 
 
+def _stream_git(
+    command: str,
+    *args: str,
+    cwd: Optional[str] = None,
+    on_record: Callable[[bytes], bool],
+    sep: bytes = b"\n",
+) -> Tuple[Optional[int], str, bool]:
+    """流式运行 git 命令，逐条记录回调；回调返回 False 时立即终止子进程。
+
+    适用于输出可能非常大的命令（如 git grep），避免一次性读入并解码全部 stdout。
+    stderr 写入临时文件，避免管道写满导致死锁；整体耗时受 _GIT_TIMEOUT_SECONDS 约束。
+
+    Returns:
+        (返回码, stderr 文本, 是否提前终止)。提前终止时返回码为 None。
+    """
+
+    ensure_git_repository(cwd)
+    cmd = ["git", "-c", "core.quotepath=false"]
+    if _allow_unsafe_git_repo():
+        cmd.extend(["-c", "safe.directory=*"])
+    cmd.extend([command, *args])
+
+    stopped = False
+    with tempfile.TemporaryFile() as err_file:
+        proc = subprocess.Popen(
+            cmd,
+            cwd=cwd,
+            stdout=subprocess.PIPE,
+            stderr=err_file,
+            env=_git_env(),
+        )
+        timer = threading.Timer(_GIT_TIMEOUT_SECONDS, proc.kill)
+        timer.daemon = True
+        timer.start()
+        try:
+            assert proc.stdout is not None
+            pending = b""
+            while True:
+                chunk = proc.stdout.read1(65536) if hasattr(proc.stdout, "read1") else proc.stdout.read(65536)
+                if not chunk:
+                    break
+                pending += chunk
+                *records, pending = pending.split(sep)
+                for record in records:
+                    if not on_record(record):
+                        stopped = True
+                        break
+                if stopped:
+                    break
+            if not stopped and pending:
+                stopped = not on_record(pending)
+        finally:
+            timer.cancel()
+            if proc.poll() is None:
+                proc.kill()
+            try:
+                if proc.stdout is not None:
+                    proc.stdout.close()
+            except Exception:
+                pass
+            proc.wait()
+        err_file.seek(0)
+        stderr_text = _decode_output(err_file.read())
+    return (None if stopped else proc.returncode), stderr_text, stopped
+
+
 def has_working_changes(cwd: Optional[str] = None) -> bool:
     """如果工作区有未暂存变更（包括未跟踪文件）则返回 True。"""
 
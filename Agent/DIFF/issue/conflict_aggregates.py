@@ -0,0 +1,118 @@
+"""冲突分组聚合的增量维护。
+
+RuleAnalyzer.analyze_all 与 ConflictTracker.generate_rule_suggestions 原先每次调用
+都加载全部历史冲突、重新分组并从头计算通用标签与一致性。这里为每种分组维护
+计数器（样本数、LLM 决策分布、标签出现次数、文件分布、共同标签、前若干条样本），
+新冲突记录时按 O(标签数) 更新，分析与建议直接读取聚合结果。
+
+ConflictTracker 负责在首次使用时全量构建、在冲突被删除 / 提升后失效重建，
+并按 REBUILD_INTERVAL_SECONDS 定期全量重建、与增量结果比对校验。
+"""
+
+from __future__ import annotations
+
+import os
+from collections import Counter
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Optional, Set, Tuple
+
+if TYPE_CHECKING:
+    from Agent.DIFF.issue.conflict_tracker import RuleConflict
+
+# 每组保留的样本冲突数（参考提示最多展示 10 条）
+SAMPLE_LIMIT = 10
+
+
+class FeatureStats:
+    """一组冲突的增量统计。"""
+
+    __slots__ = ("count", "decisions", "tag_counts", "files", "common_tags", "samples")
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.decisions: Counter = Counter()      # llm_context_level -> 次数（忽略空值）
+        self.tag_counts: Counter = Counter()     # 标签 -> 出现该标签的冲突数
+        self.files: Counter = Counter()          # file_path -> 次数
+        self.common_tags: Optional[Set[str]] = None  # 所有冲突共有的标签
+        self.samples: List["RuleConflict"] = []  # 最早的若干条冲突
+
+    def add(self, conflict: "RuleConflict") -> None:
+        tags = set(conflict.tags)
+        self.count += 1
+        if conflict.llm_context_level:
+            self.decisions[conflict.llm_context_level] += 1
+        self.tag_counts.update(tags)
+        self.files[conflict.file_path] += 1
+        self.common_tags = tags if self.common_tags is None else (self.common_tags & tags)
+        if len(self.samples) < SAMPLE_LIMIT:
+            self.samples.append(conflict)
+
+    @property
+    def unique_files(self) -> int:
+        return len(self.files)
+
+    def consistency(self) -> Tuple[float, Optional[str]]:
+        """(最常见决策占比, 最常见决策)。"""
+        total = sum(self.decisions.values())
+        if not total:
+            return 0.0, None
+        decision, count = self.decisions.most_common(1)[0]
+        return count / total, decision
+
+    def tags_above(self, ratio: float) -> List[str]:
+        """出现在不少于 ratio 比例冲突中的标签。"""
+        threshold = self.count * ratio
+        return sorted(tag for tag, count in self.tag_counts.items() if count >= threshold)
+
+    def signature(self) -> Tuple[Any, ...]:
+        """用于全量重建时校验增量结果。"""
+        return (self.count, dict(self.decisions), dict(self.tag_counts), len(self.files))
+
+
+class ConflictAggregates:
+    """按三种分组方式维护的冲突聚合。
+
+    - features: (language, tags_signature, conflict_type) —— RuleAnalyzer 的语义特征分组
+    - by_notes: (conflict_type, rule_notes) —— 规则建议中的规则备注分组
+    - by_file_pattern: (language, file_name) —— 低置信度一致决策的文件模式分组
+    """
+
+    def __init__(self) -> None:
+        self.total = 0
+        self.features: Dict[Tuple[str, str, str], FeatureStats] = {}
+        self.by_notes: Dict[Tuple[str, str], FeatureStats] = {}
+        self.by_file_pattern: Dict[Tuple[str, str], FeatureStats] = {}
+
+    @classmethod
+    def build(cls, conflicts: Iterable["RuleConflict"]) -> "ConflictAggregates":
+        aggregates = cls()
+        for conflict in conflicts:
+            aggregates.add(conflict)
+        return aggregates
+
+    @staticmethod
+    def feature_key(conflict: "RuleConflict") -> Tuple[str, str, str]:
+        return (conflict.language, "|".join(sorted(conflict.tags)), conflict.conflict_type.value)
+
+    def add(self, conflict: "RuleConflict") -> None:
+        """把一条新冲突计入所有分组。"""
+        self.total += 1
+        self._stats(self.features, self.feature_key(conflict)).add(conflict)
+        conflict_type = conflict.conflict_type.value
+        if conflict.rule_notes:
+            self._stats(self.by_notes, (conflict_type, conflict.rule_notes)).add(conflict)
+        if conflict_type == "rule_low_llm_consistent":
+            key = (conflict.language, os.path.basename(conflict.file_path))
+            self._stats(self.by_file_pattern, key).add(conflict)
+
+    @staticmethod
+    def _stats(table: Dict[Any, FeatureStats], key: Any) -> FeatureStats:
+        stats = table.get(key)
+        if stats is None:
+            stats = table[key] = FeatureStats()
+        return stats
+
+    def signature(self) -> Dict[Any, Tuple[Any, ...]]:
+        return {key: stats.signature() for key, stats in self.features.items()}
+
+
+__all__ = ["ConflictAggregates", "FeatureStats", "SAMPLE_LIMIT"]
@@ -0,0 +1,207 @@
+"""冲突记录的 SQLite 存储。
+
+冲突原先每条保存为 conflicts/ 下的一个 JSON 文件，汇总、趋势、模式导出等每次
+调用都要遍历并解析全部文件。这里改为单个 SQLite 库（conflicts/conflicts.db）：
+查询常用的字段（类型、语言、文件名、规则备注、标签、时间、提升状态）单独成列并
+建索引，完整记录以 JSON 保存在 data 列中。旧的 JSON 文件在首次打开时一次性导入，
+导入后移动到 conflicts/migrated/。
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import shutil
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS conflicts (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    record_key TEXT UNIQUE,
+    conflict_type TEXT NOT NULL,
+    language TEXT,
+    file_path TEXT,
+    file_name TEXT,
+    unit_id TEXT,
+    rule_notes TEXT,
+    rule_key TEXT,
+    llm_context_level TEXT,
+    tags TEXT,
+    timestamp TEXT,
+    day TEXT,
+    promoted INTEGER NOT NULL DEFAULT 0,
+    promoted_at TEXT,
+    promoted_rule_id TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_conflicts_type ON conflicts(promoted, conflict_type, timestamp);
+CREATE INDEX IF NOT EXISTS idx_conflicts_time ON conflicts(timestamp);
+CREATE INDEX IF NOT EXISTS idx_conflicts_language ON conflicts(promoted, language);
+CREATE INDEX IF NOT EXISTS idx_conflicts_notes ON conflicts(promoted, rule_notes);
+"""
+
+# 非 RuleConflict 字段（保存在独立列中）
+PROMOTION_FIELDS = ("promoted", "promoted_at", "promoted_rule_id")
+
+
+def normalize_tags(tags: Optional[Iterable[str]]) -> str:
+    """标签集合的规范化表示（去重排序后的 JSON），便于按集合相等比较。"""
+    return json.dumps(sorted({str(t) for t in (tags or [])}), ensure_ascii=False)
+
+
+def rule_key_of(notes: Optional[str]) -> str:
+    """提取主要规则标识（如 "py:decorator:django_view" -> "py:decorator"）。"""
+    if not notes:
+        return ""
+    parts = notes.split(":")
+    return ":".join(parts[:2]) if len(parts) >= 2 else notes
+
+
+class ConflictStore:
+    """冲突记录表（线程安全，WAL 模式）。"""
+
+    def __init__(self, db_path: Path) -> None:
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(_SCHEMA)
+            self._conn.commit()
+
+    # ------------------------------------------------------------------
+    # 写入
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _row_values(record_key: str, data: Dict[str, Any]) -> Tuple[Any, ...]:
+        record = {k: v for k, v in data.items() if k not in PROMOTION_FIELDS}
+        timestamp = str(record.get("timestamp") or "")
+        file_path = record.get("file_path") or ""
+        return (
+            record_key,
+            record.get("conflict_type"),
+            record.get("language"),
+            file_path,
+            os.path.basename(file_path),
+            str(record.get("unit_id") or ""),
+            record.get("rule_notes") or "",
+            rule_key_of(record.get("rule_notes")),
+            record.get("llm_context_level"),
+            normalize_tags(record.get("tags")),
+            timestamp,
+            timestamp[:10],
+            1 if data.get("promoted") else 0,
+            data.get("promoted_at"),
+            data.get("promoted_rule_id"),
+            json.dumps(record, ensure_ascii=False),
+        )
+
+    _INSERT = (
+        "INSERT OR IGNORE INTO conflicts (record_key, conflict_type, language, file_path, file_name, "
+        "unit_id, rule_notes, rule_key, llm_context_level, tags, timestamp, day, promoted, "
+        "promoted_at, promoted_rule_id, data) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+    )
+
+    def insert(self, record_key: str, data: Dict[str, Any]) -> int:
+        """写入一条冲突记录（data 为 RuleConflict.to_dict()），返回行 ID。"""
+        with self._lock, self._conn:
+            cur = self._conn.execute(self._INSERT, self._row_values(record_key, data))
+            return int(cur.lastrowid or 0)
+
+    def insert_many(self, records: Iterable[Tuple[str, Dict[str, Any]]]) -> int:
+        """在一个事务内批量写入，已存在的 record_key 被忽略；返回新增条数。"""
+        with self._lock, self._conn:
+            before = self._conn.total_changes
+            self._conn.executemany(self._INSERT, (self._row_values(k, d) for k, d in records))
+            return self._conn.total_changes - before
+
+    def delete_ids(self, ids: Sequence[int]) -> int:
+        if not ids:
+            return 0
+        with self._lock, self._conn:
+            deleted = 0
+            for start in range(0, len(ids), 500):
+                chunk = list(ids[start:start + 500])
+                cur = self._conn.execute(
+                    f"DELETE FROM conflicts WHERE id IN ({', '.join('?' for _ in chunk)})", chunk
+                )
+                deleted += cur.rowcount
+            return deleted
+
+    def execute(self, sql: str, params: Sequence[Any] = ()) -> int:
+        """执行写语句，返回影响的行数。"""
+        with self._lock, self._conn:
+            return self._conn.execute(sql, params).rowcount
+
+    # ------------------------------------------------------------------
+    # 查询
+    # ------------------------------------------------------------------
+
+    def fetch(self, sql: str, params: Sequence[Any] = ()) -> List[Tuple[Any, ...]]:
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def scalar(self, sql: str, params: Sequence[Any] = ()) -> Any:
+        with self._lock:
+            row = self._conn.execute(sql, params).fetchone()
+        return row[0] if row else None
+
+    # ------------------------------------------------------------------
+    # 迁移
+    # ------------------------------------------------------------------
+
+    def migrate_json_dir(self, conflicts_dir: Path, fix_language=None) -> int:
+        """导入旧版逐文件存储的冲突记录，导入后移动到 conflicts/migrated/。
+
+        Args:
+            conflicts_dir: 旧冲突文件目录
+            fix_language: 可选回调 (data) -> None，导入前修复历史记录中的 language
+
+        Returns:
+            导入的记录数
+        """
+        files = sorted(conflicts_dir.glob("*.json"))
+        if not files:
+            return 0
+        records: List[Tuple[str, Dict[str, Any]]] = []
+        for filepath in files:
+            try:
+                with open(filepath, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                if not isinstance(data, dict) or not data.get("conflict_type"):
+                    continue
+                if fix_language is not None:
+                    fix_language(data)
+                records.append((filepath.stem, data))
+            except (json.JSONDecodeError, OSError) as e:
+                logger.warning(f"Skipping unreadable conflict file {filepath.name}: {e}")
+        imported = self.insert_many(records)
+
+        archive = conflicts_dir / "migrated"
+        archive.mkdir(exist_ok=True)
+        for filepath in files:
+            try:
+                shutil.move(str(filepath), str(archive / filepath.name))
+            except OSError as e:
+                logger.warning(f"Failed to archive migrated conflict file {filepath.name}: {e}")
+        logger.info(f"Migrated {imported} conflict records from {len(files)} files into {self.db_path.name}")
+        return imported
+
+    def close(self) -> None:
+        with self._lock:
+            try:
+                self._conn.close()
+            except sqlite3.Error:
+                pass
+
+
+__all__ = ["ConflictStore", "normalize_tags", "rule_key_of", "PROMOTION_FIELDS"]
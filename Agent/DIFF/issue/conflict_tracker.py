@@ -6,7 +6,7 @@
 3. rule_low_llm_consistent: 规则低置信度，LLM 给出明确决策（可提取新规则）
 4. context_level_mismatch: 上下文级别不匹配（非高置信度情况）
 
-存储路径：Agent/DIFF/issue/conflicts/
+存储路径：Agent/DIFF/issue/conflicts/conflicts.db（SQLite，旧版逐文件 JSON 记录首次打开时自动导入）
 
 自成长机制功能：
 - 冲突检测与记录
@@ -23,6 +23,8 @@ import json
 import logging
 import os
 import re
+import threading
+import time
 from collections import defaultdict
 from dataclasses import dataclass, field, asdict
 from datetime import datetime, timedelta
@@ -31,6 +33,8 @@ from pathlib import Path
 from typing import Any, Dict, List, Optional, Tuple
 
 from Agent.DIFF.file_utils import guess_language
+from Agent.DIFF.issue.conflict_aggregates import ConflictAggregates
+from Agent.DIFF.issue.conflict_store import ConflictStore, normalize_tags
 from Agent.DIFF.rule.context_levels import RULE_TO_UNIFIED_CONTEXT_MAP
 
 logger = logging.getLogger(__name__)
@@ -120,6 +124,9 @@ def _get_context_rank(level: Optional[str]) -> int:
 class ConflictTracker:
     """规则冲突追踪器。"""
     
+    # 增量聚合的定期全量重建间隔（秒），重建时与增量结果比对校验
+    REBUILD_INTERVAL_SECONDS = 3600
+    
     def __init__(self, base_dir: Optional[str] = None):
         """初始化追踪器。
         
@@ -138,8 +145,68 @@ class ConflictTracker:
         self.conflicts_dir.mkdir(parents=True, exist_ok=True)
         self.patterns_dir.mkdir(parents=True, exist_ok=True)
         
+        # 冲突记录库；目录中残留的旧版 JSON 文件一次性导入
+        self.store = ConflictStore(self.conflicts_dir / "conflicts.db")
+        try:
+            self.store.migrate_json_dir(self.conflicts_dir, fix_language=self._fix_language)
+        except Exception as e:
+            logger.warning(f"Failed to migrate legacy conflict files: {e}")
+        
         # 内存中的冲突缓存（当前会话）
         self._session_conflicts: List[RuleConflict] = []
+        
+        # 未提升冲突的分组聚合：首次使用时构建，之后随 record 增量更新
+        self._aggregates: Optional[ConflictAggregates] = None
+        self._aggregates_built_at = 0.0
+        self._aggregates_lock = threading.RLock()
+    
+    def get_aggregates(self) -> ConflictAggregates:
+        """获取未提升冲突的分组聚合（按需构建，定期全量重建校验）。"""
+        with self._aggregates_lock:
+            current = self._aggregates
+            if current is not None and time.monotonic() - self._aggregates_built_at < self.REBUILD_INTERVAL_SECONDS:
+                return current
+            rebuilt = ConflictAggregates.build(self._load_all_conflicts())
+            if current is not None and current.signature() != rebuilt.signature():
+                logger.warning(
+                    f"Incremental conflict aggregates drifted from storage "
+                    f"(incremental={current.total}, rebuilt={rebuilt.total}); using rebuilt state"
+                )
+            self._aggregates = rebuilt
+            self._aggregates_built_at = time.monotonic()
+            return rebuilt
+    
+    def invalidate_aggregates(self) -> None:
+        """冲突被删除或提升后丢弃聚合，下次使用时全量重建。"""
+        with self._aggregates_lock:
+            self._aggregates = None
+    
+    @staticmethod
+    def _fix_language(data: Dict[str, Any]) -> None:
+        """修复 language 为 unknown 的历史记录。"""
+        if data.get("language") == "unknown" and data.get("file_path"):
+            inferred_lang = guess_language(data["file_path"])
+            if inferred_lang != "unknown":
+                data["language"] = inferred_lang
+    
+    def _query_conflicts(
+        self,
+        where: str = "promoted = 0",
+        params: Tuple[Any, ...] = (),
+        order: str = "timestamp, id",
+        limit: Optional[int] = None,
+    ) -> List[RuleConflict]:
+        """按条件从记录库加载冲突。"""
+        sql = f"SELECT data FROM conflicts WHERE {where} ORDER BY {order}"
+        if limit:
+            sql += f" LIMIT {int(limit)}"
+        conflicts: List[RuleConflict] = []
+        for (raw,) in self.store.fetch(sql, params):
+            try:
+                conflicts.append(RuleConflict.from_dict(json.loads(raw)))
+            except (ValueError, KeyError, TypeError):
+                continue
+        return conflicts
     
     def validate_conflict(self, conflict: RuleConflict) -> Tuple[bool, str]:
         """验证冲突记录是否有效。
@@ -240,13 +307,13 @@ class ConflictTracker:
         return conflict
     
     def record(self, conflict: RuleConflict) -> Optional[str]:
-        """记录冲突到文件。
+        """记录冲突到记录库。
         
         Args:
             conflict: 冲突记录
             
         Returns:
-            保存的文件路径，如果验证失败则返回 None
+            记录标识（时间戳_冲突类型），如果验证失败则返回 None
         """
         logger.debug(f"准备记录冲突：conflict_type={conflict.conflict_type}, unit_id={conflict.unit_id}, file_path={conflict.file_path}")
         
@@ -271,17 +338,16 @@ class ConflictTracker:
         # 添加到会话缓存
         self._session_conflicts.append(conflict)
         
-        # 生成文件名
+        # 生成记录标识（与旧版文件名一致）
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
-        filename = f"{timestamp}_{conflict.conflict_type.value}.json"
-        filepath = self.conflicts_dir / filename
-        
-        # 保存到文件
-        with open(filepath, "w", encoding="utf-8") as f:
-            json.dump(conflict.to_dict(), f, ensure_ascii=False, indent=2)
-        
-        logger.debug(f"冲突记录成功保存：{filepath}")
-        return str(filepath)
+        record_key = f"{timestamp}_{conflict.conflict_type.value}"
+        self.store.insert(record_key, conflict.to_dict())
+        with self._aggregates_lock:
+            if self._aggregates is not None:
+                self._aggregates.add(conflict)
+        
+        logger.debug(f"冲突记录成功保存：{record_key}")
+        return record_key
     
     def detect_and_record(
         self,
@@ -295,7 +361,7 @@ class ConflictTracker:
             llm_decision: LLM 决策
             
         Returns:
-            如果记录了冲突，返回文件路径；否则返回 None
+            如果记录了冲突，返回记录标识；否则返回 None
         """
         conflict = self.detect_conflict(unit, llm_decision)
         if conflict:
@@ -311,64 +377,25 @@ class ConflictTracker:
         self._session_conflicts.clear()
     
     def get_summary(self) -> Dict[str, Any]:
-        """获取冲突汇总统计。
+        """获取冲突汇总统计（排除已提升为规则的冲突）。
         
         Returns:
             汇总统计字典
         """
-        # 读取所有冲突文件（排除已提升的）
-        conflicts: List[RuleConflict] = []
-        for filepath in self.conflicts_dir.glob("*.json"):
-            try:
-                with open(filepath, "r", encoding="utf-8") as f:
-                    data = json.load(f)
-                    
-                    # 跳过已提升为规则的冲突
-                    if data.get("promoted"):
-                        continue
-                    
-                    # 修复 language 为 unknown 的历史记录
-                    if data.get("language") == "unknown" and data.get("file_path"):
-                        inferred_lang = guess_language(data["file_path"])
-                        if inferred_lang != "unknown":
-                            data["language"] = inferred_lang
-                    
-                    # 移除非 RuleConflict 字段
-                    data.pop("promoted", None)
-                    data.pop("promoted_at", None)
-                    data.pop("promoted_rule_id", None)
-                    
-                    conflicts.append(RuleConflict.from_dict(data))
-            except (json.JSONDecodeError, KeyError, TypeError):
-                continue
-        
-        # 统计
-        by_type: Dict[str, int] = {}
-        by_language: Dict[str, int] = {}
-        by_rule_notes: Dict[str, int] = {}
-        
-        for conflict in conflicts:
-            # 按类型统计
-            type_key = conflict.conflict_type.value
-            by_type[type_key] = by_type.get(type_key, 0) + 1
-            
-            # 按语言统计
-            lang = conflict.language
-            by_language[lang] = by_language.get(lang, 0) + 1
-            
-            # 按规则备注统计（提取规则类型）
-            notes = conflict.rule_notes
-            if notes:
-                # 提取主要规则标识（如 "py:decorator:django_view" -> "py:decorator"）
-                parts = notes.split(":")
-                if len(parts) >= 2:
-                    rule_key = ":".join(parts[:2])
-                else:
-                    rule_key = notes
-                by_rule_notes[rule_key] = by_rule_notes.get(rule_key, 0) + 1
+        store = self.store
+        by_type = dict(store.fetch(
+            "SELECT conflict_type, COUNT(*) FROM conflicts WHERE promoted = 0 GROUP BY conflict_type"
+        ))
+        by_language = dict(store.fetch(
+            "SELECT language, COUNT(*) FROM conflicts WHERE promoted = 0 GROUP BY language"
+        ))
+        # 按规则备注统计（rule_key 为主要规则标识，如 "py:decorator"）
+        by_rule_notes = dict(store.fetch(
+            "SELECT rule_key, COUNT(*) FROM conflicts WHERE promoted = 0 AND rule_key != '' GROUP BY rule_key"
+        ))
         
         return {
-            "total_conflicts": len(conflicts),
+            "total_conflicts": sum(by_type.values()),
             "by_type": by_type,
             "by_language": by_language,
             "by_rule_notes": by_rule_notes,
@@ -384,67 +411,37 @@ class ConflictTracker:
         Returns:
             可提取的规则模式列表
         """
-        # 读取所有 RULE_LOW_LLM_CONSISTENT 类型的冲突（排除已提升的）
-        conflicts: List[RuleConflict] = []
-        for filepath in self.conflicts_dir.glob("*.json"):
-            try:
-                with open(filepath, "r", encoding="utf-8") as f:
-                    data = json.load(f)
-                    
-                    # 跳过已提升为规则的冲突
-                    if data.get("promoted"):
-                        continue
-                    
-                    # 修复 language 为 unknown 的历史记录
-                    if data.get("language") == "unknown" and data.get("file_path"):
-                        inferred_lang = guess_language(data["file_path"])
-                        if inferred_lang != "unknown":
-                            data["language"] = inferred_lang
-                    
-                    # 移除非 RuleConflict 字段
-                    data.pop("promoted", None)
-                    data.pop("promoted_at", None)
-                    data.pop("promoted_rule_id", None)
-                    
-                    conflict = RuleConflict.from_dict(data)
-                    if conflict.conflict_type == ConflictType.RULE_LOW_LLM_CONSISTENT:
-                        conflicts.append(conflict)
-            except (json.JSONDecodeError, KeyError, TypeError):
-                continue
-        
-        # 按文件路径模式和语言分组
-        patterns: Dict[str, List[RuleConflict]] = {}
-        for conflict in conflicts:
-            # 提取文件路径模式（如 "models.py", "views.py" 等）
-            file_path = conflict.file_path
-            filename = os.path.basename(file_path)
-            
-            # 构建模式键
-            pattern_key = f"{conflict.language}:{filename}:{conflict.llm_context_level}"
-            
-            if pattern_key not in patterns:
-                patterns[pattern_key] = []
-            patterns[pattern_key].append(conflict)
+        # 按语言、文件名和 LLM 上下文级别分组，筛选出现次数 >= 3 的模式
+        groups = self.store.fetch(
+            "SELECT language, file_name, llm_context_level, COUNT(*) FROM conflicts "
+            "WHERE promoted = 0 AND conflict_type = ? "
+            "GROUP BY language, file_name, llm_context_level HAVING COUNT(*) >= 3 "
+            "ORDER BY MIN(id)",
+            (ConflictType.RULE_LOW_LLM_CONSISTENT.value,),
+        )
         
-        # 筛选出现次数 >= 3 的模式
         suggested_rules: List[Dict[str, Any]] = []
-        for pattern_key, pattern_conflicts in patterns.items():
-            if len(pattern_conflicts) >= 3:
-                # 提取共同特征
-                sample = pattern_conflicts[0]
-                common_tags = set(sample.tags)
-                for c in pattern_conflicts[1:]:
-                    common_tags &= set(c.tags)
-                
-                suggested_rules.append({
-                    "pattern_key": pattern_key,
-                    "language": sample.language,
-                    "file_pattern": os.path.basename(sample.file_path),
-                    "suggested_context_level": sample.llm_context_level,
-                    "occurrence_count": len(pattern_conflicts),
-                    "common_tags": list(common_tags),
-                    "sample_files": [c.file_path for c in pattern_conflicts[:5]],
-                })
+        for language, file_name, llm_level, count in groups:
+            rows = self.store.fetch(
+                "SELECT file_path, tags FROM conflicts "
+                "WHERE promoted = 0 AND conflict_type = ? AND language IS ? AND file_name = ? "
+                "AND llm_context_level IS ? ORDER BY timestamp, id",
+                (ConflictType.RULE_LOW_LLM_CONSISTENT.value, language, file_name, llm_level),
+            )
+            # 提取共同特征
+            common_tags = set(json.loads(rows[0][1] or "[]"))
+            for _, tags in rows[1:]:
+                common_tags &= set(json.loads(tags or "[]"))
+            
+            suggested_rules.append({
+                "pattern_key": f"{language}:{file_name}:{llm_level}",
+                "language": language,
+                "file_pattern": file_name,
+                "suggested_context_level": llm_level,
+                "occurrence_count": count,
+                "common_tags": list(common_tags),
+                "sample_files": [r[0] for r in rows[:5]],
+            })
         
         return suggested_rules
     
@@ -457,31 +454,7 @@ class ConflictTracker:
         Returns:
             冲突记录列表
         """
-        conflicts: List[RuleConflict] = []
-        for filepath in self.conflicts_dir.glob("*.json"):
-            try:
-                with open(filepath, "r", encoding="utf-8") as f:
-                    data = json.load(f)
-                    
-                    # 跳过已提升的记录（除非明确要求包含）
-                    if not include_promoted and data.get("promoted"):
-                        continue
-                    
-                    # 修复 language 为 unknown 的历史记录
-                    if data.get("language") == "unknown" and data.get("file_path"):
-                        inferred_lang = guess_language(data["file_path"])
-                        if inferred_lang != "unknown":
-                            data["language"] = inferred_lang
-                    
-                    # 移除非 RuleConflict 字段
-                    data.pop("promoted", None)
-                    data.pop("promoted_at", None)
-                    data.pop("promoted_rule_id", None)
-                    
-                    conflicts.append(RuleConflict.from_dict(data))
-            except (json.JSONDecodeError, KeyError, TypeError):
-                continue
-        return conflicts
+        return self._query_conflicts("1 = 1" if include_promoted else "promoted = 0")
     
     def cleanup_old_conflicts(
         self,
@@ -497,62 +470,23 @@ class ConflictTracker:
         Returns:
             删除的记录数量
         """
-        deleted_count = 0
         cutoff_date = datetime.now() - timedelta(days=max_age_days)
         
-        # 收集所有文件及其时间戳
-        files_with_time: List[Tuple[Path, datetime]] = []
-        for filepath in self.conflicts_dir.glob("*.json"):
-            try:
-                # 从文件名提取时间戳
-                filename = filepath.stem
-                timestamp_str = "_".join(filename.split("_")[:3])
-                file_time = datetime.strptime(timestamp_str, "%Y%m%d_%H%M%S_%f")
-                files_with_time.append((filepath, file_time))
-            except (ValueError, IndexError):
-                # 无法解析时间戳，使用文件修改时间
-                mtime = datetime.fromtimestamp(filepath.stat().st_mtime)
-                files_with_time.append((filepath, mtime))
-        
-        # 按时间排序（最旧的在前）
-        files_with_time.sort(key=lambda x: x[1])
-        
         # 按时间删除
-        for filepath, file_time in files_with_time:
-            if file_time < cutoff_date:
-                try:
-                    filepath.unlink()
-                    deleted_count += 1
-                except OSError:
-                    pass
-        
-        # 按数量删除（如果指定了 max_count）
+        deleted_count = self.store.execute(
+            "DELETE FROM conflicts WHERE timestamp < ?", (cutoff_date.isoformat(),)
+        )
+        
+        # 按数量删除（如果指定了 max_count）：保留最新的 max_count 条
         if max_count is not None:
-            remaining_files = list(self.conflicts_dir.glob("*.json"))
-            if len(remaining_files) > max_count:
-                # 重新排序剩余文件
-                remaining_with_time: List[Tuple[Path, datetime]] = []
-                for filepath in remaining_files:
-                    try:
-                        filename = filepath.stem
-                        timestamp_str = "_".join(filename.split("_")[:3])
-                        file_time = datetime.strptime(timestamp_str, "%Y%m%d_%H%M%S_%f")
-                        remaining_with_time.append((filepath, file_time))
-                    except (ValueError, IndexError):
-                        mtime = datetime.fromtimestamp(filepath.stat().st_mtime)
-                        remaining_with_time.append((filepath, mtime))
-                
-                remaining_with_time.sort(key=lambda x: x[1])
-                
-                # 删除超出数量的最旧文件
-                to_delete = len(remaining_with_time) - max_count
-                for filepath, _ in remaining_with_time[:to_delete]:
-                    try:
-                        filepath.unlink()
-                        deleted_count += 1
-                    except OSError:
-                        pass
+            deleted_count += self.store.execute(
+                "DELETE FROM conflicts WHERE id NOT IN "
+                "(SELECT id FROM conflicts ORDER BY timestamp DESC, id DESC LIMIT ?)",
+                (max(0, int(max_count)),),
+            )
         
+        if deleted_count:
+            self.invalidate_aggregates()
         return deleted_count
     
     def mark_conflicts_as_promoted(
@@ -564,7 +498,7 @@ class ConflictTracker:
     ) -> int:
         """将匹配的冲突记录标记为已提升。
         
-        当参考提示被提升为规则后，调用此方法在冲突文件中添加 promoted 字段。
+        当参考提示被提升为规则后，调用此方法更新冲突记录的提升状态。
         
         Args:
             language: 编程语言
@@ -575,59 +509,25 @@ class ConflictTracker:
         Returns:
             标记的记录数量
         """
-        marked_count = 0
-        tags_set = set(tags) if tags else set()
-        
-        for filepath in list(self.conflicts_dir.glob("*.json")):
-            try:
-                with open(filepath, "r", encoding="utf-8") as f:
-                    data = json.load(f)
-                
-                # 跳过已经标记的
-                if data.get("promoted"):
-                    continue
-                
-                # 检查语言匹配（考虑历史记录中的 unknown 需要修复）
-                file_lang = data.get("language", "")
-                if file_lang == "unknown" and data.get("file_path"):
-                    # 从文件路径推断实际语言
-                    file_lang = guess_language(data["file_path"])
-                
-                if file_lang != language:
-                    continue
-                
-                # 检查冲突类型匹配（如果指定）
-                if conflict_type:
-                    file_type = data.get("conflict_type", "")
-                    if file_type != conflict_type:
-                        continue
-                
-                # 检查标签匹配（如果指定）
-                if tags_set:
-                    file_tags = set(data.get("tags", []))
-                    if file_tags and file_tags != tags_set:
-                        continue
-                
-                # 添加 promoted 字段，并修复 language
-                data["promoted"] = True
-                data["promoted_at"] = datetime.now().isoformat()
-                if rule_id:
-                    data["promoted_rule_id"] = rule_id
-                # 同时修复历史记录中的 language
-                if data.get("language") == "unknown" and data.get("file_path"):
-                    inferred = guess_language(data["file_path"])
-                    if inferred != "unknown":
-                        data["language"] = inferred
-                
-                # 写回文件
-                with open(filepath, "w", encoding="utf-8") as f:
-                    json.dump(data, f, ensure_ascii=False, indent=2)
-                
-                marked_count += 1
-                
-            except (json.JSONDecodeError, KeyError, TypeError, OSError):
-                continue
-        
+        where = ["promoted = 0", "language = ?"]
+        params: List[Any] = [language]
+        
+        # 检查冲突类型匹配（如果指定）
+        if conflict_type:
+            where.append("conflict_type = ?")
+            params.append(conflict_type)
+        
+        # 检查标签匹配（如果指定）：记录无标签或标签集合完全相同
+        if tags:
+            where.append("(tags = '[]' OR tags = ?)")
+            params.append(normalize_tags(tags))
+        
+        marked_count = self.store.execute(
+            f"UPDATE conflicts SET promoted = 1, promoted_at = ?, promoted_rule_id = ? WHERE {' AND '.join(where)}",
+            (datetime.now().isoformat(), rule_id or None, *params),
+        )
+        if marked_count:
+            self.invalidate_aggregates()
         return marked_count
     
     def get_trend_analysis(self, days: int = 7) -> Dict[str, Any]:
@@ -639,23 +539,18 @@ class ConflictTracker:
         Returns:
             趋势分析结果
         """
-        conflicts = self._load_all_conflicts()
-        cutoff_date = datetime.now() - timedelta(days=days)
+        cutoff = (datetime.now() - timedelta(days=days)).isoformat()
+        where = "promoted = 0 AND timestamp >= ?"
         
         # 按日期分组统计
         daily_counts: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
-        recent_conflicts: List[RuleConflict] = []
-        
-        for conflict in conflicts:
-            try:
-                conflict_time = datetime.fromisoformat(conflict.timestamp)
-                if conflict_time >= cutoff_date:
-                    recent_conflicts.append(conflict)
-                    date_key = conflict_time.strftime("%Y-%m-%d")
-                    daily_counts[date_key][conflict.conflict_type.value] += 1
-                    daily_counts[date_key]["total"] += 1
-            except (ValueError, TypeError):
-                continue
+        for day, type_value, count in self.store.fetch(
+            f"SELECT day, conflict_type, COUNT(*) FROM conflicts WHERE {where} "
+            "GROUP BY day, conflict_type",
+            (cutoff,),
+        ):
+            daily_counts[day][type_value] += count
+            daily_counts[day]["total"] += count
         
         # 计算趋势
         dates = sorted(daily_counts.keys())
@@ -679,130 +574,83 @@ class ConflictTracker:
         
         return {
             "period_days": days,
-            "total_conflicts": len(recent_conflicts),
+            "total_conflicts": sum(total_counts),
             "average_daily": round(avg_daily, 2),
             "change_rate_percent": round(change_rate, 2),
             "daily_trend": trend_data,
-            "most_common_type": self._get_most_common(
-                [c.conflict_type.value for c in recent_conflicts]
+            "most_common_type": self.store.scalar(
+                f"SELECT conflict_type FROM conflicts WHERE {where} "
+                "GROUP BY conflict_type ORDER BY COUNT(*) DESC, MIN(id) LIMIT 1",
+                (cutoff,),
             ),
-            "most_affected_language": self._get_most_common(
-                [c.language for c in recent_conflicts]
+            "most_affected_language": self.store.scalar(
+                f"SELECT language FROM conflicts WHERE {where} "
+                "GROUP BY language ORDER BY COUNT(*) DESC, MIN(id) LIMIT 1",
+                (cutoff,),
             ),
         }
     
-    def _get_most_common(self, items: List[str]) -> Optional[str]:
-        """获取列表中出现最多的元素。"""
-        if not items:
-            return None
-        counts: Dict[str, int] = {}
-        for item in items:
-            counts[item] = counts.get(item, 0) + 1
-        return max(counts, key=lambda k: counts[k])
-    
     def generate_rule_suggestions(self) -> List[Dict[str, Any]]:
         """生成规则优化建议。
         
-        基于冲突分析，生成具体的规则配置建议。
+        基于冲突分析，生成具体的规则配置建议。分组统计来自增量维护的聚合，
+        不再每次加载全部冲突。
         
         Returns:
             规则建议列表
         """
-        conflicts = self._load_all_conflicts()
+        aggregates = self.get_aggregates()
         suggestions: List[Dict[str, Any]] = []
         
-        # 分析 RULE_HIGH_LLM_EXPAND 类型：规则可能低估了复杂度
-        expand_conflicts = [
-            c for c in conflicts 
-            if c.conflict_type == ConflictType.RULE_HIGH_LLM_EXPAND
-        ]
-        if expand_conflicts:
-            # 按规则备注分组
-            by_notes: Dict[str, List[RuleConflict]] = defaultdict(list)
-            for c in expand_conflicts:
-                if c.rule_notes:
-                    by_notes[c.rule_notes].append(c)
-            
-            for notes, group in by_notes.items():
-                if len(group) >= 2:
-                    # 计算 LLM 建议的平均上下文级别
-                    llm_levels = [c.llm_context_level for c in group if c.llm_context_level]
-                    if llm_levels:
-                        most_common_level = self._get_most_common(llm_levels)
-                        suggestions.append({
-                            "type": "upgrade_context_level",
-                            "rule_notes": notes,
-                            "current_behavior": "规则建议较小上下文",
-                            "suggested_change": f"考虑将上下文级别提升到 {most_common_level}",
-                            "occurrence_count": len(group),
-                            "confidence": min(0.9, 0.5 + len(group) * 0.1),
-                            "sample_files": [c.file_path for c in group[:3]],
-                        })
-        
-        # 分析 RULE_HIGH_LLM_SKIP 类型：规则可能高估了风险
-        skip_conflicts = [
-            c for c in conflicts 
-            if c.conflict_type == ConflictType.RULE_HIGH_LLM_SKIP
-        ]
-        if skip_conflicts:
-            by_notes: Dict[str, List[RuleConflict]] = defaultdict(list)
-            for c in skip_conflicts:
-                if c.rule_notes:
-                    by_notes[c.rule_notes].append(c)
+        for (type_value, notes), group in list(aggregates.by_notes.items()):
+            sample_files = [c.file_path for c in group.samples[:3]]
             
-            for notes, group in by_notes.items():
-                if len(group) >= 3:
-                    # 分析共同标签
-                    common_tags = set(group[0].tags)
-                    for c in group[1:]:
-                        common_tags &= set(c.tags)
-                    
+            # 分析 RULE_HIGH_LLM_EXPAND 类型：规则可能低估了复杂度
+            if type_value == ConflictType.RULE_HIGH_LLM_EXPAND.value and group.count >= 2:
+                # LLM 建议的最常见上下文级别
+                _, most_common_level = group.consistency()
+                if most_common_level:
                     suggestions.append({
-                        "type": "add_noise_detection",
+                        "type": "upgrade_context_level",
                         "rule_notes": notes,
-                        "current_behavior": "规则认为需要审查",
-                        "suggested_change": "考虑添加噪音标签识别，减少误报",
-                        "common_tags": list(common_tags),
-                        "occurrence_count": len(group),
-                        "confidence": min(0.85, 0.4 + len(group) * 0.1),
-                        "sample_files": [c.file_path for c in group[:3]],
+                        "current_behavior": "规则建议较小上下文",
+                        "suggested_change": f"考虑将上下文级别提升到 {most_common_level}",
+                        "occurrence_count": group.count,
+                        "confidence": min(0.9, 0.5 + group.count * 0.1),
+                        "sample_files": sample_files,
                     })
-        
-        # 分析 RULE_LOW_LLM_CONSISTENT 类型：可以提取新规则
-        consistent_conflicts = [
-            c for c in conflicts 
-            if c.conflict_type == ConflictType.RULE_LOW_LLM_CONSISTENT
-        ]
-        if consistent_conflicts:
-            # 按语言和文件模式分组
-            by_pattern: Dict[str, List[RuleConflict]] = defaultdict(list)
-            for c in consistent_conflicts:
-                filename = os.path.basename(c.file_path)
-                pattern_key = f"{c.language}:{filename}"
-                by_pattern[pattern_key].append(c)
             
-            for pattern_key, group in by_pattern.items():
-                if len(group) >= 3:
-                    # 检查 LLM 决策是否一致
-                    llm_levels = [c.llm_context_level for c in group if c.llm_context_level]
-                    if llm_levels:
-                        most_common = self._get_most_common(llm_levels)
-                        if most_common is None:
-                            continue
-                        consistency = llm_levels.count(most_common) / len(llm_levels)
-                        
-                        if consistency >= 0.7:
-                            lang, filename = pattern_key.split(":", 1)
-                            suggestions.append({
-                                "type": "new_rule",
-                                "language": lang,
-                                "file_pattern": filename,
-                                "suggested_context_level": most_common,
-                                "suggested_confidence": 0.75,
-                                "occurrence_count": len(group),
-                                "consistency": round(consistency, 2),
-                                "sample_files": [c.file_path for c in group[:3]],
-                            })
+            # 分析 RULE_HIGH_LLM_SKIP 类型：规则可能高估了风险
+            elif type_value == ConflictType.RULE_HIGH_LLM_SKIP.value and group.count >= 3:
+                suggestions.append({
+                    "type": "add_noise_detection",
+                    "rule_notes": notes,
+                    "current_behavior": "规则认为需要审查",
+                    "suggested_change": "考虑添加噪音标签识别，减少误报",
+                    "common_tags": list(group.common_tags or ()),
+                    "occurrence_count": group.count,
+                    "confidence": min(0.85, 0.4 + group.count * 0.1),
+                    "sample_files": sample_files,
+                })
+        
+        # 分析 RULE_LOW_LLM_CONSISTENT 类型：按语言和文件模式分组，可以提取新规则
+        for (lang, filename), group in list(aggregates.by_file_pattern.items()):
+            if group.count < 3:
+                continue
+            # 检查 LLM 决策是否一致
+            consistency, most_common = group.consistency()
+            if most_common is None or consistency < 0.7:
+                continue
+            suggestions.append({
+                "type": "new_rule",
+                "language": lang,
+                "file_pattern": filename,
+                "suggested_context_level": most_common,
+                "suggested_confidence": 0.75,
+                "occurrence_count": group.count,
+                "consistency": round(consistency, 2),
+                "sample_files": [c.file_path for c in group.samples[:3]],
+            })
         
         # 按置信度排序
         suggestions.sort(key=lambda x: x.get("confidence", 0), reverse=True)
@@ -849,15 +697,13 @@ class ConflictTracker:
         Returns:
             冲突记录列表
         """
-        conflicts = self._load_all_conflicts()
-        filtered = [c for c in conflicts if c.conflict_type == conflict_type]
-        
-        # 按时间倒序排序
-        filtered.sort(key=lambda c: c.timestamp, reverse=True)
-        
-        if limit:
-            return filtered[:limit]
-        return filtered
+        # 按时间倒序
+        return self._query_conflicts(
+            "promoted = 0 AND conflict_type = ?",
+            (conflict_type.value,),
+            order="timestamp DESC, id DESC",
+            limit=limit,
+        )
     
     def get_high_priority_conflicts(self, limit: int = 10) -> List[RuleConflict]:
         """获取高优先级冲突（需要优先处理的）。
@@ -873,8 +719,6 @@ class ConflictTracker:
         Returns:
             高优先级冲突列表
         """
-        conflicts = self._load_all_conflicts()
-        
         # 按优先级分组
         priority_order = [
             ConflictType.RULE_HIGH_LLM_SKIP,
@@ -885,9 +729,7 @@ class ConflictTracker:
         
         result: List[RuleConflict] = []
         for conflict_type in priority_order:
-            type_conflicts = [c for c in conflicts if c.conflict_type == conflict_type]
-            type_conflicts.sort(key=lambda c: c.timestamp, reverse=True)
-            result.extend(type_conflicts)
+            result.extend(self.get_conflicts_by_type(conflict_type, limit=limit - len(result)))
             if len(result) >= limit:
                 break
         
@@ -896,73 +738,47 @@ class ConflictTracker:
     def cleanup_invalid_records(self) -> Dict[str, Any]:
         """清理无效的冲突记录。
         
-        扫描所有冲突文件，识别并删除无效记录：
+        扫描所有冲突记录，识别并删除无效记录：
         1. 空 file_path 的记录
         2. 匹配测试 unit_id 模式的记录（如 test_unit_1, test-001）
         
         Returns:
             清理结果统计，包含：
-            - total_scanned: 扫描的文件总数
-            - deleted_count: 删除的文件数量
+            - total_scanned: 扫描的记录总数
+            - deleted_count: 删除的记录数量
             - deleted_by_reason: 按原因分类的删除数量
             - errors: 处理过程中的错误列表
         """
-        total_scanned = 0
-        deleted_count = 0
         deleted_by_reason: Dict[str, int] = {
             "empty_file_path": 0,
             "test_unit_id_pattern": 0,
         }
         errors: List[str] = []
+        total_scanned = 0
         
-        # 扫描所有冲突文件
-        for filepath in list(self.conflicts_dir.glob("*.json")):
-            total_scanned += 1
+        try:
+            total_scanned = int(self.store.scalar("SELECT COUNT(*) FROM conflicts") or 0)
             
-            try:
-                # 读取冲突记录
-                with open(filepath, "r", encoding="utf-8") as f:
-                    data = json.load(f)
-                
-                # 检查 file_path 是否为空
-                file_path = data.get("file_path", "")
-                if not file_path or file_path.strip() == "":
-                    # 删除无效记录
-                    filepath.unlink()
-                    deleted_count += 1
-                    deleted_by_reason["empty_file_path"] += 1
-                    logger.info(f"Deleted invalid conflict (empty file_path): {filepath}")
-                    continue
-                
-                # 检查 unit_id 是否匹配测试模式
-                unit_id = data.get("unit_id", "")
-                is_test_pattern = False
-                for pattern in INVALID_UNIT_ID_PATTERNS:
-                    if re.match(pattern, unit_id):
-                        is_test_pattern = True
-                        break
-                
-                if is_test_pattern:
-                    # 删除无效记录
-                    filepath.unlink()
-                    deleted_count += 1
-                    deleted_by_reason["test_unit_id_pattern"] += 1
-                    logger.info(f"Deleted invalid conflict (test unit_id): {filepath}")
-                    continue
-                    
-            except json.JSONDecodeError as e:
-                error_msg = f"JSON decode error for {filepath}: {e}"
-                errors.append(error_msg)
-                logger.warning(error_msg)
-            except OSError as e:
-                error_msg = f"OS error for {filepath}: {e}"
-                errors.append(error_msg)
-                logger.warning(error_msg)
-            except Exception as e:
-                error_msg = f"Unexpected error for {filepath}: {e}"
-                errors.append(error_msg)
-                logger.warning(error_msg)
-        
+            # 空 file_path
+            deleted_by_reason["empty_file_path"] = self.store.execute(
+                "DELETE FROM conflicts WHERE file_path IS NULL OR TRIM(file_path) = ''"
+            )
+            
+            # unit_id 匹配测试模式（SQLite 无内置正则，只取 ID 列在 Python 中匹配）
+            test_ids = [
+                row_id
+                for row_id, unit_id in self.store.fetch("SELECT id, unit_id FROM conflicts")
+                if any(re.match(pattern, unit_id or "") for pattern in INVALID_UNIT_ID_PATTERNS)
+            ]
+            deleted_by_reason["test_unit_id_pattern"] = self.store.delete_ids(test_ids)
+        except Exception as e:
+            error_msg = f"Unexpected error while cleaning conflict records: {e}"
+            errors.append(error_msg)
+            logger.warning(error_msg)
+        
+        deleted_count = sum(deleted_by_reason.values())
+        if deleted_count:
+            self.invalidate_aggregates()
         result = {
             "total_scanned": total_scanned,
             "deleted_count": deleted_count,
@@ -1001,7 +817,7 @@ def record_conflict(
         llm_decision: LLM 决策
         
     Returns:
-        如果记录了冲突，返回文件路径；否则返回 None
+        如果记录了冲突，返回记录标识；否则返回 None
     """
     tracker = get_conflict_tracker()
     return tracker.detect_and_record(unit, llm_decision)
@@ -1,7 +1,8 @@
 """规则分析器：从冲突记录中提取通用规则模式。
 
 基于语义特征（语言、标签、变更规模）而非文件路径来分析冲突，
-生成可应用规则和参考提示。
+生成可应用规则和参考提示。分组统计由 ConflictTracker 增量维护
+（见 conflict_aggregates），分析时不再重新加载、分组全部历史冲突。
 """
 
 from __future__ import annotations
@@ -12,6 +13,7 @@ from dataclasses import dataclass, field, asdict
 from datetime import datetime
 from typing import Any, Dict, List, Optional, Tuple, Union
 
+from Agent.DIFF.issue.conflict_aggregates import ConflictAggregates, FeatureStats
 from Agent.DIFF.issue.conflict_tracker import (
     ConflictTracker,
     ConflictType,
@@ -255,16 +257,33 @@ class RuleAnalyzer:
                 conflict_type="",
             )
         
-        # 提取基本信息
+        stats = FeatureStats()
+        for conflict in conflicts:
+            stats.add(conflict)
         sample = conflicts[0]
-        language = sample.language
-        conflict_type = sample.conflict_type.value
+        return self.evaluate_stats(sample.language, sample.conflict_type.value, stats)
+    
+    def evaluate_stats(
+        self,
+        language: str,
+        conflict_type: str,
+        stats: FeatureStats,
+    ) -> Union[ApplicableRule, ReferenceHint]:
+        """基于一组冲突的聚合统计评估是否可生成可应用规则。
         
+        Args:
+            language: 编程语言
+            conflict_type: 冲突类型
+            stats: 该语义特征组的增量统计
+            
+        Returns:
+            ApplicableRule 或 ReferenceHint
+        """
         # 计算指标
-        sample_count = len(conflicts)
-        consistency, most_common_decision = self.calculate_consistency(conflicts)
-        common_tags = self.extract_common_tags(conflicts)
-        unique_files = len(set(c.file_path for c in conflicts))
+        sample_count = stats.count
+        consistency, most_common_decision = stats.consistency()
+        common_tags = stats.tags_above(self.TAG_PRESENCE_THRESHOLD)
+        unique_files = stats.unique_files
         
         # 检查所有条件
         meets_occurrences = sample_count >= self.MIN_OCCURRENCES
@@ -304,12 +323,10 @@ class RuleAnalyzer:
                 sample_count, consistency, len(common_tags), unique_files
             )
             
-            # 使用所有标签（不仅是通用标签）
-            all_tags = list(set(tag for c in conflicts for tag in c.tags))
-            
             return ReferenceHint(
                 language=language,
-                tags=sorted(all_tags)[:5],  # 最多显示 5 个标签
+                # 使用所有标签（不仅是通用标签），最多显示 5 个
+                tags=sorted(stats.tag_counts)[:5],
                 suggested_context_level=most_common_decision or "unknown",
                 sample_count=sample_count,
                 consistency=round(consistency, 2),
@@ -331,7 +348,7 @@ class RuleAnalyzer:
                         "metrics": c.metrics,
                         "unit_id": c.unit_id,
                     }
-                    for c in conflicts[:10]
+                    for c in stats.samples
                 ],
             )
     
@@ -342,25 +359,22 @@ class RuleAnalyzer:
         """分析所有冲突，返回可应用规则和参考提示。
         
         Args:
-            conflicts: 冲突列表，默认从 tracker 加载
+            conflicts: 冲突列表，默认使用 tracker 增量维护的聚合
             
         Returns:
             (可应用规则列表, 参考提示列表)
         """
         if conflicts is None:
-            conflicts = self.tracker._load_all_conflicts()
-        
-        if not conflicts:
-            return [], []
-        
-        # 按语义特征分组
-        groups = self.group_by_semantic_features(conflicts)
+            aggregates = self.tracker.get_aggregates()
+        else:
+            aggregates = ConflictAggregates.build(conflicts)
         
         applicable_rules: List[ApplicableRule] = []
         reference_hints: List[ReferenceHint] = []
         
-        for key, group_conflicts in groups.items():
-            result = self.evaluate_applicability(group_conflicts)
+        # 按语义特征分组的统计
+        for (language, _tags_signature, conflict_type), stats in list(aggregates.features.items()):
+            result = self.evaluate_stats(language, conflict_type, stats)
             
             if isinstance(result, ApplicableRule):
                 applicable_rules.append(result)
@@ -3,6 +3,7 @@
 from __future__ import annotations
 
 import ast
+import time
 import uuid
 from collections import defaultdict
 from typing import List, Dict, Any, Optional, cast
@@ -24,6 +25,7 @@ from Agent.DIFF.code_analysis import (
     infer_file_level_tags,
 )
 from Agent.DIFF.git_operations import DiffMode
+from Agent.core.logging.metrics import observe_stage, stage_timer
 
 # 导入规则层模块，使用可选导入以确保降级兼容性
 _RULES_AVAILABLE = False
@@ -289,6 +291,7 @@ def build_review_units_from_patch(
 ) -> List[Dict[str, Any]]:
     """从 PatchSet 构建审查单元，可选智能上下文与规则层处理。"""
 
+    units_started = time.perf_counter()
     units: List[Dict[str, Any]] = []
     for patched_file in patch:
         if patched_file.is_removed_file:
@@ -434,8 +437,10 @@ def build_review_units_from_patch(
             else:
                 merged_units.extend(file_units)
         units = merged_units
+    observe_stage("units", time.perf_counter() - units_started)
 
     if apply_rules:
-        _apply_rules_to_units(units)
+        with stage_timer("rules"):
+            _apply_rules_to_units(units)
 
     return units
@@ -18,6 +18,8 @@ from abc import ABC, abstractmethod
 from dataclasses import dataclass, asdict
 from typing import Any, Dict, List, Optional, Tuple
 
+from Agent.core.logging.tracing import span
+
 logger = logging.getLogger(__name__)
 
 _UNAVAILABLE_LOG_TTL_SECONDS = 60.0
@@ -457,6 +459,16 @@ class BaseScanner(ABC):
             
         Requirements: 4.3, 6.1
         """
+        with span("scanner", scanner=self.name, command=args[0] if args else "", cwd=cwd or ""):
+            return self._execute_process(args, cwd, input_data)
+
+    def _execute_process(
+        self,
+        args: List[str],
+        cwd: Optional[str],
+        input_data: Optional[str],
+    ) -> Tuple[int, str, str]:
+        """Run the scanner process for _execute_command (timeout, termination, output decoding)."""
         process = None
         try:
             # Use Popen for better control over timeout and process termination
@@ -16,6 +16,8 @@ import time
 from dataclasses import dataclass, field
 from typing import Any, Dict, List, Optional
 
+from Agent.core.logging.metrics import record_cache
+
 logger = logging.getLogger(__name__)
 
 
@@ -138,6 +140,7 @@ class ScannerCache:
             
             if entry is None:
                 logger.debug(f"Cache miss for {cache_key}: no entry")
+                record_cache("scanner", False)
                 return None
             
             # Check if content has changed (Requirements 6.3)
@@ -148,15 +151,18 @@ class ScannerCache:
                 )
                 # Remove stale entry
                 del self._cache[cache_key]
+                record_cache("scanner", False)
                 return None
             
             # Check TTL
             if time.time() - entry.timestamp > self._ttl:
                 logger.debug(f"Cache expired for {cache_key}")
                 del self._cache[cache_key]
+                record_cache("scanner", False)
                 return None
             
             logger.debug(f"Cache hit for {cache_key}")
+            record_cache("scanner", True)
             return entry.issues
     
     def set(
@@ -22,6 +22,7 @@ from pathlib import Path
 import threading
 
 from Agent.core.logging import get_logger
+from Agent.core.logging.metrics import observe_stage
 from Agent.DIFF.file_utils import guess_language
 from Agent.DIFF.rule.scanner_registry import ScannerRegistry
 from Agent.DIFF.rule.scanner_performance import ScannerExecutor, AvailabilityCache
@@ -1975,6 +1976,7 @@ async def run_static_scan(
                     pass
     
     result.duration_ms = (time.perf_counter() - start_time) * 1000
+    observe_stage("static_scan", result.duration_ms / 1000)
 
     critical_issues: List[Dict[str, Any]] = []
     try:
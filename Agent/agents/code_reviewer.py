@@ -8,6 +8,7 @@ import asyncio
 from Agent.core.adapter.llm_adapter import LLMAdapter, ToolDefinition
 from Agent.core.context.provider import ContextProvider
 from Agent.core.logging.api_logger import APILogger
+from Agent.core.logging.tracing import span, traced
 from Agent.core.state.conversation import ConversationState
 from Agent.core.tools.runtime import ToolRuntime
 from Agent.core.stream.stream_processor import NormalizedToolCall, NormalizedMessage
@@ -52,6 +53,7 @@ class CodeReviewAgent:
         self.trace_id = getattr(trace_logger, "trace_id", None)
         self.file_tree = file_tree
 
+    @traced("agent.review")
     async def run(
         self,
         prompt: str,
@@ -72,6 +74,8 @@ class CodeReviewAgent:
                 file_tree_str = _format_file_tree(self.file_tree)
                 system_prompt += f"\n\n## 项目文件结构\n以下是项目的全局文件结构，供你理解项目整体架构：\n```\n{file_tree_str}\n```"
             self.state.add_system_message(system_prompt)
+            # system + 文件树跨审查不变，作为第一个前缀缓存断点
+            self.state.mark_cache_breakpoint()
 
         # 会话级别日志：记录一次审查的起点（包含文件列表和可用工具）
         if self._trace_logger and self._trace_path is None:
@@ -94,18 +98,33 @@ class CodeReviewAgent:
         # 为避免重复贴整文件内容，这里不再追加 ContextProvider 的全文片段。
         # 如需更多上下文，请通过工具（read_file_hunk 等）按需读取。
         self.state.add_user_message(prompt)
+        # 审查索引与上下文包在本次工具循环内保持不变，之后每轮只追加消息
+        self.state.mark_cache_breakpoint()
 
         whitelist = set(auto_approve_tools or [])
         
         # 从 ConfigAPI 读取 LLM 调用超时配置
-        from Agent.core.api.config import get_llm_call_timeout
+        from Agent.core.api.config import get_compaction_settings, get_llm_call_timeout
         call_timeout = get_llm_call_timeout(default=300.0)
+        compaction = get_compaction_settings()
 
         while True:
             # 每轮 LLM 调用的序号（用于日志与流式回调）
             self._call_index += 1
             call_idx = self._call_index
 
+            # 会话超出 token 预算时压缩较早的工具结果，避免每轮重发全部历史
+            compacted = self.state.compact(compaction["max_tokens"], compaction["keep_turns"])
+            if compacted:
+                if self._trace_logger and self._trace_path is not None:
+                    self._trace_logger.append(
+                        self._trace_path,
+                        f"LLM_CALL_{call_idx}_CONTEXT_COMPACTED",
+                        dict(compacted, trace_id=self.trace_id),
+                    )
+                if stream_observer:
+                    stream_observer({"type": "context_compacted", "call_index": call_idx, **compacted})
+
             # 日志：记录每次对 LLM 的请求（包含当前 messages 和工具定义）
             if self._trace_logger and self._trace_path is not None:
                 self._trace_logger.append(
@@ -130,18 +149,20 @@ class CodeReviewAgent:
                     stream_observer(event_with_idx)
 
             try:
-                assistant_msg = await asyncio.wait_for(
-                    self.adapter.complete(
-                        self.state.messages,
-                        tools=tools,
-                        observer=wrapped_observer if stream_observer else None,
-                        temperature=1,
-                        # 尝试显式开启推理（针对部分支持该参数的渠道）
-                        enable_reasoning=True,
-                        include_reasoning_content=True, # Explicitly request reasoning content
-                    ),
-                    timeout=call_timeout,
-                )
+                with span("llm.call", call_index=call_idx, messages=len(self.state.messages)):
+                    assistant_msg = await asyncio.wait_for(
+                        self.adapter.complete(
+                            self.state.messages,
+                            tools=tools,
+                            cache_breakpoints=self.state.cache_breakpoints,
+                            observer=wrapped_observer if stream_observer else None,
+                            temperature=1,
+                            # 尝试显式开启推理（针对部分支持该参数的渠道）
+                            enable_reasoning=True,
+                            include_reasoning_content=True, # Explicitly request reasoning content
+                        ),
+                        timeout=call_timeout,
+                    )
             except asyncio.TimeoutError:
                 timeout_msg = (
                     f"LLM call timeout after {call_timeout}s "
@@ -273,6 +294,8 @@ class CodeReviewAgent:
 
                 # 推送给流式观察者，前端可以看到“拒绝”结果
                 if stream_observer:
+                    cache_stats_fn = getattr(self.runtime, "cache_stats", None)
+                    cache_stats = cache_stats_fn() if callable(cache_stats_fn) else None
                     for call, result in list(zip(approved_calls, results)) + list(
                         zip(denied_calls, error_results)
                     ):
@@ -288,6 +311,8 @@ class CodeReviewAgent:
                                 "duration_ms": result.get("duration_ms"),
                                 "cpu_time": result.get("cpu_time"),
                                 "mem_delta": result.get("mem_delta"),
+                                "cache": result.get("cache"),
+                                "cache_stats": cache_stats,
                             }
                         )
                         stream_observer(
@@ -15,7 +15,15 @@ from typing import Any, Dict, List, Tuple, Optional, TypeVar, Generic
 
 from Agent.core.context.diff_provider import DiffContext
 from Agent.core.context.runtime_context import get_project_root
+from Agent.core.context.line_index import (
+    clear_line_index_cache,
+    get_line_index,
+    line_index_cache_stats,
+    split_lines,
+)
 from Agent.core.logging.fallback_tracker import record_fallback, read_text_with_fallback
+from Agent.core.logging.metrics import record_cache
+from Agent.core.logging.tracing import traced
 from Agent.core.api.config import get_context_limits
 from Agent.DIFF.git_operations import run_git
 
@@ -36,10 +44,12 @@ class LRUCache(Generic[K, V]):
     当缓存满时，自动移除最久未使用的条目。
     """
     
-    def __init__(self, max_size: int = 100) -> None:
+    def __init__(self, max_size: int = 100, name: Optional[str] = None) -> None:
         self._max_size = max(1, max_size)
         self._cache: OrderedDict[K, V] = OrderedDict()
         self._lock = threading.RLock()
+        # 设置名称后，命中/未命中计入运行指标（cache 标签）
+        self._name = name
     
     def get(self, key: K, default: Optional[V] = None) -> Optional[V]:
         """获取缓存值，并将其标记为最近使用。
@@ -53,9 +63,13 @@ class LRUCache(Generic[K, V]):
         """
         with self._lock:
             if key not in self._cache:
+                if self._name:
+                    record_cache(self._name, False)
                 return default
             # 移动到末尾（最近使用）
             self._cache.move_to_end(key)
+            if self._name:
+                record_cache(self._name, True)
             return self._cache[key]
     
     def set(self, key: K, value: V) -> None:
@@ -138,16 +152,16 @@ class ContextConfig:
 # 跨调用的文件读取缓存（使用 LRU 策略）
 # ============================================================
 
-_FILE_CACHE: LRUCache[str, List[str]] = LRUCache(max_size=_FILE_CACHE_MAX_SIZE)
+_FILE_CACHE: LRUCache[str, List[str]] = LRUCache(max_size=_FILE_CACHE_MAX_SIZE, name="file")
 """文件内容缓存，键为文件路径，值为文件内容的行列表。"""
 
-_PREV_FILE_CACHE: LRUCache[Tuple[str, str], List[str]] = LRUCache(max_size=_PREV_FILE_CACHE_MAX_SIZE)
+_PREV_FILE_CACHE: LRUCache[Tuple[str, str], List[str]] = LRUCache(max_size=_PREV_FILE_CACHE_MAX_SIZE, name="prev_file")
 """历史版本文件内容缓存，键为 (base, file_path) 元组，值为文件内容的行列表。"""
 
-_AST_CACHE: LRUCache[str, ast.AST] = LRUCache(max_size=_AST_CACHE_MAX_SIZE)
+_AST_CACHE: LRUCache[str, ast.AST] = LRUCache(max_size=_AST_CACHE_MAX_SIZE, name="ast")
 """AST 缓存，键为文件内容 hash，值为解析后的 AST。"""
 
-_RG_CACHE: LRUCache[Tuple[str, str, int], List[Dict[str, str]]] = LRUCache(max_size=_RG_CACHE_MAX_SIZE)
+_RG_CACHE: LRUCache[Tuple[str, str, int], List[Dict[str, str]]] = LRUCache(max_size=_RG_CACHE_MAX_SIZE, name="rg")
 """ripgrep 搜索缓存。"""
 
 _EMPTY_RESULT_LIST: List[str] = []
@@ -173,6 +187,7 @@ def clear_file_caches() -> None:
     _PREV_FILE_CACHE.clear()
     _AST_CACHE.clear()
     _RG_CACHE.clear()
+    clear_line_index_cache()
     logger.debug("All file caches cleared")
 
 
@@ -183,6 +198,7 @@ def get_cache_stats() -> Dict[str, Any]:
         "prev_file_cache": _PREV_FILE_CACHE.stats(),
         "ast_cache": _AST_CACHE.stats(),
         "rg_cache": _RG_CACHE.stats(),
+        "line_index_cache": line_index_cache_stats(),
     }
 
 
@@ -227,6 +243,23 @@ def _span_from_unit(unit: Dict[str, Any], key: str) -> Tuple[int, int]:
     return start, end
 
 
+def _resolve_context_path(path: str) -> Optional[Path]:
+    """将上下文文件路径解析为实际存在的路径（相对路径按项目根解析），不存在返回 None。"""
+    root_str = get_project_root() or ""
+    p = Path(path)
+    if not p.exists():
+        if root_str and not p.is_absolute():
+            try:
+                root_path = Path(root_str).resolve()
+                candidate = (root_path / p).resolve()
+                candidate.relative_to(root_path)
+                if candidate.exists():
+                    p = candidate
+            except Exception:
+                pass
+    return p if p.exists() else None
+
+
 def _read_file_cached(path: str) -> List[str]:
     """读取文件内容，使用 LRU 缓存。
     
@@ -244,19 +277,8 @@ def _read_file_cached(path: str) -> List[str]:
     if cached is not None:
         return cached
     
-    p = Path(path)
-    if not p.exists():
-        if root_str and not p.is_absolute():
-            try:
-                root_path = Path(root_str).resolve()
-                candidate = (root_path / p).resolve()
-                candidate.relative_to(root_path)
-                if candidate.exists():
-                    p = candidate
-            except Exception:
-                pass
-    
-    if not p.exists():
+    p = _resolve_context_path(path)
+    if p is None:
         _FILE_CACHE.set(cache_key, _EMPTY_RESULT_LIST)
         return _EMPTY_RESULT_LIST
     
@@ -273,7 +295,8 @@ def _read_file_cached(path: str) -> List[str]:
         _FILE_CACHE.set(cache_key, _EMPTY_RESULT_LIST)
         return _EMPTY_RESULT_LIST
     
-    lines = text.splitlines()
+    # 与行偏移索引同样只按 \n 分行，保证两条读取路径的行号一致
+    lines = split_lines(text)
     _FILE_CACHE.set(cache_key, lines)
     return lines
 
@@ -286,6 +309,30 @@ def _slice_lines(lines: List[str], start: int, end: int) -> str:
     return "\n".join(lines[s - 1 : e])
 
 
+def _slice_file(path: str, start: int, end: int) -> str:
+    """按行区间读取文件片段（语义同 _slice_lines），只解码所需字节。
+
+    已在整文件缓存中的文件直接切片；否则走行偏移索引，避免为几行上下文读入整个文件。
+    """
+    root_str = get_project_root() or ""
+    cached = _FILE_CACHE.get(f"{root_str}::{path}")
+    if cached is not None:
+        return _slice_lines(cached, start, end)
+    p = _resolve_context_path(path)
+    if p is None:
+        return ""
+    s = max(1, start)
+    try:
+        return "\n".join(get_line_index(p).read_lines(s, max(s, end)))
+    except Exception as exc:
+        record_fallback(
+            "context_slice_failed",
+            "按行索引读取上下文失败，回退整文件读取",
+            meta={"path": path, "error": str(exc)},
+        )
+        return _slice_lines(_read_file_cached(path), start, end)
+
+
 def _extract_function_by_span(lines: List[str], start: int, end: int, window: int = 30) -> str:
     """启发式：在跨度周围取较大窗口作为函数级上下文兜底。"""
     if not lines:
@@ -608,6 +655,64 @@ def _create_merged_item(
     
     return merged
 
+@traced("context.prefetch")
+def prefetch_plan_item(
+    unit: Dict[str, Any],
+    plan_item: Dict[str, Any],
+    base_branch: Optional[str] = None,
+    config: Optional[ContextConfig] = None,
+) -> Dict[str, int]:
+    """按单个 plan 条目预热上下文缓存（文件内容、AST、历史版本、调用方搜索）。
+
+    供 planner 流式输出期间在线程中调用：此时尚未融合，最终层级未知，
+    因此只要不是双方都为 diff_only 就预读文件；extra_requests 与融合规则一致，
+    planner 有则用 planner 的，否则回退到规则侧。缓存键与 build_context_bundle 完全一致，
+    之后组装 bundle 时直接命中。
+
+    Returns:
+        各类预热动作的计数，便于记录日志。
+    """
+    cfg = config or ContextConfig()
+    stats = {"files": 0, "previous_version": 0, "callers": 0}
+    if plan_item.get("skip_review"):
+        return stats
+    file_path = unit.get("file_path")
+    if not file_path:
+        return stats
+
+    llm_level = plan_item.get("llm_context_level")
+    rule_level = unit.get("rule_context_level")
+    if not (llm_level == "diff_only" and rule_level in (None, "diff_only", "unknown")):
+        lines = _read_file_cached(file_path)
+        stats["files"] += 1
+        if lines and (llm_level or rule_level or "function") == "function":
+            new_start, new_end = _span_from_unit(unit, "after")
+            _extract_function_ast(lines, new_start, new_end, unit.get("language", ""))
+
+    extra_requests = plan_item.get("extra_requests") or unit.get("rule_extra_requests") or []
+    for req in extra_requests:
+        if not isinstance(req, dict):
+            continue
+        rtype = req.get("type")
+        if rtype == "previous_version":
+            if base_branch:
+                root_str = get_project_root() or ""
+                key = (f"{root_str}::{base_branch}", file_path)
+                if _PREV_FILE_CACHE.get(key) is None:
+                    _PREV_FILE_CACHE.set(key, _git_show_file(base_branch, file_path))
+                stats["previous_version"] += 1
+        elif rtype in ("callers", "search"):
+            symbol = req.get("symbol") if rtype == "callers" else (req.get("keyword") or req.get("text"))
+            if symbol:
+                for hit in _search_callers(symbol, max_hits=cfg.callers_max_hits):
+                    hit_path = _resolve_context_path(hit["file_path"]) if hit.get("file_path") else None
+                    if hit_path is not None:
+                        get_line_index(hit_path)
+                stats["callers"] += 1
+    return stats
+
+
+@traced("context.bundle")
 def build_context_bundle(
     diff_ctx: DiffContext,
     fused_plan: Dict[str, Any],
@@ -715,15 +820,16 @@ def build_context_bundle(
         
         extra_requests = item.get("extra_requests") or item.get("final_extra_requests") or []
 
-        lines = _read_file_cached(file_path) if file_path else []
+        # 仅函数级/全文件级需要整文件内容；文件片段级走行索引按区间读取
+        lines = _read_file_cached(file_path) if file_path and ctx_level in ("function", "full_file") else []
 
         if ctx_level == "function":
             function_ctx = _extract_function_ast(lines, new_start, new_end, unit.get("language", "")) or _extract_function_by_span(
                 lines, new_start, new_end, window=cfg.function_window
             )
-        elif ctx_level == "file_context":
-            file_ctx = _slice_lines(
-                lines,
+        elif ctx_level == "file_context" and file_path:
+            file_ctx = _slice_file(
+                file_path,
                 new_start - cfg.file_context_window,
                 new_end + cfg.file_context_window
             )
@@ -775,9 +881,8 @@ def build_context_bundle(
                 except Exception:
                     ln = None
                 if ln:
-                    hit_lines = _read_file_cached(fp)
-                    snippet = _slice_lines(
-                        hit_lines,
+                    snippet = _slice_file(
+                        fp,
                         ln - cfg.callers_snippet_window,
                         ln + cfg.callers_snippet_window,
                     )
@@ -843,4 +948,10 @@ def build_context_bundle(
     return bundle
 
 
-__all__ = ["build_context_bundle", "clear_file_caches", "get_cache_stats", "LRUCache"]
+__all__ = [
+    "build_context_bundle",
+    "prefetch_plan_item",
+    "clear_file_caches",
+    "get_cache_stats",
+    "LRUCache",
+]
@@ -28,6 +28,7 @@ class IntentAgent:
         *,
         stream: bool = True,
         observer=None,
+        use_cache: bool = True,
     ) -> str:
         """生成意图摘要 Markdown。
 
@@ -35,6 +36,7 @@ class IntentAgent:
             intent_input: 预先收集的项目概览数据（文件列表/README 摘要/提交概览等）。
             stream: 是否流式。
             observer: 可选流式观察者。
+            use_cache: 输入完全相同时是否复用磁盘响应缓存（强制刷新时传 False）。
         """
         if not self.state.messages:
             self.state.add_system_message(SYSTEM_PROMPT_INTENT)
@@ -52,6 +54,7 @@ class IntentAgent:
             stream=stream,
             observer=observer,
             temperature=1,
+            response_cache=use_cache,
         )
         self.last_usage = assistant_msg.get("usage")
         content_text = assistant_msg.get("content", "") or ""
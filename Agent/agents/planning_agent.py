@@ -4,9 +4,10 @@ from __future__ import annotations
 
 import time
 import json
-from typing import Any, Dict, List
+from typing import Any, Callable, Dict, List
 
 from Agent.core.adapter.llm_adapter import LLMAdapter
+from Agent.core.llm.response_cache import get_response_cache
 from Agent.core.state.conversation import ConversationState
 from Agent.agents.prompts import SYSTEM_PROMPT_PLANNER, PLANNER_USER_INSTRUCTIONS
 from Agent.core.logging.pipeline_logger import PipelineLogger
@@ -52,6 +53,137 @@ def _extract_json_object(text: str) -> str | None:
     return None
 
 
+_ALLOWED_LEVELS = {"function", "file_context", "full_file", "diff_only"}
+_ALLOWED_EXTRA_TYPES = {"callers", "previous_version", "search"}
+_ALLOWED_KEYS = {"unit_id", "llm_context_level", "extra_requests", "skip_review", "reason"}
+
+
+def _normalize_plan_item(item: Any) -> Dict[str, Any] | None:
+    """对单个 planner 条目做白名单过滤，返回下游消费的 dict；非法条目返回 None。"""
+    if not isinstance(item, dict):
+        return None
+    unit_id = item.get("unit_id")
+    if not unit_id:
+        return None
+    clean_item = {k: item.get(k) for k in _ALLOWED_KEYS if k in item}
+    clean_item["unit_id"] = unit_id
+    llm_level = clean_item.get("llm_context_level")
+    if llm_level not in _ALLOWED_LEVELS:
+        clean_item.pop("llm_context_level", None)
+    extra_reqs = clean_item.get("extra_requests")
+    if isinstance(extra_reqs, list):
+        filtered_reqs = []
+        for req in extra_reqs:
+            if not isinstance(req, dict):
+                continue
+            if req.get("type") not in _ALLOWED_EXTRA_TYPES:
+                continue
+            filtered_reqs.append(req)
+        clean_item["extra_requests"] = filtered_reqs
+    else:
+        clean_item.pop("extra_requests", None)
+    clean_item["skip_review"] = bool(clean_item.get("skip_review", False))
+
+    # 转为数据类（域模型）
+    extra_list = []
+    for er in clean_item.get("extra_requests", []) or []:
+        extra_list.append(ExtraRequest(type=er.get("type"), details=er.get("details")))
+    plan_item_obj = PlanItem(
+        unit_id=clean_item["unit_id"],
+        llm_context_level=clean_item.get("llm_context_level"),
+        extra_requests=extra_list or None,
+        skip_review=bool(clean_item.get("skip_review", False)),
+        reason=clean_item.get("reason"),
+    )
+    # 目前下游仍消费 dict，保持兼容：
+    return {
+        "unit_id": plan_item_obj.unit_id,
+        "llm_context_level": plan_item_obj.llm_context_level,
+        "extra_requests": [{"type": er.type, "details": er.details} for er in (plan_item_obj.extra_requests or [])],
+        "skip_review": plan_item_obj.skip_review,
+        "reason": plan_item_obj.reason,
+    }
+
+
+class PlanStreamParser:
+    """增量解析 planner 流式输出，在 plan 数组的每个元素闭合时立即产出。
+
+    只做结构扫描（字符串/转义/括号深度），不回溯已扫描的文本；
+    最终结果仍以完整 JSON 解析为准，这里产出的条目仅用于提前预取上下文。
+    """
+
+    def __init__(self) -> None:
+        self._text = ""
+        self._pos = 0
+        self._started = False
+        self._depth = 0
+        self._in_str = False
+        self._esc = False
+        self._str_start = -1
+        self._last_str: str | None = None
+        self._plan_depth: int | None = None
+        self._plan_closed = False
+        self._item_start = -1
+
+    def feed(self, delta: str | None) -> List[Dict[str, Any]]:
+        """追加一段 content 增量，返回本次新闭合的原始 plan 元素。"""
+        if not delta or self._plan_closed:
+            return []
+        self._text += delta
+        items: List[Dict[str, Any]] = []
+        text = self._text
+        i = self._pos
+        n = len(text)
+        if not self._started:
+            brace = text.find("{", i)
+            if brace < 0:
+                self._pos = n
+                return items
+            self._started = True
+            i = brace
+        while i < n:
+            ch = text[i]
+            if self._in_str:
+                if self._esc:
+                    self._esc = False
+                elif ch == "\\":
+                    self._esc = True
+                elif ch == '"':
+                    self._in_str = False
+                    self._last_str = text[self._str_start + 1 : i]
+            elif ch == '"':
+                self._in_str = True
+                self._str_start = i
+            elif ch in "{[":
+                if (
+                    ch == "["
+                    and self._plan_depth is None
+                    and self._depth == 1
+                    and self._last_str == "plan"
+                ):
+                    self._plan_depth = self._depth + 1
+                elif ch == "{" and self._plan_depth is not None and self._depth == self._plan_depth:
+                    self._item_start = i
+                self._depth += 1
+            elif ch in "}]":
+                self._depth -= 1
+                if self._plan_depth is not None:
+                    if ch == "}" and self._depth == self._plan_depth and self._item_start >= 0:
+                        try:
+                            obj = json.loads(text[self._item_start : i + 1])
+                        except Exception:
+                            obj = None
+                        if isinstance(obj, dict):
+                            items.append(obj)
+                        self._item_start = -1
+                    elif ch == "]" and self._depth == self._plan_depth - 1:
+                        self._plan_closed = True
+                        break
+            i += 1
+        self._pos = i
+        return items
+
+
 class PlanningAgent:
     """轻量规划 Agent，决定审查哪些 ReviewUnit 以及所需上下文（默认流式）。"""
 
@@ -61,8 +193,23 @@ class PlanningAgent:
         self.logger = logger
         self.last_usage: Dict[str, Any] | None = None
 
-    async def run(self, review_index: Dict[str, Any], *, stream: bool = True, observer=None, intent_md: str | None = None, user_prompt: str | None = None) -> Dict[str, Any]:
-        """基于 review_index 生成上下文计划（仅返回 JSON，默认流式）。"""
+    async def run(
+        self,
+        review_index: Dict[str, Any],
+        *,
+        stream: bool = True,
+        observer=None,
+        intent_md: str | None = None,
+        user_prompt: str | None = None,
+        on_plan_item: Callable[[Dict[str, Any]], None] | None = None,
+        use_cache: bool = True,
+    ) -> Dict[str, Any]:
+        """基于 review_index 生成上下文计划（仅返回 JSON，默认流式）。
+
+        on_plan_item: 可选回调；流式过程中每当 plan 数组有元素闭合即以清洗后的条目调用，
+        便于调用方在 planner 仍在生成时提前预取上下文。回调异常不影响规划流程。
+        use_cache: 输入完全相同时是否复用磁盘响应缓存；无法解析的缓存结果会被作废。
+        """
 
         # 构建消息
         if not self.state.messages:
@@ -113,6 +260,9 @@ class PlanningAgent:
             if thinking_mode
             else get_planner_first_token_timeout(default=20.0)
         )
+        # 路由客户端会在首包超时后依次切换备用厂商，整体首包等待按候选数放宽
+        candidate_count = len(getattr(getattr(self.adapter, "client", None), "candidates", None) or ()) or 1
+        first_token_timeout *= candidate_count
         first_token_timeout_enabled = first_token_timeout > 0
 
         planner_started_at = time.monotonic()
@@ -125,6 +275,9 @@ class PlanningAgent:
 
         task: asyncio.Task | None = None
 
+        stream_parser = PlanStreamParser() if on_plan_item else None
+        streamed_ids: set = set()
+
         def _wrapped_observer(evt: Dict[str, Any]) -> None:
             nonlocal last_activity_at
             last_activity_at = time.monotonic()
@@ -136,6 +289,16 @@ class PlanningAgent:
             if first_token_at is None:
                 first_token_at = last_activity_at
                 first_token_event.set()
+            if stream_parser is not None and on_plan_item is not None:
+                try:
+                    for raw_item in stream_parser.feed(evt.get("content_delta")):
+                        early_item = _normalize_plan_item(raw_item)
+                        if early_item is None or early_item["unit_id"] in streamed_ids:
+                            continue
+                        streamed_ids.add(early_item["unit_id"])
+                        on_plan_item(early_item)
+                except Exception:
+                    pass
             if observer:
                 try:
                     observer(evt)
@@ -205,6 +368,7 @@ class PlanningAgent:
                     observer=_wrapped_observer,
                     # response_format=response_format,  # 移除强制 JSON 约束以允许输出思考过程
                     temperature=1,
+                    response_cache=use_cache,
                 )
             )
 
@@ -318,6 +482,8 @@ class PlanningAgent:
                     parsed = None
  
                 if parsed is None:
+                    # 不可用的输出不应在重跑时被复用
+                    await asyncio.to_thread(get_response_cache().invalidate, assistant_msg.get("cache_key"))
                     if self.logger:
                         self.logger.log(
                             "planner_error",
@@ -328,59 +494,16 @@ class PlanningAgent:
         clean_plan = {"plan": []}
         raw_items = cast(List[Dict[str, Any]], parsed.get("plan", []) if isinstance(parsed, dict) else [])
 
-        allowed_levels = {"function", "file_context", "full_file", "diff_only"}
-        allowed_extra_types = {"callers", "previous_version", "search"}
-        allowed_keys = {"unit_id", "llm_context_level", "extra_requests", "skip_review", "reason"}
         seen_ids = set()
         dropped = 0
         # 对 planner 返回做白名单过滤，确保进入融合层的数据结构化、可预期。
         for item in raw_items:
-            if not isinstance(item, dict):
-                dropped += 1
-                continue
-            unit_id = item.get("unit_id")
-            if not unit_id or unit_id in seen_ids:
+            clean_item = _normalize_plan_item(item)
+            if clean_item is None or clean_item["unit_id"] in seen_ids:
                 dropped += 1
                 continue
-            seen_ids.add(unit_id)
-            clean_item = {k: item.get(k) for k in allowed_keys if k in item}
-            clean_item["unit_id"] = unit_id
-            llm_level = clean_item.get("llm_context_level")
-            if llm_level not in allowed_levels:
-                clean_item.pop("llm_context_level", None)
-            extra_reqs = clean_item.get("extra_requests")
-            if isinstance(extra_reqs, list):
-                filtered_reqs = []
-                for req in extra_reqs:
-                    if not isinstance(req, dict):
-                        continue
-                    if req.get("type") not in allowed_extra_types:
-                        continue
-                    filtered_reqs.append(req)
-                clean_item["extra_requests"] = filtered_reqs
-            else:
-                clean_item.pop("extra_requests", None)
-            clean_item["skip_review"] = bool(clean_item.get("skip_review", False))
-
-            # 转为数据类（域模型）
-            extra_list = []
-            for er in clean_item.get("extra_requests", []) or []:
-                extra_list.append(ExtraRequest(type=er.get("type"), details=er.get("details")))
-            plan_item_obj = PlanItem(
-                unit_id=clean_item["unit_id"],
-                llm_context_level=clean_item.get("llm_context_level"),
-                extra_requests=extra_list or None,
-                skip_review=bool(clean_item.get("skip_review", False)),
-                reason=clean_item.get("reason"),
-            )
-            # 目前下游仍消费 dict，保持兼容：
-            clean_plan["plan"].append({
-                "unit_id": plan_item_obj.unit_id,
-                "llm_context_level": plan_item_obj.llm_context_level,
-                "extra_requests": [{"type": er.type, "details": er.details} for er in (plan_item_obj.extra_requests or [])],
-                "skip_review": plan_item_obj.skip_review,
-                "reason": plan_item_obj.reason,
-            })
+            seen_ids.add(clean_item["unit_id"])
+            clean_plan["plan"].append(clean_item)
         if dropped and self.logger:
             self.logger.log(
                 "planner_response_filtered",
@@ -402,4 +525,5 @@ class PlanningAgent:
 
 __all__ = [
     "PlanningAgent",
+    "PlanStreamParser",
 ]
@@ -3,10 +3,13 @@
 from __future__ import annotations
 
 import abc
+import asyncio
 import json
 from typing import Any, Dict, List, Optional, TypedDict, AsyncIterator, cast
 
 from Agent.core.llm.client import BaseLLMClient
+from Agent.core.llm.router import RoutingLLMClient
+from Agent.core.llm.response_cache import get_response_cache, make_cache_key
 from Agent.core.stream.stream_processor import (
     NormalizedMessage,
     NormalizedToolCall,
@@ -51,12 +54,81 @@ class LLMAdapter(abc.ABC):
         extra_kwargs: Dict[str, Any] = dict(kwargs)
         if response_format:
             extra_kwargs["response_format"] = response_format
+        route_info = self._route_info(extra_kwargs)
         stream = cast(AsyncIterator[Dict[str, Any]], self.client.stream_chat(messages, tools=tools, **extra_kwargs))
         normalized = await self.stream_processor.collect(stream, observer=observer)
-        normalized["provider"] = self.provider_name
+        self._annotate_route(normalized, route_info)
         normalized["tool_schemas"] = tools
         return normalized
 
+    def _route_info(self, kwargs: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """路由客户端会把实际应答的厂商/模型写入 route_info；单厂商客户端返回 None。"""
+        if not isinstance(self.client, RoutingLLMClient):
+            return None
+        route_info: Dict[str, Any] = {}
+        kwargs["route_info"] = route_info
+        return route_info
+
+    def _annotate_route(self, normalized: NormalizedMessage, route_info: Optional[Dict[str, Any]]) -> None:
+        """provider 记录实际应答的厂商（故障转移后不再是首选厂商）。"""
+        normalized["provider"] = (route_info or {}).get("provider") or self.provider_name
+        if route_info:
+            normalized["route"] = dict(route_info)
+
+    def _response_cache_key(
+        self,
+        messages: List[Dict[str, Any]],
+        tools: Optional[List[ToolDefinition]],
+        kwargs: Dict[str, Any],
+        route: Optional[Dict[str, Any]] = None,
+    ) -> str:
+        """缓存键按应答的厂商/模型计算；route 为路由客户端回传的实际应答方，缺省为首选厂商。"""
+        provider = (route or {}).get("provider") or self.provider_name
+        model = str((route or {}).get("model") or getattr(self.client, "model", "") or "")
+        return make_cache_key(
+            provider,
+            model,
+            messages,
+            tools=tools,
+            response_format=kwargs.get("response_format"),
+            temperature=kwargs.get("temperature"),
+        )
+
+    async def _complete_from_cache(self, key: str, tools: Optional[List[ToolDefinition]], observer=None) -> Optional[NormalizedMessage]:
+        """命中响应缓存时构造规范化消息，并以单个增量事件回放给观察者。"""
+        cached = await asyncio.to_thread(get_response_cache().get, key)
+        if not cached:
+            return None
+        message = cast(NormalizedMessage, {
+            "type": "assistant",
+            "role": cached.get("role") or "assistant",
+            "content": cached.get("content"),
+            "content_json": cached.get("content_json"),
+            "reasoning": cached.get("reasoning"),
+            "tool_calls": [],
+            "finish_reason": cached.get("finish_reason") or "stop",
+            "raw": {"source": "response_cache", "provider": self.provider_name},
+            "usage": None,
+        })
+        message["provider"] = self.provider_name
+        message["tool_schemas"] = tools
+        message["cache_key"] = key
+        message["cache"] = "hit"
+        if observer:
+            try:
+                observer({
+                    "type": "delta",
+                    "content_delta": message.get("content") or "",
+                    "reasoning_delta": message.get("reasoning") or "",
+                    "tool_calls_delta": [],
+                    "chunk": {},
+                    "usage": None,
+                    "cache": "hit",
+                })
+            except Exception:
+                pass
+        return message
+
 
 class OpenAIAdapter(LLMAdapter):
     """兼容 OpenAI 语义的适配器（流式 + 非流式），支持所有 OpenAI 兼容的 API。"""
@@ -68,6 +140,43 @@ class OpenAIAdapter(LLMAdapter):
         tools: Optional[List[ToolDefinition]] = None,
         observer=None,
         **kwargs: Any,
+    ) -> NormalizedMessage:
+        """response_cache=True 时对输入逐字节相同的调用复用磁盘缓存（仅用于确定性的规划/意图调用）。"""
+        use_cache = bool(kwargs.pop("response_cache", False))
+        if not use_cache:
+            return await self._complete_uncached(messages, stream=stream, tools=tools, observer=observer, **kwargs)
+
+        key = self._response_cache_key(messages, tools, kwargs)
+        cached = await self._complete_from_cache(key, tools, observer)
+        if cached is not None:
+            return cached
+        normalized = await self._complete_uncached(messages, stream=stream, tools=tools, observer=observer, **kwargs)
+        route = normalized.get("route")
+        if route and route.get("failover"):
+            # 故障转移后由备用厂商应答：按实际应答方存储，避免把它当作首选模型的结果复用
+            key = self._response_cache_key(messages, tools, kwargs, route)
+        # 只缓存正常结束、无工具调用的文本回复
+        if normalized.get("content") and not normalized.get("tool_calls") and normalized.get("finish_reason") in (None, "stop"):
+            await asyncio.to_thread(
+                get_response_cache().set,
+                key,
+                cast(Dict[str, Any], normalized),
+                {
+                    "provider": normalized.get("provider") or self.provider_name,
+                    "model": (route or {}).get("model") or getattr(self.client, "model", None),
+                },
+            )
+        normalized["cache_key"] = key
+        normalized["cache"] = "miss"
+        return normalized
+
+    async def _complete_uncached(
+        self,
+        messages: List[Dict[str, Any]],
+        stream: bool = True,
+        tools: Optional[List[ToolDefinition]] = None,
+        observer=None,
+        **kwargs: Any,
     ) -> NormalizedMessage:
         if stream:
             normalized = await super().complete(
@@ -79,11 +188,12 @@ class OpenAIAdapter(LLMAdapter):
             normalized["raw"] = raw_field
             return normalized
 
+        route_info = self._route_info(kwargs)
         response = await self.client.create_chat_completion(
             messages, tools=tools, **kwargs
         )
         normalized = self._normalize_non_stream_response(response)
-        normalized["provider"] = self.provider_name
+        self._annotate_route(normalized, route_info)
         normalized["tool_schemas"] = tools
         return normalized
 
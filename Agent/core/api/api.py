@@ -27,6 +27,8 @@ load_dotenv()
 from Agent.core.logging import get_logger
 from Agent.core.logging.fallback_tracker import fallback_tracker
 from Agent.core.logging.context import generate_trace_id
+from Agent.core.logging.profiler import SamplingProfiler, profile_path_for, should_profile
+from Agent.core.api.logs import get_log_manager
 from Agent.core.adapter.llm_adapter import OpenAIAdapter
 from Agent.core.context.diff_provider import collect_diff_context, DiffContext
 from Agent.core.stream.stream_processor import StreamProcessor
@@ -47,6 +49,8 @@ from Agent.core.api.models import (
     ToolApprover
 )
 from Agent.core.api.factory import LLMFactory
+from Agent.core.api.config import get_failover_settings
+from Agent.core.api.health import get_metrics_collector
 
 logger = get_logger(__name__)
 
@@ -91,6 +95,11 @@ class AgentAPI:
             return collect_diff_context(cwd=cwd)
 
         fallback_tracker.reset()
+        metrics = get_metrics_collector()
+        review_started = metrics.record_review_start()
+        review_succeeded = False
+        kernel = None
+        profiler = SamplingProfiler().start() if should_profile(request.profile) else None
         if request.stream_callback:
             try:
                 request.stream_callback({"type": "pipeline_stage_start", "stage": "diff_parse"})
@@ -229,15 +238,18 @@ class AgentAPI:
             # 2. 资源初始化 (LLM Clients)
             trace_id = generate_trace_id()
             
-            # Review Client
-            review_client, review_provider = LLMFactory.create(request.llm_preference, trace_id=trace_id)
+            # Review Client（启用故障转移时，首选厂商故障/首包超时自动切换到备用厂商）
+            review_client, review_provider = LLMFactory.create_routed(request.llm_preference, trace_id=trace_id)
             
-            # Planner Client
+            # Planner Client：规划调用可额外启用对冲请求，单独创建路由客户端
             planner_pref = request.planner_llm_preference or request.llm_preference
-            if planner_pref == request.llm_preference:
+            planner_hedge_after = get_failover_settings()["planner_hedge_after"]
+            if planner_pref == request.llm_preference and planner_hedge_after <= 0:
                 planner_client, planner_provider = review_client, review_provider
             else:
-                planner_client, planner_provider = LLMFactory.create(planner_pref, trace_id=trace_id)
+                planner_client, planner_provider = LLMFactory.create_routed(
+                    planner_pref, trace_id=trace_id, hedge_after=planner_hedge_after
+                )
 
             # 3. 内核执行
             # 组装适配器
@@ -255,7 +267,7 @@ class AgentAPI:
             )
             
             # 运行
-            return await kernel.run(
+            result = await kernel.run(
                 prompt=request.prompt,
                 tool_names=request.tool_names,
                 auto_approve=request.auto_approve,
@@ -265,11 +277,29 @@ class AgentAPI:
                 message_history=request.message_history,
                 agents=request.agents,
             )
+            review_succeeded = True
+            return result
         except asyncio.CancelledError:
             if static_scan_task and not static_scan_task.done():
                 static_scan_task.cancel()
             raise
         finally:
+            tokens_used = kernel.usage_agg.session_totals().get("total", 0) if kernel else 0
+            metrics.record_review_end(review_started, review_succeeded, review_provider or "unknown", tokens_used)
+            if profiler is not None:
+                # stop() 最多等待采样线程 2 秒，写文件也是同步的，放到线程中执行
+                saved = await asyncio.to_thread(AgentAPI._save_profile, profiler, kernel, trace_id)
+                if saved is not None and request.stream_callback:
+                    try:
+                        request.stream_callback({
+                            "type": "profile_saved",
+                            "trace_id": trace_id,
+                            "path": str(saved),
+                            "url": f"/api/logs/session/{trace_id}/profile" if trace_id else None,
+                            **profiler.summary(),
+                        })
+                    except Exception:
+                        pass
             # 4. 资源清理
             if review_client:
                 await review_client.aclose()
@@ -282,6 +312,25 @@ class AgentAPI:
             # 清理规则层事件回调
             set_rule_event_callback(None)
 
+    @staticmethod
+    def _save_profile(
+        profiler: SamplingProfiler,
+        kernel: Any,
+        trace_id: Optional[str],
+    ) -> Optional[Path]:
+        """停止剖析并把结果写到流水线日志旁边，返回写出的路径（失败时为 None）。"""
+        profiler.stop()
+        session_path = getattr(getattr(kernel, "pipe_logger", None), "session_path", None)
+        if session_path is not None:
+            target = profile_path_for(Path(session_path))
+        else:
+            # 内核启动前失败（如 diff 收集出错）时没有流水线日志，放在日志 API 查找的同一目录
+            target = get_log_manager().standalone_profile_path(trace_id or generate_trace_id())
+        saved = profiler.save(target, name=f"review {trace_id or ''}".strip())
+        if saved is not None:
+            logger.info("review profile saved: %s (%s)", saved, profiler.summary())
+        return saved
+
     @staticmethod
     def review_code_sync(request: ReviewRequest) -> str:
         """执行代码审查任务（同步封装）。"""
@@ -310,6 +359,7 @@ async def run_review_async_entry(
     diff_mode: Optional[str] = None,
     commit_from: Optional[str] = None,
     commit_to: Optional[str] = None,
+    profile: bool = False,
 ) -> str:
     req = ReviewRequest(
         prompt=prompt,
@@ -327,6 +377,7 @@ async def run_review_async_entry(
         diff_mode=diff_mode,
         commit_from=commit_from,
         commit_to=commit_to,
+        profile=profile,
     )
     return await AgentAPI.review_code(req)
 
@@ -32,6 +32,18 @@ class LLMConfig:
     planner_first_token_timeout_thinking: int = 120  # 思考模型首个增量输出超时（秒）
     max_retries: int = 3                # 最大重试次数
     retry_delay: float = 1.0            # 重试间隔（秒）
+    http_max_connections: int = 100     # 共享连接池：每个 provider 最大连接数
+    http_max_keepalive: int = 20        # 共享连接池：最大保活连接数
+    http_keepalive_expiry: float = 60.0  # 保活连接空闲过期时间（秒）
+    http2: bool = False                 # 是否启用 HTTP/2（需安装 h2）
+    provider_max_concurrency: int = 8   # 调度器：每个 provider 同时在途请求数
+    provider_rpm: int = 0               # 调度器：每个 provider 每分钟请求数上限（0 不限）
+    provider_tpm: int = 0               # 调度器：每个 provider 每分钟估算 token 上限（0 不限）
+    failover_enabled: bool = False      # 首选厂商故障时切换到其他已配置厂商（需显式开启；指定了具体模型时不切换）
+    failover_ttft_timeout: float = 20.0  # 故障转移：首个流式片段超时（秒，0 关闭）
+    failover_ttft_timeout_thinking: float = 120.0  # 故障转移：思考模型的首个流式片段超时（秒）
+    failover_max_providers: int = 2     # 故障转移：最多追加的备用厂商数
+    planner_hedge_after: float = 0.0    # 规划阶段对冲：首选厂商超过该秒数无首包即并行请求备用厂商（0 关闭）
 
 
 @dataclass
@@ -41,6 +53,9 @@ class ContextConfig:
     full_file_max_lines: int = 1000     # 全文件模式最大行数
     callers_max_hits: int = 10          # 调用方搜索最大命中数
     file_cache_ttl: int = 300           # 文件缓存TTL（秒）
+    plan_prefetch_workers: int = 4      # 规划流式输出期间预取上下文的并发数（0 关闭）
+    max_conversation_tokens: int = 96000  # 审查会话估算 token 上限，超出后压缩较早的工具结果（0 关闭）
+    compaction_keep_turns: int = 4      # 压缩时保持原样的最近轮数
 
 
 @dataclass
@@ -50,6 +65,26 @@ class ReviewConfig:
     enable_intent_cache: bool = True    # 是否启用意图分析缓存
     intent_cache_ttl_days: int = 30     # 意图缓存过期天数
     stream_chunk_sample_rate: int = 20  # 流式日志采样率
+    enable_llm_response_cache: bool = True  # 规划/意图调用的磁盘响应缓存
+    llm_response_cache_ttl_hours: int = 24  # 响应缓存过期时间（小时）
+    llm_response_cache_max_mb: int = 64  # 响应缓存总大小上限（MB）
+    async_log_writer: bool = True       # 日志由后台线程批量写入（关闭则同步逐条写）
+    log_queue_size: int = 20000         # 后台日志队列容量，满时丢弃并计数
+    log_flush_interval_ms: int = 200    # 后台日志最长缓冲时间（毫秒）
+    log_flush_kb: int = 64              # 后台日志累计达到该大小立即落盘（KB）
+    log_compression: str = "none"       # 已关闭日志的压缩方式：none / gzip / zstd（需安装 zstandard，否则使用 gzip）
+    trace_export: str = "none"          # 审查链路追踪导出格式：none / chrome（可用 Perfetto 打开）/ otlp / both
+    profile_sample_rate: float = 0.0    # 自动开启采样剖析的审查比例（0~1，请求也可单独开启）
+    profile_interval_ms: int = 10       # 剖析采样间隔（毫秒）
+    sse_coalesce_ms: int = 40           # SSE 增量合并窗口（毫秒，0 关闭合并）
+    sse_coalesce_max_bytes: int = 8192  # 合并帧内容达到该长度立即输出
+    sse_queue_max_events: int = 2000    # 每个 SSE 连接的事件队列上限（增量合并后计数）
+    sse_max_lag_seconds: int = 120      # 客户端滞后超过该秒数则断开事件流（0 关闭）
+    session_journal_compact_kb: int = 1024  # 会话事件日志超过该大小后压缩为新快照（KB）
+    session_cache_size: int = 64        # 内存中保留的已加载会话数（LRU）
+    session_save_debounce_ms: int = 500  # 流式过程中会话保存的合并窗口（毫秒，0 表示每次立即保存）
+    review_job_log_size: int = 20000    # 每个后台审查任务保留的可回放事件数
+    review_job_retention_seconds: int = 600  # 审查结束后保留事件日志供断线重连的时间（秒）
 
 
 @dataclass
@@ -322,6 +357,75 @@ def get_retry_config(default_retries: int = 3, default_delay: float = 1.0) -> tu
         return (default_retries, default_delay)
 
 
+def get_http_pool_settings() -> dict[str, Any]:
+    """获取 LLM HTTP 共享连接池配置，带fallback。
+
+    Returns:
+        Dict[str, Any]: 包含 max_connections, max_keepalive, keepalive_expiry, http2 的字典
+    """
+    try:
+        config = get_config_manager().get_config()
+        return {
+            "max_connections": int(config.llm.http_max_connections),
+            "max_keepalive": int(config.llm.http_max_keepalive),
+            "keepalive_expiry": float(config.llm.http_keepalive_expiry),
+            "http2": bool(config.llm.http2),
+        }
+    except Exception:
+        return {
+            "max_connections": 100,
+            "max_keepalive": 20,
+            "keepalive_expiry": 60.0,
+            "http2": False,
+        }
+
+
+def get_llm_scheduler_settings() -> dict[str, int]:
+    """获取全局 LLM 调度器配置，带fallback。
+
+    Returns:
+        Dict[str, int]: 包含 max_concurrency, requests_per_minute, tokens_per_minute 的字典
+    """
+    try:
+        config = get_config_manager().get_config()
+        return {
+            "max_concurrency": max(1, int(config.llm.provider_max_concurrency)),
+            "requests_per_minute": max(0, int(config.llm.provider_rpm)),
+            "tokens_per_minute": max(0, int(config.llm.provider_tpm)),
+        }
+    except Exception:
+        return {
+            "max_concurrency": 8,
+            "requests_per_minute": 0,
+            "tokens_per_minute": 0,
+        }
+
+
+def get_failover_settings() -> dict[str, Any]:
+    """获取多厂商故障转移/对冲配置，带fallback。
+
+    Returns:
+        Dict[str, Any]: 包含 enabled, ttft_timeout, ttft_timeout_thinking, max_providers, planner_hedge_after 的字典
+    """
+    try:
+        config = get_config_manager().get_config()
+        return {
+            "enabled": bool(config.llm.failover_enabled),
+            "ttft_timeout": max(0.0, float(config.llm.failover_ttft_timeout)),
+            "ttft_timeout_thinking": max(0.0, float(config.llm.failover_ttft_timeout_thinking)),
+            "max_providers": max(0, int(config.llm.failover_max_providers)),
+            "planner_hedge_after": max(0.0, float(config.llm.planner_hedge_after)),
+        }
+    except Exception:
+        return {
+            "enabled": False,
+            "ttft_timeout": 20.0,
+            "ttft_timeout_thinking": 120.0,
+            "max_providers": 2,
+            "planner_hedge_after": 0.0,
+        }
+
+
 def get_context_limits() -> dict[str, int]:
     """获取上下文限制配置。
     
@@ -346,6 +450,31 @@ def get_context_limits() -> dict[str, int]:
         }
 
 
+def get_compaction_settings() -> dict[str, int]:
+    """获取审查会话压缩配置，带fallback。
+
+    Returns:
+        Dict[str, int]: 包含 max_tokens, keep_turns 的字典
+    """
+    try:
+        config = get_config_manager().get_config()
+        return {
+            "max_tokens": max(0, int(config.context.max_conversation_tokens)),
+            "keep_turns": max(0, int(config.context.compaction_keep_turns)),
+        }
+    except Exception:
+        return {"max_tokens": 96000, "keep_turns": 4}
+
+
+def get_plan_prefetch_workers(default: int = 4) -> int:
+    """获取规划阶段上下文预取并发数，带fallback；0 表示关闭预取。"""
+    try:
+        config = get_config_manager().get_config()
+        return max(0, int(config.context.plan_prefetch_workers))
+    except Exception:
+        return default
+
+
 # ============================================================================
 # Review Configuration Helper Functions
 # ============================================================================
@@ -374,6 +503,148 @@ def get_review_settings() -> dict[str, Any]:
         }
 
 
+def get_llm_response_cache_settings() -> dict[str, Any]:
+    """获取规划/意图 LLM 响应缓存配置，带fallback。
+
+    Returns:
+        Dict[str, Any]: 包含 enabled, ttl_seconds, max_bytes 的字典
+    """
+    try:
+        config = get_config_manager().get_config()
+        return {
+            "enabled": bool(config.review.enable_llm_response_cache),
+            "ttl_seconds": max(0, int(config.review.llm_response_cache_ttl_hours)) * 3600,
+            "max_bytes": max(0, int(config.review.llm_response_cache_max_mb)) * 1024 * 1024,
+        }
+    except Exception:
+        return {"enabled": True, "ttl_seconds": 24 * 3600, "max_bytes": 64 * 1024 * 1024}
+
+
+def get_log_writer_settings() -> dict[str, Any]:
+    """获取后台日志写入器配置，带fallback。
+
+    Returns:
+        Dict[str, Any]: 包含 enabled, queue_size, flush_interval（秒）, batch_bytes 的字典
+    """
+    try:
+        config = get_config_manager().get_config()
+        return {
+            "enabled": bool(config.review.async_log_writer),
+            "queue_size": max(100, int(config.review.log_queue_size)),
+            "flush_interval": max(10, int(config.review.log_flush_interval_ms)) / 1000.0,
+            "batch_bytes": max(1, int(config.review.log_flush_kb)) * 1024,
+        }
+    except Exception:
+        return {"enabled": True, "queue_size": 20000, "flush_interval": 0.2, "batch_bytes": 64 * 1024}
+
+
+def get_log_catalog_settings() -> dict[str, Any]:
+    """获取日志索引与压缩配置，带fallback。
+
+    Returns:
+        Dict[str, Any]: 包含 compression（"none" / "gzip" / "zstd"）的字典
+    """
+    try:
+        config = get_config_manager().get_config()
+        return {"compression": str(config.review.log_compression or "none").strip().lower()}
+    except Exception:
+        return {"compression": "none"}
+
+
+def get_tracing_settings() -> dict[str, Any]:
+    """获取审查链路追踪配置，带fallback。
+
+    Returns:
+        Dict[str, Any]: 包含 export（"none" / "chrome" / "otlp" / "both"）的字典
+    """
+    try:
+        config = get_config_manager().get_config()
+        return {"export": str(config.review.trace_export or "none").strip().lower()}
+    except Exception:
+        return {"export": "none"}
+
+
+def get_profiler_settings() -> dict[str, Any]:
+    """获取审查采样剖析配置，带fallback。
+
+    Returns:
+        Dict[str, Any]: 包含 sample_rate（0~1）, interval（秒）的字典
+    """
+    try:
+        config = get_config_manager().get_config()
+        return {
+            "sample_rate": min(1.0, max(0.0, float(config.review.profile_sample_rate))),
+            "interval": max(1, int(config.review.profile_interval_ms)) / 1000.0,
+        }
+    except Exception:
+        return {"sample_rate": 0.0, "interval": 0.01}
+
+
+def get_sse_coalesce_settings() -> dict[str, Any]:
+    """获取 SSE 增量帧合并配置，带fallback。
+
+    Returns:
+        Dict[str, Any]: 包含 window（秒，0 表示不合并）, max_bytes 的字典
+    """
+    try:
+        config = get_config_manager().get_config()
+        return {
+            "window": max(0, int(config.review.sse_coalesce_ms)) / 1000.0,
+            "max_bytes": max(256, int(config.review.sse_coalesce_max_bytes)),
+        }
+    except Exception:
+        return {"window": 0.04, "max_bytes": 8192}
+
+
+def get_sse_queue_settings() -> dict[str, Any]:
+    """获取 SSE 事件队列背压配置，带fallback。
+
+    Returns:
+        Dict[str, Any]: 包含 max_events, max_lag（秒，0 表示不断开）的字典
+    """
+    try:
+        config = get_config_manager().get_config()
+        return {
+            "max_events": max(50, int(config.review.sse_queue_max_events)),
+            "max_lag": float(max(0, int(config.review.sse_max_lag_seconds))),
+        }
+    except Exception:
+        return {"max_events": 2000, "max_lag": 120.0}
+
+
+def get_session_storage_settings() -> dict[str, Any]:
+    """获取会话持久化配置，带fallback。
+
+    Returns:
+        Dict[str, Any]: 包含 journal_max_bytes, cache_size, save_debounce(秒) 的字典
+    """
+    try:
+        config = get_config_manager().get_config()
+        return {
+            "journal_max_bytes": max(64, int(config.review.session_journal_compact_kb)) * 1024,
+            "cache_size": max(1, int(config.review.session_cache_size)),
+            "save_debounce": max(0, int(config.review.session_save_debounce_ms)) / 1000.0,
+        }
+    except Exception:
+        return {"journal_max_bytes": 1024 * 1024, "cache_size": 64, "save_debounce": 0.5}
+
+
+def get_review_job_settings() -> dict[str, Any]:
+    """获取后台审查任务配置，带fallback。
+
+    Returns:
+        Dict[str, Any]: 包含 log_size, retention(秒) 的字典
+    """
+    try:
+        config = get_config_manager().get_config()
+        return {
+            "log_size": max(100, int(config.review.review_job_log_size)),
+            "retention": max(0, int(config.review.review_job_retention_seconds)),
+        }
+    except Exception:
+        return {"log_size": 20000, "retention": 600}
+
+
 def get_intent_cache_enabled(default: bool = True) -> bool:
     """获取意图缓存是否启用配置，带fallback。
     
@@ -453,7 +724,21 @@ __all__ = [
     "get_planner_first_token_timeout",
     "get_planner_first_token_timeout_thinking",
     "get_retry_config",
+    "get_http_pool_settings",
+    "get_llm_scheduler_settings",
+    "get_failover_settings",
+    "get_compaction_settings",
+    "get_llm_response_cache_settings",
+    "get_log_writer_settings",
+    "get_log_catalog_settings",
+    "get_profiler_settings",
+    "get_tracing_settings",
+    "get_sse_coalesce_settings",
+    "get_sse_queue_settings",
+    "get_session_storage_settings",
+    "get_review_job_settings",
     "get_context_limits",
+    "get_plan_prefetch_workers",
     # Review configuration helper functions
     "get_review_settings",
     "get_intent_cache_enabled",
@@ -190,6 +190,54 @@ class LLMFactory:
         record_fallback("llm_client_fallback", "未找到可用 LLM 客户端，降级为 Mock", meta={"preference": preference})
         return MockMoonshotClient(), "mock"
 
+    @staticmethod
+    def create_routed(
+        preference: str = "auto",
+        trace_id: str | None = None,
+        hedge_after: float = 0.0,
+    ) -> Tuple[BaseLLMClient, str]:
+        """创建带故障转移的客户端：首选厂商之外按健康度追加已配置 Key 的备用厂商。
+
+        未启用故障转移（默认关闭）、Mock 模式、用户指定了具体模型（"provider:model"）
+        或没有可用备用厂商时，返回与 create 相同的单厂商客户端。返回的厂商名始终是首选
+        厂商；单次调用实际由哪个厂商应答见 RoutingLLMClient 的 route_info。
+        """
+        client, provider_name = LLMFactory.create(preference, trace_id=trace_id)
+        if provider_name == "mock":
+            return client, provider_name
+        # 用户显式指定了模型时不得悄悄换成其他厂商的模型
+        if ":" in (preference or ""):
+            return client, provider_name
+
+        from Agent.core.api.config import get_failover_settings
+        from Agent.core.llm.router import RoutingLLMClient, get_provider_health
+
+        settings = get_failover_settings()
+        if not settings["enabled"] or settings["max_providers"] <= 0:
+            return client, provider_name
+
+        backups: List[Tuple[str, BaseLLMClient]] = []
+        others = [name for name in LLMFactory.PROVIDERS if name != provider_name]
+        for name in sorted(others, key=get_provider_health().score):
+            if len(backups) >= settings["max_providers"]:
+                break
+            try:
+                backup = LLMFactory._create_client(name, trace_id)
+            except Exception:
+                backup = None
+            if backup:
+                backups.append((name, backup))
+        if not backups:
+            return client, provider_name
+
+        routed = RoutingLLMClient(
+            [(provider_name, client)] + backups,
+            ttft_timeout=settings["ttft_timeout"],
+            ttft_timeout_thinking=settings["ttft_timeout_thinking"],
+            hedge_after=hedge_after,
+        )
+        return routed, provider_name
+
     @staticmethod
     def _create_client(provider_name: str, trace_id: str | None, model_override: str | None = None) -> Optional[BaseLLMClient]:
         """通用客户端创建逻辑。"""
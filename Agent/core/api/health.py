@@ -9,12 +9,14 @@ from __future__ import annotations
 import os
 import time
 import threading
+from collections import deque
 from dataclasses import dataclass, field
 from datetime import datetime
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Deque, Dict, List, Optional, Tuple
 
 from Agent.core.api.factory import LLMFactory
+from Agent.core.logging.metrics import get_metrics_registry, record_cache
 
 
 @dataclass
@@ -58,7 +60,8 @@ class MetricsCollector:
     
     收集系统运行时的各类指标。
     注意：这是一个轻量级的内存指标收集器，重启后数据会丢失。
-    生产环境应考虑集成专业的监控系统（如Prometheus）。
+    分阶段耗时直方图与缓存命中统计由 Agent.core.logging.metrics 的注册表维护，
+    并通过 /metrics 以 Prometheus 文本格式导出。
     """
     
     _instance: Optional["MetricsCollector"] = None
@@ -89,12 +92,8 @@ class MetricsCollector:
         self._tokens_by_provider: Dict[str, int] = {}
         
         # 耗时统计
-        self._review_durations: List[float] = []  # 最近100次审查耗时
         self._max_duration_samples = 100
-        
-        # 缓存命中统计
-        self._cache_hits = 0
-        self._cache_misses = 0
+        self._review_durations: Deque[float] = deque(maxlen=self._max_duration_samples)  # 最近100次审查耗时
         
         # 回退统计
         self._fallback_count = 0
@@ -124,24 +123,23 @@ class MetricsCollector:
             # 记录耗时
             duration_ms = (time.time() - start_time) * 1000
             self._review_durations.append(duration_ms)
-            if len(self._review_durations) > self._max_duration_samples:
-                self._review_durations.pop(0)
             
             # 记录Token
             self._total_tokens += tokens_used
             self._tokens_by_provider[provider] = (
                 self._tokens_by_provider.get(provider, 0) + tokens_used
             )
+        get_metrics_registry().observe(
+            "review_seconds", duration_ms / 1000, outcome="success" if success else "failed"
+        )
     
-    def record_cache_hit(self) -> None:
+    def record_cache_hit(self, cache: str = "default") -> None:
         """记录缓存命中。"""
-        with self._metrics_lock:
-            self._cache_hits += 1
+        record_cache(cache, True)
     
-    def record_cache_miss(self) -> None:
+    def record_cache_miss(self, cache: str = "default") -> None:
         """记录缓存未命中。"""
-        with self._metrics_lock:
-            self._cache_misses += 1
+        record_cache(cache, False)
     
     def record_fallback(self) -> None:
         """记录一次回退。"""
@@ -156,11 +154,13 @@ class MetricsCollector:
             if self._review_durations:
                 avg_duration = sum(self._review_durations) / len(self._review_durations)
             
-            # 计算缓存命中率
-            total_cache_ops = self._cache_hits + self._cache_misses
+            # 计算缓存命中率（所有缓存合计）
+            caches = get_metrics_registry().cache_ratios()
+            cache_hits = sum(c["hits"] for c in caches.values())
+            total_cache_ops = cache_hits + sum(c["misses"] for c in caches.values())
             cache_hit_rate = 0.0
             if total_cache_ops > 0:
-                cache_hit_rate = self._cache_hits / total_cache_ops
+                cache_hit_rate = cache_hits / total_cache_ops
             
             return SystemMetrics(
                 total_reviews=self._total_reviews,
@@ -183,10 +183,9 @@ class MetricsCollector:
             self._total_tokens = 0
             self._tokens_by_provider.clear()
             self._review_durations.clear()
-            self._cache_hits = 0
-            self._cache_misses = 0
             self._fallback_count = 0
             self._start_time = time.time()
+        get_metrics_registry().reset()
 
 
 # 全局指标收集器
@@ -344,10 +343,60 @@ class HealthAPI:
                 "avg_review_duration_ms": float,
                 "cache_hit_rate": float,
                 "fallback_count": int,
-                "uptime_seconds": float
+                "uptime_seconds": float,
+                "llm_scheduler": Dict[str, Dict],  # 各厂商排队深度/在途数/等待时间
+                "llm_provider_health": Dict[str, Dict],  # 各厂商滚动首包耗时/错误率
+                "log_writer": Dict[str, Any],  # 后台日志队列深度/丢弃计数
+                "sse_frames": Dict[str, Any],  # SSE 事件数/输出帧数/字节数
+                "sse_queues": Dict[str, Any],  # 各连接队列深度/滞后与丢弃计数
+                "session_writer": Dict[str, Any],  # 会话后台保存的合并/写盘计数
+                "review_jobs": List[Dict[str, Any]],  # 后台审查任务状态/事件序号/订阅者数
+                "tool_executor": Dict[str, int],  # 工具线程池容量/仍在运行的超时调用数
+                "timings": Dict[str, Dict],  # 各阶段/LLM/工具耗时直方图的滚动 p50/p95/p99
+                "caches": Dict[str, Dict]  # 各缓存命中/未命中次数与命中率
             }
         """
         metrics = get_metrics_collector().get_metrics()
+        try:
+            from Agent.core.llm.scheduler import get_llm_scheduler
+            scheduler_stats = get_llm_scheduler().stats()
+        except Exception:
+            scheduler_stats = {}
+        try:
+            from Agent.core.llm.router import get_provider_health
+            provider_health = get_provider_health().stats()
+        except Exception:
+            provider_health = {}
+        try:
+            from Agent.core.logging.log_writer import get_log_writer
+            log_writer_stats = get_log_writer().stats()
+        except Exception:
+            log_writer_stats = {}
+        try:
+            from Agent.core.stream.sse_frames import get_sse_frame_stats
+            sse_frame_stats = get_sse_frame_stats()
+        except Exception:
+            sse_frame_stats = {}
+        try:
+            from Agent.core.stream.event_queue import get_event_queue_stats
+            sse_queue_stats = get_event_queue_stats()
+        except Exception:
+            sse_queue_stats = {}
+        try:
+            from Agent.core.api.session import get_session_manager
+            session_writer_stats = get_session_manager().writer_stats()
+        except Exception:
+            session_writer_stats = {}
+        try:
+            from Agent.core.stream.review_jobs import get_review_jobs
+            review_jobs = get_review_jobs().list_jobs()
+        except Exception:
+            review_jobs = []
+        try:
+            from Agent.core.tools.runtime import get_tool_executor_stats
+            tool_executor_stats = get_tool_executor_stats()
+        except Exception:
+            tool_executor_stats = {}
         return {
             "total_reviews": metrics.total_reviews,
             "successful_reviews": metrics.successful_reviews,
@@ -358,8 +407,53 @@ class HealthAPI:
             "cache_hit_rate": metrics.cache_hit_rate,
             "fallback_count": metrics.fallback_count,
             "uptime_seconds": metrics.uptime_seconds,
+            "llm_scheduler": scheduler_stats,
+            "llm_provider_health": provider_health,
+            "log_writer": log_writer_stats,
+            "sse_frames": sse_frame_stats,
+            "sse_queues": sse_queue_stats,
+            "session_writer": session_writer_stats,
+            "review_jobs": review_jobs,
+            "tool_executor": tool_executor_stats,
+            "timings": get_metrics_registry().snapshot(),
+            "caches": get_metrics_registry().cache_ratios(),
         }
     
+    @staticmethod
+    def get_prometheus_metrics() -> str:
+        """以 Prometheus 文本格式（0.0.4）导出指标，供 /metrics 抓取。"""
+        metrics = get_metrics_collector().get_metrics()
+        extra: List[Tuple[str, str, str, Dict[str, str], float]] = [
+            ("reviews_total", "counter", "审查次数", {"outcome": "success"}, metrics.successful_reviews),
+            ("reviews_total", "counter", "审查次数", {"outcome": "failed"}, metrics.failed_reviews),
+            ("fallbacks_total", "counter", "回退次数", {}, metrics.fallback_count),
+            ("uptime_seconds", "gauge", "进程运行时长", {}, round(metrics.uptime_seconds, 3)),
+        ]
+        try:
+            from Agent.core.llm.scheduler import get_llm_scheduler
+            for provider, stats in get_llm_scheduler().stats().items():
+                labels = {"provider": provider}
+                extra.append(("llm_queue_depth", "gauge", "LLM 调度排队请求数", labels, stats.get("queue_depth", 0)))
+                extra.append(("llm_active_requests", "gauge", "LLM 在途请求数", labels, stats.get("active", 0)))
+        except Exception:
+            pass
+        try:
+            from Agent.core.logging.log_writer import get_log_writer
+            writer = get_log_writer().stats()
+            extra.append(("log_writer_queue_depth", "gauge", "后台日志队列深度", {}, writer.get("queue_depth", 0)))
+            extra.append(("log_writer_dropped_total", "counter", "后台日志丢弃条数", {}, writer.get("dropped", 0)))
+        except Exception:
+            pass
+        try:
+            from Agent.core.tools.runtime import get_tool_executor_stats
+            executor = get_tool_executor_stats()
+            extra.append((
+                "tool_timed_out_running", "gauge", "已超时但仍占用工具线程的调用数", {}, executor["timed_out_running"]
+            ))
+        except Exception:
+            pass
+        return get_metrics_registry().render_prometheus(extra)
+    
     @staticmethod
     def get_provider_status() -> List[Dict[str, Any]]:
         """获取所有LLM提供商的状态。
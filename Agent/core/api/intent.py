@@ -415,6 +415,14 @@ class IntentAPI:
             }
         """
         project_name = IntentAPI._extract_project_name(project_root)
+
+        # 意图分析属于后台刷新，LLM 调度时让位于交互式审查
+        try:
+            from Agent.core.context.runtime_context import set_llm_priority
+            from Agent.core.llm.scheduler import PRIORITY_BACKGROUND
+            set_llm_priority(PRIORITY_BACKGROUND)
+        except Exception:
+            pass
         
         # 检查缓存是否启用
         cache_enabled = True
@@ -542,6 +550,7 @@ class IntentAPI:
                 intent_input=overview,
                 stream=True,
                 observer=llm_observer,
+                use_cache=not force_refresh,
             )
             
             # 关闭LLM客户端
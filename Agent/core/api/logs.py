@@ -10,7 +10,16 @@ import os
 from dataclasses import dataclass
 from datetime import datetime
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
+
+from Agent.core.logging.log_catalog import (
+    LogCatalog,
+    get_log_catalog,
+    iter_log_lines,
+    log_exists,
+    log_size,
+)
+from Agent.core.logging.profiler import PROFILE_SUFFIX, profile_path_for
 
 
 @dataclass
@@ -25,12 +34,39 @@ class LogEntry:
 
 
 class LogManager:
-    """日志管理器。"""
+    """日志管理器。
+
+    会话列表与按 trace_id 的查找都走日志目录索引（见 Agent.core.logging.log_catalog），
+    日志内容通过 iter_log_lines 读取，已压缩的日志自动解压。
+    """
+    
+    def __init__(self, log_root: str | Path = "log") -> None:
+        root = Path(log_root)
+        self._api_log_dir = root / "api_log"
+        self._human_log_dir = root / "human_log"
+        self._pipeline_log_dir = root / "pipeline"
     
-    def __init__(self) -> None:
-        self._api_log_dir = Path("log/api_log")
-        self._human_log_dir = Path("log/human_log")
-        self._pipeline_log_dir = Path("log/pipeline")
+    def _catalog(self, log_dir: Path) -> Optional[LogCatalog]:
+        """获取目录索引；首次访问时导入索引建立前已有的日志。目录不存在时返回 None。"""
+        if not log_dir.exists():
+            return None
+        catalog = get_log_catalog(log_dir)
+        catalog.ensure_imported()
+        return catalog
+    
+    def query_sessions(
+        self,
+        limit: int = 50,
+        offset: int = 0,
+        date_from: Optional[str] = None,
+        date_to: Optional[str] = None,
+    ) -> Tuple[List[Dict[str, Any]], int]:
+        """分页查询历史审查会话，返回 (当前页, 过滤后总数)。"""
+        catalog = self._catalog(self._pipeline_log_dir)
+        if catalog is None:
+            return [], 0
+        rows, total = catalog.query(date_from=date_from, date_to=date_to, limit=limit, offset=offset)
+        return [self._session_summary(row) for row in rows], total
     
     def list_sessions(
         self,
@@ -47,57 +83,46 @@ class LogManager:
             date_from: 起始日期 (YYYY-MM-DD)
             date_to: 结束日期 (YYYY-MM-DD)
         """
-        sessions = []
-        
-        # 扫描 pipeline 日志目录
-        if self._pipeline_log_dir.exists():
-            for log_file in sorted(self._pipeline_log_dir.glob("*.jsonl"), reverse=True):
-                try:
-                    # 从文件名解析时间戳和 trace_id
-                    # 格式: 20251130_220524_planning_review_service_async_b89af792a8f7.jsonl
-                    name = log_file.stem
-                    parts = name.split("_")
-                    if len(parts) >= 6:
-                        date_str = parts[0]  # 20251130
-                        time_str = parts[1]  # 220524
-                        trace_id = parts[-1]  # b89af792a8f7
-                        
-                        # 日期过滤
-                        file_date = datetime.strptime(date_str, "%Y%m%d")
-                        if date_from:
-                            from_date = datetime.strptime(date_from, "%Y-%m-%d")
-                            if file_date < from_date:
-                                continue
-                        if date_to:
-                            to_date = datetime.strptime(date_to, "%Y-%m-%d")
-                            if file_date > to_date:
-                                continue
-                        
-                        # 读取首条记录获取元数据
-                        meta = {}
-                        try:
-                            with open(log_file, "r", encoding="utf-8") as f:
-                                first_line = f.readline()
-                                if first_line:
-                                    first_entry = json.loads(first_line)
-                                    meta = first_entry.get("meta", {})
-                        except Exception:
-                            pass
-                        
-                        sessions.append({
-                            "trace_id": trace_id,
-                            "date": date_str,
-                            "time": time_str,
-                            "file_path": str(log_file),
-                            "file_size": log_file.stat().st_size,
-                            "review_provider": meta.get("review_provider"),
-                            "planner_provider": meta.get("planner_provider"),
-                        })
-                except Exception:
-                    continue
-        
-        # 应用分页
-        return sessions[offset:offset + limit]
+        return self.query_sessions(limit, offset, date_from, date_to)[0]
+    
+    @staticmethod
+    def _session_summary(row: Dict[str, Any]) -> Dict[str, Any]:
+        started = row.get("started_at") or ""
+        path = Path(row["path"])
+        # 仍在写入的日志大小以实际文件为准，已关闭的使用索引中的记录
+        file_size = row.get("file_bytes") if row.get("status") == "closed" else None
+        usage = None
+        if row.get("usage_total") is not None:
+            usage = {
+                "in": row.get("usage_in") or 0,
+                "out": row.get("usage_out") or 0,
+                "total": row.get("usage_total") or 0,
+                "cached": row.get("usage_cached") or 0,
+            }
+        return {
+            "trace_id": row["trace_id"],
+            "date": started[:10].replace("-", ""),
+            "time": started[11:19].replace(":", ""),
+            "name": row.get("name"),
+            "started_at": started,
+            "ended_at": row.get("ended_at"),
+            "status": row.get("status"),
+            "file_path": str(path),
+            "file_size": file_size if file_size else log_size(path),
+            "compression": row.get("compression") or None,
+            "review_provider": row.get("review_provider"),
+            "planner_provider": row.get("planner_provider"),
+            "usage": usage,
+        }
+    
+    def _locate(self, log_dir: Path, trace_id: str) -> Optional[Dict[str, Any]]:
+        catalog = self._catalog(log_dir)
+        if catalog is None:
+            return None
+        row = catalog.get(trace_id)
+        if row is None or not log_exists(Path(row["path"])):
+            return None
+        return row
     
     def get_session_log(self, trace_id: str) -> Optional[Dict[str, Any]]:
         """获取单个会话的详细日志。
@@ -108,58 +133,77 @@ class LogManager:
         Returns:
             Dict: 会话日志详情
         """
-        # 查找 pipeline 日志
-        pipeline_log = None
-        if self._pipeline_log_dir.exists():
-            for log_file in self._pipeline_log_dir.glob(f"*_{trace_id}.jsonl"):
-                pipeline_log = log_file
-                break
-        
-        if not pipeline_log or not pipeline_log.exists():
+        row = self._locate(self._pipeline_log_dir, trace_id)
+        if row is None:
             return None
+        pipeline_log = Path(row["path"])
         
         events = []
         usage_summary = {}
         
         try:
-            with open(pipeline_log, "r", encoding="utf-8") as f:
-                for line in f:
-                    if line.strip():
-                        entry = json.loads(line)
-                        events.append({
-                            "event": entry.get("event"),
-                            "stage": entry.get("stage"),
-                            "status": entry.get("status"),
-                            "ts": entry.get("ts"),
-                            "uptime_ms": entry.get("uptime_ms"),
-                            "payload_preview": str(entry.get("payload", {}))[:200],
-                        })
-                        
-                        # 提取用量信息
-                        if entry.get("event") == "session_end":
-                            usage_summary = entry.get("payload", {}).get("session_usage", {})
+            for line in iter_log_lines(pipeline_log):
+                if line.strip():
+                    entry = json.loads(line)
+                    events.append({
+                        "event": entry.get("event"),
+                        "stage": entry.get("stage"),
+                        "status": entry.get("status"),
+                        "ts": entry.get("ts"),
+                        "uptime_ms": entry.get("uptime_ms"),
+                        "payload_preview": str(entry.get("payload", {}))[:200],
+                    })
+                    
+                    # 提取用量信息
+                    if entry.get("event") == "session_end":
+                        usage_summary = entry.get("payload", {}).get("session_usage", {})
         except Exception:
             pass
         
-        # 查找对应的人类可读日志
+        # 查找对应的人类可读日志（与 API 日志同名，扩展名为 .md）
         human_log_content = None
-        if self._human_log_dir.exists():
-            for human_file in self._human_log_dir.glob(f"*_{trace_id}.md"):
-                try:
-                    human_log_content = human_file.read_text(encoding="utf-8")[:5000]  # 限制大小
-                except Exception:
-                    pass
-                break
+        human_file = self._human_log_path(trace_id)
+        if human_file is not None and human_file.exists():
+            try:
+                human_log_content = human_file.read_text(encoding="utf-8")[:5000]  # 限制大小
+            except Exception:
+                pass
         
+        profile_path = self.get_profile_path(trace_id)
         return {
             "trace_id": trace_id,
             "pipeline_log_path": str(pipeline_log),
+            "profile_path": str(profile_path) if profile_path else None,
+            "compression": row.get("compression") or None,
             "events": events,
             "event_count": len(events),
             "usage_summary": usage_summary,
             "human_log_preview": human_log_content,
         }
     
+    def get_profile_path(self, trace_id: str) -> Optional[Path]:
+        """获取会话的采样剖析文件（speedscope 格式）；未开启剖析时返回 None。"""
+        if not trace_id or not trace_id.replace("-", "").replace("_", "").isalnum():
+            return None
+        row = self._locate(self._pipeline_log_dir, trace_id)
+        if row is not None:
+            candidate = profile_path_for(Path(row["path"]))
+        else:
+            candidate = self.standalone_profile_path(trace_id)
+        return candidate if candidate.is_file() else None
+    
+    def standalone_profile_path(self, trace_id: str) -> Path:
+        """审查在写流水线日志之前失败时，剖析文件按 trace_id 单独命名。"""
+        return self._pipeline_log_dir / f"{trace_id}{PROFILE_SUFFIX}"
+    
+    def _human_log_path(self, trace_id: str) -> Optional[Path]:
+        row = self._locate(self._api_log_dir, trace_id)
+        if row is None:
+            return None
+        if row.get("human_path"):
+            return Path(row["human_path"])
+        return self._human_log_dir / Path(row["path"]).name.replace(".jsonl", ".md")
+    
     def get_api_call_log(self, trace_id: str) -> List[Dict[str, Any]]:
         """获取会话的API调用详情。
         
@@ -170,22 +214,22 @@ class LogManager:
             List[Dict]: API调用记录
         """
         calls = []
+        row = self._locate(self._api_log_dir, trace_id)
+        if row is None:
+            return calls
         
-        if self._api_log_dir.exists():
-            for log_file in self._api_log_dir.glob(f"*_{trace_id}.jsonl"):
-                try:
-                    with open(log_file, "r", encoding="utf-8") as f:
-                        for line in f:
-                            if line.strip():
-                                entry = json.loads(line)
-                                calls.append({
-                                    "section": entry.get("section"),
-                                    "label": entry.get("label"),
-                                    "ts": entry.get("ts"),
-                                    "payload_preview": str(entry.get("payload", {}))[:300],
-                                })
-                except Exception:
-                    continue
+        try:
+            for line in iter_log_lines(Path(row["path"])):
+                if line.strip():
+                    entry = json.loads(line)
+                    calls.append({
+                        "section": entry.get("section"),
+                        "label": entry.get("label"),
+                        "ts": entry.get("ts"),
+                        "payload_preview": str(entry.get("payload", {}))[:300],
+                    })
+        except Exception:
+            pass
         
         return calls
     
@@ -206,16 +250,25 @@ class LogManager:
             if not log_dir.exists():
                 continue
             
+            deleted: List[Path] = []
             for log_file in log_dir.iterdir():
-                if log_file.is_file():
+                # 跳过索引文件（.catalog.db 及其 WAL 文件）
+                if log_file.is_file() and not log_file.name.startswith("."):
                     try:
                         if log_file.stat().st_mtime < cutoff:
                             file_size = log_file.stat().st_size
                             log_file.unlink()
                             deleted_files += 1
                             freed_bytes += file_size
+                            deleted.append(log_file)
                     except Exception:
                         continue
+            
+            if deleted and log_dir != self._human_log_dir:
+                try:
+                    get_log_catalog(log_dir).forget_paths(deleted)
+                except Exception:
+                    pass
         
         return {
             "deleted_files": deleted_files,
@@ -237,7 +290,7 @@ class LogManager:
         ]:
             if log_dir.exists():
                 for f in log_dir.iterdir():
-                    if f.is_file():
+                    if f.is_file() and not f.name.startswith("."):
                         stats[name]["file_count"] += 1
                         stats[name]["total_size"] += f.stat().st_size
         
@@ -277,13 +330,15 @@ class LogAPI:
         Returns:
             Dict: {
                 "sessions": List[{...}],
-                "count": int
+                "count": int,   # 当前页条数
+                "total": int    # 过滤后的总条数
             }
         """
-        sessions = get_log_manager().list_sessions(limit, offset, date_from, date_to)
+        sessions, total = get_log_manager().query_sessions(limit, offset, date_from, date_to)
         return {
             "sessions": sessions,
             "count": len(sessions),
+            "total": total,
         }
     
     @staticmethod
@@ -314,6 +369,19 @@ class LogAPI:
             "count": len(calls),
         }
     
+    @staticmethod
+    def get_profile_path(trace_id: str) -> Optional[str]:
+        """获取会话的采样剖析文件路径（speedscope 格式）。
+        
+        Args:
+            trace_id: 追踪ID
+            
+        Returns:
+            Optional[str]: 文件路径；该会话未开启剖析时为 None
+        """
+        path = get_log_manager().get_profile_path(trace_id)
+        return str(path) if path else None
+    
     @staticmethod
     def delete_old_logs(days: int = 30) -> Dict[str, Any]:
         """清理过期日志。
@@ -44,6 +44,7 @@ class ReviewRequest:
     ] = None  # auto|working|staged|pr|commit
     commit_from: Optional[str] = None  # 历史提交模式的起始commit
     commit_to: Optional[str] = None  # 历史提交模式的结束commit
+    profile: bool = False  # 是否对本次审查开启采样剖析（另可按配置比例自动开启）
 
 
 @dataclass
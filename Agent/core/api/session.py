@@ -92,8 +92,11 @@ class SessionAPI:
         tag: Optional[str] = None,
         limit: int = 50,
         offset: int = 0,
+        query: Optional[str] = None,
+        sort: str = "updated_at",
+        order: str = "desc",
     ) -> Dict[str, Any]:
-        """列出会话（支持过滤）。
+        """列出会话（支持过滤、搜索、排序，在会话目录索引中分页）。
         
         Args:
             status: 按状态过滤 ("active", "completed", "archived")
@@ -101,31 +104,26 @@ class SessionAPI:
             tag: 按标签过滤
             limit: 返回条数
             offset: 偏移量
+            query: 按会话名称全文搜索
+            sort: 排序字段 (updated_at, created_at, name, status, snapshot_bytes, message_count)
+            order: "desc" 或 "asc"
             
         Returns:
             Dict: {"sessions": List[{...}], "total": int}
         """
-        all_sessions = get_session_manager().list_sessions()
-        
-        # 应用过滤
-        filtered = []
-        for s in all_sessions:
-            if status and s.get("status") != status:
-                continue
-            if project_root and s.get("project_root") != project_root:
-                continue
-            # tag过滤需要读取完整会话数据
-            if tag:
-                full_session = get_session_manager().get_session(s["session_id"])
-                if full_session and tag not in (full_session.metadata.tags or []):
-                    continue
-            filtered.append(s)
-        
-        total = len(filtered)
-        paginated = filtered[offset:offset + limit]
+        sessions, total = get_session_manager().query_sessions(
+            status=status,
+            project_root=project_root,
+            tag=tag,
+            search=query,
+            sort=sort,
+            descending=(order or "desc").lower() != "asc",
+            limit=max(0, limit),
+            offset=max(0, offset),
+        )
         
         return {
-            "sessions": paginated,
+            "sessions": sessions,
             "total": total,
             "limit": limit,
             "offset": offset,
@@ -381,32 +379,7 @@ class SessionAPI:
                 "total_messages": int
             }
         """
-        all_sessions = get_session_manager().list_sessions()
-        
-        by_status: Dict[str, int] = {}
-        by_project: Dict[str, int] = {}
-        total_messages = 0
-        
-        for s in all_sessions:
-            # 按状态统计
-            status = s.get("status", "unknown")
-            by_status[status] = by_status.get(status, 0) + 1
-            
-            # 按项目统计
-            project = s.get("project_root") or "unknown"
-            by_project[project] = by_project.get(project, 0) + 1
-            
-            # 消息统计需要读取完整会话
-            full_session = get_session_manager().get_session(s["session_id"])
-            if full_session:
-                total_messages += len(full_session.conversation.messages)
-        
-        return {
-            "total_sessions": len(all_sessions),
-            "by_status": by_status,
-            "by_project": by_project,
-            "total_messages": total_messages,
-        }
+        return get_session_manager().session_stats()
     
     @staticmethod
     def archive_old_sessions(days: int = 30) -> Dict[str, Any]:
@@ -419,27 +392,26 @@ class SessionAPI:
             Dict: {"archived_count": int}
         """
         manager = get_session_manager()
-        all_sessions = manager.list_sessions()
+        cutoff = datetime.fromtimestamp(datetime.now().timestamp() - (days * 24 * 3600)).isoformat()
+        # updated_at 为本地时间 ISO 字符串，字典序即时间顺序
+        candidates, _ = manager.query_sessions(
+            exclude_status="archived",
+            updated_before=cutoff,
+            limit=None,
+        )
         
         archived_count = 0
-        cutoff = datetime.now().timestamp() - (days * 24 * 3600)
-        
-        for s in all_sessions:
-            if s.get("status") == "archived":
+        for s in candidates:
+            if not s.get("updated_at"):
+                continue
+            try:
+                session = manager.get_session(s["session_id"])
+                if session:
+                    session.metadata.status = "archived"
+                    manager.save_session(session)
+                    archived_count += 1
+            except Exception:
                 continue
-            
-            updated_at = s.get("updated_at")
-            if updated_at:
-                try:
-                    updated_ts = datetime.fromisoformat(updated_at).timestamp()
-                    if updated_ts < cutoff:
-                        session = manager.get_session(s["session_id"])
-                        if session:
-                            session.metadata.status = "archived"
-                            manager.save_session(session)
-                            archived_count += 1
-                except Exception:
-                    continue
         
         return {"archived_count": archived_count}
 
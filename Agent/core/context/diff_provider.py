@@ -12,6 +12,7 @@ except ImportError as exc:  # pragma: no cover
     raise RuntimeError("unidiff package is required for diff context collection") from exc
 
 from Agent.DIFF import diff_collector
+from Agent.core.logging.metrics import stage_timer
 
 
 @dataclass
@@ -41,11 +42,12 @@ def collect_diff_context(
 ) -> DiffContext:
     """收集 diff 并生成元数据摘要：ReviewUnit + review_index + 简要文本概览。"""
 
-    diff_text, actual_mode, base_branch = diff_collector.get_diff_text(mode, cwd=cwd)
-    if not diff_text.strip():
-        raise RuntimeError("未检测到所选模式的差异")
+    with stage_timer("diff"):
+        diff_text, actual_mode, base_branch = diff_collector.get_diff_text(mode, cwd=cwd)
+        if not diff_text.strip():
+            raise RuntimeError("未检测到所选模式的差异")
 
-    patch = PatchSet(diff_text)
+        patch = PatchSet(diff_text)
     units = diff_collector.build_review_units_from_patch(patch)
     if not units:
         raise RuntimeError("Diff detected but no review units were produced.")
@@ -98,7 +100,8 @@ def build_diff_context_from_text(
             review_index={"files": [], "units": [], "review_metadata": {}, "summary": {}},
         )
     
-    patch = PatchSet(diff_text)
+    with stage_timer("diff"):
+        patch = PatchSet(diff_text)
     units = diff_collector.build_review_units_from_patch(patch)
     
     review_index = diff_collector.build_review_index(
@@ -0,0 +1,150 @@
+"""文件行偏移索引：按行号区间读取文件，而不必整文件解码再 splitlines。
+
+索引记录每一行起始的字节偏移，按 (路径, mtime, size) 缓存；读取第 N..M 行时
+只 seek 到对应字节区间读取并解码，成本与 M-N 成正比。
+
+行的划分与 git diff 的行号一致：仅以 ``\\n`` 分行，行尾的 ``\\r`` 会被去掉（兼容 CRLF）。
+与 str.splitlines 不同，换页符 ``\\f``、``\\v``、``\\x1c``-``\\x1e``、``\\x85``、
+``\\u2028``/``\\u2029`` 以及单独的 ``\\r`` 都不视为换行。整文件读取的路径通过
+split_lines 使用同样的规则，保证两条路径得到的行号相同（例外：整文件读取经过文本模式
+的通用换行转换，只含单独 ``\\r`` 的旧式 Mac 文件在那里仍会分行）。
+"""
+
+from __future__ import annotations
+
+import mmap
+import os
+import threading
+from array import array
+from collections import OrderedDict
+from pathlib import Path
+from typing import List, Tuple, Union
+
+from Agent.core.logging.fallback_tracker import record_fallback
+from Agent.core.logging.metrics import record_cache
+
+PathLike = Union[str, Path]
+
+_INDEX_CACHE_MAX_SIZE = 256
+
+
+class LineIndex:
+    """单个文件的行起始偏移表。"""
+
+    __slots__ = ("path", "mtime_ns", "size", "offsets", "line_count")
+
+    def __init__(self, path: str, mtime_ns: int, size: int, offsets: array, line_count: int) -> None:
+        self.path = path
+        self.mtime_ns = mtime_ns
+        self.size = size
+        self.offsets = offsets
+        self.line_count = line_count
+
+    @classmethod
+    def build(cls, path: str, st: os.stat_result) -> "LineIndex":
+        offsets = array("q")
+        size = st.st_size
+        if size > 0:
+            with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                offsets.append(0)
+                find = mm.find
+                pos = find(b"\n")
+                while pos != -1:
+                    offsets.append(pos + 1)
+                    pos = find(b"\n", pos + 1)
+            # 文件以换行结尾时，最后一个偏移指向 EOF，不构成新行
+            if offsets[-1] >= size:
+                offsets.pop()
+        return cls(path, st.st_mtime_ns, size, offsets, len(offsets))
+
+    def _byte_range(self, start: int, end: int) -> Tuple[int, int]:
+        begin = self.offsets[start - 1]
+        stop = self.offsets[end] if end < self.line_count else self.size
+        return begin, stop
+
+    def read_lines(self, start: int, end: int) -> List[str]:
+        """读取第 start..end 行（1-based，闭区间，自动裁剪到文件范围）。"""
+        start = max(1, start)
+        end = min(self.line_count, end)
+        if start > end:
+            return []
+        begin, stop = self._byte_range(start, end)
+        # 小区间直接 seek + read，比每次建立 mmap 映射更便宜
+        with open(self.path, "rb") as f:
+            f.seek(begin)
+            raw = f.read(stop - begin)
+        try:
+            text = raw.decode("utf-8")
+        except UnicodeDecodeError as exc:
+            record_fallback(
+                "io_decode_fallback",
+                "line_index_decode",
+                meta={"path": self.path, "error": exc.__class__.__name__},
+            )
+            text = raw.decode("utf-8", errors="ignore")
+        return split_lines(text)
+
+
+def split_lines(text: str) -> List[str]:
+    """按与行索引相同的规则分行：仅以 \\n 分行并去掉行尾 \\r，末尾换行不产生空行。"""
+    if not text:
+        return []
+    lines = text.split("\n")
+    if lines[-1] == "":
+        lines.pop()
+    return [ln[:-1] if ln.endswith("\r") else ln for ln in lines]
+
+
+_INDEX_CACHE: "OrderedDict[str, LineIndex]" = OrderedDict()
+_INDEX_LOCK = threading.Lock()
+
+
+def get_line_index(path: PathLike) -> LineIndex:
+    """获取文件的行索引；文件 mtime/size 变化时自动重建。
+
+    Raises:
+        OSError: 文件不存在或不可读。
+    """
+    key = os.fspath(path)
+    st = os.stat(key)
+    with _INDEX_LOCK:
+        cached = _INDEX_CACHE.get(key)
+        if cached is not None and cached.mtime_ns == st.st_mtime_ns and cached.size == st.st_size:
+            _INDEX_CACHE.move_to_end(key)
+            record_cache("line_index", True)
+            return cached
+    record_cache("line_index", False)
+    index = LineIndex.build(key, st)
+    with _INDEX_LOCK:
+        _INDEX_CACHE[key] = index
+        _INDEX_CACHE.move_to_end(key)
+        while len(_INDEX_CACHE) > _INDEX_CACHE_MAX_SIZE:
+            _INDEX_CACHE.popitem(last=False)
+    return index
+
+
+def read_line_range(path: PathLike, start: int, end: int) -> Tuple[List[str], int]:
+    """读取文件第 start..end 行，返回 (行列表, 文件总行数)。"""
+    index = get_line_index(path)
+    return index.read_lines(start, end), index.line_count
+
+
+def clear_line_index_cache() -> None:
+    """清空行索引缓存。"""
+    with _INDEX_LOCK:
+        _INDEX_CACHE.clear()
+
+
+def line_index_cache_stats() -> dict:
+    with _INDEX_LOCK:
+        return {"size": len(_INDEX_CACHE), "max_size": _INDEX_CACHE_MAX_SIZE}
+
+
+__all__ = [
+    "LineIndex",
+    "get_line_index",
+    "read_line_range",
+    "split_lines",
+    "clear_line_index_cache",
+    "line_index_cache_stats",
+]
@@ -26,3 +26,13 @@ def set_diff_units(units: List[Dict[str, Any]]) -> None:
 def get_diff_units() -> List[Dict[str, Any]]:
     """获取当前审查的 diff units。"""
     return _diff_units_ctx.get() or []
+
+_llm_priority_ctx: ContextVar[Optional[str]] = ContextVar("llm_priority", default=None)
+
+def set_llm_priority(priority: Optional[str]) -> None:
+    """设置当前任务发起 LLM 请求的调度优先级（interactive / background）。"""
+    _llm_priority_ctx.set(priority)
+
+def get_llm_priority() -> Optional[str]:
+    """获取当前任务的 LLM 调度优先级。"""
+    return _llm_priority_ctx.get()
@@ -4,8 +4,8 @@ from __future__ import annotations
 
 import abc
 import asyncio
-import json
 import os
+import time
 from typing import Any, AsyncIterator, Dict, List, Optional
 
 try:  # 可选依赖；真正的客户端需要 httpx
@@ -14,6 +14,22 @@ except ImportError:  # pragma: no cover
     httpx = None  # type: ignore[assignment]
 
 from Agent.core.logging.api_logger import APILogger
+from Agent.core.logging.metrics import observe_llm_call
+from Agent.core.logging.tracing import add_span
+from Agent.core.llm.http_pool import acquire_http_client
+from Agent.core.llm.scheduler import estimate_tokens, get_llm_scheduler, parse_retry_after
+from Agent.core.stream.sse import JSONDecodeError, iter_sse_data, json_loads
+
+# 触发调度器退避并自动重试的状态码（限流 / 服务暂不可用）
+_THROTTLE_STATUS = (429, 503)
+
+
+def _max_retries() -> int:
+    try:
+        from Agent.core.api.config import get_retry_config
+        return max(0, get_retry_config()[0])
+    except Exception:
+        return 3
 
 
 def _default_timeout() -> float:
@@ -80,6 +96,10 @@ class BaseLLMClient(abc.ABC):
 class OpenAIClientBase(BaseLLMClient):
     """兼容 OpenAI 格式的客户端基类，提取公共逻辑。"""
 
+    # 是否支持在消息内容上标注 cache_control（显式前缀缓存）；
+    # DeepSeek / Moonshot 等为自动前缀缓存，无需标注，只要前缀字节稳定即可命中。
+    supports_cache_control: bool = False
+
     def __init__(
         self,
         model: str,
@@ -101,12 +121,14 @@ class OpenAIClientBase(BaseLLMClient):
         if not base_url_final:
             raise ValueError(f"Base URL not found. Please check your configuration.")
         self.base_url = base_url_final
-        self._client = httpx.AsyncClient(timeout=_httpx_timeout())
+        # 传输层按 (厂商, base_url) 在进程内共享；日志等按 trace 的状态留在客户端对象上
+        self.provider = self.__class__.__name__.replace("LLMClient", "").lower()
+        self._client, self._owns_client = acquire_http_client(self.provider, base_url_final)
         self._logger = logger or APILogger()
 
     async def aclose(self) -> None:
-        """关闭 HTTP 客户端连接。"""
-        if hasattr(self, '_client') and self._client:
+        """释放客户端；共享连接池由服务退出时统一关闭，这里只关闭独占的连接。"""
+        if getattr(self, "_owns_client", False) and self._client:
             await self._client.aclose()
 
     async def __aenter__(self):
@@ -121,6 +143,37 @@ class OpenAIClientBase(BaseLLMClient):
             "Content-Type": "application/json",
         }
 
+    def _apply_cache_hints(
+        self,
+        messages: List[Dict[str, Any]],
+        breakpoints: Any,
+    ) -> List[Dict[str, Any]]:
+        """在稳定前缀的断点消息上标注 cache_control（仅支持显式缓存的厂商）。
+
+        只复制被标注的消息，其余消息对象原样复用；最多标注首个断点和最近 3 个断点。
+        """
+        if not self.supports_cache_control or not breakpoints:
+            return messages
+        points = sorted({int(i) for i in breakpoints if 0 <= int(i) < len(messages)})
+        if len(points) > 4:
+            points = points[:1] + points[-3:]
+        if not points:
+            return messages
+        marked = list(messages)
+        for idx in points:
+            msg = marked[idx]
+            if msg.get("role") not in ("system", "user"):
+                continue
+            content = msg.get("content")
+            if isinstance(content, str) and content:
+                parts = [{"type": "text", "text": content, "cache_control": {"type": "ephemeral"}}]
+            elif isinstance(content, list) and content and isinstance(content[-1], dict):
+                parts = list(content[:-1]) + [dict(content[-1], cache_control={"type": "ephemeral"})]
+            else:
+                continue
+            marked[idx] = dict(msg, content=parts)
+        return marked
+
     async def stream_chat(
         self,
         messages: List[Dict[str, Any]],
@@ -145,6 +198,8 @@ class OpenAIClientBase(BaseLLMClient):
             
         # Extract timeout if present
         timeout = kwargs.pop("timeout", None)
+        # 稳定前缀断点只用于缓存标注，不透传给厂商
+        payload["messages"] = self._apply_cache_hints(messages, kwargs.pop("cache_breakpoints", None))
             
         # 强制透传 kwargs 里的剩余参数（比如 temperature, top_p, 以及可能的 vendor specific params）
         payload.update(kwargs)
@@ -157,107 +212,138 @@ class OpenAIClientBase(BaseLLMClient):
         content_parts: List[str] = []
         final_usage: Dict[str, Any] | None = None
         chunk_count = 0
-        async with self._client.stream(
-            "POST", url, headers=self._headers(), json=payload, timeout=timeout
-        ) as response:
-            self._logger.append(
-                log_path,
-                "RESPONSE_HEADERS",
-                {"status_code": response.status_code, "headers": dict(response.headers)},
-            )
+        scheduler = get_llm_scheduler()
+        provider = self.provider
+        est_tokens = estimate_tokens(messages)
+        max_retries = _max_retries()
+        attempt = 0
+        requested_at = time.monotonic()
+        sent_at: float | None = None
+        first_chunk_at: float | None = None
+        while True:
+            async with scheduler.slot(provider, tokens=est_tokens):
+                # 首包耗时从获得调度名额、发出请求时算起，不含排队
+                sent_at = time.monotonic()
+                async with self._client.stream(
+                    "POST", url, headers=self._headers(), json=payload,
+                    timeout=timeout if timeout is not None else _httpx_timeout(),
+                ) as response:
+                    self._logger.append(
+                        log_path,
+                        "RESPONSE_HEADERS",
+                        {"status_code": response.status_code, "headers": dict(response.headers)},
+                    )
             
-            if response.is_error:
-                error_content = await response.aread()
-                error_text = error_content.decode("utf-8", errors="replace")
-                self._logger.append(
-                    log_path,
-                    "ERROR_RESPONSE_BODY",
-                    {"status_code": response.status_code, "body": error_text}
-                )
-                raise RuntimeError(f"API Request Failed ({response.status_code}): {error_text}")
-
-            # response.raise_for_status() # Handled above
-            async for line in response.aiter_lines():
-                if not line:
-                    continue
-                
-                # 处理 SSE 注释/心跳 (如 OpenRouter 的 ": OPENROUTER PROCESSING")
-                if line.startswith(":"):
-                    continue
-
-                # 兼容有些非标 API 可能直接返回 JSON 而不是 data: 前缀
-                # 或者有些错误信息直接在 body 里
-                if line.startswith("data:"):
-                    data = line.removeprefix("data:").strip()
-                else:
-                    # 尝试直接解析，或者是心跳/注释
-                    data = line.strip()
-                
-                if not data or data == "[DONE]":
-                    continue
-                    
-                try:
-                    parsed = json.loads(data)
-                except json.JSONDecodeError:
-                    # 忽略无法解析的行（可能是注释或心跳），但记录日志
-                    self._logger.append(log_path, "WARN_PARSE_FAIL", {"line": line})
-                    continue
-
-                chunk_count += 1
-                self._logger.append(
-                    log_path, "RESPONSE_CHUNK", {"raw": line, "parsed": parsed}
-                )
-                
-                # 某些 API 返回错误结构不同，尝试检测
-                if "error" in parsed:
-                     raise RuntimeError(f"API Error: {parsed['error']}")
-
-                # 处理可能为空的 choices - MiniMax/某些 API 可能返回空列表
-                choices = parsed.get("choices", [])
-                if not choices:
-                    # 只处理 usage 信息（最后一个 chunk 可能只有 usage）
-                    if parsed.get("usage"):
-                        final_usage = parsed["usage"]
-                    continue
-                choice = choices[0]
-                usage = parsed.get("usage") or choice.get("usage")
-                if usage:
-                    final_usage = usage
-                delta = choice.get("delta", {})
-                content_delta = delta.get("content")
-                reasoning_delta = delta.get("reasoning_content")  # Support for DeepSeek reasoning
-                # Support MiniMax reasoning_details (可能是列表格式)
-                if not reasoning_delta:
-                    rd = delta.get("reasoning_details")
-                    if rd:
-                        if isinstance(rd, list):
-                            # MiniMax 格式: [{"text": "...", "type": "text" | "reasoning.text"}, ...]
-                            reasoning_delta = "".join(
-                                item.get("text", "") for item in rd 
-                                if isinstance(item, dict) and item.get("type") in ("text", "reasoning.text")
+                    if response.is_error:
+                        error_content = await response.aread()
+                        error_text = error_content.decode("utf-8", errors="replace")
+                        self._logger.append(
+                            log_path,
+                            "ERROR_RESPONSE_BODY",
+                            {"status_code": response.status_code, "body": error_text}
+                        )
+                        if response.status_code in _THROTTLE_STATUS and attempt < max_retries:
+                            # 尚未向调用方输出任何内容，可以安全地退避后重发
+                            scheduler.penalize(provider, parse_retry_after(response.headers.get("retry-after")), attempt)
+                            attempt += 1
+                            continue
+                        raise RuntimeError(f"API Request Failed ({response.status_code}): {error_text}")
+
+                    # response.raise_for_status() # Handled above
+                    log_chunks = self._logger.enable_stream_chunks
+                    async for data in iter_sse_data(response.aiter_bytes()):
+                        try:
+                            parsed = json_loads(data)
+                        except JSONDecodeError:
+                            # 忽略无法解析的行（可能是注释或心跳），但记录日志
+                            self._logger.append(
+                                log_path, "WARN_PARSE_FAIL", {"line": data.decode("utf-8", errors="replace")}
                             )
-                        elif isinstance(rd, str):
-                            reasoning_delta = rd
+                            continue
+
+                        chunk_count += 1
+                        if first_chunk_at is None:
+                            first_chunk_at = time.monotonic()
+                        if log_chunks:
+                            self._logger.append(
+                                log_path,
+                                "RESPONSE_CHUNK",
+                                {"raw": data.decode("utf-8", errors="replace"), "parsed": parsed},
+                            )
+                        else:
+                            # 未开启 chunk 日志时只计数，不构造任何载荷
+                            self._logger.note_stream_chunk(log_path)
                 
-                if isinstance(content_delta, list):
-                    for piece in content_delta:
-                        if (
-                            isinstance(piece, dict)
-                            and piece.get("type") == "text"
-                        ):
-                            content_parts.append(piece.get("text", ""))
-                elif isinstance(content_delta, str):
-                    content_parts.append(content_delta)
+                        # 某些 API 返回错误结构不同，尝试检测
+                        if "error" in parsed:
+                             raise RuntimeError(f"API Error: {parsed['error']}")
+
+                        # 处理可能为空的 choices - MiniMax/某些 API 可能返回空列表
+                        choices = parsed.get("choices", [])
+                        if not choices:
+                            # 只处理 usage 信息（最后一个 chunk 可能只有 usage）
+                            if parsed.get("usage"):
+                                final_usage = parsed["usage"]
+                            continue
+                        choice = choices[0]
+                        usage = parsed.get("usage") or choice.get("usage")
+                        if usage:
+                            final_usage = usage
+                        delta = choice.get("delta", {})
+                        content_delta = delta.get("content")
+                        reasoning_delta = delta.get("reasoning_content")  # Support for DeepSeek reasoning
+                        # Support MiniMax reasoning_details (可能是列表格式)
+                        if not reasoning_delta:
+                            rd = delta.get("reasoning_details")
+                            if rd:
+                                if isinstance(rd, list):
+                                    # MiniMax 格式: [{"text": "...", "type": "text" | "reasoning.text"}, ...]
+                                    reasoning_delta = "".join(
+                                        item.get("text", "") for item in rd 
+                                        if isinstance(item, dict) and item.get("type") in ("text", "reasoning.text")
+                                    )
+                                elif isinstance(rd, str):
+                                    reasoning_delta = rd
                 
-                # Note: We don't append reasoning to content_parts (which is used for final summary)
-                # as reasoning is usually auxiliary.
+                        if isinstance(content_delta, list):
+                            for piece in content_delta:
+                                if (
+                                    isinstance(piece, dict)
+                                    and piece.get("type") == "text"
+                                ):
+                                    content_parts.append(piece.get("text", ""))
+                        elif isinstance(content_delta, str):
+                            content_parts.append(content_delta)
                 
-                yield {
-                    "delta": delta,
-                    "reasoning_content": reasoning_delta, # Explicitly yield reasoning
-                    "finish_reason": choice.get("finish_reason"),
-                    "usage": usage,
-                }
+                        # Note: We don't append reasoning to content_parts (which is used for final summary)
+                        # as reasoning is usually auxiliary.
+                
+                        yield {
+                            "delta": delta,
+                            "reasoning_content": reasoning_delta, # Explicitly yield reasoning
+                            "finish_reason": choice.get("finish_reason"),
+                            "usage": usage,
+                        }
+
+            break
+
+        if first_chunk_at is not None and sent_at is not None:
+            observe_llm_call(
+                provider,
+                ttft=first_chunk_at - sent_at,
+                generation_seconds=time.monotonic() - first_chunk_at,
+                usage=final_usage,
+            )
+            add_span(
+                "llm.stream",
+                time.monotonic() - requested_at,
+                provider=provider,
+                model=self.model,
+                queue_ms=round((sent_at - requested_at) * 1000, 1),
+                ttft_ms=round((first_chunk_at - sent_at) * 1000, 1),
+                chunks=chunk_count,
+                retries=attempt,
+            )
 
         # 在流式结束后记录汇总内容，便于人工阅读
         try:
@@ -288,6 +374,7 @@ class OpenAIClientBase(BaseLLMClient):
         
         # Extract timeout
         timeout = kwargs.pop("timeout", None)
+        payload["messages"] = self._apply_cache_hints(messages, kwargs.pop("cache_breakpoints", None))
         
         payload.update(kwargs)
         url = f"{self.base_url}/chat/completions" if "/chat/completions" not in self.base_url else self.base_url
@@ -295,29 +382,46 @@ class OpenAIClientBase(BaseLLMClient):
             f"{self.__class__.__name__.lower().replace('llmclient', '')}_chat_completion", 
             {"url": url, "payload": payload}
         )
-        try:
-            response = await self._client.post(url, headers=self._headers(), json=payload, timeout=timeout)
-        except Exception as exc:  # pragma: no cover - 网络错误兜底
-            err_msg = repr(exc)
-            self._logger.append(
-                log_path, "ERROR", {"error": err_msg, "type": str(type(exc))}
-            )
-            raise RuntimeError(err_msg) from exc
-        self._logger.append(
-            log_path,
-            "RESPONSE_HEADERS",
-            {"status_code": response.status_code, "headers": dict(response.headers)},
-        )
-        
-        if response.is_error:
-            error_text = response.text
+        scheduler = get_llm_scheduler()
+        provider = self.provider
+        est_tokens = estimate_tokens(messages)
+        max_retries = _max_retries()
+        attempt = 0
+        while True:
+            async with scheduler.slot(provider, tokens=est_tokens):
+                try:
+                    response = await self._client.post(
+                        url, headers=self._headers(), json=payload,
+                        timeout=timeout if timeout is not None else _httpx_timeout(),
+                    )
+                except Exception as exc:  # pragma: no cover - 网络错误兜底
+                    err_msg = repr(exc)
+                    self._logger.append(
+                        log_path, "ERROR", {"error": err_msg, "type": str(type(exc))}
+                    )
+                    raise RuntimeError(err_msg) from exc
             self._logger.append(
-                log_path, "ERROR_RESPONSE_BODY", {"status_code": response.status_code, "body": error_text}
+                log_path,
+                "RESPONSE_HEADERS",
+                {"status_code": response.status_code, "headers": dict(response.headers)},
             )
-            raise RuntimeError(f"API Request Failed ({response.status_code}): {error_text}")
+
+            if response.is_error:
+                error_text = response.text
+                self._logger.append(
+                    log_path, "ERROR_RESPONSE_BODY", {"status_code": response.status_code, "body": error_text}
+                )
+                if response.status_code in _THROTTLE_STATUS and attempt < max_retries:
+                    scheduler.penalize(provider, parse_retry_after(response.headers.get("retry-after")), attempt)
+                    attempt += 1
+                    continue
+                raise RuntimeError(f"API Request Failed ({response.status_code}): {error_text}")
+            break
 
         data = response.json()
         self._logger.append(log_path, "RESPONSE", data)
+        if isinstance(data, dict):
+            observe_llm_call(provider, usage=data.get("usage"))
         return data
 
 
@@ -403,7 +507,8 @@ class GLMLLMClient(OpenAIClientBase):
 
 
 class BailianLLMClient(OpenAIClientBase):
-    # 百炼的客户端
+    # 百炼的客户端（支持 cache_control 显式缓存）
+    supports_cache_control = True
 
     def __init__(
         self,
@@ -441,6 +546,9 @@ class ModelScopeLLMClient(OpenAIClientBase):
         )
 
 class OpenRouterLLMClient(OpenAIClientBase):
+    # OpenRouter 会把 cache_control 透传给支持显式缓存的上游模型，其余模型忽略
+    supports_cache_control = True
+
     def __init__(
         self,
         model: str,
@@ -0,0 +1,125 @@
+"""进程级共享的 LLM HTTP 连接池。
+
+每次审查都会新建 LLM 客户端；如果每个客户端都自带 httpx.AsyncClient，
+每次审查/规划/意图调用都要重新握手 TCP+TLS，结束后连接池也随之丢弃。
+这里按 (provider, base_url, 事件循环) 共享 httpx.AsyncClient，客户端对象只保留
+模型、密钥、APILogger 等按 trace 区分的状态，传输层跨审查复用。
+
+httpx 的连接绑定在创建它的事件循环上，因此池的键包含事件循环；
+事件循环关闭后对应条目会在下次获取时被清理。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+import weakref
+from typing import Any, Dict, Tuple
+
+try:  # 可选依赖；真正的客户端需要 httpx
+    import httpx
+except ImportError:  # pragma: no cover
+    httpx = None  # type: ignore[assignment]
+
+from Agent.core.logging.fallback_tracker import record_fallback
+
+_PoolKey = Tuple[str, str, int]
+
+_pool: Dict[_PoolKey, Tuple["weakref.ref[asyncio.AbstractEventLoop]", Any]] = {}
+_pool_lock = threading.Lock()
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # type: ignore  # noqa: F401
+        return True
+    except Exception:
+        return False
+
+
+def _build_client() -> Any:
+    from Agent.core.api.config import get_http_pool_settings
+
+    settings = get_http_pool_settings()
+    http2 = bool(settings.get("http2"))
+    if http2 and not _http2_available():
+        record_fallback(
+            "llm_http2_unavailable",
+            "已配置 HTTP/2 但未安装 h2，回退为 HTTP/1.1",
+        )
+        http2 = False
+    limits = httpx.Limits(
+        max_connections=int(settings.get("max_connections") or 100),
+        max_keepalive_connections=int(settings.get("max_keepalive") or 20),
+        keepalive_expiry=float(settings.get("keepalive_expiry") or 60.0),
+    )
+    # 超时按请求传入（随配置实时生效），这里不设客户端级超时
+    return httpx.AsyncClient(limits=limits, http2=http2)
+
+
+def _prune_closed_loops() -> None:
+    """移除事件循环已关闭/回收的条目（调用方需持有锁）。"""
+    for key in [k for k, (loop_ref, _) in _pool.items() if (loop_ref() is None or loop_ref().is_closed())]:
+        _pool.pop(key, None)
+
+
+def acquire_http_client(provider: str, base_url: str) -> Tuple[Any, bool]:
+    """获取 (provider, base_url) 对应的共享 AsyncClient。
+
+    Returns:
+        (client, owned)：owned 为 True 表示当前没有运行中的事件循环，返回的是独占客户端，
+        调用方负责关闭；共享客户端由 close_shared_http_clients 统一关闭。
+    """
+    if httpx is None:  # pragma: no cover - 仅在缺少 httpx 时触发
+        raise RuntimeError("httpx is required but not installed")
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return _build_client(), True
+
+    key: _PoolKey = (provider, base_url, id(loop))
+    with _pool_lock:
+        entry = _pool.get(key)
+        if entry is not None and entry[0]() is loop and not getattr(entry[1], "is_closed", False):
+            return entry[1], False
+        _prune_closed_loops()
+        client = _build_client()
+        _pool[key] = (weakref.ref(loop), client)
+        return client, False
+
+
+async def close_shared_http_clients() -> None:
+    """关闭当前事件循环上的全部共享客户端（服务退出时调用）。"""
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        loop = None
+    with _pool_lock:
+        targets = [
+            (key, client)
+            for key, (loop_ref, client) in _pool.items()
+            if loop is None or loop_ref() is loop
+        ]
+        for key, _ in targets:
+            _pool.pop(key, None)
+    for _, client in targets:
+        try:
+            await client.aclose()
+        except Exception:
+            pass
+
+
+def http_pool_stats() -> Dict[str, Any]:
+    """返回共享连接池概况。"""
+    with _pool_lock:
+        return {
+            "clients": len(_pool),
+            "providers": sorted({key[0] for key in _pool}),
+        }
+
+
+__all__ = [
+    "acquire_http_client",
+    "close_shared_http_clients",
+    "http_pool_stats",
+]
@@ -0,0 +1,234 @@
+"""确定性 LLM 调用（规划 / 意图）的磁盘响应缓存。
+
+用户在同一份 diff 上重跑审查（审查失败后重试、切换审查模型、刷新页面）时，
+规划与意图分析的输入逐字节相同。这里按
+(provider, model, 规范化 messages, tools, response_format, temperature)
+计算内容哈希，将规范化后的助手消息存到 Agent/data/llm_cache/<hash>.json，
+带 TTL 与总大小上限（超限按最久未写入淘汰）。
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from Agent.core.logging.fallback_tracker import record_fallback
+from Agent.core.logging.metrics import record_cache
+
+# 持久化的助手消息字段（不保存原始流式片段）
+_STORED_FIELDS = ("role", "content", "content_json", "reasoning", "finish_reason")
+
+
+def _default_cache_dir() -> Path:
+    agent_root = Path(__file__).resolve().parents[2]
+    return (agent_root / "data" / "llm_cache").resolve()
+
+
+def _settings() -> Dict[str, Any]:
+    try:
+        from Agent.core.api.config import get_llm_response_cache_settings
+        return get_llm_response_cache_settings()
+    except Exception:
+        return {"enabled": True, "ttl_seconds": 24 * 3600, "max_bytes": 64 * 1024 * 1024}
+
+
+def make_cache_key(
+    provider: str,
+    model: str,
+    messages: List[Dict[str, Any]],
+    tools: Any = None,
+    response_format: Any = None,
+    temperature: Any = None,
+) -> str:
+    """计算请求的内容哈希；messages 只取 role/content/tool_calls/tool_call_id 等语义字段。"""
+    normalized = [
+        {k: m.get(k) for k in ("role", "content", "tool_calls", "tool_call_id", "name") if m.get(k) is not None}
+        for m in messages
+    ]
+    material = json.dumps(
+        {
+            "provider": provider,
+            "model": model,
+            "messages": normalized,
+            "tools": tools,
+            "response_format": response_format,
+            "temperature": temperature,
+        },
+        ensure_ascii=False,
+        sort_keys=True,
+        separators=(",", ":"),
+        default=str,
+    )
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """内容寻址的 LLM 响应缓存（单例）。"""
+
+    _instance: Optional["ResponseCache"] = None
+    _lock = threading.Lock()
+
+    def __new__(cls, cache_dir: Optional[Path] = None) -> "ResponseCache":
+        if cls._instance is None:
+            with cls._lock:
+                if cls._instance is None:
+                    cls._instance = super().__new__(cls)
+                    cls._instance._initialized = False
+        return cls._instance
+
+    def __init__(self, cache_dir: Optional[Path] = None) -> None:
+        if self._initialized:
+            return
+        self.cache_dir = Path(cache_dir) if cache_dir else _default_cache_dir()
+        self._io_lock = threading.Lock()
+        # 文件名 -> (mtime, size)，首次使用时扫描目录建立
+        self._index: Optional[Dict[str, tuple]] = None
+        self._hits = 0
+        self._misses = 0
+        self._initialized = True
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.json"
+
+    def _ensure_index(self) -> Dict[str, tuple]:
+        if self._index is None:
+            index: Dict[str, tuple] = {}
+            if self.cache_dir.exists():
+                for entry in os.scandir(self.cache_dir):
+                    if entry.is_file() and entry.name.endswith(".json"):
+                        st = entry.stat()
+                        index[entry.name] = (st.st_mtime, st.st_size)
+            self._index = index
+        return self._index
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """读取未过期的缓存消息；不存在、过期或损坏时返回 None。"""
+        settings = _settings()
+        if not settings["enabled"]:
+            return None
+        path = self._path(key)
+        with self._io_lock:
+            try:
+                st = path.stat()
+            except OSError:
+                self._misses += 1
+                record_cache("llm_response", False)
+                return None
+            if time.time() - st.st_mtime > settings["ttl_seconds"]:
+                self._remove(path)
+                self._misses += 1
+                record_cache("llm_response", False)
+                return None
+            try:
+                data = json.loads(path.read_text(encoding="utf-8"))
+            except Exception as exc:
+                record_fallback(
+                    "llm_response_cache_corrupt",
+                    "LLM 响应缓存文件损坏，已删除",
+                    meta={"path": str(path), "error": exc.__class__.__name__},
+                )
+                self._remove(path)
+                self._misses += 1
+                record_cache("llm_response", False)
+                return None
+            self._hits += 1
+        record_cache("llm_response", True)
+        message = data.get("message")
+        return message if isinstance(message, dict) else None
+
+    def set(self, key: str, message: Dict[str, Any], meta: Optional[Dict[str, Any]] = None) -> None:
+        """写入缓存（原子替换），超出总大小上限时淘汰最旧条目。"""
+        settings = _settings()
+        if not settings["enabled"]:
+            return
+        record = {
+            "created_at": time.time(),
+            "meta": meta or {},
+            "message": {k: message.get(k) for k in _STORED_FIELDS},
+        }
+        payload = json.dumps(record, ensure_ascii=False)
+        path = self._path(key)
+        with self._io_lock:
+            try:
+                self.cache_dir.mkdir(parents=True, exist_ok=True)
+                tmp = path.with_suffix(".tmp")
+                tmp.write_text(payload, encoding="utf-8")
+                os.replace(tmp, path)
+                st = path.stat()
+            except OSError as exc:
+                record_fallback(
+                    "llm_response_cache_write_failed",
+                    "LLM 响应缓存写入失败",
+                    meta={"path": str(path), "error": exc.__class__.__name__},
+                )
+                return
+            index = self._ensure_index()
+            index[path.name] = (st.st_mtime, st.st_size)
+            self._evict(index, settings["max_bytes"])
+
+    def invalidate(self, key: Optional[str]) -> None:
+        """删除指定条目（例如调用方发现缓存内容不可用）。"""
+        if not key:
+            return
+        with self._io_lock:
+            self._remove(self._path(key))
+
+    def _remove(self, path: Path) -> None:
+        try:
+            path.unlink()
+        except OSError:
+            pass
+        if self._index is not None:
+            self._index.pop(path.name, None)
+
+    def _evict(self, index: Dict[str, tuple], max_bytes: int) -> None:
+        total = sum(size for _, size in index.values())
+        if total <= max_bytes:
+            return
+        for name, (_, size) in sorted(index.items(), key=lambda kv: kv[1][0]):
+            if total <= max_bytes:
+                break
+            self._remove(self.cache_dir / name)
+            total -= size
+
+    def clear(self) -> None:
+        with self._io_lock:
+            for name in list(self._ensure_index()):
+                self._remove(self.cache_dir / name)
+            self._hits = 0
+            self._misses = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._io_lock:
+            index = self._ensure_index()
+            total = self._hits + self._misses
+            return {
+                "entries": len(index),
+                "bytes": sum(size for _, size in index.values()),
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_ratio": (self._hits / total) if total else 0.0,
+            }
+
+
+_response_cache: Optional[ResponseCache] = None
+
+
+def get_response_cache() -> ResponseCache:
+    """获取 LLM 响应缓存单例。"""
+    global _response_cache
+    if _response_cache is None:
+        _response_cache = ResponseCache()
+    return _response_cache
+
+
+__all__ = [
+    "ResponseCache",
+    "get_response_cache",
+    "make_cache_key",
+]
@@ -0,0 +1,407 @@
+"""多厂商路由客户端：按健康度选择厂商，首包超时/连接失败时故障转移，可选对冲请求。
+
+单个厂商出现几分钟的降级（连接失败、迟迟不出首个流式片段）时，原先整次审查会
+一直等到 call_timeout。路由客户端包装一组候选客户端：
+
+- 健康度：按厂商记录最近若干次调用的首包耗时与失败情况，退化的首选厂商会被后置；
+- 故障转移：在向调用方输出任何片段之前，连接错误 / 5xx / 429 / 首包超时都会切换到下一个候选；
+  思考模型在首包前可能长时间无输出，首包超时按候选模型分别取值；
+- 对冲（hedging）：首选厂商超过 hedge_after 秒仍无首包时，并行向下一个候选发起同一请求，
+  取先出首包的一方，另一方立即取消。
+
+一旦已向调用方输出片段，就不再切换（流式内容无法撤回），后续错误照常抛出。
+实际应答的厂商/模型通过调用方传入的 route_info 字典返回（同一客户端会被并发调用，
+不能写在客户端属性上）。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from collections import deque
+from typing import Any, AsyncIterator, Deque, Dict, List, Optional, Tuple
+
+try:  # 可选依赖；真正的客户端需要 httpx
+    import httpx
+except ImportError:  # pragma: no cover
+    httpx = None  # type: ignore[assignment]
+
+from Agent.core.llm.client import BaseLLMClient
+from Agent.core.logging.fallback_tracker import record_fallback
+
+_HEALTH_WINDOW = 50
+# 连续失败达到该次数后进入冷却期，冷却期内不作为首选
+_COOLDOWN_AFTER_FAILURES = 3
+_COOLDOWN_SECONDS = 60.0
+
+
+def is_thinking_model(model: str) -> bool:
+    """与规划器一致的轻量判断：模型名含 thinking 视为思考模型。"""
+    return "thinking" in str(model or "").lower()
+
+
+class FailoverError(RuntimeError):
+    """可以切换到其他厂商重试的错误（尚未输出任何片段）。"""
+
+
+def is_failover_error(exc: BaseException) -> bool:
+    """判断异常是否属于厂商侧故障（连接失败、超时、限流、5xx）。"""
+    if isinstance(exc, (FailoverError, asyncio.TimeoutError, ConnectionError)):
+        return True
+    if httpx is not None and isinstance(exc, httpx.TransportError):
+        return True
+    message = str(exc)
+    if message.startswith("API Request Failed ("):
+        code = message[len("API Request Failed ("):].split(")", 1)[0]
+        return code == "429" or code.startswith("5")
+    # create_chat_completion 将网络错误包装为 RuntimeError(repr(exc))
+    return isinstance(exc, RuntimeError) and any(
+        name in message for name in ("ConnectError", "ReadTimeout", "ConnectTimeout", "RemoteProtocolError")
+    )
+
+
+class ProviderHealth:
+    """按厂商统计滚动窗口内的首包耗时与失败率（单例）。"""
+
+    _instance: Optional["ProviderHealth"] = None
+    _lock = threading.Lock()
+
+    def __new__(cls) -> "ProviderHealth":
+        if cls._instance is None:
+            with cls._lock:
+                if cls._instance is None:
+                    cls._instance = super().__new__(cls)
+                    cls._instance._initialized = False
+        return cls._instance
+
+    def __init__(self) -> None:
+        if self._initialized:
+            return
+        self._data_lock = threading.Lock()
+        self._samples: Dict[str, Deque[Tuple[bool, float]]] = {}
+        self._consecutive_failures: Dict[str, int] = {}
+        self._cooldown_until: Dict[str, float] = {}
+        self._initialized = True
+
+    def record_success(self, provider: str, ttft_ms: float) -> None:
+        with self._data_lock:
+            self._samples.setdefault(provider, deque(maxlen=_HEALTH_WINDOW)).append((True, ttft_ms))
+            self._consecutive_failures[provider] = 0
+            self._cooldown_until.pop(provider, None)
+
+    def record_failure(self, provider: str, elapsed_ms: float) -> None:
+        with self._data_lock:
+            self._samples.setdefault(provider, deque(maxlen=_HEALTH_WINDOW)).append((False, elapsed_ms))
+            count = self._consecutive_failures.get(provider, 0) + 1
+            self._consecutive_failures[provider] = count
+            if count >= _COOLDOWN_AFTER_FAILURES:
+                self._cooldown_until[provider] = time.monotonic() + _COOLDOWN_SECONDS
+
+    def score(self, provider: str) -> float:
+        """健康分，越小越好：错误率权重最高，其次是首包耗时中位数（秒）。"""
+        with self._data_lock:
+            samples = list(self._samples.get(provider, ()))
+            cooling = self._cooldown_until.get(provider, 0.0) > time.monotonic()
+        if not samples:
+            return 0.0
+        errors = sum(1 for ok, _ in samples if not ok)
+        ttfts = sorted(ms for ok, ms in samples if ok)
+        p50 = ttfts[len(ttfts) // 2] / 1000 if ttfts else 0.0
+        return (100.0 if cooling else 0.0) + errors / len(samples) * 10.0 + p50
+
+    def is_degraded(self, provider: str) -> bool:
+        with self._data_lock:
+            if self._cooldown_until.get(provider, 0.0) > time.monotonic():
+                return True
+            samples = list(self._samples.get(provider, ()))[-10:]
+        if len(samples) < 3:
+            return False
+        return sum(1 for ok, _ in samples if not ok) / len(samples) >= 0.5
+
+    def rank(self, providers: List[str]) -> List[str]:
+        """首选厂商健康时保持首位，否则与其余候选一起按健康分排序。"""
+        if not providers:
+            return []
+        primary, rest = providers[0], providers[1:]
+        rest = sorted(rest, key=self.score)
+        if self.is_degraded(primary):
+            return sorted([primary] + rest, key=self.score)
+        return [primary] + rest
+
+    def stats(self) -> Dict[str, Any]:
+        with self._data_lock:
+            snapshot = {name: list(samples) for name, samples in self._samples.items()}
+        result: Dict[str, Any] = {}
+        for name, samples in snapshot.items():
+            ttfts = sorted(ms for ok, ms in samples if ok)
+            result[name] = {
+                "samples": len(samples),
+                "error_rate": round(sum(1 for ok, _ in samples if not ok) / len(samples), 3) if samples else 0.0,
+                "ttft_ms_p50": round(ttfts[len(ttfts) // 2], 1) if ttfts else None,
+                "ttft_ms_p95": round(ttfts[min(len(ttfts) - 1, int(len(ttfts) * 0.95))], 1) if ttfts else None,
+                "degraded": self.is_degraded(name),
+            }
+        return result
+
+    def reset(self) -> None:
+        with self._data_lock:
+            self._samples.clear()
+            self._consecutive_failures.clear()
+            self._cooldown_until.clear()
+
+
+_provider_health: Optional[ProviderHealth] = None
+
+
+def get_provider_health() -> ProviderHealth:
+    """获取厂商健康度统计单例。"""
+    global _provider_health
+    if _provider_health is None:
+        _provider_health = ProviderHealth()
+    return _provider_health
+
+
+_END = object()
+
+
+class _Attempt:
+    """一次候选厂商的流式调用。
+
+    流在独立任务中消费（httpx 的流式响应需在同一任务内打开和关闭），
+    首个片段通过 future 交付，其后的片段经有界队列转交给调用方。
+    """
+
+    def __init__(
+        self,
+        provider: str,
+        client: BaseLLMClient,
+        messages: List[Dict[str, Any]],
+        kwargs: Dict[str, Any],
+        ttft_limit: float = 0.0,
+    ) -> None:
+        self.provider = provider
+        self.ttft_limit = ttft_limit
+        self.started_at = time.monotonic()
+        self.first: "asyncio.Future[Dict[str, Any]]" = asyncio.get_running_loop().create_future()
+        self.queue: "asyncio.Queue[Any]" = asyncio.Queue(maxsize=256)
+        self.task = asyncio.ensure_future(self._run(client, messages, dict(kwargs)))
+
+    async def _run(self, client: BaseLLMClient, messages: List[Dict[str, Any]], kwargs: Dict[str, Any]) -> None:
+        try:
+            async for chunk in client.stream_chat(messages, **kwargs):
+                if not self.first.done():
+                    self.first.set_result(chunk)
+                else:
+                    await self.queue.put(chunk)
+        except asyncio.CancelledError:
+            if not self.first.done():
+                self.first.cancel()
+            raise
+        except Exception as exc:
+            if not self.first.done():
+                self.first.set_exception(exc)
+            else:
+                await self.queue.put(exc)
+            return
+        if not self.first.done():
+            self.first.set_exception(RuntimeError(f"{self.provider} stream ended without output"))
+        else:
+            await self.queue.put(_END)
+
+    async def rest(self) -> AsyncIterator[Dict[str, Any]]:
+        while True:
+            item = await self.queue.get()
+            if item is _END:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+
+    async def cancel(self) -> None:
+        if not self.task.done():
+            self.task.cancel()
+        await asyncio.gather(self.task, return_exceptions=True)
+        if self.first.done() and not self.first.cancelled():
+            self.first.exception()  # 标记异常已读取，避免未处理异常告警
+
+
+class RoutingLLMClient(BaseLLMClient):
+    """在多个候选厂商之间路由的客户端，接口与单厂商客户端一致。"""
+
+    def __init__(
+        self,
+        candidates: List[Tuple[str, BaseLLMClient]],
+        *,
+        ttft_timeout: float = 20.0,
+        ttft_timeout_thinking: float = 120.0,
+        hedge_after: float = 0.0,
+    ) -> None:
+        if not candidates:
+            raise ValueError("RoutingLLMClient requires at least one candidate")
+        self.candidates = list(candidates)
+        self._clients = dict(candidates)
+        self.ttft_timeout = float(ttft_timeout)
+        self.ttft_timeout_thinking = float(ttft_timeout_thinking)
+        self.hedge_after = float(hedge_after)
+        self.primary_provider = candidates[0][0]
+        # 始终为首选厂商的模型（规划器据此判断是否为思考模型），不随故障转移改变
+        self.model = getattr(candidates[0][1], "model", "")
+
+    def _ordered(self) -> List[str]:
+        return get_provider_health().rank([name for name, _ in self.candidates])
+
+    def _on_failure(self, provider: str, started_at: float, exc: BaseException, next_provider: Optional[str]) -> None:
+        get_provider_health().record_failure(provider, (time.monotonic() - started_at) * 1000)
+        record_fallback(
+            "llm_provider_failover",
+            f"{provider} 调用失败，切换到 {next_provider}" if next_provider else f"{provider} 调用失败，无可用候选",
+            meta={"provider": provider, "next": next_provider, "error": f"{type(exc).__name__}: {exc}"[:300]},
+        )
+
+    def _ttft_limit(self, provider: str) -> float:
+        """候选厂商的首包超时：思考模型使用更宽松的 ttft_timeout_thinking。"""
+        if self.ttft_timeout <= 0:
+            return 0.0
+        model = getattr(self._clients[provider], "model", "")
+        if is_thinking_model(model):
+            return max(self.ttft_timeout, self.ttft_timeout_thinking)
+        return self.ttft_timeout
+
+    def _ttft_budget(self, attempt: _Attempt) -> Optional[float]:
+        if attempt.ttft_limit <= 0:
+            return None
+        return max(0.0, attempt.ttft_limit - (time.monotonic() - attempt.started_at))
+
+    def _record_route(self, route_info: Optional[Dict[str, Any]], provider: str) -> None:
+        if route_info is None:
+            return
+        route_info["provider"] = provider
+        route_info["model"] = getattr(self._clients[provider], "model", "")
+        route_info["failover"] = provider != self.primary_provider
+
+    async def _first_chunk(
+        self, order: List[str], messages: List[Dict[str, Any]], kwargs: Dict[str, Any]
+    ) -> Tuple[_Attempt, Dict[str, Any]]:
+        """依次/对冲地发起候选请求，返回最先产出首个片段的调用。"""
+        pending: List[str] = list(order)
+        running: List[_Attempt] = []
+        last_exc: Optional[BaseException] = None
+
+        def _launch() -> None:
+            name = pending.pop(0)
+            running.append(_Attempt(name, self._clients[name], messages, kwargs, self._ttft_limit(name)))
+
+        _launch()
+        try:
+            while running:
+                budgets = [b for b in (self._ttft_budget(a) for a in running) if b is not None]
+                timeout = min(budgets) if budgets else None
+                hedge_pending = self.hedge_after > 0 and pending and len(running) == 1
+                if hedge_pending:
+                    hedge_wait = max(0.0, self.hedge_after - (time.monotonic() - running[0].started_at))
+                    timeout = hedge_wait if timeout is None else min(timeout, hedge_wait)
+                done, _ = await asyncio.wait({a.first for a in running}, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+
+                for attempt in [a for a in running if a.first in done]:
+                    exc = attempt.first.exception()
+                    if exc is None:
+                        running.remove(attempt)
+                        for other in running:
+                            await other.cancel()
+                        running.clear()
+                        return attempt, attempt.first.result()
+                    running.remove(attempt)
+                    await attempt.cancel()
+                    if not is_failover_error(exc):
+                        raise exc
+                    last_exc = exc
+                    self._on_failure(attempt.provider, attempt.started_at, exc, pending[0] if pending else None)
+                    if pending and not running:
+                        _launch()
+
+                # 首包超时：放弃该候选并切换
+                for attempt in list(running):
+                    budget = self._ttft_budget(attempt)
+                    if budget is not None and budget <= 0:
+                        running.remove(attempt)
+                        await attempt.cancel()
+                        last_exc = asyncio.TimeoutError(f"{attempt.provider} first chunk exceeded {attempt.ttft_limit}s")
+                        self._on_failure(attempt.provider, attempt.started_at, last_exc, pending[0] if pending else None)
+                        if pending and not running:
+                            _launch()
+
+                # 对冲：首选迟迟无首包时并行发起下一个候选
+                if (
+                    self.hedge_after > 0 and pending and len(running) == 1
+                    and time.monotonic() - running[0].started_at >= self.hedge_after
+                ):
+                    record_fallback(
+                        "llm_provider_hedge",
+                        f"{running[0].provider} 首包超过 {self.hedge_after}s，对冲请求 {pending[0]}",
+                        meta={"provider": running[0].provider, "hedge": pending[0]},
+                        priority="info",
+                    )
+                    _launch()
+        except BaseException:
+            for attempt in running:
+                await attempt.cancel()
+            raise
+        raise last_exc or RuntimeError("No LLM provider available")
+
+    async def stream_chat(
+        self,
+        messages: List[Dict[str, Any]],
+        route_info: Optional[Dict[str, Any]] = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """route_info 非空时写入实际应答的 provider / model / failover。"""
+        attempt, first = await self._first_chunk(self._ordered(), messages, kwargs)
+        self._record_route(route_info, attempt.provider)
+        get_provider_health().record_success(attempt.provider, (time.monotonic() - attempt.started_at) * 1000)
+        try:
+            yield first
+            async for chunk in attempt.rest():
+                yield chunk
+        finally:
+            await attempt.cancel()
+
+    async def create_chat_completion(
+        self,
+        messages: List[Dict[str, Any]],
+        route_info: Optional[Dict[str, Any]] = None,
+        **kwargs: Any,
+    ) -> Dict[str, Any]:
+        order = self._ordered()
+        last_exc: Optional[BaseException] = None
+        for idx, name in enumerate(order):
+            started_at = time.monotonic()
+            try:
+                result = await self._clients[name].create_chat_completion(messages, **dict(kwargs))
+            except Exception as exc:
+                if not is_failover_error(exc):
+                    raise
+                last_exc = exc
+                self._on_failure(name, started_at, exc, order[idx + 1] if idx + 1 < len(order) else None)
+                continue
+            self._record_route(route_info, name)
+            get_provider_health().record_success(name, (time.monotonic() - started_at) * 1000)
+            return result
+        raise last_exc or RuntimeError("No LLM provider available")
+
+    async def aclose(self) -> None:
+        for _, client in self.candidates:
+            try:
+                await client.aclose()
+            except Exception:
+                pass
+
+
+__all__ = [
+    "FailoverError",
+    "ProviderHealth",
+    "RoutingLLMClient",
+    "get_provider_health",
+    "is_failover_error",
+    "is_thinking_model",
+]
@@ -0,0 +1,369 @@
+"""全局 LLM 请求调度器：跨审查协调各厂商的并发、速率与退避。
+
+所有 OpenAI 兼容客户端的请求都先向调度器申请名额：
+- 每个 provider 独立的并发上限与令牌桶（请求数/分钟、估算 token 数/分钟）；
+- 优先级：交互式审查（interactive）优先于后台意图刷新（background）；
+- 同一优先级内按会话轮转，避免单个会话的突发请求占满名额；
+- 收到 429/503 时按 Retry-After（或指数退避）暂停该 provider 的派发。
+
+调度器是进程级单例，队列深度与等待时间通过 /api/metrics 暴露。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from email.utils import parsedate_to_datetime
+from typing import Any, AsyncIterator, Deque, Dict, List, Optional
+
+from Agent.core.context.runtime_context import get_llm_priority, get_session_id
+
+PRIORITY_INTERACTIVE = "interactive"
+PRIORITY_BACKGROUND = "background"
+_PRIORITY_ORDER = {PRIORITY_INTERACTIVE: 0, PRIORITY_BACKGROUND: 1}
+
+# 未配置 Retry-After 时退避上限，避免单次异常把 provider 暂停过久
+_MAX_BACKOFF_SECONDS = 60.0
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """解析 Retry-After 头（秒数或 HTTP 日期），无法解析返回 None。"""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        dt = parsedate_to_datetime(value)
+        return max(0.0, dt.timestamp() - time.time())
+    except Exception:
+        return None
+
+
+def estimate_tokens(messages: List[Dict[str, Any]]) -> int:
+    """粗略估算请求 token 数（约 4 字符 / token），用于 token 预算。"""
+    chars = 0
+    for msg in messages or []:
+        content = msg.get("content") if isinstance(msg, dict) else None
+        if isinstance(content, str):
+            chars += len(content)
+        elif isinstance(content, list):
+            for part in content:
+                if isinstance(part, dict) and isinstance(part.get("text"), str):
+                    chars += len(part["text"])
+    return chars // 4
+
+
+class TokenBucket:
+    """令牌桶：rate_per_minute <= 0 表示不限制。"""
+
+    def __init__(self, rate_per_minute: float) -> None:
+        self.rate = max(0.0, float(rate_per_minute)) / 60.0
+        self.capacity = max(0.0, float(rate_per_minute))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        if self.rate <= 0:
+            return
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """返回满足 amount 还需等待的秒数（不扣减）。"""
+        if self.rate <= 0:
+            return 0.0
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+    def consume(self, amount: float) -> None:
+        if self.rate > 0:
+            self.tokens -= min(amount, self.capacity)
+
+
+@dataclass
+class _Waiter:
+    loop: asyncio.AbstractEventLoop
+    future: "asyncio.Future[None]"
+    session: str
+    priority: str
+    tokens: int
+    enqueued_at: float = field(default_factory=time.monotonic)
+    granted: bool = False
+
+
+class _ProviderState:
+    def __init__(self, max_concurrency: int, rpm: float, tpm: float) -> None:
+        self.max_concurrency = max(1, int(max_concurrency))
+        self.requests = TokenBucket(rpm)
+        self.token_budget = TokenBucket(tpm)
+        self.active = 0
+        self.paused_until = 0.0
+        # 优先级 -> (会话 -> 等待队列)，OrderedDict 用于会话轮转
+        self.queues: Dict[str, "OrderedDict[str, Deque[_Waiter]]"] = {
+            p: OrderedDict() for p in _PRIORITY_ORDER
+        }
+        self.timer: Optional[asyncio.TimerHandle] = None
+        # 定时器所属的事件循环：循环关闭后定时器永远不会触发，需要据此重挂
+        self.timer_loop: Optional[asyncio.AbstractEventLoop] = None
+        self.dispatched = 0
+        self.throttled = 0
+        self.wait_total_ms = 0.0
+        self.wait_max_ms = 0.0
+        self.recent_waits_ms: Deque[float] = deque(maxlen=200)
+
+    def depth(self) -> int:
+        return sum(len(q) for sessions in self.queues.values() for q in sessions.values())
+
+    def peek(self) -> Optional[_Waiter]:
+        """按优先级取下一个等待者（同优先级内按会话轮转），并清理已取消或所属事件循环已关闭的等待者。"""
+        for priority in sorted(self.queues, key=_PRIORITY_ORDER.get):
+            sessions = self.queues[priority]
+            while sessions:
+                session, queue = next(iter(sessions.items()))
+                while queue and (queue[0].future.done() or queue[0].loop.is_closed()):
+                    queue.popleft()
+                if not queue:
+                    sessions.pop(session, None)
+                    continue
+                return queue[0]
+        return None
+
+    def pop(self, waiter: _Waiter) -> None:
+        sessions = self.queues[waiter.priority]
+        queue = sessions.get(waiter.session)
+        if queue and queue[0] is waiter:
+            queue.popleft()
+        # 本会话派发一次后移到队尾，实现轮转
+        if queue:
+            sessions.move_to_end(waiter.session)
+        else:
+            sessions.pop(waiter.session, None)
+
+
+class LLMScheduler:
+    """LLM 请求调度器（单例）。"""
+
+    _instance: Optional["LLMScheduler"] = None
+    _lock = threading.Lock()
+
+    def __new__(cls) -> "LLMScheduler":
+        if cls._instance is None:
+            with cls._lock:
+                if cls._instance is None:
+                    cls._instance = super().__new__(cls)
+                    cls._instance._initialized = False
+        return cls._instance
+
+    def __init__(self) -> None:
+        if self._initialized:
+            return
+        self._state_lock = threading.RLock()
+        self._providers: Dict[str, _ProviderState] = {}
+        self._initialized = True
+
+    def _state(self, provider: str) -> _ProviderState:
+        state = self._providers.get(provider)
+        if state is None:
+            try:
+                from Agent.core.api.config import get_llm_scheduler_settings
+                settings = get_llm_scheduler_settings()
+            except Exception:
+                settings = {"max_concurrency": 8, "requests_per_minute": 0, "tokens_per_minute": 0}
+            state = _ProviderState(
+                settings["max_concurrency"],
+                settings["requests_per_minute"],
+                settings["tokens_per_minute"],
+            )
+            self._providers[provider] = state
+        return state
+
+    async def acquire(
+        self,
+        provider: str,
+        *,
+        tokens: int = 0,
+        priority: Optional[str] = None,
+        session_id: Optional[str] = None,
+    ) -> float:
+        """排队申请一个请求名额，返回等待时长（毫秒）。"""
+        loop = asyncio.get_running_loop()
+        prio = priority or get_llm_priority() or PRIORITY_INTERACTIVE
+        if prio not in _PRIORITY_ORDER:
+            prio = PRIORITY_INTERACTIVE
+        waiter = _Waiter(
+            loop=loop,
+            future=loop.create_future(),
+            session=str(session_id or get_session_id() or "-"),
+            priority=prio,
+            tokens=max(0, int(tokens)),
+        )
+        with self._state_lock:
+            state = self._state(provider)
+            state.queues[prio].setdefault(waiter.session, deque()).append(waiter)
+            self._pump(provider, state)
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            with self._state_lock:
+                # 已派发但调用方被取消：归还名额
+                if waiter.granted:
+                    state.active = max(0, state.active - 1)
+                self._pump(provider, state)
+            raise
+        return (time.monotonic() - waiter.enqueued_at) * 1000
+
+    def release(self, provider: str) -> None:
+        with self._state_lock:
+            state = self._state(provider)
+            state.active = max(0, state.active - 1)
+            self._pump(provider, state)
+
+    @asynccontextmanager
+    async def slot(
+        self,
+        provider: str,
+        *,
+        tokens: int = 0,
+        priority: Optional[str] = None,
+        session_id: Optional[str] = None,
+    ) -> AsyncIterator[float]:
+        """`async with scheduler.slot(...)` 包裹一次完整请求（含流式读取）。"""
+        waited_ms = await self.acquire(provider, tokens=tokens, priority=priority, session_id=session_id)
+        try:
+            yield waited_ms
+        finally:
+            self.release(provider)
+
+    def penalize(self, provider: str, retry_after: Optional[float], attempt: int = 0) -> float:
+        """收到限流响应后暂停该 provider 的派发，返回实际暂停秒数。"""
+        if retry_after is None:
+            try:
+                from Agent.core.api.config import get_retry_config
+                _, base_delay = get_retry_config()
+            except Exception:
+                base_delay = 1.0
+            retry_after = min(_MAX_BACKOFF_SECONDS, base_delay * (2 ** max(0, attempt)))
+        with self._state_lock:
+            state = self._state(provider)
+            state.throttled += 1
+            state.paused_until = max(state.paused_until, time.monotonic() + retry_after)
+        return retry_after
+
+    def _pump(self, provider: str, state: _ProviderState) -> None:
+        """尽可能派发等待者；受限时挂一个定时器稍后重试（调用方需持有锁）。"""
+        while state.active < state.max_concurrency:
+            waiter = state.peek()
+            if waiter is None:
+                return
+            now = time.monotonic()
+            delay = max(
+                state.paused_until - now,
+                state.requests.wait_time(1, now),
+                state.token_budget.wait_time(waiter.tokens, now),
+            )
+            if delay > 0:
+                self._schedule(provider, state, waiter.loop, delay)
+                return
+            state.pop(waiter)
+            state.requests.consume(1)
+            state.token_budget.consume(waiter.tokens)
+            state.active += 1
+            waiter.granted = True
+            wait_ms = (now - waiter.enqueued_at) * 1000
+            state.dispatched += 1
+            state.wait_total_ms += wait_ms
+            state.wait_max_ms = max(state.wait_max_ms, wait_ms)
+            state.recent_waits_ms.append(wait_ms)
+            waiter.loop.call_soon_threadsafe(_resolve, waiter.future)
+
+    def _schedule(
+        self, provider: str, state: _ProviderState, loop: asyncio.AbstractEventLoop, delay: float
+    ) -> None:
+        """在队首等待者的事件循环上挂重试定时器（调用方需持有锁）。
+
+        已有定时器时不重复挂；但若定时器所属的事件循环已经关闭（例如上一次
+        asyncio.run 已结束），它永远不会触发，此时丢弃并在当前循环上重挂。
+        """
+        if state.timer is not None:
+            if state.timer_loop is not None and not state.timer_loop.is_closed():
+                return
+            state.timer.cancel()
+            state.timer = None
+            state.timer_loop = None
+
+        def _fire() -> None:
+            with self._state_lock:
+                if state.timer is handle:
+                    state.timer = None
+                    state.timer_loop = None
+                self._pump(provider, state)
+
+        handle = loop.call_later(delay, _fire)
+        state.timer = handle
+        state.timer_loop = loop
+
+    def stats(self) -> Dict[str, Any]:
+        """返回各 provider 的队列深度、并发与等待时间统计。"""
+        with self._state_lock:
+            result: Dict[str, Any] = {}
+            now = time.monotonic()
+            for name, state in self._providers.items():
+                recent = sorted(state.recent_waits_ms)
+                p95 = recent[int(len(recent) * 0.95) - 1] if len(recent) >= 20 else (recent[-1] if recent else 0.0)
+                result[name] = {
+                    "queue_depth": state.depth(),
+                    "active": state.active,
+                    "max_concurrency": state.max_concurrency,
+                    "dispatched": state.dispatched,
+                    "throttled": state.throttled,
+                    "paused_for_s": round(max(0.0, state.paused_until - now), 3),
+                    "wait_ms_avg": round(state.wait_total_ms / state.dispatched, 2) if state.dispatched else 0.0,
+                    "wait_ms_p95": round(p95, 2),
+                    "wait_ms_max": round(state.wait_max_ms, 2),
+                }
+            return result
+
+    def reset(self) -> None:
+        """清空所有 provider 状态（配置变更或测试时使用）。"""
+        with self._state_lock:
+            for state in self._providers.values():
+                if state.timer is not None:
+                    state.timer.cancel()
+            self._providers.clear()
+
+
+def _resolve(future: "asyncio.Future[None]") -> None:
+    if not future.done():
+        future.set_result(None)
+
+
+_scheduler: Optional[LLMScheduler] = None
+
+
+def get_llm_scheduler() -> LLMScheduler:
+    """获取 LLM 调度器单例。"""
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = LLMScheduler()
+    return _scheduler
+
+
+__all__ = [
+    "LLMScheduler",
+    "TokenBucket",
+    "PRIORITY_INTERACTIVE",
+    "PRIORITY_BACKGROUND",
+    "estimate_tokens",
+    "get_llm_scheduler",
+    "parse_retry_after",
+]
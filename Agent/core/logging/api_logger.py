@@ -2,14 +2,20 @@
 
 from __future__ import annotations
 
+import io
 import json
+import logging
 from datetime import datetime
 from pathlib import Path
 from typing import Any, Dict, Iterable, List, Optional, Set
 
 from Agent.core.logging.context import generate_trace_id
+from Agent.core.logging.log_catalog import close_log_file, get_log_catalog
+from Agent.core.logging.log_writer import get_log_writer
 from Agent.core.logging.utils import safe_payload, utc_iso
 
+logger = logging.getLogger(__name__)
+
 
 def _get_default_stream_chunk_sample_rate() -> int:
     """获取默认的流式日志采样率（从配置读取）。"""
@@ -26,6 +32,8 @@ class APILogger:
     # 同一 trace_id 复用一份日志文件，避免一轮对话生成多个文件
     _session_paths: Dict[str, Path] = {}
     _human_paths: Dict[str, Path] = {}
+    # 已登记到日志索引的 trace_id（每个 trace 只登记一次，关闭后移除）
+    _catalogued: Set[str] = set()
 
     def __init__(
         self,
@@ -93,7 +101,6 @@ class APILogger:
         return path
 
     def _write_entry(self, path: Path, section: str, payload: Any, label: str | None = None) -> None:
-        path.parent.mkdir(parents=True, exist_ok=True)
         record = {
             "section": section,
             "label": label,
@@ -106,8 +113,8 @@ class APILogger:
             "trace_id": self.trace_id,
             "ts": utc_iso(),
         }
-        with path.open("a", encoding="utf-8") as fp:
-            fp.write(json.dumps(record, ensure_ascii=False) + "\n")
+        # 截断在调用方完成（得到独立副本），序列化与落盘交给后台写入线程
+        get_log_writer().write_json(path, record, droppable=section.startswith("RESPONSE_CHUNK"))
 
     def start(self, label: str, payload: Dict[str, Any]) -> Path:
         """创建新日志文件并写入请求负载。"""
@@ -127,26 +134,55 @@ class APILogger:
         self._chunk_logged[path] = 0
 
         # 对关键会话（例如 agent_session）额外创建一份中文摘要日志
+        human_created = False
         if self.human_dir is not None and label == "agent_session":
             human_path = APILogger._human_paths.get(self.trace_id)
             if human_path is None:
                 human_path = self.human_dir / path.name.replace(".jsonl", ".md")
                 APILogger._human_paths[self.trace_id] = human_path
                 self._init_human_session(human_path, enriched)
+                human_created = True
+
+        if human_created or self.trace_id not in APILogger._catalogued:
+            try:
+                get_log_catalog(self.base_dir).register(
+                    self.trace_id,
+                    path,
+                    name=label,
+                    human_path=APILogger._human_paths.get(self.trace_id),
+                )
+                APILogger._catalogued.add(self.trace_id)
+            except Exception as e:
+                logger.warning(f"Failed to register API log {self.trace_id}: {e}")
 
         return path
 
+    def close(self) -> None:
+        """结束当前 trace 的 API 日志：落盘后按配置压缩，并在索引中记录文件大小。"""
+        path = self.session_path or APILogger._session_paths.get(self.trace_id)
+        if path is None:
+            return
+        try:
+            get_log_catalog(self.base_dir).finish(self.trace_id)
+        except Exception as e:
+            logger.warning(f"Failed to finish API log {self.trace_id}: {e}")
+        APILogger._catalogued.discard(self.trace_id)
+        base_dir, trace_id = self.base_dir, self.trace_id
+        get_log_writer().close_file(path, lambda p: close_log_file(base_dir, trace_id, p))
+
+    def note_stream_chunk(self, path: Path) -> int:
+        """只累计流式 chunk 数量（不写日志），返回当前序号；供关闭 chunk 日志时的快速路径使用。"""
+
+        seen = self._chunk_seen.get(path, 0) + 1
+        self._chunk_seen[path] = seen
+        return seen
+
     def append(self, path: Path, section: str, payload: Any) -> None:
         """向已有日志文件追加一个 JSON 段落。"""
 
-        enriched = dict(payload)
-        enriched.setdefault("trace_id", self.trace_id)
-
         # 针对流式 chunk 做采样/限频，避免日志爆炸
         if section.startswith("RESPONSE_CHUNK"):
-            seen = self._chunk_seen.get(path, 0) + 1
-            self._chunk_seen[path] = seen
-
+            seen = self.note_stream_chunk(path)
             if not self.enable_stream_chunks:
                 return
             if seen > self.stream_chunk_limit:
@@ -170,12 +206,16 @@ class APILogger:
             if not should_log:
                 return
 
-            enriched = dict(enriched)
+            enriched = dict(payload)
+            enriched.setdefault("trace_id", self.trace_id)
             enriched["chunk_index"] = seen
             self._chunk_logged[path] = self._chunk_logged.get(path, 0) + 1
             self._write_entry(path, section, enriched, label=enriched.get("label"))
             return
 
+        enriched = dict(payload)
+        enriched.setdefault("trace_id", self.trace_id)
+
         # 在 SUMMARY 中附带 chunk 统计，便于回放
         if section == "RESPONSE_SUMMARY":
             if path in self._chunk_seen:
@@ -208,7 +248,7 @@ class APILogger:
             files = payload.get("files") or []
             tools = payload.get("tools_exposed") or []
             trace_id = payload.get("trace_id") or "-"
-            with path.open("w", encoding="utf-8") as fp:
+            with io.StringIO() as fp:
                 fp.write("# 代码审查会话日志（人类可读版）\n\n")
                 fp.write(f"- 模型提供方: `{provider}`\n")
                 fp.write(f"- trace_id: `{trace_id}`\n")
@@ -222,6 +262,7 @@ class APILogger:
                 fp.write(f"- 暴露给模型的工具: {', '.join(tools) if tools else '（无）'}\n\n")
                 fp.write("> 提示：本文件为调试/人工审查使用，仅保留关键信息；\n")
                 fp.write("> 若需完整 JSON，请查看 log/api_log 下对应的 agent_session 日志。\n\n")
+                get_log_writer().write_text(path, fp.getvalue())
         except Exception:
             # 摘要日志失败不影响主日志
             return
@@ -237,7 +278,7 @@ class APILogger:
             return
 
         try:
-            with human_path.open("a", encoding="utf-8") as fp:
+            with io.StringIO() as fp:
                 # LLM 调用请求
                 if section.startswith("LLM_CALL_") and section.endswith("_REQUEST"):
                     call_index = payload.get("call_index")
@@ -329,6 +370,8 @@ class APILogger:
                         fp.write(self._truncate(str(final_content), 1200))
                         fp.write("\n\n")
 
+                get_log_writer().write_text(human_path, fp.getvalue())
+
         except Exception:
             # 摘要日志写入失败不影响主流程或结构化日志
             return
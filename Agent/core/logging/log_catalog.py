@@ -0,0 +1,483 @@
+"""日志目录索引与已关闭日志的压缩。
+
+LogManager 原先列出会话时要排序并遍历整个 log/pipeline 目录、解析文件名、逐个打开
+读取首行，最后才做 offset/limit；按 trace_id 查日志也要 glob 整个目录。这里为每个
+日志目录维护一个 SQLite 索引（<目录>/.catalog.db），由 PipelineLogger / APILogger
+在创建日志时登记（trace_id、时间、provider、路径），关闭时补充结束时间、用量
+合计与文件大小。列表是一次分页查询，按 trace_id 查找是一次主键查询。
+
+日志关闭后可按配置压缩为 .gz（或在安装了 zstandard 时压缩为 .zst）。压缩在
+后台日志写入线程中、该文件的全部记录落盘并关闭句柄之后进行；读取统一通过
+iter_log_lines，依次读取压缩文件与（压缩后仍有追加时的）明文文件，调用方无需
+关心日志是否已压缩。
+"""
+
+from __future__ import annotations
+
+import gzip
+import io
+import json
+import logging
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+try:  # zstd 为可选依赖
+    import zstandard as _zstd
+except ImportError:  # pragma: no cover - 取决于运行环境
+    _zstd = None
+
+logger = logging.getLogger(__name__)
+
+# 索引文件名（以 "." 开头，日志清理与统计时跳过）
+CATALOG_NAME = ".catalog.db"
+
+# 压缩方式 -> 文件后缀
+COMPRESSED_SUFFIXES = {"gzip": ".gz", "zstd": ".zst"}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS logs (
+    trace_id TEXT PRIMARY KEY,
+    name TEXT,
+    path TEXT NOT NULL,
+    human_path TEXT,
+    started_at TEXT,
+    day TEXT,
+    ended_at TEXT,
+    status TEXT NOT NULL DEFAULT 'open',
+    review_provider TEXT,
+    planner_provider TEXT,
+    usage_in INTEGER,
+    usage_out INTEGER,
+    usage_total INTEGER,
+    usage_cached INTEGER,
+    file_bytes INTEGER DEFAULT 0,
+    compression TEXT NOT NULL DEFAULT ''
+);
+CREATE INDEX IF NOT EXISTS idx_logs_started ON logs(started_at);
+CREATE INDEX IF NOT EXISTS idx_logs_day ON logs(day, started_at);
+"""
+
+# 导入过历史日志后写入的 user_version
+_IMPORTED_VERSION = 1
+
+
+def _settings() -> Dict[str, Any]:
+    try:
+        from Agent.core.api.config import get_log_catalog_settings
+        return get_log_catalog_settings()
+    except Exception:
+        return {"compression": ""}
+
+
+def resolve_compression(method: Optional[str]) -> str:
+    """规范化压缩方式：未安装 zstandard 时 zstd 退化为 gzip，其他值视为不压缩。"""
+    method = (method or "").strip().lower()
+    if method in ("zstd", "zst"):
+        return "zstd" if _zstd is not None else "gzip"
+    if method in ("gzip", "gz"):
+        return "gzip"
+    return ""
+
+
+# ----------------------------------------------------------------------
+# 文件层：压缩与透明读取
+# ----------------------------------------------------------------------
+
+def compressed_path(path: Path, method: str) -> Path:
+    return path.with_name(path.name + COMPRESSED_SUFFIXES[method])
+
+
+def log_variants(path: Path) -> List[Tuple[Path, str]]:
+    """按读取顺序返回日志实际存在的文件：压缩文件在前，明文追加部分在后。"""
+    path = Path(path)
+    variants: List[Tuple[Path, str]] = []
+    for method in COMPRESSED_SUFFIXES:
+        candidate = compressed_path(path, method)
+        if candidate.exists():
+            variants.append((candidate, method))
+    if path.exists():
+        variants.append((path, ""))
+    return variants
+
+
+def log_exists(path: Path) -> bool:
+    return bool(log_variants(path))
+
+
+def log_size(path: Path) -> int:
+    """日志在磁盘上的总字节数（压缩文件 + 明文部分）。"""
+    total = 0
+    for candidate, _ in log_variants(path):
+        try:
+            total += candidate.stat().st_size
+        except OSError:
+            continue
+    return total
+
+
+def _open_binary(path: Path, method: str):
+    if method == "gzip":
+        return gzip.open(path, "rb")
+    if method == "zstd":
+        if _zstd is None:
+            raise RuntimeError(f"zstandard is required to read {path.name}")
+        return _zstd.ZstdDecompressor().stream_reader(open(path, "rb"), read_across_frames=True, closefd=True)
+    return open(path, "rb")
+
+
+def iter_log_lines(path: Path) -> Iterator[str]:
+    """逐行读取日志（自动解压），依次覆盖压缩文件与其后追加的明文部分。"""
+    for candidate, method in log_variants(path):
+        try:
+            with _open_binary(candidate, method) as raw:
+                for line in io.TextIOWrapper(raw, encoding="utf-8", errors="replace"):
+                    yield line
+        except (OSError, EOFError, RuntimeError) as e:
+            # 压缩文件正在被追加或已损坏时读到的截断部分直接跳过
+            logger.warning(f"Failed to read log file {candidate.name}: {e}")
+        except Exception as e:  # zstandard.ZstdError 等
+            logger.warning(f"Failed to decode log file {candidate.name}: {e}")
+
+
+def read_log_text(path: Path, limit: Optional[int] = None) -> str:
+    """读取日志文本（自动解压），limit 为最多返回的字符数。"""
+    parts: List[str] = []
+    size = 0
+    for line in iter_log_lines(path):
+        parts.append(line)
+        size += len(line)
+        if limit is not None and size >= limit:
+            break
+    text = "".join(parts)
+    return text[:limit] if limit is not None else text
+
+
+def compress_file(path: Path, method: str) -> Optional[Path]:
+    """把明文日志压缩为 <path>.gz / <path>.zst 并删除明文。
+
+    已存在压缩文件（压缩后又有追加）时，新内容作为一个新的 gzip member / zstd frame
+    追加到压缩文件末尾，读取时按顺序拼接。
+    """
+    method = resolve_compression(method)
+    path = Path(path)
+    if not method or not path.exists():
+        return None
+    target = compressed_path(path, method)
+    data = path.read_bytes()
+    if method == "gzip":
+        payload = gzip.compress(data, compresslevel=6)
+    else:
+        payload = _zstd.ZstdCompressor(level=3).compress(data)
+    if target.exists():
+        with open(target, "ab") as fp:
+            fp.write(payload)
+    else:
+        tmp = target.with_name(target.name + ".tmp")
+        tmp.write_bytes(payload)
+        os.replace(tmp, target)
+    path.unlink()
+    return target
+
+
+# ----------------------------------------------------------------------
+# 索引
+# ----------------------------------------------------------------------
+
+class LogCatalog:
+    """单个日志目录的索引表（线程安全，WAL 模式）。"""
+
+    _COLUMNS = (
+        "trace_id", "name", "path", "human_path", "started_at", "day", "ended_at", "status",
+        "review_provider", "planner_provider", "usage_in", "usage_out", "usage_total",
+        "usage_cached", "file_bytes", "compression",
+    )
+
+    def __init__(self, log_dir: Path) -> None:
+        self.log_dir = Path(log_dir)
+        self.log_dir.mkdir(parents=True, exist_ok=True)
+        self.db_path = self.log_dir / CATALOG_NAME
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(_SCHEMA)
+            self._conn.commit()
+
+    # ------------------------------------------------------------------
+    # 写入
+    # ------------------------------------------------------------------
+
+    def register(
+        self,
+        trace_id: str,
+        path: Path,
+        *,
+        name: Optional[str] = None,
+        meta: Optional[Dict[str, Any]] = None,
+        started_at: Optional[datetime] = None,
+        human_path: Optional[Path] = None,
+    ) -> None:
+        """登记新创建（或重新打开）的日志；已登记的 trace 只更新路径与状态。"""
+        meta = meta or {}
+        started = (started_at or datetime.now()).isoformat(timespec="seconds")
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO logs (trace_id, name, path, human_path, started_at, day, status, "
+                "review_provider, planner_provider) VALUES (?, ?, ?, ?, ?, ?, 'open', ?, ?) "
+                "ON CONFLICT(trace_id) DO UPDATE SET path = excluded.path, status = 'open', "
+                "human_path = COALESCE(excluded.human_path, logs.human_path)",
+                (
+                    trace_id,
+                    name,
+                    str(path),
+                    str(human_path) if human_path else None,
+                    started,
+                    started[:10],
+                    meta.get("review_provider"),
+                    meta.get("planner_provider"),
+                ),
+            )
+
+    def finish(self, trace_id: str, usage: Optional[Dict[str, Any]] = None) -> None:
+        """标记日志关闭，记录结束时间与会话用量合计。"""
+        usage = usage or {}
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE logs SET status = 'closed', ended_at = ?, "
+                "usage_in = COALESCE(?, usage_in), usage_out = COALESCE(?, usage_out), "
+                "usage_total = COALESCE(?, usage_total), usage_cached = COALESCE(?, usage_cached) "
+                "WHERE trace_id = ?",
+                (
+                    datetime.now().isoformat(timespec="seconds"),
+                    usage.get("in"),
+                    usage.get("out"),
+                    usage.get("total"),
+                    usage.get("cached"),
+                    trace_id,
+                ),
+            )
+
+    def update_file(self, trace_id: str, file_bytes: int, compression: str = "") -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE logs SET file_bytes = ?, compression = ? WHERE trace_id = ?",
+                (int(file_bytes), compression, trace_id),
+            )
+
+    def forget_paths(self, paths: List[Path]) -> int:
+        """移除文件已被删除的日志记录（参数为明文或压缩文件路径）。"""
+        keys = set()
+        for p in paths:
+            text = str(p)
+            for suffix in COMPRESSED_SUFFIXES.values():
+                if text.endswith(suffix):
+                    text = text[: -len(suffix)]
+                    break
+            keys.add(text)
+        if not keys:
+            return 0
+        removed = 0
+        with self._lock, self._conn:
+            for key in keys:
+                if log_exists(Path(key)):
+                    continue
+                removed += self._conn.execute("DELETE FROM logs WHERE path = ?", (key,)).rowcount
+        return removed
+
+    # ------------------------------------------------------------------
+    # 查询
+    # ------------------------------------------------------------------
+
+    def get(self, trace_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM logs WHERE trace_id = ?", (trace_id,)).fetchone()
+        return dict(row) if row else None
+
+    def count(self) -> int:
+        with self._lock:
+            return int(self._conn.execute("SELECT COUNT(*) FROM logs").fetchone()[0])
+
+    def query(
+        self,
+        *,
+        date_from: Optional[str] = None,
+        date_to: Optional[str] = None,
+        limit: int = 50,
+        offset: int = 0,
+    ) -> Tuple[List[Dict[str, Any]], int]:
+        """按开始时间倒序分页，返回 (当前页, 过滤后总数)；日期为 YYYY-MM-DD。"""
+        where: List[str] = []
+        params: List[Any] = []
+        if date_from:
+            where.append("day >= ?")
+            params.append(date_from)
+        if date_to:
+            where.append("day <= ?")
+            params.append(date_to)
+        clause = f"WHERE {' AND '.join(where)}" if where else ""
+        with self._lock:
+            total = int(self._conn.execute(f"SELECT COUNT(*) FROM logs {clause}", params).fetchone()[0])
+            rows = self._conn.execute(
+                f"SELECT * FROM logs {clause} ORDER BY started_at DESC, trace_id DESC LIMIT ? OFFSET ?",
+                [*params, max(0, int(limit)), max(0, int(offset))],
+            ).fetchall()
+        return [dict(r) for r in rows], total
+
+    # ------------------------------------------------------------------
+    # 历史日志导入
+    # ------------------------------------------------------------------
+
+    def ensure_imported(self) -> int:
+        """首次使用时把目录中已有（索引建立前产生）的日志登记进索引，只执行一次。"""
+        with self._lock:
+            version = int(self._conn.execute("PRAGMA user_version").fetchone()[0])
+        if version >= _IMPORTED_VERSION:
+            return 0
+        imported = 0
+        for path in self._existing_logs():
+            try:
+                row = self._scan_log(path)
+            except Exception as e:
+                logger.warning(f"Skipping unreadable log {path.name}: {e}")
+                continue
+            if row is None:
+                continue
+            with self._lock, self._conn:
+                cur = self._conn.execute(
+                    f"INSERT OR IGNORE INTO logs ({', '.join(self._COLUMNS)}) "
+                    f"VALUES ({', '.join('?' for _ in self._COLUMNS)})",
+                    [row.get(col) for col in self._COLUMNS],
+                )
+                imported += cur.rowcount
+        with self._lock, self._conn:
+            self._conn.execute(f"PRAGMA user_version = {_IMPORTED_VERSION}")
+        if imported:
+            logger.info(f"Imported {imported} existing logs into {self.db_path}")
+        return imported
+
+    def _existing_logs(self) -> List[Path]:
+        """目录下的日志（以明文路径表示，压缩文件映射回明文名）。"""
+        found = set()
+        for entry in self.log_dir.iterdir():
+            name = entry.name
+            for suffix in COMPRESSED_SUFFIXES.values():
+                if name.endswith(".jsonl" + suffix):
+                    name = name[: -len(suffix)]
+                    break
+            if name.endswith(".jsonl") and not name.startswith("."):
+                found.add(self.log_dir / name)
+        return sorted(found)
+
+    def _scan_log(self, path: Path) -> Optional[Dict[str, Any]]:
+        # 文件名格式：<YYYYMMDD>_<HHMMSS>[_<微秒>][_<名称>]_<trace_id>.jsonl
+        parts = path.name[: -len(".jsonl")].split("_")
+        if len(parts) < 3:
+            return None
+        try:
+            started = datetime.strptime(f"{parts[0]}{parts[1]}", "%Y%m%d%H%M%S")
+        except ValueError:
+            return None
+        rest = parts[2:-1]
+        if rest and rest[0].isdigit():
+            rest = rest[1:]
+        meta: Dict[str, Any] = {}
+        usage: Dict[str, Any] = {}
+        ended_at = None
+        first = True
+        for line in iter_log_lines(path):
+            if not line.strip():
+                continue
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if first:
+                meta = entry.get("meta") or {}
+                first = False
+            if entry.get("event") == "session_end":
+                usage = (entry.get("payload") or {}).get("session_usage") or {}
+                ended_at = entry.get("ts")
+        compression = next((m for _, m in log_variants(path) if m), "")
+        started_iso = started.isoformat(timespec="seconds")
+        return {
+            "trace_id": parts[-1],
+            "name": "_".join(rest) or None,
+            "path": str(path),
+            "started_at": started_iso,
+            "day": started_iso[:10],
+            "ended_at": ended_at,
+            "status": "closed" if ended_at else "open",
+            "review_provider": meta.get("review_provider"),
+            "planner_provider": meta.get("planner_provider"),
+            "usage_in": usage.get("in"),
+            "usage_out": usage.get("out"),
+            "usage_total": usage.get("total"),
+            "usage_cached": usage.get("cached"),
+            "file_bytes": log_size(path),
+            "compression": compression,
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            try:
+                self._conn.close()
+            except sqlite3.Error:
+                pass
+
+
+# ----------------------------------------------------------------------
+# 进程级访问
+# ----------------------------------------------------------------------
+
+_catalogs: Dict[str, LogCatalog] = {}
+_catalogs_lock = threading.Lock()
+
+
+def get_log_catalog(log_dir: Path) -> LogCatalog:
+    """获取日志目录对应的索引（同一目录在进程内共享一个实例）。"""
+    key = os.path.abspath(str(log_dir))
+    catalog = _catalogs.get(key)
+    if catalog is None:
+        with _catalogs_lock:
+            catalog = _catalogs.get(key)
+            if catalog is None:
+                catalog = _catalogs[key] = LogCatalog(Path(log_dir))
+    return catalog
+
+
+def close_log_file(log_dir: Path, trace_id: str, path: Path) -> None:
+    """在日志全部落盘并关闭句柄后压缩（若启用）并更新索引中的文件大小。
+
+    作为 LogWriter.close_file 的回调在写入线程中执行。
+    """
+    method = resolve_compression(_settings().get("compression"))
+    if method:
+        try:
+            compress_file(path, method)
+        except OSError as e:
+            logger.warning(f"Failed to compress log {Path(path).name}: {e}")
+    compression = next((m for _, m in log_variants(path) if m), "")
+    try:
+        get_log_catalog(log_dir).update_file(trace_id, log_size(path), compression)
+    except sqlite3.Error as e:
+        logger.warning(f"Failed to update log catalog for {trace_id}: {e}")
+
+
+__all__ = [
+    "CATALOG_NAME",
+    "LogCatalog",
+    "close_log_file",
+    "compress_file",
+    "get_log_catalog",
+    "iter_log_lines",
+    "log_exists",
+    "log_size",
+    "read_log_text",
+    "resolve_compression",
+]
@@ -0,0 +1,329 @@
+"""后台批量日志写入服务。
+
+APILogger / PipelineLogger 每条日志原本都在调用线程（通常是事件循环）上
+open → write → close 一次文件。这里改为：调用方只做截断并把记录放入有界队列，
+由单个后台线程负责 JSON 序列化、按文件聚合、保持句柄常开，并在累计字节数或
+时间阈值到达时批量落盘，日志写入不再阻塞流式输出。
+
+背压策略：
+- 队列超过高水位时，可丢弃的记录（流式 chunk 采样日志）直接丢弃并计数；
+- 队列已满时任何记录都丢弃并计数，调用方永远不会被阻塞。
+"""
+
+from __future__ import annotations
+
+import atexit
+import json
+import os
+import queue
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import IO, Any, Callable, Dict, List, Optional, Tuple
+
+# 队列中的控制指令
+_FLUSH = object()
+_STOP = object()
+_CLOSE = object()
+
+# 同时保持打开的文件句柄上限（超出后关闭最久未写入的）
+_MAX_OPEN_HANDLES = 32
+
+
+def _settings() -> Dict[str, Any]:
+    try:
+        from Agent.core.api.config import get_log_writer_settings
+        return get_log_writer_settings()
+    except Exception:
+        return {"enabled": True, "queue_size": 20000, "flush_interval": 0.2, "batch_bytes": 64 * 1024}
+
+
+class LogWriter:
+    """进程级后台日志写入器（单例）。"""
+
+    _instance: Optional["LogWriter"] = None
+    _lock = threading.Lock()
+
+    def __new__(cls) -> "LogWriter":
+        if cls._instance is None:
+            with cls._lock:
+                if cls._instance is None:
+                    cls._instance = super().__new__(cls)
+                    cls._instance._initialized = False
+        return cls._instance
+
+    def __init__(self) -> None:
+        if self._initialized:
+            return
+        settings = _settings()
+        self.enabled = bool(settings["enabled"])
+        self.queue_size = max(100, int(settings["queue_size"]))
+        self.flush_interval = max(0.01, float(settings["flush_interval"]))
+        self.batch_bytes = max(1024, int(settings["batch_bytes"]))
+        self._high_watermark = int(self.queue_size * 0.8)
+        self._queue: "queue.Queue[Tuple[Any, str, Any]]" = queue.Queue(maxsize=self.queue_size)
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self._closed = False
+        # 仅由后台线程访问
+        self._handles: "OrderedDict[Path, IO[str]]" = OrderedDict()
+        # 同步写入（未启用 / 已关闭）时保护文件句柄
+        self._direct_lock = threading.Lock()
+        self._stats = {
+            "enqueued": 0,
+            "written": 0,
+            "dropped": 0,
+            "sampled_out": 0,
+            "batches": 0,
+            "write_errors": 0,
+        }
+        self._initialized = True
+
+    # ------------------------------------------------------------------
+    # 生产者接口
+    # ------------------------------------------------------------------
+
+    def write_json(self, path: Path, record: Dict[str, Any], *, droppable: bool = False) -> bool:
+        """提交一条 JSONL 记录；record 交给写入线程后调用方不应再修改。"""
+        return self._submit(path, "json", record, droppable)
+
+    def write_text(self, path: Path, text: str, *, droppable: bool = False) -> bool:
+        """提交一段原样追加的文本（如人类可读日志）。"""
+        if not text:
+            return True
+        return self._submit(path, "text", text, droppable)
+
+    def _submit(self, path: Path, kind: str, data: Any, droppable: bool) -> bool:
+        if not self.enabled or self._closed:
+            return self._write_direct(path, kind, data)
+        self._ensure_started()
+        if droppable and self._queue.qsize() >= self._high_watermark:
+            self._stats["sampled_out"] += 1
+            return False
+        try:
+            self._queue.put_nowait((path, kind, data))
+        except queue.Full:
+            self._stats["dropped"] += 1
+            return False
+        self._stats["enqueued"] += 1
+        return True
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """等待此前提交的记录全部落盘；超时返回 False。"""
+        if self._thread is None or not self._thread.is_alive():
+            return True
+        done = threading.Event()
+        try:
+            self._queue.put((_FLUSH, "", done), timeout=timeout)
+        except queue.Full:
+            return False
+        return done.wait(timeout)
+
+    def close_file(self, path: Path, callback: Optional[Callable[[Path], None]] = None) -> bool:
+        """在此前提交的该文件记录全部落盘后关闭其句柄，然后在写入线程中调用 callback(path)。
+
+        用于日志结束后的收尾（例如压缩）；队列已满时放弃收尾并返回 False。
+        """
+        if self._thread is None or not self._thread.is_alive():
+            with self._direct_lock:
+                self._run_close_callback(path, callback)
+            return True
+        try:
+            self._queue.put_nowait((_CLOSE, str(path), (Path(path), callback)))
+        except queue.Full:
+            self._stats["dropped"] += 1
+            return False
+        return True
+
+    def shutdown(self, timeout: float = 5.0) -> None:
+        """刷新剩余记录并停止后台线程；之后的写入退化为同步写入。"""
+        self._closed = True
+        thread = self._thread
+        if thread is not None and thread.is_alive():
+            done = threading.Event()
+            try:
+                self._queue.put((_STOP, "", done), timeout=timeout)
+                done.wait(timeout)
+            except queue.Full:
+                pass
+            thread.join(timeout)
+        self._thread = None
+
+    def stats(self) -> Dict[str, Any]:
+        data = dict(self._stats)
+        data["queue_depth"] = self._queue.qsize()
+        data["queue_size"] = self.queue_size
+        data["open_handles"] = len(self._handles)
+        data["running"] = bool(self._thread and self._thread.is_alive())
+        return data
+
+    # ------------------------------------------------------------------
+    # 后台线程
+    # ------------------------------------------------------------------
+
+    def _ensure_started(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+            self._thread.start()
+
+    def _run(self) -> None:
+        pending: Dict[Path, List[str]] = {}
+        pending_bytes = 0
+        batch_started = 0.0
+        while True:
+            timeout = None
+            if pending:
+                timeout = max(0.0, self.flush_interval - (time.monotonic() - batch_started))
+            try:
+                path, kind, data = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                self._drain(pending)
+                pending_bytes = 0
+                continue
+
+            if path is _FLUSH or path is _STOP:
+                self._drain(pending)
+                pending_bytes = 0
+                if path is _STOP:
+                    self._close_handles()
+                    data.set()
+                    return
+                data.set()
+                continue
+            if path is _CLOSE:
+                self._drain(pending)
+                pending_bytes = 0
+                target, callback = data
+                self._close_handle(target)
+                self._run_close_callback(target, callback)
+                continue
+
+            line = self._render(kind, data)
+            if line is None:
+                continue
+            if not pending:
+                batch_started = time.monotonic()
+            pending.setdefault(path, []).append(line)
+            pending_bytes += len(line)
+            if pending_bytes >= self.batch_bytes or time.monotonic() - batch_started >= self.flush_interval:
+                self._drain(pending)
+                pending_bytes = 0
+
+    def _render(self, kind: str, data: Any) -> Optional[str]:
+        if kind == "text":
+            return str(data)
+        try:
+            return json.dumps(data, ensure_ascii=False, default=str) + "\n"
+        except Exception:
+            self._stats["write_errors"] += 1
+            return None
+
+    def _drain(self, pending: Dict[Path, List[str]]) -> None:
+        if not pending:
+            return
+        for path, lines in pending.items():
+            chunk = "".join(lines)
+            try:
+                fp = self._handle(path)
+                fp.write(chunk)
+                fp.flush()
+            except OSError:
+                # 目录可能在运行期间被清理：关闭旧句柄后重开一次
+                self._close_handle(path)
+                try:
+                    fp = self._handle(path)
+                    fp.write(chunk)
+                    fp.flush()
+                except OSError:
+                    self._stats["write_errors"] += 1
+                    continue
+            self._stats["written"] += len(lines)
+        self._stats["batches"] += 1
+        pending.clear()
+
+    def _handle(self, path: Path) -> IO[str]:
+        fp = self._handles.get(path)
+        if fp is not None and not os.path.exists(path):
+            # 文件被删除（例如清理日志），重新创建
+            self._close_handle(path)
+            fp = None
+        if fp is None:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            fp = path.open("a", encoding="utf-8")
+            self._handles[path] = fp
+            while len(self._handles) > _MAX_OPEN_HANDLES:
+                _, oldest = self._handles.popitem(last=False)
+                try:
+                    oldest.close()
+                except OSError:
+                    pass
+        else:
+            self._handles.move_to_end(path)
+        return fp
+
+    def _close_handle(self, path: Path) -> None:
+        fp = self._handles.pop(path, None)
+        if fp is not None:
+            try:
+                fp.close()
+            except OSError:
+                pass
+
+    def _run_close_callback(self, path: Path, callback: Optional[Callable[[Path], None]]) -> None:
+        if callback is None:
+            return
+        try:
+            callback(path)
+        except Exception:
+            self._stats["write_errors"] += 1
+
+    def _close_handles(self) -> None:
+        for path in list(self._handles):
+            self._close_handle(path)
+
+    def _write_direct(self, path: Path, kind: str, data: Any) -> bool:
+        line = self._render(kind, data)
+        if line is None:
+            return False
+        with self._direct_lock:
+            try:
+                path.parent.mkdir(parents=True, exist_ok=True)
+                with path.open("a", encoding="utf-8") as fp:
+                    fp.write(line)
+            except OSError:
+                self._stats["write_errors"] += 1
+                return False
+        self._stats["written"] += 1
+        return True
+
+
+_log_writer: Optional[LogWriter] = None
+
+
+def get_log_writer() -> LogWriter:
+    """获取后台日志写入器单例。"""
+    global _log_writer
+    if _log_writer is None:
+        _log_writer = LogWriter()
+    return _log_writer
+
+
+def shutdown_log_writer(timeout: float = 5.0) -> None:
+    """刷新并停止后台日志写入器（进程退出 / 服务关闭时调用）。"""
+    if _log_writer is not None:
+        _log_writer.shutdown(timeout)
+
+
+atexit.register(shutdown_log_writer)
+
+
+__all__ = [
+    "LogWriter",
+    "get_log_writer",
+    "shutdown_log_writer",
+]
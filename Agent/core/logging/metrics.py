@@ -0,0 +1,333 @@
+"""进程内运行指标：分阶段耗时直方图、LLM 首包/吞吐、工具耗时与缓存命中。
+
+原先只有 MetricsCollector 在列表里保存最近 100 次审查耗时，无法回答"审查时间花在
+哪里"。这里提供一个轻量指标注册表：
+
+- 直方图使用固定桶（累计计数 + 总和，按 Prometheus 语义导出），同时保留最近
+  WINDOW_SIZE 个样本的环形窗口，用于 /api/metrics 中的滚动 p50/p95/p99；
+- 计数器按标签组合累加；
+- render_prometheus 输出 Prometheus 文本格式（0.0.4），由 /metrics 端点暴露。
+
+埋点只做一次加锁的数组自增，可在事件循环与工作线程中直接调用。
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Deque, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+# 指标名前缀
+PREFIX = "deltaconverge"
+
+# 耗时桶（秒）：覆盖毫秒级本地阶段到数分钟的 LLM 审查
+LATENCY_BUCKETS: Tuple[float, ...] = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0,
+)
+# 输出速率桶（tokens/s）
+RATE_BUCKETS: Tuple[float, ...] = (1, 2, 5, 10, 20, 35, 50, 75, 100, 150, 250, 500)
+
+# 滚动分位数窗口大小（每个标签组合）
+WINDOW_SIZE = 512
+
+# 审查流水线阶段（stage 标签的取值）
+PIPELINE_STAGES: Tuple[str, ...] = (
+    "diff", "units", "rules", "intent", "planner", "fusion", "context_bundle", "reviewer", "static_scan",
+)
+
+# PipelineEvents 中的阶段名 -> stage 标签
+STAGE_ALIASES: Dict[str, str] = {
+    "diff_parse": "diff",
+    "review_units": "units",
+    "rule_layer": "rules",
+    "intent_analysis": "intent",
+}
+
+
+class Histogram:
+    """固定桶直方图 + 最近样本窗口。"""
+
+    __slots__ = ("buckets", "counts", "count", "total", "window")
+
+    def __init__(self, buckets: Sequence[float], window: int = WINDOW_SIZE) -> None:
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # 最后一格为 +Inf
+        self.count = 0
+        self.total = 0.0
+        self.window: Deque[float] = deque(maxlen=window)
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.total += value
+        self.window.append(value)
+
+    def snapshot(self) -> Dict[str, Any]:
+        recent = sorted(self.window)
+
+        def _q(q: float) -> Optional[float]:
+            if not recent:
+                return None
+            return round(recent[min(len(recent) - 1, int(len(recent) * q))], 4)
+
+        return {
+            "count": self.count,
+            "sum": round(self.total, 4),
+            "avg": round(self.total / self.count, 4) if self.count else None,
+            "p50": _q(0.50),
+            "p95": _q(0.95),
+            "p99": _q(0.99),
+            "max": round(recent[-1], 4) if recent else None,
+        }
+
+
+class _Family:
+    __slots__ = ("name", "kind", "help", "labels", "buckets", "series")
+
+    def __init__(self, name: str, kind: str, help_text: str, labels: Sequence[str], buckets: Sequence[float]) -> None:
+        self.name = name
+        self.kind = kind  # "histogram" | "counter"
+        self.help = help_text
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self.series: Dict[Tuple[str, ...], Any] = {}
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(pairs: Iterable[Tuple[str, str]]) -> str:
+    body = ",".join(f'{k}="{_escape(str(v))}"' for k, v in pairs)
+    return f"{{{body}}}" if body else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class MetricsRegistry:
+    """进程级指标注册表（单例）。"""
+
+    _instance: Optional["MetricsRegistry"] = None
+    _lock = threading.Lock()
+
+    def __new__(cls) -> "MetricsRegistry":
+        if cls._instance is None:
+            with cls._lock:
+                if cls._instance is None:
+                    cls._instance = super().__new__(cls)
+                    cls._instance._initialized = False
+        return cls._instance
+
+    def __init__(self) -> None:
+        if self._initialized:
+            return
+        self._data_lock = threading.Lock()
+        self._families: Dict[str, _Family] = {}
+        self._declare_defaults()
+        self._initialized = True
+
+    # ------------------------------------------------------------------
+    # 声明
+    # ------------------------------------------------------------------
+
+    def histogram(
+        self, name: str, help_text: str, labels: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS
+    ) -> None:
+        self._declare(name, "histogram", help_text, labels, buckets)
+
+    def counter(self, name: str, help_text: str, labels: Sequence[str] = ()) -> None:
+        self._declare(name, "counter", help_text, labels, ())
+
+    def _declare(self, name: str, kind: str, help_text: str, labels: Sequence[str], buckets: Sequence[float]) -> None:
+        with self._data_lock:
+            if name not in self._families:
+                self._families[name] = _Family(name, kind, help_text, labels, buckets)
+
+    def _declare_defaults(self) -> None:
+        self.histogram("review_seconds", "端到端审查耗时", ("outcome",))
+        self.histogram("stage_seconds", "审查流水线各阶段耗时", ("stage",))
+        self.histogram("llm_ttft_seconds", "LLM 流式调用首包耗时（不含排队）", ("provider",))
+        self.histogram("llm_output_tokens_per_second", "LLM 首包之后的输出速率", ("provider",), RATE_BUCKETS)
+        self.counter("llm_tokens_total", "LLM token 用量", ("provider", "direction"))
+        self.histogram("tool_seconds", "工具调用耗时", ("tool", "outcome"))
+        self.counter("cache_requests_total", "缓存查询次数", ("cache", "result"))
+
+    # ------------------------------------------------------------------
+    # 记录
+    # ------------------------------------------------------------------
+
+    def observe(self, name: str, value: float, **labels: str) -> None:
+        family = self._families.get(name)
+        if family is None or family.kind != "histogram":
+            return
+        key = tuple(str(labels.get(label, "")) for label in family.labels)
+        with self._data_lock:
+            hist = family.series.get(key)
+            if hist is None:
+                hist = family.series[key] = Histogram(family.buckets)
+            hist.observe(float(value))
+
+    def inc(self, name: str, value: float = 1.0, **labels: str) -> None:
+        family = self._families.get(name)
+        if family is None or family.kind != "counter":
+            return
+        key = tuple(str(labels.get(label, "")) for label in family.labels)
+        with self._data_lock:
+            family.series[key] = family.series.get(key, 0.0) + float(value)
+
+    def reset(self) -> None:
+        with self._data_lock:
+            for family in self._families.values():
+                family.series.clear()
+
+    # ------------------------------------------------------------------
+    # 导出
+    # ------------------------------------------------------------------
+
+    def snapshot(self) -> Dict[str, Any]:
+        """JSON 视图：{指标名: {标签值(以 "/" 连接): 统计}}，计数器为数值。"""
+        result: Dict[str, Any] = {}
+        with self._data_lock:
+            for family in self._families.values():
+                series: Dict[str, Any] = {}
+                for key, value in family.series.items():
+                    label = "/".join(key) or "_"
+                    series[label] = value.snapshot() if family.kind == "histogram" else value
+                result[family.name] = series
+        return result
+
+    def cache_ratios(self) -> Dict[str, Dict[str, Any]]:
+        """各缓存的命中次数、未命中次数与命中率。"""
+        family = self._families["cache_requests_total"]
+        caches: Dict[str, Dict[str, Any]] = {}
+        with self._data_lock:
+            for (cache, outcome), value in family.series.items():
+                entry = caches.setdefault(cache, {"hits": 0, "misses": 0})
+                entry["hits" if outcome == "hit" else "misses"] += int(value)
+        for entry in caches.values():
+            total = entry["hits"] + entry["misses"]
+            entry["hit_ratio"] = round(entry["hits"] / total, 4) if total else 0.0
+        return caches
+
+    def render_prometheus(self, extra: Iterable[Tuple[str, str, str, Dict[str, str], float]] = ()) -> str:
+        """输出 Prometheus 文本格式。
+
+        Args:
+            extra: 追加的瞬时指标 (name, type, help, labels, value)，用于导出其他组件的统计
+        """
+        lines: List[str] = []
+        with self._data_lock:
+            for family in self._families.values():
+                name = f"{PREFIX}_{family.name}"
+                lines.append(f"# HELP {name} {family.help}")
+                lines.append(f"# TYPE {name} {family.kind}")
+                for key, value in sorted(family.series.items()):
+                    pairs = list(zip(family.labels, key))
+                    if family.kind == "counter":
+                        lines.append(f"{name}{_format_labels(pairs)} {_format_value(value)}")
+                        continue
+                    cumulative = 0
+                    for bound, count in zip((*family.buckets, float("inf")), value.counts):
+                        cumulative += count
+                        le = _format_value(bound)
+                        lines.append(f"{name}_bucket{_format_labels([*pairs, ('le', le)])} {cumulative}")
+                    lines.append(f"{name}_sum{_format_labels(pairs)} {_format_value(round(value.total, 6))}")
+                    lines.append(f"{name}_count{_format_labels(pairs)} {value.count}")
+
+        declared = set()
+        for name, kind, help_text, labels, value in extra:
+            full = f"{PREFIX}_{name}"
+            if full not in declared:
+                lines.append(f"# HELP {full} {help_text}")
+                lines.append(f"# TYPE {full} {kind}")
+                declared.add(full)
+            lines.append(f"{full}{_format_labels(labels.items())} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+_registry: Optional[MetricsRegistry] = None
+
+
+def get_metrics_registry() -> MetricsRegistry:
+    """获取指标注册表单例。"""
+    global _registry
+    if _registry is None:
+        _registry = MetricsRegistry()
+    return _registry
+
+
+# ----------------------------------------------------------------------
+# 埋点辅助函数
+# ----------------------------------------------------------------------
+
+def observe_stage(stage: str, seconds: float) -> None:
+    """记录一个流水线阶段的耗时（阶段名按 STAGE_ALIASES 归一）。"""
+    get_metrics_registry().observe("stage_seconds", seconds, stage=STAGE_ALIASES.get(stage, stage))
+
+
+@contextmanager
+def stage_timer(stage: str) -> Iterator[None]:
+    """计时上下文：退出时记录阶段耗时（异常退出同样记录）。"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_stage(stage, time.perf_counter() - started)
+
+
+def observe_llm_call(
+    provider: str,
+    *,
+    ttft: Optional[float] = None,
+    generation_seconds: Optional[float] = None,
+    usage: Optional[Dict[str, Any]] = None,
+) -> None:
+    """记录一次 LLM 调用的首包耗时、输出速率与 token 用量。"""
+    registry = get_metrics_registry()
+    provider = provider or "unknown"
+    if ttft is not None:
+        registry.observe("llm_ttft_seconds", ttft, provider=provider)
+    if not usage:
+        return
+    tokens_in = usage.get("prompt_tokens") or usage.get("input_tokens") or 0
+    tokens_out = usage.get("completion_tokens") or usage.get("output_tokens") or 0
+    if tokens_in:
+        registry.inc("llm_tokens_total", tokens_in, provider=provider, direction="input")
+    if tokens_out:
+        registry.inc("llm_tokens_total", tokens_out, provider=provider, direction="output")
+        if generation_seconds and generation_seconds > 0:
+            registry.observe("llm_output_tokens_per_second", tokens_out / generation_seconds, provider=provider)
+
+
+def observe_tool(tool: str, seconds: float, outcome: str = "ok") -> None:
+    """记录一次工具调用耗时；outcome 为 ok / error / timeout / cached。"""
+    get_metrics_registry().observe("tool_seconds", seconds, tool=tool or "unknown", outcome=outcome)
+
+
+def record_cache(cache: str, hit: bool) -> None:
+    """记录一次缓存查询结果。"""
+    get_metrics_registry().inc("cache_requests_total", cache=cache, result="hit" if hit else "miss")
+
+
+__all__ = [
+    "Histogram",
+    "LATENCY_BUCKETS",
+    "MetricsRegistry",
+    "PIPELINE_STAGES",
+    "RATE_BUCKETS",
+    "get_metrics_registry",
+    "observe_llm_call",
+    "observe_stage",
+    "observe_tool",
+    "record_cache",
+    "stage_timer",
+]
@@ -2,14 +2,18 @@
 
 from __future__ import annotations
 
-import json
+import logging
 from uuid import uuid4
 from pathlib import Path
 from datetime import datetime, timezone
 from typing import Any, Dict, Iterable, Set
 
+from Agent.core.logging.log_catalog import close_log_file, get_log_catalog
+from Agent.core.logging.log_writer import get_log_writer
 from Agent.core.logging.utils import safe_payload, utc_iso
 
+logger = logging.getLogger(__name__)
+
 
 class PipelineLogger:
     """轻量 JSONL 日志器，用于跟踪规划→融合→上下文→审查。"""
@@ -49,22 +53,46 @@ class PipelineLogger:
         ts = datetime.now().strftime("%Y%m%d_%H%M%S")
         self.started_at = datetime.now(timezone.utc)
         self.session_path = self.root / f"{ts}_{name}_{self.trace_id}.jsonl"
+        safe_meta = safe_payload(
+            meta or {},
+            max_chars=self.max_chars,
+            max_items=self.max_items,
+            redacted_keys=self.redacted_keys,
+        )
         self._write(
             {
                 "event": "session_start",
                 "stage": name,
                 "status": "start",
-                "meta": safe_payload(
-                    meta or {},
-                    max_chars=self.max_chars,
-                    max_items=self.max_items,
-                    redacted_keys=self.redacted_keys,
-                ),
+                "meta": safe_meta,
                 "ts": utc_iso(self.started_at),
             }
         )
+        try:
+            get_log_catalog(self.root).register(
+                self.trace_id,
+                self.session_path,
+                name=name,
+                meta=safe_meta if isinstance(safe_meta, dict) else None,
+                started_at=self.started_at.astimezone().replace(tzinfo=None),
+            )
+        except Exception as e:
+            logger.warning(f"Failed to register pipeline log {self.trace_id}: {e}")
         return self.session_path
 
+    def close(self, usage: Dict[str, Any] | None = None) -> None:
+        """结束本次日志：在索引中记录用量合计，落盘后按配置压缩并更新文件大小。"""
+        if self.session_path is None:
+            return
+        try:
+            get_log_catalog(self.root).finish(self.trace_id, usage)
+        except Exception as e:
+            logger.warning(f"Failed to finish pipeline log {self.trace_id}: {e}")
+        root, trace_id = self.root, self.trace_id
+        get_log_writer().close_file(
+            self.session_path, lambda path: close_log_file(root, trace_id, path)
+        )
+
     def log(self, stage: str, payload: Dict[str, Any] | None = None, status: str = "info") -> None:
         """记录阶段事件，自动补充 trace_id/时间戳/运行时长。"""
 
@@ -91,8 +119,7 @@ class PipelineLogger:
         if self.started_at:
             delta = now - self.started_at
             obj.setdefault("uptime_ms", int(delta.total_seconds() * 1000))
-        with self.session_path.open("a", encoding="utf-8") as f:
-            f.write(json.dumps(obj, ensure_ascii=False) + "\n")
+        get_log_writer().write_json(self.session_path, obj)
 
 
 __all__ = ["PipelineLogger"]
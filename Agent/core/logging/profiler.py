@@ -0,0 +1,204 @@
+"""按审查开启的采样式性能剖析。
+
+审查变慢时，日志与链路追踪只能看到"哪个阶段慢"，看不到 Python 侧的 CPU 热点
+（规则匹配、AST 遍历、JSON 序列化、扫描报告解析等）。这里用一个后台线程按固定
+间隔读取 sys._current_frames()，把各线程的调用栈按 (线程, 栈) 聚合计时：
+
+- 不使用 sys.setprofile / cProfile，被剖析代码本身没有额外开销，代价只是每个采样
+  间隔一次栈遍历（默认 10ms），可以按 profile_sample_rate 对小比例线上审查常开；
+- 叶子帧处于等待状态（selector、锁、队列）的样本记为空闲，不计入火焰图；
+- 结果写成 speedscope JSON（https://www.speedscope.app 可直接打开），放在流水线
+  日志旁边：<流水线日志名>.speedscope.json。
+
+采样的是整个进程，服务端同时运行多个审查时，其他审查的样本也会出现在结果中。
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from types import CodeType, FrameType
+from typing import Any, Dict, List, Optional, Tuple
+
+from Agent.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+PROFILE_SUFFIX = ".speedscope.json"
+
+# 单个栈最多保留的帧数（从叶子向上截断）
+MAX_STACK_DEPTH = 128
+
+# 叶子帧落在这些函数上时视为线程空闲：(文件名, 函数名)
+IDLE_LEAVES = frozenset({
+    ("selectors.py", "select"),
+    ("threading.py", "wait"),
+    ("threading.py", "_wait_for_tstate_lock"),
+    ("queue.py", "get"),
+    ("thread.py", "_worker"),
+    ("socket.py", "accept"),
+})
+
+
+def _settings() -> Dict[str, Any]:
+    try:
+        from Agent.core.api.config import get_profiler_settings
+        return get_profiler_settings()
+    except Exception:
+        return {"sample_rate": 0.0, "interval": 0.01}
+
+
+def should_profile(requested: bool = False) -> bool:
+    """本次审查是否开启剖析：请求显式开启，或按配置的比例随机抽样。"""
+    if requested:
+        return True
+    rate = float(_settings().get("sample_rate") or 0.0)
+    return rate > 0 and random.random() < rate
+
+
+def profile_path_for(pipeline_log: Path) -> Path:
+    """流水线日志对应的剖析文件路径。"""
+    name = pipeline_log.name
+    if name.endswith(".jsonl"):
+        name = name[: -len(".jsonl")]
+    return pipeline_log.with_name(name + PROFILE_SUFFIX)
+
+
+class SamplingProfiler:
+    """后台线程定时采样全部线程的调用栈。"""
+
+    def __init__(self, interval: Optional[float] = None) -> None:
+        self.interval = max(0.001, float(interval if interval is not None else _settings()["interval"]))
+        self._stacks: Counter = Counter()  # (线程名, 栈) -> 累计秒数
+        self._thread_names: Dict[int, str] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.samples = 0
+        self.idle_samples = 0
+        self.started_at = 0.0
+        self.duration = 0.0
+
+    def start(self) -> "SamplingProfiler":
+        self.started_at = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="review-profiler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+            self._thread = None
+        self.duration = time.perf_counter() - self.started_at
+
+    def _run(self) -> None:
+        own = threading.get_ident()
+        last = time.perf_counter()
+        while not self._stop.wait(self.interval):
+            now = time.perf_counter()
+            self._sample(own, now - last)
+            last = now
+
+    def _sample(self, own: int, weight: float) -> None:
+        names = self._thread_names
+        for ident, frame in sys._current_frames().items():
+            if ident == own:
+                continue
+            leaf = frame.f_code
+            if (os.path.basename(leaf.co_filename), leaf.co_name) in IDLE_LEAVES:
+                self.idle_samples += 1
+                continue
+            name = names.get(ident)
+            if name is None:
+                name = names[ident] = self._thread_name(ident)
+            self._stacks[(name, self._walk(frame))] += weight
+            self.samples += 1
+
+    @staticmethod
+    def _walk(frame: Optional[FrameType]) -> Tuple[CodeType, ...]:
+        codes: List[CodeType] = []
+        while frame is not None and len(codes) < MAX_STACK_DEPTH:
+            codes.append(frame.f_code)
+            frame = frame.f_back
+        codes.reverse()
+        return tuple(codes)
+
+    @staticmethod
+    def _thread_name(ident: int) -> str:
+        for thread in threading.enumerate():
+            if thread.ident == ident:
+                return thread.name
+        return f"thread-{ident}"
+
+    # ------------------------------------------------------------------
+    # 导出
+    # ------------------------------------------------------------------
+
+    def to_speedscope(self, name: str = "review") -> Dict[str, Any]:
+        """speedscope 文件格式：每个线程一个 sampled profile，权重单位为毫秒。"""
+        frame_index: Dict[CodeType, int] = {}
+        frames: List[Dict[str, Any]] = []
+        per_thread: Dict[str, Tuple[List[List[int]], List[float]]] = {}
+        for (thread, stack), seconds in self._stacks.most_common():
+            indices = []
+            for code in stack:
+                index = frame_index.get(code)
+                if index is None:
+                    index = frame_index[code] = len(frames)
+                    frames.append({"name": code.co_name, "file": code.co_filename, "line": code.co_firstlineno})
+                indices.append(index)
+            samples, weights = per_thread.setdefault(thread, ([], []))
+            samples.append(indices)
+            weights.append(round(seconds * 1000, 3))
+
+        profiles = []
+        for thread, (samples, weights) in sorted(per_thread.items(), key=lambda kv: -sum(kv[1][1])):
+            profiles.append({
+                "type": "sampled",
+                "name": thread,
+                "unit": "milliseconds",
+                "startValue": 0,
+                "endValue": round(sum(weights), 3),
+                "samples": samples,
+                "weights": weights,
+            })
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": name,
+            "exporter": "deltaconverge",
+            "activeProfileIndex": 0,
+            "shared": {"frames": frames},
+            "profiles": profiles,
+        }
+
+    def save(self, path: Path, name: str = "review") -> Optional[Path]:
+        """写出 speedscope 文件；失败只记录警告并返回 None。"""
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(json.dumps(self.to_speedscope(name), ensure_ascii=False), encoding="utf-8")
+            return path
+        except Exception as exc:
+            logger.warning(f"Failed to write profile {path}: {exc}")
+            return None
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "samples": self.samples,
+            "idle_samples": self.idle_samples,
+            "interval_ms": round(self.interval * 1000, 3),
+            "duration_ms": round(self.duration * 1000, 1),
+        }
+
+
+__all__ = [
+    "PROFILE_SUFFIX",
+    "SamplingProfiler",
+    "profile_path_for",
+    "should_profile",
+]
@@ -0,0 +1,339 @@
+"""进程内轻量链路追踪：按审查记录嵌套耗时 span，并导出为 Perfetto 可读的文件。
+
+PipelineEvents 只给出平铺的阶段起止，无法看出"某次 LLM 调用 → 工具调用 → git /
+扫描器子进程"之间的嵌套关系。这里用 contextvars 传播当前 span：
+
+- trace_session 为一次审查建立根 span；未开启导出时返回 None，其余接口全部空转；
+- span / traced 记录一段同步或异步代码，子 span 的父节点取自当前上下文。
+  asyncio 任务与 asyncio.to_thread / ctx.run 会复制上下文，线程中的 span 也能正确挂接；
+- add_span 追加一段已结束的耗时（例如阶段结束时才知道起点的场景）；
+- export_trace 把结果写到 log/traces/，格式为 Chrome trace-event（Perfetto /
+  chrome://tracing 直接打开）或 OTLP JSON。
+"""
+
+from __future__ import annotations
+
+import contextvars
+import functools
+import hashlib
+import inspect
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, TypeVar
+
+from Agent.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+# 单次审查保留的 span 上限，超出后丢弃并计数
+MAX_SPANS = 50000
+
+EXPORT_FORMATS = ("none", "chrome", "otlp", "both")
+
+
+def _settings() -> Dict[str, Any]:
+    try:
+        from Agent.core.api.config import get_tracing_settings
+        return get_tracing_settings()
+    except Exception:
+        return {"export": "none"}
+
+
+def _new_span_id() -> str:
+    return os.urandom(8).hex()
+
+
+class Span:
+    """一段带起止时间（纳秒，Unix 时间）的耗时记录。"""
+
+    __slots__ = ("name", "span_id", "parent_id", "start_ns", "end_ns", "attributes", "error", "thread")
+
+    def __init__(self, name: str, parent_id: Optional[str], attributes: Dict[str, Any]) -> None:
+        self.name = name
+        self.span_id = _new_span_id()
+        self.parent_id = parent_id
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.attributes = attributes
+        self.error: Optional[str] = None
+        self.thread = threading.current_thread().name
+
+    @property
+    def duration_ns(self) -> int:
+        return (self.end_ns or time.time_ns()) - self.start_ns
+
+
+class TraceRecorder:
+    """收集一次审查内的全部 span（线程安全）。"""
+
+    def __init__(self, trace_id: str, export: str = "chrome") -> None:
+        self.trace_id = trace_id
+        self.export = export
+        self.spans: List[Span] = []
+        self.dropped = 0
+        self.closed = False
+        self._lock = threading.Lock()
+
+    def add(self, span: Span) -> None:
+        with self._lock:
+            if self.closed or len(self.spans) >= MAX_SPANS:
+                self.dropped += 1
+                return
+            self.spans.append(span)
+
+    # ------------------------------------------------------------------
+    # 导出
+    # ------------------------------------------------------------------
+
+    def _finished(self) -> List[Span]:
+        with self._lock:
+            spans = list(self.spans)
+        now = time.time_ns()
+        for span in spans:
+            if span.end_ns is None:
+                # 审查结束时仍未完成的 span（如后台静态扫描）截断到导出时刻
+                span.end_ns = now
+                span.attributes.setdefault("unfinished", True)
+        return sorted(spans, key=lambda s: (s.start_ns, -s.duration_ns))
+
+    @staticmethod
+    def _assign_lanes(spans: List[Span]) -> Dict[str, int]:
+        """为 span 分配展示轨道：同一轨道上的 span 必须严格嵌套。
+
+        并发的工具调用 / 预取在同一线程内交错执行，直接按线程分轨会互相覆盖，
+        这里让与兄弟 span 重叠的 span 另起一条轨道。
+        """
+        by_id = {span.span_id: span for span in spans}
+        lanes: List[List[Span]] = []
+        lane_of: Dict[str, int] = {}
+
+        def _is_ancestor(candidate: Span, span: Span) -> bool:
+            parent_id = span.parent_id
+            while parent_id is not None:
+                if parent_id == candidate.span_id:
+                    return True
+                parent = by_id.get(parent_id)
+                parent_id = parent.parent_id if parent else None
+            return False
+
+        for span in spans:
+            preferred = lane_of.get(span.parent_id or "")
+            order = ([preferred] if preferred is not None else []) + [
+                i for i in range(len(lanes)) if i != preferred
+            ]
+            chosen = None
+            for index in order:
+                stack = lanes[index]
+                while stack and (stack[-1].end_ns or 0) <= span.start_ns:
+                    stack.pop()
+                if not stack or (_is_ancestor(stack[-1], span) and (stack[-1].end_ns or 0) >= (span.end_ns or 0)):
+                    chosen = index
+                    break
+            if chosen is None:
+                lanes.append([])
+                chosen = len(lanes) - 1
+            lanes[chosen].append(span)
+            lane_of[span.span_id] = chosen
+        return lane_of
+
+    def to_chrome(self) -> Dict[str, Any]:
+        """Chrome trace-event 格式（完整事件 ph=X，时间单位微秒）。"""
+        spans = self._finished()
+        lanes = self._assign_lanes(spans)
+        pid = os.getpid()
+        events: List[Dict[str, Any]] = [
+            {"name": "process_name", "ph": "M", "pid": pid, "tid": 0, "args": {"name": f"review {self.trace_id}"}},
+        ]
+        for lane in sorted(set(lanes.values())):
+            events.append({"name": "thread_name", "ph": "M", "pid": pid, "tid": lane, "args": {"name": f"lane {lane}"}})
+        for span in spans:
+            args = dict(span.attributes)
+            args["thread"] = span.thread
+            if span.error:
+                args["error"] = span.error
+            events.append({
+                "name": span.name,
+                "cat": span.name.split(".", 1)[0],
+                "ph": "X",
+                "ts": span.start_ns / 1000,
+                "dur": span.duration_ns / 1000,
+                "pid": pid,
+                "tid": lanes[span.span_id],
+                "args": args,
+            })
+        return {
+            "traceEvents": events,
+            "displayTimeUnit": "ms",
+            "otherData": {"trace_id": self.trace_id, "dropped_spans": self.dropped},
+        }
+
+    def otlp_trace_id(self) -> str:
+        """OTLP 要求 32 位十六进制 trace id：十六进制 trace_id 左补零，否则取哈希。"""
+        raw = self.trace_id.lower()
+        if raw and len(raw) <= 32 and all(c in "0123456789abcdef" for c in raw):
+            return raw.rjust(32, "0")
+        return hashlib.md5(self.trace_id.encode("utf-8")).hexdigest()
+
+    def to_otlp(self) -> Dict[str, Any]:
+        """OTLP/JSON（ExportTraceServiceRequest）格式。"""
+        trace_id = self.otlp_trace_id()
+        otlp_spans: List[Dict[str, Any]] = []
+        for span in self._finished():
+            item: Dict[str, Any] = {
+                "traceId": trace_id,
+                "spanId": span.span_id,
+                "name": span.name,
+                "kind": 1,  # SPAN_KIND_INTERNAL
+                "startTimeUnixNano": str(span.start_ns),
+                "endTimeUnixNano": str(span.end_ns),
+                "attributes": [_otlp_attribute(k, v) for k, v in span.attributes.items()]
+                + [_otlp_attribute("thread.name", span.thread)],
+                "status": {"code": 2, "message": span.error} if span.error else {"code": 1},
+            }
+            if span.parent_id:
+                item["parentSpanId"] = span.parent_id
+            otlp_spans.append(item)
+        return {
+            "resourceSpans": [{
+                "resource": {"attributes": [_otlp_attribute("service.name", "deltaconverge")]},
+                "scopeSpans": [{"scope": {"name": "Agent.core.logging.tracing"}, "spans": otlp_spans}],
+            }]
+        }
+
+
+def _otlp_attribute(key: str, value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        wrapped: Dict[str, Any] = {"boolValue": value}
+    elif isinstance(value, int):
+        wrapped = {"intValue": str(value)}
+    elif isinstance(value, float):
+        wrapped = {"doubleValue": value}
+    else:
+        wrapped = {"stringValue": str(value)}
+    return {"key": key, "value": wrapped}
+
+
+# 当前审查的记录器与当前 span
+_current_trace: contextvars.ContextVar[Optional[TraceRecorder]] = contextvars.ContextVar(
+    "deltaconverge_trace", default=None
+)
+_current_span: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar(
+    "deltaconverge_span", default=None
+)
+
+
+def current_trace() -> Optional[TraceRecorder]:
+    """当前上下文中的追踪记录器（未开启追踪时为 None）。"""
+    return _current_trace.get()
+
+
+@contextmanager
+def trace_session(trace_id: str, name: str = "review", **attributes: Any) -> Iterator[Optional[TraceRecorder]]:
+    """为一次审查开启追踪并建立根 span；导出格式为 none 时直接返回 None。"""
+    export = str(_settings().get("export") or "none")
+    if export not in EXPORT_FORMATS or export == "none":
+        yield None
+        return
+    recorder = TraceRecorder(trace_id, export)
+    trace_token = _current_trace.set(recorder)
+    try:
+        with span(name, trace_id=trace_id, **attributes):
+            yield recorder
+    finally:
+        _current_trace.reset(trace_token)
+        recorder.closed = True
+
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Optional[Span]]:
+    """记录一段代码的耗时，作为当前 span 的子节点；未开启追踪时不做任何事。"""
+    recorder = _current_trace.get()
+    if recorder is None:
+        yield None
+        return
+    parent = _current_span.get()
+    current = Span(name, parent.span_id if parent else None, attributes)
+    recorder.add(current)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as exc:
+        current.error = f"{type(exc).__name__}: {exc}"[:500]
+        raise
+    finally:
+        current.end_ns = time.time_ns()
+        try:
+            _current_span.reset(token)
+        except ValueError:
+            # 在其他上下文中退出（例如跨任务传递的生成器），只需保证不抛出
+            pass
+
+
+def traced(name: str, **attributes: Any) -> Callable[[F], F]:
+    """装饰器：把整个函数（同步或协程）记录为一个 span。"""
+
+    def decorator(func: F) -> F:
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args: Any, **kwargs: Any) -> Any:
+                with span(name, **attributes):
+                    return await func(*args, **kwargs)
+            return async_wrapper  # type: ignore[return-value]
+
+        @functools.wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            with span(name, **attributes):
+                return func(*args, **kwargs)
+        return wrapper  # type: ignore[return-value]
+
+    return decorator
+
+
+def add_span(name: str, seconds: float, **attributes: Any) -> None:
+    """追加一段刚刚结束、持续 seconds 秒的耗时，挂在当前 span 之下。"""
+    recorder = _current_trace.get()
+    if recorder is None:
+        return
+    parent = _current_span.get()
+    finished = Span(name, parent.span_id if parent else None, attributes)
+    finished.end_ns = time.time_ns()
+    finished.start_ns = finished.end_ns - int(max(0.0, seconds) * 1e9)
+    recorder.add(finished)
+
+
+def export_trace(recorder: TraceRecorder, log_root: str | Path = "log/traces") -> List[Path]:
+    """按记录器的导出格式写出追踪文件，返回写出的路径；失败只记录警告。"""
+    root = Path(log_root)
+    written: List[Path] = []
+    targets = []
+    if recorder.export in ("chrome", "both"):
+        targets.append((root / f"{recorder.trace_id}.trace.json", recorder.to_chrome))
+    if recorder.export in ("otlp", "both"):
+        targets.append((root / f"{recorder.trace_id}.otlp.json", recorder.to_otlp))
+    for path, render in targets:
+        try:
+            root.mkdir(parents=True, exist_ok=True)
+            path.write_text(json.dumps(render(), ensure_ascii=False, default=str), encoding="utf-8")
+            written.append(path)
+        except Exception as exc:
+            logger.warning(f"Failed to export trace {recorder.trace_id} to {path}: {exc}")
+    return written
+
+
+__all__ = [
+    "EXPORT_FORMATS",
+    "Span",
+    "TraceRecorder",
+    "add_span",
+    "current_trace",
+    "export_trace",
+    "span",
+    "trace_session",
+    "traced",
+]
@@ -16,7 +16,11 @@ from Agent.agents.code_reviewer import CodeReviewAgent
 from Agent.agents.planning_agent import PlanningAgent
 from Agent.agents.intent_agent import IntentAgent
 from Agent.agents.fusion import fuse_plan
-from Agent.agents.context_scheduler import build_context_bundle
+from Agent.agents.context_scheduler import (
+    ContextConfig as BundleContextConfig,
+    build_context_bundle,
+    prefetch_plan_item,
+)
 from Agent.core.adapter.llm_adapter import LLMAdapter
 from Agent.core.context.provider import ContextProvider
 from Agent.core.context.diff_provider import (
@@ -32,10 +36,13 @@ from Agent.core.logging import get_logger
 from Agent.core.logging.api_logger import APILogger
 from Agent.core.logging.pipeline_logger import PipelineLogger
 from Agent.core.logging.fallback_tracker import fallback_tracker
+from Agent.core.logging.metrics import record_cache
+from Agent.core.logging.tracing import TraceRecorder, export_trace, trace_session
+from Agent.core.api.config import get_plan_prefetch_workers
 from Agent.core.state.conversation import ConversationState
 from Agent.core.stream.stream_processor import NormalizedToolCall
 from Agent.core.tools.runtime import ToolRuntime
-from Agent.tool.registry import get_tool_functions
+from Agent.tool.registry import get_tool_functions, get_tool_spec
 from Agent.core.services.prompt_builder import build_review_prompt
 from Agent.core.services.tool_policy import resolve_tools
 from Agent.core.services.usage_service import UsageService
@@ -98,6 +105,7 @@ class ReviewKernel:
         self.usage_agg = UsageAggregator()
         self.pipe_logger = PipelineLogger(trace_id=trace_id)
         self.session_log = None
+        self._prefetch_tasks: List[asyncio.Task] = []
 
     def _get_project_name(self, project_path: str) -> str:
         """获取项目名称。"""
@@ -214,6 +222,39 @@ class ReviewKernel:
             "by_level": level_count,
         }
 
+    async def _await_prefetch(self, tasks: List[asyncio.Task], started_at: float) -> None:
+        """等待规划阶段发起的上下文预取完成，并记录预热统计（失败仅记录，不影响主流程）。"""
+        waited_at = time.monotonic()
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+        totals: Dict[str, int] = {"files": 0, "previous_version": 0, "callers": 0}
+        errors = 0
+        for res in results:
+            if isinstance(res, BaseException):
+                errors += 1
+                continue
+            for key, val in (res or {}).items():
+                totals[key] = totals.get(key, 0) + int(val or 0)
+        self.pipe_logger.log(
+            "context_prefetch",
+            {
+                "items": len(tasks),
+                "errors": errors,
+                "warmed": totals,
+                "wait_ms": int((time.monotonic() - waited_at) * 1000),
+                "elapsed_ms": int((time.monotonic() - started_at) * 1000),
+            },
+        )
+
+    async def _cancel_pending_prefetch(self) -> None:
+        """收尾未被 _await_prefetch 等待的预取任务（规划被取消、审查失败或提前返回时）。"""
+        tasks, self._prefetch_tasks = self._prefetch_tasks, []
+        pending = [task for task in tasks if not task.done()]
+        for task in pending:
+            task.cancel()
+        if tasks:
+            # 同时取回已结束任务的异常，避免 "exception was never retrieved"
+            await asyncio.gather(*tasks, return_exceptions=True)
+
     def _notify(self, callback: Optional[Callable], evt: Dict[str, Any]) -> None:
         if callback:
             try:
@@ -423,6 +464,44 @@ class ReviewKernel:
         tool_approver: Optional[Callable[[List[Dict[str, Any]]], List[Dict[str, Any]]]] = None,
         message_history: Optional[List[Dict[str, Any]]] = None,
         agents: Optional[List[str]] = None,
+    ) -> str:
+        """运行审查流程；开启链路追踪时记录本次审查的 span 并在结束后导出到 log/traces。"""
+        recorder: Optional[TraceRecorder] = None
+        try:
+            with trace_session(
+                self.trace_id,
+                "review",
+                review_provider=self.review_provider,
+                planner_provider=self.planner_provider,
+                units=len(diff_ctx.units),
+            ) as recorder:
+                return await self._run(
+                    prompt=prompt,
+                    tool_names=tool_names,
+                    auto_approve=auto_approve,
+                    diff_ctx=diff_ctx,
+                    stream_callback=stream_callback,
+                    tool_approver=tool_approver,
+                    message_history=message_history,
+                    agents=agents,
+                )
+        finally:
+            await self._cancel_pending_prefetch()
+            if recorder is not None:
+                # 序列化与写文件可能耗时数百毫秒，放到线程中避免阻塞事件循环
+                for path in await asyncio.to_thread(export_trace, recorder):
+                    logger.info(f"Trace exported: {path}")
+
+    async def _run(
+        self,
+        prompt: str,
+        tool_names: List[str],
+        auto_approve: bool,
+        diff_ctx: DiffContext,
+        stream_callback: Optional[Callable[[Dict[str, Any]], None]] = None,
+        tool_approver: Optional[Callable[[List[Dict[str, Any]]], List[Dict[str, Any]]]] = None,
+        message_history: Optional[List[Dict[str, Any]]] = None,
+        agents: Optional[List[str]] = None,
     ) -> str:
         """运行审查流程核心逻辑。"""
         
@@ -491,9 +570,11 @@ class ReviewKernel:
                     intent_file_data = None
                     intent_summary_md = None
                 else:
+                    record_cache("intent", True)
                     events.stage_end("intent_analysis", has_output=True)
             elif "intent" in active_agents:
                 # 文件不存在且启用了 intent agent，生成新的意图分析结果
+                record_cache("intent", False)
                 # 使用已在 run() 开头收集的 intent_inputs
                 intent_agent = IntentAgent(self.intent_adapter, ConversationState())
 
@@ -566,6 +647,11 @@ class ReviewKernel:
 
         # Planning Phase
         plan = {}
+        prefetch_tasks: List[asyncio.Task] = []
+        # 正常路径由 _await_prefetch 等待；其余路径由 run() 的 finally 统一取消
+        self._prefetch_tasks = prefetch_tasks
+        prefetched_ids: set[str] = set()
+        prefetch_started_at = time.monotonic()
         if "planner" in active_agents:
             events.stage_start("planner")
             
@@ -580,6 +666,36 @@ class ReviewKernel:
                 last_exc: Exception | None = None
                 planner_model = getattr(getattr(self.planner_adapter, "client", None), "model", None)
 
+                # 规划与上下文构建重叠：planner 流式输出中每闭合一个 plan 条目，
+                # 就在线程中预热该单元的文件/历史版本/调用方缓存，融合后组装 bundle 时直接命中。
+                prefetch_workers = get_plan_prefetch_workers() if "reviewer" in active_agents else 0
+                on_plan_item: Callable[[Dict[str, Any]], None] | None = None
+                if prefetch_workers > 0:
+                    prefetch_units = {
+                        str(u.get("unit_id") or u.get("id")): u
+                        for u in diff_ctx.units
+                        if u.get("unit_id") or u.get("id")
+                    }
+                    prefetch_cfg = BundleContextConfig()
+                    prefetch_sem = asyncio.Semaphore(prefetch_workers)
+
+                    async def _prefetch(unit: Dict[str, Any], item: Dict[str, Any]) -> Dict[str, int]:
+                        async with prefetch_sem:
+                            # to_thread 会复制 contextvars，线程内可读取 project_root
+                            return await asyncio.to_thread(
+                                prefetch_plan_item, unit, item, diff_ctx.base_branch, prefetch_cfg
+                            )
+
+                    def _on_plan_item(item: Dict[str, Any]) -> None:
+                        uid = str(item.get("unit_id"))
+                        unit = prefetch_units.get(uid)
+                        if unit is None or uid in prefetched_ids:
+                            return
+                        prefetched_ids.add(uid)
+                        prefetch_tasks.append(asyncio.create_task(_prefetch(unit, item)))
+
+                    on_plan_item = _on_plan_item
+
                 for attempt in range(max_attempts):
                     started_at = time.monotonic()
 
@@ -644,6 +760,7 @@ class ReviewKernel:
                             observer=_planner_observer,
                             intent_md=intent_summary_md,
                             user_prompt=prompt,
+                            on_plan_item=on_plan_item,
                         )
                         plan_error = plan.get("error") if isinstance(plan, dict) else "invalid_plan"
                         ok = not bool(plan_error)
@@ -769,6 +886,9 @@ class ReviewKernel:
 
         try:
             # Fusion & Context Phase
+            if prefetch_tasks:
+                await self._await_prefetch(prefetch_tasks, prefetch_started_at)
+                self._prefetch_tasks = []
             events.stage_start("fusion")
             fused = fuse_plan(diff_ctx.review_index, plan)
             
@@ -826,7 +946,15 @@ class ReviewKernel:
         
         runtime = ToolRuntime()
         for name, func in get_tool_functions(tool_names).items():
-            runtime.register(name, func)
+            spec = get_tool_spec(name)
+            runtime.register(
+                name,
+                func,
+                timeout=spec.timeout,
+                max_concurrency=spec.max_concurrency,
+                cacheable=spec.cacheable,
+                cache_ttl=spec.cache_ttl,
+            )
         
         tp = resolve_tools(tool_names, auto_approve)
         tools = tp["schemas"]
@@ -981,6 +1109,9 @@ class ReviewKernel:
                 "trace_id": self.trace_id,
             },
         )
+        # 登记用量合计并收尾（按配置压缩）本次的流水线与 API 日志
+        self.pipe_logger.close(usage=self.usage_agg.session_totals())
+        trace_logger.close()
         events.stage_end("final_output", result_preview=str(result)[:300])
         
         return result
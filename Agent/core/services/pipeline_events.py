@@ -1,10 +1,15 @@
 import time
 from typing import Any, Callable, Dict, List, Optional
 
+from Agent.core.logging.metrics import observe_stage
+from Agent.core.logging.tracing import add_span
+
 
 class PipelineEvents:
     def __init__(self, callback: Callable[[Dict[str, Any]], None] | None) -> None:
         self.callback = callback
+        # 阶段开始时间，stage_end 时据此记录阶段耗时指标与追踪 span（跳过的阶段不计）
+        self._stage_started: Dict[str, float] = {}
 
     def emit(self, evt: Dict[str, Any]) -> None:
         if not self.callback:
@@ -15,9 +20,15 @@ class PipelineEvents:
             pass
 
     def stage_start(self, stage: str) -> None:
+        self._stage_started[stage] = time.perf_counter()
         self.emit({"type": "pipeline_stage_start", "stage": stage})
 
     def stage_end(self, stage: str, **summary: Any) -> None:
+        started = self._stage_started.pop(stage, None)
+        if started is not None and not summary.get("skipped"):
+            elapsed = time.perf_counter() - started
+            observe_stage(stage, elapsed)
+            add_span(f"stage.{stage}", elapsed)
         evt: Dict[str, Any] = {"type": "pipeline_stage_end", "stage": stage}
         if summary:
             evt["summary"] = summary
@@ -1,6 +1,22 @@
 from typing import Any, Dict, Tuple
 
 
+def _cached_prompt_tokens(usage: Dict[str, Any]) -> Any:
+    """提取命中前缀缓存的输入 token 数，兼容各厂商字段。
+
+    - OpenAI / 百炼 / OpenRouter / 硅基流动 / 智谱：prompt_tokens_details.cached_tokens
+    - DeepSeek：prompt_cache_hit_tokens
+    - Moonshot：cached_tokens
+    """
+    for key in ("prompt_tokens_details", "input_tokens_details"):
+        details = usage.get(key)
+        if isinstance(details, dict) and details.get("cached_tokens") is not None:
+            return details.get("cached_tokens")
+    if usage.get("prompt_cache_hit_tokens") is not None:
+        return usage.get("prompt_cache_hit_tokens")
+    return usage.get("cached_tokens")
+
+
 class UsageService:
     def __init__(self) -> None:
         self._call_usage: Dict[int, Dict[str, int]] = {}
@@ -18,27 +34,25 @@ class UsageService:
         in_tok = _to_int(usage.get("input_tokens") or usage.get("prompt_tokens"))
         out_tok = _to_int(usage.get("output_tokens") or usage.get("completion_tokens"))
         total_tok = _to_int(usage.get("total_tokens"))
+        cached_tok = _to_int(_cached_prompt_tokens(usage))
         try:
             idx = int(call_index) if call_index is not None else 1
         except (TypeError, ValueError):
             idx = 1
-        current = self._call_usage.get(idx, {"in": 0, "out": 0, "total": 0})
+        current = self._call_usage.get(idx, {"in": 0, "out": 0, "total": 0, "cached": 0})
         current["in"] = max(current["in"], in_tok)
         current["out"] = max(current["out"], out_tok)
         current["total"] = max(current["total"], total_tok)
+        current["cached"] = max(current["cached"], cached_tok)
         self._call_usage[idx] = current
 
-        session_totals = {
-            "in": sum(v["in"] for v in self._call_usage.values()),
-            "out": sum(v["out"] for v in self._call_usage.values()),
-            "total": sum(v["total"] for v in self._call_usage.values()),
-        }
-        return current, session_totals
+        return current, self.session_totals()
 
     def session_totals(self) -> Dict[str, int]:
         return {
             "in": sum(v["in"] for v in self._call_usage.values()),
             "out": sum(v["out"] for v in self._call_usage.values()),
             "total": sum(v["total"] for v in self._call_usage.values()),
+            "cached": sum(v["cached"] for v in self._call_usage.values()),
         }
 
@@ -2,9 +2,28 @@
 
 from __future__ import annotations
 
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional, Tuple
 import json
 
+# 压缩后的工具结果保留的预览字符数
+_COMPACT_PREVIEW_CHARS = 300
+# 短于该长度的工具结果不值得压缩
+_COMPACT_MIN_CHARS = 600
+_COMPACTED_MARK = "[已压缩]"
+
+
+def _message_chars(message: Dict[str, Any]) -> int:
+    total = 0
+    for key in ("content", "reasoning_content"):
+        value = message.get(key)
+        if isinstance(value, str):
+            total += len(value)
+    for call in message.get("tool_calls") or ():
+        fn = call.get("function") if isinstance(call, dict) else None
+        if isinstance(fn, dict) and isinstance(fn.get("arguments"), str):
+            total += len(fn["arguments"])
+    return total
+
 
 class ConversationState:
     """保存与 LLM 往返的消息列表。"""
@@ -12,13 +31,37 @@ class ConversationState:
     def __init__(self) -> None:
         self._messages: List[Dict[str, Any]] = []
         self._max_messages: int | None = None
+        # 前缀缓存断点：这些下标处的消息及其之前的内容在后续轮次中保持字节不变
+        self._cache_breakpoints: List[int] = []
 
     @property
     def messages(self) -> List[Dict[str, Any]]:
-        """返回当前消息（只读副本）。"""
+        """返回当前消息列表。
+
+        多轮工具循环每轮都会读取，为避免整表复制这里直接返回内部列表，
+        调用方应视为只读；需要独立副本时使用 snapshot()。
+        """
+
+        return self._messages
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        """返回当前消息的浅拷贝。"""
 
         return list(self._messages)
 
+    @property
+    def cache_breakpoints(self) -> Tuple[int, ...]:
+        """稳定前缀的断点下标（升序），供支持 cache_control 的厂商标注缓存边界。"""
+
+        return tuple(self._cache_breakpoints)
+
+    def mark_cache_breakpoint(self) -> None:
+        """将当前最后一条消息标记为稳定前缀的结尾。"""
+
+        idx = len(self._messages) - 1
+        if idx >= 0 and (not self._cache_breakpoints or self._cache_breakpoints[-1] < idx):
+            self._cache_breakpoints.append(idx)
+
     def add_system_message(self, content: str) -> None:
         self._messages.append({"role": "system", "content": content})
 
@@ -90,6 +133,68 @@ class ConversationState:
         others = [m for m in self._messages if m.get("role") != "system"]
         keep = others[-(self._max_messages - len(system_msgs)) :]
         self._messages = system_msgs + keep
+        # 裁剪后只有 system 前缀仍保持原样
+        self._cache_breakpoints = [i for i in self._cache_breakpoints if i < len(system_msgs)]
+
+    def estimated_tokens(self) -> int:
+        """粗略估算当前会话的 token 数（约 4 字符 / token）。"""
+
+        return sum(_message_chars(m) for m in self._messages) // 4
+
+    def compact(self, max_tokens: int, keep_recent_turns: int = 4) -> Optional[Dict[str, Any]]:
+        """会话超出 token 预算时，把较早的工具结果替换为简短摘要。
+
+        最近 keep_recent_turns 轮（以助手消息计）及其后的内容保持原样；
+        更早的工具结果只保留工具名、原始长度与开头预览，模型需要时可重新调用工具。
+        一次性压缩全部可压缩的旧结果，避免每轮都改动前缀导致缓存失效。
+
+        Returns:
+            未触发压缩时返回 None，否则返回 {"compacted_messages", "bytes_saved",
+            "tokens_before", "tokens_after"}。
+        """
+
+        if max_tokens <= 0:
+            return None
+        tokens_before = self.estimated_tokens()
+        if tokens_before <= max_tokens:
+            return None
+
+        assistant_idx = [i for i, m in enumerate(self._messages) if m.get("role") == "assistant"]
+        if len(assistant_idx) <= keep_recent_turns:
+            return None
+        boundary = assistant_idx[-keep_recent_turns] if keep_recent_turns > 0 else len(self._messages)
+
+        compacted = 0
+        bytes_saved = 0
+        first_changed: Optional[int] = None
+        for i in range(boundary):
+            msg = self._messages[i]
+            if msg.get("role") != "tool":
+                continue
+            content = msg.get("content")
+            if not isinstance(content, str) or len(content) < _COMPACT_MIN_CHARS or content.startswith(_COMPACTED_MARK):
+                continue
+            summary = (
+                f"{_COMPACTED_MARK} 工具 {msg.get('name') or 'unknown'} 的早期结果"
+                f"（原 {len(content)} 字符），开头预览：\n{content[:_COMPACT_PREVIEW_CHARS]}\n"
+                "……如需完整内容请重新调用该工具。"
+            )
+            bytes_saved += len(content.encode("utf-8")) - len(summary.encode("utf-8"))
+            self._messages[i] = dict(msg, content=summary)
+            compacted += 1
+            if first_changed is None:
+                first_changed = i
+
+        if not compacted:
+            return None
+        # 被改写位置之后的断点不再代表稳定前缀
+        self._cache_breakpoints = [i for i in self._cache_breakpoints if i < (first_changed or 0)]
+        return {
+            "compacted_messages": compacted,
+            "bytes_saved": bytes_saved,
+            "tokens_before": tokens_before,
+            "tokens_after": self.estimated_tokens(),
+        }
 
     def restore_message(self, message: Dict[str, Any]) -> None:
         """恢复单条消息（用于反序列化）。
@@ -117,3 +222,4 @@ class ConversationState:
     def clear(self) -> None:
         """清空所有消息。"""
         self._messages.clear()
+        self._cache_breakpoints.clear()
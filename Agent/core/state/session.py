@@ -2,14 +2,19 @@ from __future__ import annotations
 
 import json
 import logging
+import os
 import threading
 import re
-from typing import Any, Dict, List, Optional
+import weakref
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
 from datetime import datetime
 from dataclasses import dataclass, field, asdict
 from pathlib import Path
 
 from Agent.core.state.conversation import ConversationState
+from Agent.core.state.session_catalog import SessionCatalog
+from Agent.core.state.session_writer import SessionWriter
 
 logger = logging.getLogger(__name__)
 
@@ -32,6 +37,22 @@ class SessionOperationError(SessionError):
 # 预编译正则，避免重复编译
 _SESSION_ID_PATTERN = re.compile(r'"session_id"\s*:\s*"([^"]+)"')
 
+# 整体替换（而非追加）的会话字段，变化时在日志中整体记录
+_REPLACED_FIELDS = ("diff_files", "diff_units", "static_scan_linked")
+
+
+def _storage_settings() -> Dict[str, int]:
+    try:
+        from Agent.core.api.config import get_session_storage_settings
+        return get_session_storage_settings()
+    except Exception:
+        return {"journal_max_bytes": 1024 * 1024, "cache_size": 64, "save_debounce": 0.5}
+
+
+def _journal_max_bytes() -> int:
+    """会话事件日志超过该大小时压缩为新快照。"""
+    return _storage_settings()["journal_max_bytes"]
+
 
 @dataclass
 class SessionMetadata:
@@ -66,24 +87,31 @@ class ReviewSession:
             name=session_id,
             project_root=project_root
         )
+        # 上次落盘时的状态水位，用于计算增量日志；None 表示尚未落盘
+        self._persisted: Dict[str, Any] | None = None
+        self._snapshot_gen = 0
+        # 状态锁：保护事件循环追加事件与后台保存读取状态；写锁：保证同一会话的落盘按顺序进行
+        self._state_lock = threading.RLock()
+        self._write_lock = threading.Lock()
 
     def add_message(self, role: str, content: str, **kwargs: Any) -> None:
         """通用消息添加接口，自动更新元数据。"""
-        if role == "user":
-            self.conversation.add_user_message(content)
-        elif role == "system":
-            self.conversation.add_system_message(content)
-        elif role == "assistant":
-            self.conversation.add_assistant_message(content, tool_calls=kwargs.get("tool_calls", []), reasoning=kwargs.get("reasoning"))
-        elif role == "tool":
-            self.conversation.add_tool_result({
-                "tool_call_id": kwargs.get("tool_call_id"),
-                "name": kwargs.get("name"),
-                "content": content,
-                "error": kwargs.get("error")
-            })
-        
-        self.metadata.updated_at = datetime.now().isoformat()
+        with self._state_lock:
+            if role == "user":
+                self.conversation.add_user_message(content)
+            elif role == "system":
+                self.conversation.add_system_message(content)
+            elif role == "assistant":
+                self.conversation.add_assistant_message(content, tool_calls=kwargs.get("tool_calls", []), reasoning=kwargs.get("reasoning"))
+            elif role == "tool":
+                self.conversation.add_tool_result({
+                    "tool_call_id": kwargs.get("tool_call_id"),
+                    "name": kwargs.get("name"),
+                    "content": content,
+                    "error": kwargs.get("error")
+                })
+            
+            self.metadata.updated_at = datetime.now().isoformat()
 
     def add_workflow_event(self, event: Dict[str, Any]) -> None:
         """添加工作流事件（思考、工具调用等）。
@@ -94,26 +122,27 @@ class ReviewSession:
         evt_stage = event.get("stage")
         evt_content = event.get("content")
         
-        # 对于 thought 和 chunk 类型，尝试合并到上一个同类型事件
-        if evt_type in ("thought", "chunk") and evt_content and self.workflow_events:
-            last_evt = self.workflow_events[-1]
-            if (
-                last_evt.get("type") == evt_type and
-                last_evt.get("stage") == evt_stage and
-                "content" in last_evt
-            ):
-                old_content = str(last_evt.get("content") or "")
-                new_part = str(evt_content or "")
-                last_evt["content"] = old_content + new_part
-                last_evt["timestamp"] = datetime.now().isoformat()
-                return
-        
-        # 无法合并，添加为新事件
-        event_with_time = {
-            **event,
-            "timestamp": datetime.now().isoformat()
-        }
-        self.workflow_events.append(event_with_time)
+        with self._state_lock:
+            # 对于 thought 和 chunk 类型，尝试合并到上一个同类型事件
+            if evt_type in ("thought", "chunk") and evt_content and self.workflow_events:
+                last_evt = self.workflow_events[-1]
+                if (
+                    last_evt.get("type") == evt_type and
+                    last_evt.get("stage") == evt_stage and
+                    "content" in last_evt
+                ):
+                    old_content = str(last_evt.get("content") or "")
+                    new_part = str(evt_content or "")
+                    last_evt["content"] = old_content + new_part
+                    last_evt["timestamp"] = datetime.now().isoformat()
+                    return
+            
+            # 无法合并，添加为新事件
+            event_with_time = {
+                **event,
+                "timestamp": datetime.now().isoformat()
+            }
+            self.workflow_events.append(event_with_time)
 
     def to_dict(self) -> Dict[str, Any]:
         """序列化会话数据。"""
@@ -154,9 +183,97 @@ class ReviewSession:
 
         # 恢复静态扫描关联
         session.static_scan_linked = data.get("static_scan_linked", {})
+        session._snapshot_gen = int(data.get("snapshot_gen") or 0)
                 
         return session
 
+    # ------------------------------------------------------------------
+    # 增量持久化：快照 + 追加式事件日志
+    # ------------------------------------------------------------------
+
+    def mark_persisted(self) -> None:
+        """记录当前状态为已落盘水位。"""
+        messages = self.conversation.messages
+        events = self.workflow_events
+        last_event = events[-1] if events else None
+        self._persisted = {
+            "metadata": asdict(self.metadata),
+            "messages": len(messages),
+            "last_message": messages[-1] if messages else None,
+            "events": len(events),
+            "last_event": last_event,
+            "last_event_len": len(str(last_event.get("content") or "")) if last_event else 0,
+            "fields": {name: (id(getattr(self, name)), len(getattr(self, name))) for name in _REPLACED_FIELDS},
+        }
+
+    def journal_delta(self) -> Dict[str, Any] | None:
+        """计算自上次落盘以来的增量记录。
+
+        Returns:
+            增量字典（无变化时为空字典）；历史被截断或改写、无法用追加表达时返回 None，
+            调用方应改写完整快照。
+        """
+        persisted = self._persisted
+        if persisted is None:
+            return None
+        delta: Dict[str, Any] = {}
+
+        messages = self.conversation.messages
+        n_msg = persisted["messages"]
+        if len(messages) < n_msg or (n_msg and messages[n_msg - 1] is not persisted["last_message"]):
+            return None
+        if len(messages) > n_msg:
+            delta["messages"] = messages[n_msg:]
+
+        events = self.workflow_events
+        n_evt = persisted["events"]
+        if len(events) < n_evt or (n_evt and events[n_evt - 1] is not persisted["last_event"]):
+            return None
+        if n_evt:
+            # 连续的 thought/chunk 会合并进最后一个事件，只追加新增的文本
+            content = str(events[n_evt - 1].get("content") or "")
+            if len(content) < persisted["last_event_len"]:
+                return None
+            if len(content) > persisted["last_event_len"]:
+                delta["event_tail"] = {
+                    "index": n_evt - 1,
+                    "append": content[persisted["last_event_len"]:],
+                    "timestamp": events[n_evt - 1].get("timestamp"),
+                }
+        if len(events) > n_evt:
+            delta["events"] = events[n_evt:]
+
+        replaced = {
+            name: getattr(self, name)
+            for name in _REPLACED_FIELDS
+            if (id(getattr(self, name)), len(getattr(self, name))) != persisted["fields"][name]
+        }
+        if replaced:
+            delta["replace"] = replaced
+
+        metadata = asdict(self.metadata)
+        if delta or metadata != persisted["metadata"]:
+            delta["metadata"] = metadata
+        return delta
+
+    def apply_journal_record(self, record: Dict[str, Any]) -> None:
+        """将一条事件日志记录应用到会话上（加载时重放）。"""
+        tail = record.get("event_tail")
+        if tail and 0 <= int(tail.get("index", -1)) < len(self.workflow_events):
+            evt = self.workflow_events[int(tail["index"])]
+            evt["content"] = str(evt.get("content") or "") + str(tail.get("append") or "")
+            if tail.get("timestamp"):
+                evt["timestamp"] = tail["timestamp"]
+        if record.get("events"):
+            self.workflow_events.extend(record["events"])
+        if record.get("messages"):
+            self.conversation.restore_messages(record["messages"])
+        for name, value in (record.get("replace") or {}).items():
+            if name in _REPLACED_FIELDS:
+                setattr(self, name, value)
+        if record.get("metadata"):
+            self.metadata = SessionMetadata(**record["metadata"])
+
 
 class SessionManager:
     """会话生命周期管理与持久化。"""
@@ -169,14 +286,84 @@ class SessionManager:
             p = Path(storage_dir)
             self.storage_dir = (p if p.is_absolute() else (agent_root / p)).resolve()
         self.storage_dir.mkdir(parents=True, exist_ok=True)
-        self._sessions: Dict[str, ReviewSession] = {}
-        self._session_index: Dict[str, Dict[str, Any]] = {}  # path -> {mtime, data}
+        # 已加载会话的有界 LRU；被淘汰但仍被审查任务引用的对象通过弱引用表找回，保证同一会话只有一个实例
+        self._sessions: "OrderedDict[str, ReviewSession]" = OrderedDict()
+        self._live_sessions: "weakref.WeakValueDictionary[str, ReviewSession]" = weakref.WeakValueDictionary()
+        self._cache_size = max(1, int(_storage_settings().get("cache_size", 64)))
+        self._session_index: Dict[str, Dict[str, Any]] = {}  # path -> {mtime, data}（无目录索引时使用）
         self._lock = threading.RLock()
+        self._catalog = self._open_catalog()
+        # 高频保存（流式回调中的工具 / 扫描事件）交给后台线程按会话合并
+        self._writer = SessionWriter(self.save_session, debounce=_storage_settings().get("save_debounce", 0.5))
+
+    def _open_catalog(self) -> SessionCatalog | None:
+        """打开会话目录索引；首次使用或与磁盘文件数不一致时从会话文件重建。"""
+        try:
+            catalog = SessionCatalog(self.storage_dir / "catalog.db")
+        except Exception as e:
+            logger.error(f"Failed to open session catalog, falling back to directory scan: {e}")
+            return None
+        try:
+            snapshot_count = sum(1 for _ in self.storage_dir.glob("*.json"))
+            if catalog.count() != snapshot_count:
+                self._rebuild_catalog(catalog)
+        except Exception as e:
+            logger.error(f"Failed to rebuild session catalog: {e}")
+        return catalog
+
+    def _rebuild_catalog(self, catalog: SessionCatalog) -> None:
+        """从会话文件重建索引。
+
+        标签与消息 / 事件数不在快照头部，这里完整加载每个快照并重放事件日志（只在首次迁移
+        或索引与磁盘不一致时发生）；加载失败的会话退回到快速读取的摘要。
+        """
+        rows = []
+        for path in self.storage_dir.glob("*.json"):
+            try:
+                rows.append(self._catalog_row(self._load_session_file(path), path))
+                continue
+            except Exception as e:
+                logger.warning(f"Failed to load session {path.name} for catalog, indexing metadata only: {e}")
+            data = self._read_session_metadata_fast(path)
+            if not data:
+                continue
+            journal = self._journal_path(path)
+            data["snapshot_bytes"] = path.stat().st_size
+            data["journal_bytes"] = journal.stat().st_size if journal.exists() else 0
+            rows.append(data)
+        catalog.clear()
+        catalog.upsert_many(rows)
+        logger.info(f"Rebuilt session catalog with {len(rows)} sessions")
+
+    def _catalog_row(self, session: ReviewSession, path: Path) -> Dict[str, Any]:
+        journal = self._journal_path(path)
+        meta = session.metadata
+        return {
+            "session_id": session.session_id,
+            "name": meta.name or session.session_id,
+            "project_root": meta.project_root,
+            "status": meta.status,
+            "tags": list(meta.tags or []),
+            "created_at": meta.created_at,
+            "updated_at": meta.updated_at,
+            "snapshot_bytes": path.stat().st_size if path.exists() else 0,
+            "journal_bytes": journal.stat().st_size if journal.exists() else 0,
+            "message_count": len(session.conversation.messages),
+            "event_count": len(session.workflow_events),
+        }
+
+    def _remember(self, session: ReviewSession) -> None:
+        """放入 LRU，超出容量时淘汰最久未访问的会话。"""
+        self._sessions[session.session_id] = session
+        self._sessions.move_to_end(session.session_id)
+        self._live_sessions[session.session_id] = session
+        while len(self._sessions) > self._cache_size:
+            self._sessions.popitem(last=False)
 
     def create_session(self, session_id: str, project_root: str | None = None) -> ReviewSession:
         with self._lock:
             session = ReviewSession(session_id, project_root)
-            self._sessions[session_id] = session
+            self._remember(session)
             self.save_session(session)
             return session
 
@@ -187,39 +374,113 @@ class SessionManager:
     
     def _get_session_no_lock(self, session_id: str) -> ReviewSession | None:
         """获取会话（不带锁保护，仅供内部调用）。"""
-        if session_id in self._sessions:
-            return self._sessions[session_id]
+        session = self._sessions.get(session_id) or self._live_sessions.get(session_id)
+        if session is not None:
+            self._remember(session)
+            return session
         
-        # 尝试从磁盘加载
+        # 尝试从磁盘加载：快照 + 重放同一代的事件日志
         path = self.storage_dir / f"{session_id}.json"
         if path.exists():
             try:
-                data = json.loads(path.read_text(encoding="utf-8"))
-                session = ReviewSession.from_dict(data)
-                self._sessions[session_id] = session
+                session = self._load_session_file(path)
+                self._remember(session)
                 return session
             except Exception as e:
                 logger.error(f"Failed to load session {session_id}: {e}")
                 return None
         return None
 
+    def _load_session_file(self, path: Path) -> ReviewSession:
+        """加载快照并重放同一代的事件日志。"""
+        data = json.loads(path.read_text(encoding="utf-8"))
+        session = ReviewSession.from_dict(data)
+        self._replay_journal(session, self._journal_path(path))
+        session.mark_persisted()
+        return session
+
+    @staticmethod
+    def _journal_path(snapshot_path: Path) -> Path:
+        return snapshot_path.with_suffix(".journal.jsonl")
+
+    @staticmethod
+    def _replay_journal(session: ReviewSession, journal_path: Path) -> None:
+        """重放事件日志；跳过其他快照代的记录与写了一半的尾行。"""
+        if not journal_path.exists():
+            return
+        with journal_path.open("r", encoding="utf-8") as fp:
+            for line in fp:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    logger.warning(f"Skipping corrupt journal line for session {session.session_id}")
+                    continue
+                if record.get("gen") != session._snapshot_gen:
+                    continue
+                session.apply_journal_record(record)
+
+    @staticmethod
+    def _serialize_snapshot(session: ReviewSession) -> Tuple[str, int]:
+        """序列化完整快照（调用方需持有会话状态锁）。"""
+        gen = session._snapshot_gen + 1
+        data = session.to_dict()
+        data["snapshot_gen"] = gen
+        return json.dumps(data, ensure_ascii=False), gen
+
+    def _write_snapshot(self, session: ReviewSession, path: Path, payload: str, gen: int) -> None:
+        """原子写入完整快照并开启新一代事件日志。"""
+        tmp = path.with_name(f"{path.name}.tmp")
+        tmp.write_text(payload, encoding="utf-8")
+        os.replace(tmp, path)
+        session._snapshot_gen = gen
+        # 旧日志属于上一代，即使删除失败，加载时也会按代号跳过
+        journal = self._journal_path(path)
+        try:
+            journal.unlink()
+        except FileNotFoundError:
+            pass
+
     def save_session(self, session: ReviewSession) -> None:
-        with self._lock:
+        """立即保存会话（调用线程中同步写盘）。
+
+        只在会话状态锁内取出待写内容并推进落盘水位，文件 I/O 在锁外进行；
+        同一会话的多次保存由会话写锁串行化，不再占用管理器全局锁。
+        """
+        path = self.storage_dir / f"{session.session_id}.json"
+        with session._write_lock:
             try:
                 # 创建存储目录（如果不存在）
-                self.storage_dir.mkdir(parents=True, exist_ok=True)
-                
-                path = self.storage_dir / f"{session.session_id}.json"
-                
-                # 创建会话目录（如果不存在）
                 path.parent.mkdir(parents=True, exist_ok=True)
                 
-                # 保存会话数据
-                path.write_text(json.dumps(session.to_dict(), ensure_ascii=False, indent=2), encoding="utf-8")
-                
-                # 清除索引缓存，确保下次列表加载时获取最新数据
-                self._session_index.pop(str(path), None)
+                # 保存会话数据：能用追加表达的变化只写事件日志，否则（或日志过大时）改写快照
+                snapshot: Tuple[str, int] | None = None
+                line: str | None = None
+                with session._state_lock:
+                    delta = session.journal_delta() if path.exists() else None
+                    if delta is None:
+                        snapshot = self._serialize_snapshot(session)
+                    elif delta:
+                        delta["gen"] = session._snapshot_gen
+                        line = json.dumps(delta, ensure_ascii=False) + "\n"
+                    session.mark_persisted()
+
+                if snapshot is not None:
+                    self._write_snapshot(session, path, *snapshot)
+                elif line is not None:
+                    journal = self._journal_path(path)
+                    with journal.open("a", encoding="utf-8") as fp:
+                        fp.write(line)
+                    if journal.stat().st_size > _journal_max_bytes():
+                        with session._state_lock:
+                            snapshot = self._serialize_snapshot(session)
+                            session.mark_persisted()
+                        self._write_snapshot(session, path, *snapshot)
             except Exception as e:
+                # 水位已推进但内容未落盘：下次保存改写完整快照
+                session._persisted = None
                 # 统一异常处理，确保所有操作都被尝试
                 logger.error(f"Failed to save session {session.session_id}: {e}")
                 
@@ -228,22 +489,67 @@ class SessionManager:
                     import tempfile
                     temp_dir = tempfile.gettempdir()
                     temp_path = Path(temp_dir) / f"session_{session.session_id}.json"
-                    temp_path.write_text(json.dumps(session.to_dict(), ensure_ascii=False, indent=2), encoding="utf-8")
+                    with session._state_lock:
+                        payload = json.dumps(session.to_dict(), ensure_ascii=False, indent=2)
+                    temp_path.write_text(payload, encoding="utf-8")
                     logger.warning(f"Session {session.session_id} saved to temporary directory: {temp_path.name}")
                 except Exception as temp_err:
                     logger.error(f"Failed to save session {session.session_id} to temporary directory: {temp_err}")
+                return
+
+        with self._lock:
+            # 清除索引缓存，确保下次列表加载时获取最新数据
+            self._session_index.pop(str(path), None)
+            if self._catalog is not None:
+                try:
+                    self._catalog.upsert(self._catalog_row(session, path))
+                except Exception as e:
+                    logger.error(f"Failed to update session catalog for {session.session_id}: {e}")
+
+    def mark_dirty(self, session: ReviewSession) -> None:
+        """标记会话待保存：防抖窗口内的多次保存由后台线程合并为一次写盘。"""
+        self._writer.mark_dirty(session)
+
+    def flush_session(self, session: ReviewSession) -> None:
+        """立即保存会话并取消其待合并的保存（final / error 等关键节点调用）。"""
+        self._writer.discard(session.session_id)
+        self.save_session(session)
+
+    def close(self) -> None:
+        """写出所有待保存的会话并停止后台保存线程（服务关闭时调用）。"""
+        self._writer.shutdown()
+
+    def writer_stats(self) -> Dict[str, Any]:
+        """后台保存线程的合并 / 写盘计数。"""
+        return self._writer.stats()
 
     def delete_session(self, session_id: str) -> None:
         """删除会话。"""
+        self._writer.discard(session_id)
         with self._lock:
-            # 删除内存中的会话
-            if session_id in self._sessions:
-                del self._sessions[session_id]
+            # 删除内存中的会话；等待进行中的后台保存结束，避免删除后文件被重新写出
+            live = self._sessions.pop(session_id, None) or self._live_sessions.pop(session_id, None)
+            self._live_sessions.pop(session_id, None)
+            if live is not None:
+                with live._write_lock:
+                    pass
+            if self._catalog is not None:
+                try:
+                    self._catalog.delete(session_id)
+                except Exception as e:
+                    logger.error(f"Failed to remove session {session_id} from catalog: {e}")
             
             # 清除索引缓存并删除磁盘上的会话文件
             path = self.storage_dir / f"{session_id}.json"
             self._session_index.pop(str(path), None)
             
+            try:
+                self._journal_path(path).unlink()
+            except FileNotFoundError:
+                pass
+            except Exception as e:
+                logger.warning(f"Failed to delete session journal {session_id}: {e}")
+
             if path.exists():
                 try:
                     path.unlink()
@@ -274,8 +580,85 @@ class SessionManager:
                 self.save_session(session)
             return session
 
+    def query_sessions(
+        self,
+        *,
+        status: str | None = None,
+        project_root: str | None = None,
+        tag: str | None = None,
+        search: str | None = None,
+        updated_before: str | None = None,
+        exclude_status: str | None = None,
+        sort: str = "updated_at",
+        descending: bool = True,
+        limit: int | None = 50,
+        offset: int = 0,
+    ) -> Tuple[List[Dict[str, Any]], int]:
+        """分页、过滤、排序查询会话摘要，返回 (当前页, 过滤后总数)。"""
+        if self._catalog is not None:
+            return self._catalog.query(
+                status=status,
+                project_root=project_root,
+                tag=tag,
+                search=search,
+                updated_before=updated_before,
+                exclude_status=exclude_status,
+                sort=sort,
+                descending=descending,
+                limit=limit,
+                offset=offset,
+            )
+        # 无目录索引：扫描目录后在内存中过滤
+        keyword = (search or "").strip().lower()
+        rows = []
+        for s in self._scan_sessions():
+            if status and s.get("status") != status:
+                continue
+            if exclude_status and s.get("status") == exclude_status:
+                continue
+            if project_root and s.get("project_root") != project_root:
+                continue
+            if updated_before and not (s.get("updated_at") or "") < updated_before:
+                continue
+            if keyword and keyword not in f"{s.get('name') or ''} {s['session_id']}".lower():
+                continue
+            if tag:
+                full = self.get_session(s["session_id"])
+                if not full or tag not in (full.metadata.tags or []):
+                    continue
+            rows.append(s)
+        rows.sort(key=lambda x: x.get(sort) or "", reverse=descending)
+        total = len(rows)
+        if limit is not None:
+            rows = rows[offset:offset + limit]
+        return rows, total
+
+    def session_stats(self) -> Dict[str, Any]:
+        """会话总数、按状态 / 项目分布与消息总数。"""
+        if self._catalog is not None:
+            return self._catalog.stats()
+        by_status: Dict[str, int] = {}
+        by_project: Dict[str, int] = {}
+        sessions = self._scan_sessions()
+        for s in sessions:
+            status = s.get("status") or "unknown"
+            by_status[status] = by_status.get(status, 0) + 1
+            project = s.get("project_root") or "unknown"
+            by_project[project] = by_project.get(project, 0) + 1
+        return {
+            "total_sessions": len(sessions),
+            "by_status": by_status,
+            "by_project": by_project,
+            "total_messages": 0,
+        }
+
     def list_sessions(self) -> List[Dict[str, Any]]:
-        """列出所有会话摘要。
+        """列出所有会话摘要（按更新时间倒序）。"""
+        rows, _ = self.query_sessions(limit=None)
+        return rows
+
+    def _scan_sessions(self) -> List[Dict[str, Any]]:
+        """扫描目录列出所有会话摘要（目录索引不可用时的回退路径）。
         
         性能优化：
         - 使用内存索引缓存，基于文件修改时间增量更新
@@ -291,6 +674,9 @@ class SessionManager:
                 
                 try:
                     file_mtime = path.stat().st_mtime
+                    journal = self._journal_path(path)
+                    if journal.exists():
+                        file_mtime = (file_mtime, journal.stat().st_mtime)
                     
                     # 检查缓存是否有效
                     cached = self._session_index.get(path_str)
@@ -321,6 +707,49 @@ class SessionManager:
             return sorted(sessions, key=lambda x: x.get("updated_at") or "", reverse=True)
     
     def _read_session_metadata_fast(self, path: Path) -> Dict[str, Any] | None:
+        """读取会话摘要：快照头部的 metadata，再用事件日志最后一条记录中的 metadata 覆盖。"""
+        data = self._read_snapshot_metadata_fast(path)
+        if data is None:
+            return None
+        journal = self._journal_path(path)
+        if journal.exists():
+            meta = self._read_journal_metadata(journal)
+            if meta:
+                data.update({
+                    "name": meta.get("name", data["session_id"]),
+                    "created_at": meta.get("created_at"),
+                    "updated_at": meta.get("updated_at"),
+                    "project_root": meta.get("project_root"),
+                    "status": meta.get("status"),
+                })
+        return data
+
+    @staticmethod
+    def _read_journal_metadata(journal: Path) -> Dict[str, Any] | None:
+        """从事件日志末尾向前读取最后一条完整记录的 metadata（每条记录都带 metadata）。"""
+        try:
+            with journal.open("rb") as fp:
+                fp.seek(0, os.SEEK_END)
+                pos = fp.tell()
+                block = 4096
+                data = b""
+                while pos > 0:
+                    step = min(block, pos)
+                    pos -= step
+                    fp.seek(pos)
+                    data = fp.read(step) + data
+                    body = data.rstrip(b"\n")
+                    nl = body.rfind(b"\n")
+                    if nl >= 0 or pos == 0:
+                        record = json.loads(body[nl + 1:].decode("utf-8"))
+                        meta = record.get("metadata")
+                        return meta if isinstance(meta, dict) else None
+                    block *= 2
+        except Exception as e:
+            logger.warning(f"Failed to read session journal tail {journal.name}: {e}")
+        return None
+
+    def _read_snapshot_metadata_fast(self, path: Path) -> Dict[str, Any] | None:
         """快速读取会话文件的 metadata 部分。
         
         只读取文件前 4KB 来解析 metadata，避免加载完整 JSON。
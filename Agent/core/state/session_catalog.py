@@ -0,0 +1,226 @@
+"""基于 SQLite 的会话目录索引。
+
+会话正文仍然保存在 <id>.json 快照 + <id>.journal.jsonl 事件日志中；这里只维护一份
+可索引的摘要表（名称、项目、状态、时间、大小、消息数），由 SessionManager 在每次
+保存 / 删除时同步更新。列表、分页、排序、按名称搜索与统计都直接查询该表，
+不再扫描目录、解析每个文件头。
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    session_id TEXT PRIMARY KEY,
+    name TEXT,
+    project_root TEXT,
+    status TEXT,
+    tags TEXT,
+    created_at TEXT,
+    updated_at TEXT,
+    snapshot_bytes INTEGER DEFAULT 0,
+    journal_bytes INTEGER DEFAULT 0,
+    message_count INTEGER,
+    event_count INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_sessions_updated ON sessions(updated_at);
+CREATE INDEX IF NOT EXISTS idx_sessions_project ON sessions(project_root, updated_at);
+CREATE INDEX IF NOT EXISTS idx_sessions_status ON sessions(status, updated_at);
+"""
+
+_COLUMNS = (
+    "session_id",
+    "name",
+    "project_root",
+    "status",
+    "tags",
+    "created_at",
+    "updated_at",
+    "snapshot_bytes",
+    "journal_bytes",
+    "message_count",
+    "event_count",
+)
+
+# 允许排序的列（防止拼接任意 SQL）
+SORTABLE_COLUMNS = frozenset({"updated_at", "created_at", "name", "status", "snapshot_bytes", "message_count"})
+
+
+class SessionCatalog:
+    """会话摘要表（线程安全，WAL 模式）。"""
+
+    def __init__(self, db_path: Path) -> None:
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(_SCHEMA)
+            self.fts_mode = self._init_fts()
+            self._conn.commit()
+
+    def _init_fts(self) -> str:
+        """建立名称全文索引：优先 trigram（支持中文子串），其次默认分词，都不可用时退化为 LIKE。"""
+        for tokenize in ("trigram", "unicode61"):
+            try:
+                self._conn.execute(
+                    "CREATE VIRTUAL TABLE IF NOT EXISTS sessions_fts "
+                    f"USING fts5(session_id UNINDEXED, name, tokenize='{tokenize}')"
+                )
+                return tokenize
+            except sqlite3.OperationalError:
+                continue
+        return "like"
+
+    # ------------------------------------------------------------------
+    # 写入
+    # ------------------------------------------------------------------
+
+    def upsert(self, row: Dict[str, Any]) -> None:
+        self.upsert_many([row])
+
+    def upsert_many(self, rows: Iterable[Dict[str, Any]]) -> None:
+        """在一个事务内写入多条摘要。"""
+        with self._lock, self._conn:
+            for row in rows:
+                values = [row.get(col) for col in _COLUMNS]
+                values[_COLUMNS.index("tags")] = json.dumps(row.get("tags") or [], ensure_ascii=False)
+                self._conn.execute(
+                    f"INSERT OR REPLACE INTO sessions ({', '.join(_COLUMNS)}) "
+                    f"VALUES ({', '.join('?' for _ in _COLUMNS)})",
+                    values,
+                )
+                if self.fts_mode != "like":
+                    self._conn.execute("DELETE FROM sessions_fts WHERE session_id = ?", (row["session_id"],))
+                    self._conn.execute(
+                        "INSERT INTO sessions_fts (session_id, name) VALUES (?, ?)",
+                        (row["session_id"], row.get("name") or ""),
+                    )
+
+    def delete(self, session_id: str) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+            if self.fts_mode != "like":
+                self._conn.execute("DELETE FROM sessions_fts WHERE session_id = ?", (session_id,))
+
+    def clear(self) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM sessions")
+            if self.fts_mode != "like":
+                self._conn.execute("DELETE FROM sessions_fts")
+
+    # ------------------------------------------------------------------
+    # 查询
+    # ------------------------------------------------------------------
+
+    def count(self) -> int:
+        with self._lock:
+            return int(self._conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0])
+
+    def query(
+        self,
+        *,
+        status: Optional[str] = None,
+        project_root: Optional[str] = None,
+        tag: Optional[str] = None,
+        search: Optional[str] = None,
+        updated_before: Optional[str] = None,
+        exclude_status: Optional[str] = None,
+        sort: str = "updated_at",
+        descending: bool = True,
+        limit: Optional[int] = 50,
+        offset: int = 0,
+    ) -> Tuple[List[Dict[str, Any]], int]:
+        """分页查询会话摘要，返回 (当前页, 过滤后总数)。"""
+        where: List[str] = []
+        params: List[Any] = []
+        if status:
+            where.append("s.status = ?")
+            params.append(status)
+        if exclude_status:
+            where.append("(s.status IS NULL OR s.status != ?)")
+            params.append(exclude_status)
+        if project_root:
+            where.append("s.project_root = ?")
+            params.append(project_root)
+        if updated_before:
+            where.append("s.updated_at < ?")
+            params.append(updated_before)
+        if tag:
+            where.append("EXISTS (SELECT 1 FROM json_each(s.tags) WHERE json_each.value = ?)")
+            params.append(tag)
+        search = (search or "").strip()
+        if search:
+            if (self.fts_mode == "trigram" and len(search) >= 3) or self.fts_mode == "unicode61":
+                where.append("s.session_id IN (SELECT session_id FROM sessions_fts WHERE sessions_fts MATCH ?)")
+                params.append('"' + search.replace('"', '""') + '"')
+            else:
+                escaped = search.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+                where.append("(s.name LIKE ? ESCAPE '\\' OR s.session_id LIKE ? ESCAPE '\\')")
+                params.extend([f"%{escaped}%", f"%{escaped}%"])
+        clause = f"WHERE {' AND '.join(where)}" if where else ""
+        sort_col = sort if sort in SORTABLE_COLUMNS else "updated_at"
+        order = "DESC" if descending else "ASC"
+
+        with self._lock:
+            total = int(self._conn.execute(f"SELECT COUNT(*) FROM sessions s {clause}", params).fetchone()[0])
+            sql = f"SELECT * FROM sessions s {clause} ORDER BY s.{sort_col} {order}, s.session_id {order}"
+            page_params = list(params)
+            if limit is not None:
+                sql += " LIMIT ? OFFSET ?"
+                page_params.extend([int(limit), max(0, int(offset))])
+            rows = self._conn.execute(sql, page_params).fetchall()
+        return [self._row_to_dict(r) for r in rows], total
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total, messages, snapshot_bytes, journal_bytes = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(message_count), 0), "
+                "COALESCE(SUM(snapshot_bytes), 0), COALESCE(SUM(journal_bytes), 0) FROM sessions"
+            ).fetchone()
+            by_status = {
+                (r[0] or "unknown"): r[1]
+                for r in self._conn.execute("SELECT status, COUNT(*) FROM sessions GROUP BY status")
+            }
+            by_project = {
+                (r[0] or "unknown"): r[1]
+                for r in self._conn.execute("SELECT project_root, COUNT(*) FROM sessions GROUP BY project_root")
+            }
+        return {
+            "total_sessions": int(total),
+            "by_status": by_status,
+            "by_project": by_project,
+            "total_messages": int(messages),
+            "storage_bytes": int(snapshot_bytes) + int(journal_bytes),
+        }
+
+    @staticmethod
+    def _row_to_dict(row: sqlite3.Row) -> Dict[str, Any]:
+        data = dict(row)
+        try:
+            data["tags"] = json.loads(data.get("tags") or "[]")
+        except json.JSONDecodeError:
+            data["tags"] = []
+        data["name"] = data.get("name") or data["session_id"]
+        return data
+
+    def close(self) -> None:
+        with self._lock:
+            try:
+                self._conn.close()
+            except sqlite3.Error:
+                pass
+
+
+__all__ = ["SessionCatalog", "SORTABLE_COLUMNS"]
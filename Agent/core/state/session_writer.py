@@ -0,0 +1,149 @@
+"""会话后台保存器（写合并）。
+
+审查过程中 stream_callback 在事件循环里对每个工具事件、扫描事件都同步调用
+save_session，突发的 tool_result 会对同一会话连续落盘多次。这里改为：
+调用方只把会话标记为脏（mark_dirty），由一个后台线程在防抖窗口内合并同一会话
+的多次保存，只写最后一次状态；持续有新事件时最迟在 max_delay 后强制写一次，
+避免长时间不落盘。final / error / 服务关闭时由调用方显式 flush。
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    from Agent.core.state.session import ReviewSession
+
+logger = logging.getLogger(__name__)
+
+
+class SessionWriter:
+    """按会话合并保存请求的后台写入线程。"""
+
+    def __init__(
+        self,
+        save: Callable[["ReviewSession"], None],
+        *,
+        debounce: float = 0.5,
+        max_delay: Optional[float] = None,
+    ) -> None:
+        self._save = save
+        self.debounce = max(0.0, float(debounce))
+        self.max_delay = max(self.debounce, float(max_delay if max_delay is not None else self.debounce * 5))
+        # session_id -> [会话, 首次标脏时间, 最近标脏时间]
+        self._dirty: Dict[str, List[Any]] = {}
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+        self._stats = {"marked": 0, "coalesced": 0, "written": 0, "flushed": 0, "write_errors": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self.debounce > 0 and not self._closed
+
+    def mark_dirty(self, session: "ReviewSession") -> None:
+        """标记会话待保存；未启用防抖或已关闭时直接同步保存。"""
+        if not self.enabled:
+            self._write(session)
+            return
+        now = time.monotonic()
+        with self._cond:
+            self._stats["marked"] += 1
+            entry = self._dirty.get(session.session_id)
+            if entry is None:
+                self._dirty[session.session_id] = [session, now, now]
+            else:
+                entry[0] = session
+                entry[2] = now
+                self._stats["coalesced"] += 1
+            self._ensure_thread()
+            self._cond.notify()
+
+    def flush(self, session_id: Optional[str] = None) -> None:
+        """立即在调用线程中写出待保存的会话（指定 session_id 时只写该会话）。"""
+        with self._cond:
+            if session_id is None:
+                pending = [entry[0] for entry in self._dirty.values()]
+                self._dirty.clear()
+            else:
+                entry = self._dirty.pop(session_id, None)
+                pending = [entry[0]] if entry else []
+            self._stats["flushed"] += len(pending)
+        for session in pending:
+            self._write(session)
+
+    def discard(self, session_id: str) -> None:
+        """丢弃待保存的会话（会话被删除时调用）。"""
+        with self._cond:
+            self._dirty.pop(session_id, None)
+
+    def shutdown(self, timeout: float = 5.0) -> None:
+        """写出全部待保存的会话并停止后台线程。"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+            thread = self._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout)
+        self.flush()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                "enabled": self.enabled,
+                "debounce_ms": int(self.debounce * 1000),
+                "pending": len(self._dirty),
+                **self._stats,
+            }
+
+    # ------------------------------------------------------------------
+    # 后台线程
+    # ------------------------------------------------------------------
+
+    def _ensure_thread(self) -> None:
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="session-writer", daemon=True)
+            self._thread.start()
+
+    def _take_due(self, now: float) -> Tuple[List["ReviewSession"], Optional[float]]:
+        """取出已到期的会话，并返回距离下一个到期的秒数。"""
+        due: List["ReviewSession"] = []
+        wait: Optional[float] = None
+        for session_id, (session, first, last) in list(self._dirty.items()):
+            deadline = min(last + self.debounce, first + self.max_delay)
+            if deadline <= now:
+                due.append(session)
+                del self._dirty[session_id]
+            else:
+                remaining = deadline - now
+                wait = remaining if wait is None else min(wait, remaining)
+        return due, wait
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while True:
+                    if self._closed:
+                        return
+                    due, wait = self._take_due(time.monotonic())
+                    if due:
+                        break
+                    self._cond.wait(wait)
+            for session in due:
+                self._write(session)
+
+    def _write(self, session: "ReviewSession") -> None:
+        try:
+            self._save(session)
+            with self._cond:
+                self._stats["written"] += 1
+        except Exception as e:
+            with self._cond:
+                self._stats["write_errors"] += 1
+            logger.error(f"Background save failed for session {session.session_id}: {e}")
+
+
+__all__ = ["SessionWriter"]
@@ -0,0 +1,242 @@
+"""带背压策略的 SSE 事件队列。
+
+审查 / 对话接口用 stream_callback 向队列 put_nowait 事件，再由 SSE 响应逐个读出。
+浏览器读得慢或卡住时，无界队列会随审查进度无限增长。这里的队列按以下策略限界：
+
+- 连续的同阶段 chunk/thought 增量直接并入队尾事件，不增加队列长度；
+- 队列达到上限时，先淘汰队列中的低优先级事件（如 static_scan_file_start），
+  仍然放不下时丢弃新到的低优先级事件；两种情况都只在队列中保留一条
+  events_dropped 标记（count 随丢失数累加）。阶段、工具结果、用量等其余事件与
+  增量内容永不丢弃，允许暂时超出上限，由滞后阈值兜底；
+- 断线重连时回放的历史事件（put_backlog）不受上限约束、不参与淘汰，上限只约束实时事件；
+- 记录每个连接的滞后时间（最早一条未读事件的等待时长），超过阈值视为客户端失联：
+  清空积压、只保留终止事件，并通知调用方（通常是取消后台审查任务）。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+import weakref
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional
+
+from Agent.core.logging.fallback_tracker import record_fallback
+
+# 永不丢弃的终止类事件
+CRITICAL_EVENT_TYPES = frozenset({"final", "error", "done"})
+# 队列满时优先淘汰的低优先级事件
+DROPPABLE_EVENT_TYPES = frozenset({
+    "static_scan_file_start",
+    "static_scan_file_done",
+    "scanner_progress",
+    "tool_start",
+})
+_DELTA_TYPES = frozenset({"chunk", "thought"})
+# 队列满时丢弃低优先级事件后插入的标记事件
+DROPPED_MARKER_TYPE = "events_dropped"
+
+_active_queues: "weakref.WeakSet[BoundedEventQueue]" = weakref.WeakSet()
+_totals = {"dropped": 0, "evicted": 0, "coalesced": 0, "lag_disconnects": 0}
+
+
+def _settings() -> Dict[str, Any]:
+    try:
+        from Agent.core.api.config import get_sse_queue_settings
+        return get_sse_queue_settings()
+    except Exception:
+        return {"max_events": 2000, "max_lag": 120.0}
+
+
+def _is_delta(evt: Dict[str, Any]) -> bool:
+    # 允许携带事件日志序号 seq（见 review_jobs）
+    return (
+        evt.get("type") in _DELTA_TYPES
+        and isinstance(evt.get("content"), str)
+        and len(evt) - ("seq" in evt) <= 3
+    )
+
+
+class BoundedEventQueue(asyncio.Queue):
+    """asyncio.Queue 的子类：put 永不阻塞生产者，按策略合并 / 丢弃事件。"""
+
+    def __init__(
+        self,
+        label: str = "",
+        *,
+        max_events: Optional[int] = None,
+        max_lag: Optional[float] = None,
+        on_lag: Optional[Callable[[float], None]] = None,
+    ) -> None:
+        # 父类保持无界，由 put_nowait 实施策略（避免生产者被阻塞）
+        super().__init__()
+        settings = _settings()
+        self.label = label
+        self.max_events = max(1, int(settings["max_events"] if max_events is None else max_events))
+        self.max_lag = float(settings["max_lag"] if max_lag is None else max_lag)
+        self.on_lag = on_lag
+        self.created_at = time.monotonic()
+        self.closed = False
+        self.max_lag_seen = 0.0
+        self.stats_counters = {"enqueued": 0, "dropped": 0, "evicted": 0, "coalesced": 0}
+        # 仍在队列中未被读取的丢弃标记（读取后置空，下次丢弃时重新插入）
+        self._drop_marker: Optional[Dict[str, Any]] = None
+        # 队列中尚未读取的回放事件数（不计入 max_events）
+        self._backlog = 0
+        self._putting_backlog = False
+        _active_queues.add(self)
+
+    # asyncio.Queue 的存储钩子：元素为 [入队时间, 事件, 是否为回放事件]
+    def _init(self, maxsize: int) -> None:
+        self._queue = deque()
+
+    def _put(self, item: Any) -> None:
+        self._queue.append([time.monotonic(), item, self._putting_backlog])
+        if self._putting_backlog:
+            self._backlog += 1
+
+    def _get(self) -> Any:
+        _, item, replayed = self._queue.popleft()
+        if replayed:
+            self._backlog -= 1
+        if item is self._drop_marker:
+            self._drop_marker = None
+        if item.get("type") == "done":
+            # 连接已读到终止事件，不再计入活跃连接
+            _active_queues.discard(self)
+        return item
+
+    def lag(self) -> float:
+        """最早一条未读事件已等待的秒数。"""
+        if not self._queue:
+            return 0.0
+        return time.monotonic() - self._queue[0][0]
+
+    async def put(self, item: Dict[str, Any]) -> None:
+        self.put_nowait(item)
+
+    def put_backlog(self, item: Dict[str, Any]) -> None:
+        """写入回放的历史事件：不合并、不淘汰，也不占用实时事件的 max_events 名额。"""
+        if self.closed:
+            return
+        self._putting_backlog = True
+        try:
+            # 实时增量可能就地并入队尾，入队副本避免修改事件日志中的记录
+            super().put_nowait(dict(item) if _is_delta(item) else item)
+        finally:
+            self._putting_backlog = False
+        self.stats_counters["enqueued"] += 1
+
+    def put_nowait(self, item: Dict[str, Any]) -> None:
+        if self.closed:
+            return
+        evt_type = item.get("type")
+
+        if self._queue:
+            lag = self.lag()
+            if lag > self.max_lag_seen:
+                self.max_lag_seen = lag
+            if self.max_lag > 0 and lag > self.max_lag and evt_type not in CRITICAL_EVENT_TYPES:
+                self._disconnect(lag)
+                return
+
+        if _is_delta(item) and self._queue:
+            tail = self._queue[-1][1]
+            if tail.get("type") == evt_type and tail.get("stage") == item.get("stage") and _is_delta(tail):
+                tail["content"] += item["content"]
+                if "seq" in item:
+                    # 合并后的事件携带最后一个序号，断线重连时从其后继续回放
+                    tail["seq"] = item["seq"]
+                self._count("coalesced")
+                return
+
+        if self.qsize() - self._backlog >= self.max_events and evt_type not in CRITICAL_EVENT_TYPES:
+            if not self._evict_one() and evt_type in DROPPABLE_EVENT_TYPES:
+                self._count("dropped")
+                self._note_lost()
+                return
+            # 其余事件不丢弃：允许短暂超出上限，由滞后阈值兜底
+
+        # 增量可能在后续被就地合并，入队副本避免修改调用方持有的对象
+        super().put_nowait(dict(item) if _is_delta(item) else item)
+        self.stats_counters["enqueued"] += 1
+
+    def _evict_one(self) -> bool:
+        for idx, (_, evt, replayed) in enumerate(self._queue):
+            if not replayed and evt.get("type") in DROPPABLE_EVENT_TYPES:
+                del self._queue[idx]
+                self._count("evicted")
+                self._note_lost()
+                return True
+        return False
+
+    def _note_lost(self) -> None:
+        """通过队列中唯一的标记事件告知客户端有事件未送达。"""
+        if self._drop_marker is not None:
+            self._drop_marker["count"] += 1
+            return
+        self._drop_marker = {"type": DROPPED_MARKER_TYPE, "count": 1, "reason": "queue_full"}
+        super().put_nowait(self._drop_marker)
+
+    def _count(self, key: str) -> None:
+        self.stats_counters[key] += 1
+        _totals[key] += 1
+
+    def _disconnect(self, lag: float) -> None:
+        """客户端滞后超过阈值：丢弃积压，只留终止事件，后续事件一律忽略。"""
+        dropped = len(self._queue)
+        self._queue.clear()
+        self._drop_marker = None
+        self._backlog = 0
+        self.stats_counters["dropped"] += dropped
+        _totals["dropped"] += dropped
+        _totals["lag_disconnects"] += 1
+        super().put_nowait({
+            "type": "error",
+            "message": f"客户端接收过慢（滞后 {lag:.0f}s），已断开事件流",
+            "reason": "client_lag",
+        })
+        super().put_nowait({"type": "done"})
+        self.closed = True
+        record_fallback(
+            "sse_client_lag_disconnect",
+            "SSE 客户端接收过慢，已断开事件流",
+            meta={"label": self.label, "lag_seconds": round(lag, 1), "dropped": dropped},
+        )
+        if self.on_lag is not None:
+            try:
+                self.on_lag(lag)
+            except Exception:
+                pass
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "label": self.label,
+            "depth": self.qsize(),
+            "backlog": self._backlog,
+            "lag_seconds": round(self.lag(), 3),
+            "max_lag_seconds": round(self.max_lag_seen, 3),
+            "age_seconds": round(time.monotonic() - self.created_at, 1),
+            "closed": self.closed,
+            **self.stats_counters,
+        }
+
+
+def get_event_queue_stats() -> Dict[str, Any]:
+    """活跃 SSE 连接的队列深度 / 滞后，以及进程级丢弃、合并、断开计数。"""
+    connections: List[Dict[str, Any]] = [q.stats() for q in list(_active_queues)]
+    return {
+        "active_connections": len(connections),
+        "max_lag_seconds": max((c["lag_seconds"] for c in connections), default=0.0),
+        "connections": connections,
+        **_totals,
+    }
+
+
+__all__ = [
+    "BoundedEventQueue",
+    "CRITICAL_EVENT_TYPES",
+    "DROPPABLE_EVENT_TYPES",
+    "DROPPED_MARKER_TYPE",
+    "get_event_queue_stats",
+]
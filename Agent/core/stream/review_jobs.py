@@ -0,0 +1,242 @@
+"""与 HTTP 连接解耦的审查任务。
+
+原先审查任务由 /api/review/start 的 SSE 响应直接持有：浏览器断线即取消任务，
+已经花费的 LLM 调用全部作废。这里把审查作为服务端任务运行，事件写入带递增
+序号（seq）的事件日志，SSE 连接只是日志的订阅者：
+
+- 任意客户端可通过 after=N 重新订阅：先回放 seq > N 的事件，再接续实时事件；
+  回放不受订阅队列的 max_events 限制，上限只约束实时事件；
+- 连续的同阶段 chunk/thought 增量在日志中折叠为一条记录（seq 取最后一个），
+  并记录每段的序号与结束位置，从折叠记录中间续传时只回放其后的内容；
+- 多个订阅者可以同时观看同一审查；
+- 断开连接不再取消任务，取消需显式调用 cancel；
+- 任务结束后保留一段时间供断线客户端补齐事件，之后从注册表移除。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+
+from Agent.core.stream.event_queue import BoundedEventQueue, _is_delta
+
+# 日志条目：(最后序号, 事件, 折叠增量的 [(序号, 内容结束位置)]；非增量为 None)
+_LogEntry = Tuple[int, Dict[str, Any], Optional[List[Tuple[int, int]]]]
+
+
+def _settings() -> Dict[str, Any]:
+    try:
+        from Agent.core.api.config import get_review_job_settings
+        return get_review_job_settings()
+    except Exception:
+        return {"log_size": 20000, "retention": 600.0}
+
+
+class ReviewJob:
+    """一次后台审查：事件日志 + 订阅者集合（仅在事件循环线程内访问）。"""
+
+    def __init__(self, session_id: str, *, log_size: int = 20000) -> None:
+        self.session_id = session_id
+        self.status = "running"  # running, completed, failed, cancelled
+        self.created_at = time.time()
+        self.finished_at: Optional[float] = None
+        self.task: Optional[asyncio.Task] = None
+        self._log: Deque[_LogEntry] = deque(maxlen=max(100, int(log_size)))
+        self._seq = 0
+        self._subscribers: List[BoundedEventQueue] = []
+
+    @property
+    def last_seq(self) -> int:
+        return self._seq
+
+    @property
+    def done(self) -> bool:
+        return self.finished_at is not None
+
+    def _first_seq(self) -> int:
+        """日志中仍可回放的最小序号。"""
+        if not self._log:
+            return 0
+        seq, _, bounds = self._log[0]
+        return bounds[0][0] if bounds else seq
+
+    def _append_log(self, record: Dict[str, Any]) -> None:
+        """写入事件日志；连续的同阶段增量并入上一条记录。"""
+        seq = record["seq"]
+        if _is_delta(record):
+            if self._log:
+                _, last, bounds = self._log[-1]
+                if (
+                    bounds is not None
+                    and last.get("type") == record.get("type")
+                    and last.get("stage") == record.get("stage")
+                ):
+                    # 生成新对象：旧记录可能仍在订阅者队列中
+                    merged = {**last, "content": last["content"] + record["content"], "seq": seq}
+                    bounds.append((seq, len(merged["content"])))
+                    self._log[-1] = (seq, merged, bounds)
+                    return
+            self._log.append((seq, record, [(seq, len(record["content"]))]))
+            return
+        self._log.append((seq, record, None))
+
+    def emit(self, evt: Dict[str, Any]) -> Dict[str, Any]:
+        """为事件分配序号、写入日志并分发给所有订阅者。"""
+        if self.done:
+            return evt
+        self._seq += 1
+        record = {**evt, "seq": self._seq}
+        self._append_log(record)
+        for queue in list(self._subscribers):
+            queue.put_nowait(record)
+        if record.get("type") == "done":
+            self.finished_at = time.time()
+            self._subscribers.clear()
+        return record
+
+    def subscribe(self, after: int = 0) -> BoundedEventQueue:
+        """订阅事件：先回放 seq > after 的日志，再接收实时事件。"""
+        queue = BoundedEventQueue(label=f"review:{self.session_id}")
+        # 客户端滞后过久时只断开这个订阅者，审查继续运行，客户端可按 seq 重新订阅
+        queue.on_lag = lambda _lag: self.unsubscribe(queue)
+        first_seq = self._first_seq()
+        if self._log and after + 1 < first_seq:
+            queue.put_backlog({
+                "type": "warning",
+                "message": f"事件日志已截断，seq {after + 1}~{first_seq - 1} 无法回放",
+                "reason": "replay_truncated",
+            })
+        for seq, record, bounds in self._log:
+            if seq <= after:
+                continue
+            if bounds is not None and bounds[0][0] <= after:
+                # 客户端已收到折叠记录的前半部分，只回放之后的内容
+                offset = next(end for piece_seq, end in reversed(bounds) if piece_seq <= after)
+                record = {**record, "content": record["content"][offset:]}
+            queue.put_backlog(record)
+        if not self.done:
+            self._subscribers.append(queue)
+        elif after >= self._seq:
+            # 客户端已收到全部事件（包括 done），补发终止事件以结束本次订阅
+            queue.put_backlog({"type": "done", "seq": self._seq})
+        return queue
+
+    def unsubscribe(self, queue: BoundedEventQueue) -> None:
+        try:
+            self._subscribers.remove(queue)
+        except ValueError:
+            pass
+
+    def cancel(self) -> bool:
+        if self.task is None or self.task.done():
+            return False
+        self.status = "cancelled"
+        self.task.cancel()
+        return True
+
+    def info(self) -> Dict[str, Any]:
+        return {
+            "session_id": self.session_id,
+            "status": self.status,
+            "last_seq": self._seq,
+            "first_seq": self._first_seq(),
+            "subscribers": len(self._subscribers),
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class ReviewJobRegistry:
+    """进程级审查任务注册表（单例）。"""
+
+    _instance: Optional["ReviewJobRegistry"] = None
+    _lock = threading.Lock()
+
+    def __new__(cls) -> "ReviewJobRegistry":
+        if cls._instance is None:
+            with cls._lock:
+                if cls._instance is None:
+                    cls._instance = super().__new__(cls)
+                    cls._instance._initialized = False
+        return cls._instance
+
+    def __init__(self) -> None:
+        if self._initialized:
+            return
+        self._jobs: Dict[str, ReviewJob] = {}
+        self._initialized = True
+
+    def get(self, session_id: str) -> Optional[ReviewJob]:
+        self._prune()
+        return self._jobs.get(session_id)
+
+    def is_running(self, session_id: str) -> bool:
+        job = self.get(session_id)
+        return job is not None and not job.done
+
+    def create(self, session_id: str) -> ReviewJob:
+        """登记新任务（同一会话的旧任务被替换）。"""
+        self._prune()
+        job = ReviewJob(session_id, log_size=_settings()["log_size"])
+        self._jobs[session_id] = job
+        return job
+
+    def start(self, job: ReviewJob, runner: Callable[[], Awaitable[None]]) -> ReviewJob:
+        """在事件循环中启动任务；任务以任何方式结束后都会补发 done 事件。"""
+
+        async def _run() -> None:
+            try:
+                await runner()
+                if job.status == "running":
+                    job.status = "completed"
+            except asyncio.CancelledError:
+                job.status = "cancelled"
+                job.emit({"type": "error", "message": "审查已取消", "reason": "cancelled"})
+            except Exception as exc:
+                job.status = "failed"
+                job.emit({"type": "error", "message": str(exc)})
+            finally:
+                job.emit({"type": "done"})
+
+        job.task = asyncio.create_task(_run())
+        return job
+
+    def cancel(self, session_id: str) -> bool:
+        job = self._jobs.get(session_id)
+        return job.cancel() if job is not None else False
+
+    def list_jobs(self) -> List[Dict[str, Any]]:
+        self._prune()
+        return [job.info() for job in self._jobs.values()]
+
+    def _prune(self) -> None:
+        """移除结束超过保留期的任务。"""
+        retention = float(_settings()["retention"])
+        now = time.time()
+        expired = [
+            sid for sid, job in self._jobs.items()
+            if job.finished_at is not None and now - job.finished_at > retention
+        ]
+        for sid in expired:
+            self._jobs.pop(sid, None)
+
+
+_registry: Optional[ReviewJobRegistry] = None
+
+
+def get_review_jobs() -> ReviewJobRegistry:
+    """获取审查任务注册表单例。"""
+    global _registry
+    if _registry is None:
+        _registry = ReviewJobRegistry()
+    return _registry
+
+
+__all__ = [
+    "ReviewJob",
+    "ReviewJobRegistry",
+    "get_review_jobs",
+]
@@ -0,0 +1,70 @@
+"""字节级 SSE 分帧与 JSON 解码。
+
+直接在 ``aiter_bytes`` 返回的字节块上按 ``\\n`` 切分事件行，避免逐行解码成
+str 再 strip/removeprefix；``data:`` 载荷以 bytes 形式交给 JSON 解析器。
+安装了 orjson 时优先使用（可选依赖），否则回退到标准库 json（同样接受 bytes）。
+"""
+
+from __future__ import annotations
+
+import json
+from typing import Any, AsyncIterator, Callable
+
+try:  # pragma: no cover - 取决于运行环境
+    import orjson as _orjson
+except Exception:  # pragma: no cover
+    _orjson = None
+
+_DATA_PREFIX = b"data:"
+_DONE = b"[DONE]"
+
+# orjson.JSONDecodeError 与 json.JSONDecodeError 都是 ValueError 的子类
+JSONDecodeError = ValueError
+
+json_loads: Callable[[Any], Any] = _orjson.loads if _orjson is not None else json.loads
+JSON_BACKEND = "orjson" if _orjson is not None else "json"
+
+
+def _payload_of(line: bytes) -> bytes:
+    """提取一行 SSE 的数据载荷；注释、空行与结束标记返回空串。"""
+    if not line or line[:1] == b":":
+        return b""
+    if line.startswith(_DATA_PREFIX):
+        line = line[len(_DATA_PREFIX):]
+    # 兼容有些非标 API 直接返回 JSON 而没有 data: 前缀
+    data = line.strip()
+    if data == _DONE:
+        return b""
+    return data
+
+
+async def iter_sse_data(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    """将任意切分的字节块重组为 SSE 数据载荷序列。"""
+    buffer = b""
+    async for block in chunks:
+        if not block:
+            continue
+        if buffer:
+            block = buffer + block
+        start = 0
+        while True:
+            end = block.find(b"\n", start)
+            if end < 0:
+                break
+            data = _payload_of(block[start:end])
+            start = end + 1
+            if data:
+                yield data
+        buffer = block[start:]
+    if buffer:
+        data = _payload_of(buffer)
+        if data:
+            yield data
+
+
+__all__ = [
+    "JSONDecodeError",
+    "JSON_BACKEND",
+    "iter_sse_data",
+    "json_loads",
+]
@@ -0,0 +1,178 @@
+"""服务端 SSE 帧合并。
+
+审查过程中 stream_callback 对每个内容/思考增量都会入队一个 chunk/thought 事件，
+逐个 json.dumps 并各自输出一帧会产生数万个极小的 SSE 帧。这里把同一阶段、
+同一类型的连续增量在一个短时间窗口（或字节阈值）内合并成一帧；遇到任何
+非增量事件先刷出已缓冲的增量再原样输出，保证事件相对顺序不变。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+# 可合并的增量事件类型（内容只追加，不携带其他字段）
+COALESCIBLE_TYPES = frozenset({"chunk", "thought"})
+
+
+class _FrameStats:
+    """进程级 SSE 帧计数（仅在事件循环线程内更新）。"""
+
+    def __init__(self) -> None:
+        self.reset()
+
+    def reset(self) -> None:
+        self.events_in = 0
+        self.delta_events_in = 0
+        self.frames_out = 0
+        self.bytes_out = 0
+        self.streams = 0
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "streams": self.streams,
+            "events_in": self.events_in,
+            "delta_events_in": self.delta_events_in,
+            "frames_out": self.frames_out,
+            "bytes_out": self.bytes_out,
+            "events_per_frame": (self.events_in / self.frames_out) if self.frames_out else 0.0,
+        }
+
+
+_stats = _FrameStats()
+
+
+def get_sse_frame_stats() -> Dict[str, Any]:
+    """获取 SSE 帧合并统计（供 /api/metrics 展示）。"""
+    return _stats.snapshot()
+
+
+def _settings() -> Dict[str, Any]:
+    try:
+        from Agent.core.api.config import get_sse_coalesce_settings
+        return get_sse_coalesce_settings()
+    except Exception:
+        return {"window": 0.04, "max_bytes": 8192}
+
+
+def encode_frame(evt: Dict[str, Any]) -> str:
+    frame = f"data: {json.dumps(evt, ensure_ascii=False)}\n\n"
+    _stats.frames_out += 1
+    _stats.bytes_out += len(frame)
+    return frame
+
+
+class SSEFrameCoalescer:
+    """把连续的同类增量事件合并为一帧。"""
+
+    def __init__(self, max_bytes: int = 8192) -> None:
+        self.max_bytes = max_bytes
+        self._key: Optional[tuple] = None
+        self._seq: Optional[int] = None
+        self._parts: List[str] = []
+        self._size = 0
+        self.started_at = 0.0
+
+    @property
+    def pending(self) -> bool:
+        return bool(self._parts)
+
+    def feed(self, evt: Dict[str, Any]) -> List[str]:
+        """输入一个事件，返回此刻应输出的帧（可能为空）。"""
+        _stats.events_in += 1
+        evt_type = evt.get("type")
+        content = evt.get("content")
+        if evt_type in COALESCIBLE_TYPES and isinstance(content, str) and len(evt) - ("seq" in evt) <= 3:
+            _stats.delta_events_in += 1
+            frames: List[str] = []
+            key = (evt_type, evt.get("stage"))
+            if self._parts and key != self._key:
+                frames.append(self.flush())
+            if not self._parts:
+                self._key = key
+                self.started_at = time.monotonic()
+            self._parts.append(content)
+            self._size += len(content)
+            if "seq" in evt:
+                self._seq = evt["seq"]
+            if self._size >= self.max_bytes:
+                frames.append(self.flush())
+            return frames
+
+        frames = [self.flush()] if self._parts else []
+        frames.append(encode_frame(evt))
+        return frames
+
+    def flush(self) -> str:
+        """输出已缓冲的增量（调用方需保证 pending 为真）。"""
+        evt_type, stage = self._key or ("chunk", None)
+        merged = {"type": evt_type, "content": "".join(self._parts), "stage": stage}
+        if self._seq is not None:
+            # 合并帧携带其中最后一个事件的序号
+            merged["seq"] = self._seq
+        self._parts = []
+        self._size = 0
+        self._key = None
+        self._seq = None
+        return encode_frame(merged)
+
+
+async def iter_coalesced_frames(
+    queue: "asyncio.Queue[Dict[str, Any]]",
+    *,
+    stop_types: frozenset = frozenset({"done"}),
+    window: Optional[float] = None,
+    max_bytes: Optional[int] = None,
+) -> AsyncIterator[str]:
+    """从事件队列读取并输出 SSE 帧，直到遇到 stop_types 中的事件。
+
+    window 为合并窗口（秒），<=0 时退化为逐事件输出。
+    """
+    if window is None or max_bytes is None:
+        settings = _settings()
+        window = settings["window"] if window is None else window
+        max_bytes = settings["max_bytes"] if max_bytes is None else max_bytes
+    _stats.streams += 1
+
+    if window <= 0:
+        while True:
+            evt = await queue.get()
+            _stats.events_in += 1
+            yield encode_frame(evt)
+            if evt.get("type") in stop_types:
+                return
+
+    coalescer = SSEFrameCoalescer(max_bytes=max_bytes)
+    while True:
+        if coalescer.pending:
+            remaining = window - (time.monotonic() - coalescer.started_at)
+            if remaining <= 0:
+                yield coalescer.flush()
+                continue
+            try:
+                # 队列里已有事件时直接取，避免每个增量都创建超时任务
+                evt = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                try:
+                    evt = await asyncio.wait_for(queue.get(), timeout=remaining)
+                except asyncio.TimeoutError:
+                    yield coalescer.flush()
+                    continue
+        else:
+            evt = await queue.get()
+
+        for frame in coalescer.feed(evt):
+            yield frame
+        if evt.get("type") in stop_types:
+            return
+
+
+__all__ = [
+    "COALESCIBLE_TYPES",
+    "SSEFrameCoalescer",
+    "encode_frame",
+    "get_sse_frame_stats",
+    "iter_coalesced_frames",
+]
@@ -3,6 +3,7 @@
 from __future__ import annotations
 
 import json
+import os
 import re
 from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple, TypedDict, Union
 
@@ -26,6 +27,9 @@ class NormalizedMessage(TypedDict, total=False):
     provider: str
     tool_schemas: List[Union[Dict[str, Any], Any]] | None
     usage: Dict[str, Any] | None
+    cache_key: str
+    cache: str
+    route: Dict[str, Any]
 
 
 class StreamProcessor:
@@ -33,6 +37,12 @@ class StreamProcessor:
 
     _REASONING_KEYS = ("reasoning", "reasoning_content", "reasoning_details", "analysis", "thoughts")
     _MAX_JSON_NESTING = 50
+
+    def __init__(self, keep_raw_chunks: Optional[bool] = None) -> None:
+        # 默认不保留原始片段（长推理输出可达数万个 chunk）；调试时用 LLM_STREAM_KEEP_RAW=1 打开
+        if keep_raw_chunks is None:
+            keep_raw_chunks = os.getenv("LLM_STREAM_KEEP_RAW", "").strip().lower() in {"1", "true", "yes", "on"}
+        self.keep_raw_chunks = keep_raw_chunks
     
     @staticmethod
     def _safe_json_loads(s: str, max_nesting: int = 50) -> Any:
@@ -123,11 +133,15 @@ class StreamProcessor:
         finish_reason: str | None = None
         tool_call_buffer: Dict[int, Dict[str, Any]] = {}
         raw_chunks: List[Dict[str, Any]] = []
+        keep_raw = self.keep_raw_chunks
+        chunk_count = 0
         last_usage: Dict[str, Any] | None = None
 
         # 处理每个流式片段
         async for chunk in stream:
-            raw_chunks.append(chunk)
+            chunk_count += 1
+            if keep_raw:
+                raw_chunks.append(chunk)
             delta = chunk.get("delta", {})
             
             # 更新基本信息
@@ -244,6 +258,6 @@ class StreamProcessor:
             "reasoning": reasoning or None,
             "tool_calls": tool_calls,
             "finish_reason": finish_reason,
-            "raw": {"chunks": raw_chunks, "source": "stream"},
+            "raw": {"chunks": raw_chunks, "chunk_count": chunk_count, "source": "stream"},
             "usage": last_usage,
         }
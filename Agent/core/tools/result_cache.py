@@ -0,0 +1,118 @@
+"""工具结果缓存：在单次审查内复用相同工具调用的结果。
+
+审查 Agent 在多轮对话中经常重复发起完全相同的调用（同一 read_file_hunk 区间、
+同一 search_in_project 关键字等），每次都会重新读盘/跑 git。这里按
+(工具名, 规范化参数, 仓库状态指纹) 作为键缓存成功结果；是否可缓存与 TTL 由工具自行声明。
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from Agent.core.context.runtime_context import get_project_root
+from Agent.core.logging.metrics import record_cache
+from Agent.DIFF.git_operations import _run_git_quiet
+
+CacheKey = Tuple[str, str, str]
+
+
+def canonical_arguments(args: Any) -> str:
+    """将工具参数规范化为稳定字符串（键排序、紧凑分隔）。"""
+    try:
+        return json.dumps(args, sort_keys=True, ensure_ascii=False, separators=(",", ":"), default=str)
+    except Exception:
+        return repr(args)
+
+
+def repo_fingerprint(root: Optional[str] = None) -> str:
+    """计算仓库状态指纹：项目根 + HEAD + 工作区状态摘要。
+
+    需要运行两次 git，ToolRuntime 每次审查只计算一次（见 ToolRuntime._repo_fingerprint）。
+    工作区状态只看 `git status --porcelain` 的输出，审查期间文件被编辑不会反映到指纹上，
+    这部分由工具声明的 cache_ttl 兜底。非 Git 目录或 git 失败时退化为仅项目根。
+    """
+    cwd = root if root is not None else (get_project_root() or None)
+    parts = [str(cwd or "")]
+    try:
+        head = _run_git_quiet("rev-parse", "HEAD", cwd=cwd)
+        if head.returncode == 0:
+            parts.append(head.stdout.decode("utf-8", errors="replace").strip())
+        status = _run_git_quiet("status", "--porcelain", cwd=cwd)
+        if status.returncode == 0:
+            parts.append(hashlib.sha1(status.stdout).hexdigest())
+    except Exception:
+        pass
+    return "|".join(parts)
+
+
+class ToolResultCache:
+    """审查级工具结果缓存（线程安全，带 TTL 与命中统计）。"""
+
+    def __init__(self, max_entries: int = 512) -> None:
+        self._max_entries = max(1, max_entries)
+        self._entries: Dict[CacheKey, Tuple[float, Dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(name: str, args: Any, fingerprint: str) -> CacheKey:
+        return (name, canonical_arguments(args), fingerprint)
+
+    def get(self, key: CacheKey) -> Optional[Dict[str, Any]]:
+        """命中返回结果副本；过期条目会被移除并计为未命中。"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, result = entry
+                if expires_at <= 0 or now < expires_at:
+                    self.hits += 1
+                    record_cache("tool_result", True)
+                    return dict(result)
+                self._entries.pop(key, None)
+            self.misses += 1
+        record_cache("tool_result", False)
+        return None
+
+    def record_hit(self) -> None:
+        """记录一次未经 get 的命中（同批次内合并的重复调用）。"""
+        with self._lock:
+            self.hits += 1
+        record_cache("tool_result", True)
+
+    def set(self, key: CacheKey, result: Dict[str, Any], ttl: Optional[float]) -> None:
+        """写入成功结果；ttl 为 None/<=0 表示在本次审查内一直有效。"""
+        expires_at = time.monotonic() + ttl if ttl and ttl > 0 else 0.0
+        with self._lock:
+            if key not in self._entries and len(self._entries) >= self._max_entries:
+                # 容量满时丢弃最早写入的条目
+                self._entries.pop(next(iter(self._entries)), None)
+            self._entries[key] = (expires_at, dict(result))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": len(self._entries),
+                "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+            }
+
+
+__all__ = [
+    "ToolResultCache",
+    "canonical_arguments",
+    "repo_fingerprint",
+]
@@ -1,44 +1,326 @@
-"""工具运行时：负责注册与并发执行工具。"""
+"""工具运行时：负责注册与并发执行工具。
+
+同步工具（读文件、git grep 等）放到有界线程池中执行，避免阻塞事件循环
+（否则 gather 实际上是串行的，并且会卡住服务端其它会话的 SSE 推送）；
+每个工具有独立的并发上限与超时。声明为可缓存的工具，其成功结果在本次审查内
+按 (工具名, 规范化参数, 仓库指纹) 复用，见 result_cache。
+
+限制说明：
+- 单工具并发上限按"事件循环 + 工具名"共享：服务端所有审查跑在同一个事件循环上，
+  因此 max_concurrency 约束的是整个进程内该工具同时运行的调用数；
+- Python 线程无法被强制终止：超时只是不再等待结果，工作线程仍占用线程池名额
+  （以及该工具的并发名额）直到真正结束。仍在运行的超时线程数见
+  get_tool_executor_stats()，并在 /api/metrics 的 tool_executor 中暴露。
+"""
 
 from __future__ import annotations
 
 import asyncio
-from typing import Any, Awaitable, Callable, Dict, List, Optional
+import contextvars
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
 import time
 try:
     import psutil  # type: ignore
 except Exception:
     psutil = None  # type: ignore
 
+from Agent.core.logging import get_logger
+from Agent.core.logging.metrics import observe_tool
+from Agent.core.logging.tracing import span, traced
+from Agent.core.tools.result_cache import ToolResultCache, repo_fingerprint
+
 ToolFunc = Callable[[Dict[str, Any]], Awaitable[Any] | Any]
 
+# 线程池与单工具默认限制
+TOOL_EXECUTOR_MAX_WORKERS = 8
+DEFAULT_TOOL_TIMEOUT = 60.0
+DEFAULT_TOOL_CONCURRENCY = 4
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+logger = get_logger(__name__)
+
+# 每个事件循环上的单工具并发信号量：工具名 -> Semaphore
+_tool_semaphores: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, asyncio.Semaphore]]" = (
+    weakref.WeakKeyDictionary()
+)
+
+# 已超时但工作线程仍在运行的调用
+_abandoned_lock = threading.Lock()
+_abandoned_running = 0
+_abandoned_total = 0
+
+
+def get_tool_executor() -> ThreadPoolExecutor:
+    """获取进程级共享的工具线程池（惰性创建）。"""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=TOOL_EXECUTOR_MAX_WORKERS,
+                    thread_name_prefix="tool-worker",
+                )
+    return _executor
+
+
+def shutdown_tool_executor(wait: bool = False) -> None:
+    """关闭共享线程池（服务退出时调用）。"""
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=wait, cancel_futures=True)
+            _executor = None
+
+
+def _tool_semaphore(name: str, limit: int) -> asyncio.Semaphore:
+    """当前事件循环上该工具的共享并发信号量（跨 ToolRuntime 实例生效）。
+
+    只按工具名区分，容量取首次使用时的上限：不同实例注册了不同 max_concurrency 时，
+    进程内总并发仍以一个上限为准，而不是各自的上限相加。
+    """
+    loop = asyncio.get_running_loop()
+    per_loop = _tool_semaphores.get(loop)
+    if per_loop is None:
+        per_loop = _tool_semaphores[loop] = {}
+    sem = per_loop.get(name)
+    if sem is None:
+        sem = per_loop[name] = asyncio.Semaphore(limit)
+    return sem
+
+
+class _CallState:
+    """线程内调用的完成 / 放弃标记（由 _abandoned_lock 保护）。"""
+
+    __slots__ = ("done", "abandoned")
+
+    def __init__(self) -> None:
+        self.done = False
+        self.abandoned = False
+
+
+def _abandon(name: str, state: _CallState) -> None:
+    """超时后放弃等待：若线程仍在运行则计入，线程结束时由 _call_in_thread 扣减。
+
+    在线程内扣减而不是挂在 asyncio future 上，事件循环先于线程关闭时计数也不会残留。
+    """
+    global _abandoned_running, _abandoned_total
+    with _abandoned_lock:
+        if state.done:
+            return
+        state.abandoned = True
+        _abandoned_running += 1
+        _abandoned_total += 1
+        running = _abandoned_running
+    if running * 2 >= TOOL_EXECUTOR_MAX_WORKERS:
+        logger.warning(
+            "tool %s timed out; %d/%d tool worker threads are still busy with timed-out calls",
+            name, running, TOOL_EXECUTOR_MAX_WORKERS,
+        )
+
+
+def get_tool_executor_stats() -> Dict[str, Any]:
+    """工具线程池容量与仍在运行的超时调用数。"""
+    with _abandoned_lock:
+        return {
+            "max_workers": TOOL_EXECUTOR_MAX_WORKERS,
+            "timed_out_running": _abandoned_running,
+            "timed_out_total": _abandoned_total,
+        }
+
+
+def _rss() -> Optional[int]:
+    if psutil is None:
+        return None
+    try:
+        return psutil.Process().memory_info().rss
+    except Exception:
+        return None
+
+
+def _call_in_thread(
+    func: ToolFunc, args: Dict[str, Any], state: Optional[_CallState] = None
+) -> Tuple[Any, float, Optional[int]]:
+    """在工作线程中执行工具，返回 (结果, 线程 CPU 时间, RSS 增量)。
+
+    CPU 时间使用 time.thread_time，只统计当前工作线程；
+    内存没有线程级口径，仍为进程 RSS 差值，仅作参考。
+    """
+    global _abandoned_running
+    start_mem = _rss()
+    start_cpu = time.thread_time()
+    try:
+        result = func(args)
+    finally:
+        if state is not None:
+            with _abandoned_lock:
+                state.done = True
+                if state.abandoned:
+                    _abandoned_running -= 1
+    cpu_time = time.thread_time() - start_cpu
+    end_mem = _rss()
+    mem_delta = (end_mem - start_mem) if (start_mem is not None and end_mem is not None) else None
+    return result, cpu_time, mem_delta
+
 
 class ToolRuntime:
     """注册并执行 tool_calls 中引用的工具。"""
 
-    def __init__(self) -> None:
+    def __init__(
+        self,
+        result_cache: Optional[ToolResultCache] = None,
+        fingerprint: Optional[Callable[[], str]] = None,
+    ) -> None:
         self._registry: Dict[str, ToolFunc] = {}
+        self._limits: Dict[str, Tuple[float, int]] = {}
+        self._cache_policy: Dict[str, Tuple[bool, Optional[float]]] = {}
+        # 运行时按次审查创建，缓存与仓库指纹默认与之同生命周期
+        self.result_cache = result_cache if result_cache is not None else ToolResultCache()
+        self._fingerprint = fingerprint or repo_fingerprint
+        self._fingerprint_value: Optional[str] = None
 
-    def register(self, name: str, func: ToolFunc) -> None:
-        """按函数名注册工具。"""
+    def register(
+        self,
+        name: str,
+        func: ToolFunc,
+        *,
+        timeout: Optional[float] = None,
+        max_concurrency: Optional[int] = None,
+        cacheable: bool = False,
+        cache_ttl: Optional[float] = None,
+    ) -> None:
+        """按函数名注册工具。
+
+        Args:
+            timeout: 单次调用超时（秒），<=0 表示不限制；默认 DEFAULT_TOOL_TIMEOUT。
+            max_concurrency: 该工具在整个进程（同一事件循环）内同时运行的上限；默认 DEFAULT_TOOL_CONCURRENCY。
+            cacheable: 结果是否可在本次审查内复用（只读且结果只取决于参数与仓库状态）。
+            cache_ttl: 缓存有效期（秒），None 表示整个审查期间有效。
+        """
 
         self._registry[name] = func
+        self._cache_policy[name] = (bool(cacheable), cache_ttl)
+        self._limits[name] = (
+            DEFAULT_TOOL_TIMEOUT if timeout is None else float(timeout),
+            max(1, int(max_concurrency or DEFAULT_TOOL_CONCURRENCY)),
+        )
+
+    def _semaphore(self, name: str) -> asyncio.Semaphore:
+        return _tool_semaphore(name, self._limits.get(name, (0.0, DEFAULT_TOOL_CONCURRENCY))[1])
 
+    @traced("tools.batch")
     async def execute(
         self,
         tool_calls: List[Dict[str, Any]],
     ) -> List[Dict[str, Any]]:
         """并发执行所有请求的工具。"""
 
-        tasks = [
-            asyncio.create_task(self._run_single_call(call))
-            for call in tool_calls
-        ]
+        fingerprint: Optional[str] = None
+        if any(self._cache_policy.get(call.get("name") or "", (False, None))[0] for call in tool_calls):
+            fingerprint = await self._repo_fingerprint()
+
+        # 同一批次内完全相同的可缓存调用只执行一次
+        inflight: Dict[Any, asyncio.Task] = {}
+        tasks = []
+        for call in tool_calls:
+            name = call.get("name") or ""
+            cacheable = self._cache_policy.get(name, (False, None))[0]
+            if not cacheable or fingerprint is None:
+                tasks.append(asyncio.create_task(self._run_single_call(call)))
+                continue
+            key = self.result_cache.make_key(name, call.get("arguments", {}), fingerprint)
+            first = inflight.get(key)
+            if first is not None:
+                tasks.append(asyncio.create_task(self._join_inflight(call, first)))
+                continue
+            cached = self.result_cache.get(key)
+            if cached is not None:
+                tasks.append(asyncio.create_task(self._cached_result(call, cached)))
+                continue
+            first = asyncio.create_task(self._run_and_store(call, key))
+            inflight[key] = first
+            tasks.append(first)
         return await asyncio.gather(*tasks)
 
+    async def _repo_fingerprint(self) -> Optional[str]:
+        """仓库指纹在本运行时（即单次审查）内只计算一次；计算失败时本批不用缓存，下批重试。"""
+        if self._fingerprint_value is None:
+            try:
+                self._fingerprint_value = await asyncio.to_thread(self._fingerprint)
+            except Exception:
+                return None
+        return self._fingerprint_value
+
+    def cache_stats(self) -> Dict[str, Any]:
+        """返回工具结果缓存的命中统计。"""
+        return self.result_cache.stats()
+
+    async def _run_and_store(self, call: Dict[str, Any], key: Any) -> Dict[str, Any]:
+        result = await self._run_single_call(call)
+        result["cache"] = "miss"
+        if not result.get("error"):
+            ttl = self._cache_policy.get(call.get("name") or "", (False, None))[1]
+            self.result_cache.set(key, result, ttl)
+        return result
+
+    async def _join_inflight(self, call: Dict[str, Any], first: asyncio.Task) -> Dict[str, Any]:
+        result = await first
+        if result.get("error"):
+            return {**result, "tool_call_id": call.get("id", "unknown_call")}
+        self.result_cache.record_hit()
+        return await self._cached_result(call, result)
+
+    @staticmethod
+    async def _cached_result(call: Dict[str, Any], cached: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            **cached,
+            "tool_call_id": call.get("id", "unknown_call"),
+            "duration_ms": 0,
+            "cpu_time": 0.0,
+            "mem_delta": None,
+            "cache": "hit",
+        }
+
+    async def _run_in_executor(
+        self, name: str, func: ToolFunc, args: Dict[str, Any]
+    ) -> Tuple[Any, Optional[float], Optional[int]]:
+        """在共享线程池中执行同步工具，受单工具并发上限与超时约束。"""
+
+        timeout = self._limits.get(name, (DEFAULT_TOOL_TIMEOUT, 0))[0]
+        sem = self._semaphore(name)
+        await sem.acquire()
+        loop = asyncio.get_running_loop()
+        # 复制 contextvars，使工具在线程中仍能读取 project_root 等运行时上下文
+        ctx = contextvars.copy_context()
+        state = _CallState()
+        try:
+            fut = loop.run_in_executor(get_tool_executor(), ctx.run, _call_in_thread, func, args, state)
+        except BaseException:
+            sem.release()
+            raise
+        # 线程无法被强制终止：超时后仍占用并发名额，直到线程真正结束才释放
+        fut.add_done_callback(lambda _f: sem.release())
+        if timeout and timeout > 0:
+            try:
+                return await asyncio.wait_for(asyncio.shield(fut), timeout)
+            except asyncio.TimeoutError:
+                _abandon(name, state)
+                raise
+        return await asyncio.shield(fut)
+
     async def _run_single_call(self, call: Dict[str, Any]) -> Dict[str, Any]:
         """执行单个工具调用，并包装为会话状态所需的响应。"""
 
+        with span("tool", tool=call.get("name") or "", call_id=call.get("id", "")):
+            return await self._invoke(call)
+
+    async def _invoke(self, call: Dict[str, Any]) -> Dict[str, Any]:
+        """_run_single_call 的执行部分：调用工具并统计耗时、CPU 与内存增量。"""
+
         tool_id = call.get("id", "unknown_call")
         name = call.get("name")
         func = self._registry.get(name or "")
@@ -52,18 +334,25 @@ class ToolRuntime:
             }
 
         start_perf = time.perf_counter()
-        proc = psutil.Process() if psutil else None
-        start_mem = proc.memory_info().rss if proc else None
-        start_cpu = proc.cpu_times().user + proc.cpu_times().system if proc else None
+        args = call.get("arguments", {})
+        outcome = "error"
         try:
-            result = func(call.get("arguments", {}))
-            if asyncio.iscoroutine(result):
-                result = await result
+            if asyncio.iscoroutinefunction(func):
+                # 协程工具仍在事件循环上执行，CPU/内存只能按进程口径近似
+                proc = psutil.Process() if psutil else None
+                start_mem = proc.memory_info().rss if proc else None
+                start_cpu = proc.cpu_times().user + proc.cpu_times().system if proc else None
+                result = await func(args)
+                end_mem = proc.memory_info().rss if proc else None
+                end_cpu = proc.cpu_times().user + proc.cpu_times().system if proc else None
+                mem_delta = (end_mem - start_mem) if (proc and start_mem is not None and end_mem is not None) else None
+                cpu_time = (end_cpu - start_cpu) if (proc and start_cpu is not None and end_cpu is not None) else None
+            else:
+                result, cpu_time, mem_delta = await self._run_in_executor(name or "", func, args)
+                if asyncio.iscoroutine(result):
+                    result = await result
             duration_ms = int((time.perf_counter() - start_perf) * 1000)
-            end_mem = proc.memory_info().rss if proc else None
-            end_cpu = proc.cpu_times().user + proc.cpu_times().system if proc else None
-            mem_delta = (end_mem - start_mem) if (proc and start_mem is not None and end_mem is not None) else None
-            cpu_time = (end_cpu - start_cpu) if (proc and start_cpu is not None and end_cpu is not None) else None
+            outcome = "ok"
             return {
                 "role": "tool",
                 "tool_call_id": tool_id,
@@ -73,6 +362,18 @@ class ToolRuntime:
                 "cpu_time": cpu_time,
                 "mem_delta": mem_delta,
             }
+        except asyncio.TimeoutError:
+            outcome = "timeout"
+            duration_ms = int((time.perf_counter() - start_perf) * 1000)
+            timeout = self._limits.get(name or "", (DEFAULT_TOOL_TIMEOUT, 0))[0]
+            return {
+                "role": "tool",
+                "tool_call_id": tool_id,
+                "name": name,
+                "content": "",
+                "error": f"TimeoutError: tool '{name}' exceeded {timeout}s",
+                "duration_ms": duration_ms,
+            }
         except Exception as exc:  # pragma: no cover - 异常直接反馈给 LLM
             duration_ms = int((time.perf_counter() - start_perf) * 1000)
             return {
@@ -83,3 +384,17 @@ class ToolRuntime:
                 "error": f"{type(exc).__name__}: {exc}",
                 "duration_ms": duration_ms,
             }
+        finally:
+            observe_tool(name or "", time.perf_counter() - start_perf, outcome)
+
+
+__all__ = [
+    "ToolRuntime",
+    "ToolFunc",
+    "ToolResultCache",
+    "get_tool_executor",
+    "get_tool_executor_stats",
+    "shutdown_tool_executor",
+    "DEFAULT_TOOL_TIMEOUT",
+    "DEFAULT_TOOL_CONCURRENCY",
+]
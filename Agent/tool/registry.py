@@ -13,9 +13,10 @@ from Agent.core.logging.fallback_tracker import (
     read_text_with_fallback,
     record_fallback,
 )
-from Agent.core.context.runtime_context import get_project_root
+from Agent.core.context.runtime_context import get_diff_units, get_project_root
+from Agent.core.context.line_index import get_line_index
 from Agent.core.api.project import ProjectAPI
-from Agent.DIFF.git_operations import _decode_output, _run_git_quiet, run_git
+from Agent.DIFF.git_operations import _decode_output, _stream_git, run_git
 
 
 @dataclass
@@ -24,9 +25,17 @@ class ToolSpec:
     description: str
     parameters: Dict[str, Any]
     func: Callable[[Dict[str, Any]], Any]
+    # 运行时策略：只读且结果仅取决于参数与仓库状态的工具可声明为可缓存
+    cacheable: bool = False
+    cache_ttl: Optional[float] = None  # 秒；None 表示整个审查期间有效
+    timeout: Optional[float] = None  # 秒；None 使用运行时默认值
+    max_concurrency: Optional[int] = None
 
 
 _TOOL_REGISTRY: Dict[str, ToolSpec] = {}
+# 只读工具结果的缓存有效期：仓库指纹每次审查只计算一次，审查期间工作区仍可能被编辑，
+# 由该 TTL 限制缓存结果的陈旧时间
+_READ_CACHE_TTL_SECONDS = 120.0
 # 认为“无害且应默认启用”的内置工具清单（不包含 echo 等调试类工具）
 _BUILTIN_SAFE_TOOLS = [
     "list_project_files",
@@ -250,8 +259,13 @@ def _read_file_hunk(args: Dict[str, Any]) -> str:
             indent=2,
         )
 
+    # 通过行偏移索引只读取所需区间，避免整文件解码
     try:
-        text = read_text_with_fallback(file_path, reason="read_file_hunk")
+        index = get_line_index(file_path)
+        total = index.line_count
+        ctx_start = max(1, start_line - before)
+        ctx_end = min(total, end_line + after)
+        snippet_lines = index.read_lines(ctx_start, ctx_end)
     except Exception as exc:
         record_fallback(
             "read_file_hunk_failed",
@@ -263,13 +277,6 @@ def _read_file_hunk(args: Dict[str, Any]) -> str:
             ensure_ascii=False,
             indent=2,
         )
-    lines = text.splitlines()
-    total = len(lines)
-
-    ctx_start = max(1, start_line - before)
-    ctx_end = min(total, end_line + after)
-
-    snippet_lines = lines[ctx_start - 1 : ctx_end]
     snippet = "\n".join(snippet_lines)
 
     # 便于 LLM 精确定位，附带行号标注版
@@ -315,7 +322,7 @@ def _read_file_info(args: Dict[str, Any]) -> str:
         size = None
 
     try:
-        text = read_text_with_fallback(file_path, reason="read_file_info")
+        line_count = get_line_index(file_path).line_count
     except Exception as exc:
         record_fallback(
             "read_file_info_failed",
@@ -327,8 +334,6 @@ def _read_file_info(args: Dict[str, Any]) -> str:
             ensure_ascii=False,
             indent=2,
         )
-    lines = text.splitlines()
-    line_count = len(lines)
 
     ext = file_path.suffix.lower()
     if ext == ".py":
@@ -363,98 +368,139 @@ def _read_file_info(args: Dict[str, Any]) -> str:
     )
 
 
+# 需要排除的路径（压缩文件、第三方库等），以 git pathspec 形式交给 git grep 直接跳过
+_SEARCH_EXCLUDE_GLOBS = [
+    "**/*.min.js",
+    "**/*.min.css",
+    "**/*.bundle.js",
+    "**/*.chunk.js",
+    "**/*-min.js",
+    "**/*-min.css",
+    "**/node_modules/**",
+    "**/vendor/**",
+    "**/dist/**",
+    "**/build/**",
+    "**/venv/**",
+    "**/.venv/**",
+    "**/__pycache__/**",
+    "**/*.map",
+    "**/*.lock",
+    "**/package-lock.json",
+    "**/yarn.lock",
+    "**/pnpm-lock.yaml",
+]
+_SEARCH_MAX_RESULTS_LIMIT = 500
+# snippet 最大长度限制，防止匹配到压缩文件时单行内容过长导致 token 爆炸
+_SEARCH_MAX_SNIPPET_LENGTH = 500
+
+
+# 变更文件单独搜索时最多传给 git 的路径数，超出时只依赖排序，避免命令行过长
+_SEARCH_CHANGED_PATHSPEC_LIMIT = 200
+
+
+def _changed_paths() -> List[str]:
+    """本次审查变更文件的相对路径（去重并保持顺序）。"""
+    paths: Dict[str, None] = {}
+    for unit in get_diff_units():
+        if isinstance(unit, dict) and unit.get("file_path"):
+            paths[str(unit.get("file_path")).replace("\\", "/")] = None
+    return list(paths)
+
+
+def _rank_by_change_proximity(matches: List[Dict[str, Any]], changed: List[str]) -> List[Dict[str, Any]]:
+    """按与本次变更文件的距离稳定排序：变更文件本身 > 同目录 > 其他。"""
+    if not changed or not matches:
+        return matches
+    changed_set = set(changed)
+    changed_dirs = {p.rsplit("/", 1)[0] if "/" in p else "" for p in changed_set}
+
+    def _rank(match: Dict[str, Any]) -> int:
+        path = str(match.get("path") or "")
+        if path in changed_set:
+            return 0
+        parent = path.rsplit("/", 1)[0] if "/" in path else ""
+        return 1 if parent in changed_dirs else 2
+
+    return sorted(matches, key=_rank)
+
+
 def _search_in_project(args: Dict[str, Any]) -> str:
-    """使用 git grep 在项目中搜索关键字。"""
+    """使用 git grep 在项目中搜索关键字。
+
+    流式读取 git grep 输出：排除规则通过 `:(exclude)` pathspec 在 git 内部生效，
+    `-m` 限制单文件命中数，收集满 max_results 条后立即终止子进程，
+    避免宽泛关键字在大仓库上产生数百 MB 输出。
+
+    先单独搜索本次变更的文件，再用剩余名额搜索其他文件，保证变更文件中的命中
+    不会因为 git grep 的遍历顺序被截断掉；结果再按与变更文件的距离排序。
+    多收集一条作为哨兵，只有结果确实被截断时才返回上限提示。
+    """
 
     query = args.get("query")
     if not query:
         raise ValueError("query is required")
-    max_results = int(args.get("max_results", 50))
-    
-    # snippet 最大长度限制，防止匹配到压缩文件时单行内容过长导致 token 爆炸
-    MAX_SNIPPET_LENGTH = 500
-
-    # 需要排除的路径模式（压缩文件、第三方库等）
-    EXCLUDED_PATTERNS = [
-        ".min.js",
-        ".min.css",
-        ".bundle.js",
-        ".chunk.js",
-        "-min.js",
-        "-min.css",
-        "/node_modules/",
-        "/vendor/",
-        "/dist/",
-        "/build/",
-        "/.git/",
-        "/venv/",
-        "/.venv/",
-        "/__pycache__/",
-        ".map",
-        ".lock",
-        "package-lock.json",
-        "yarn.lock",
-        "pnpm-lock.yaml",
-    ]
-
-    def should_exclude(path: str) -> bool:
-        """检查路径是否应该被排除"""
-        path_lower = path.lower().replace("\\", "/")
-        for pattern in EXCLUDED_PATTERNS:
-            if pattern in path_lower:
-                return True
-        return False
+    max_results = min(max(int(args.get("max_results", 50)), 1), _SEARCH_MAX_RESULTS_LIMIT)
+    # 多收集一条用于判断是否截断
+    capacity = max_results + 1
 
     cwd = get_project_root()
+    matches: List[Dict[str, Any]] = []
+
+    def _on_record(record: bytes) -> bool:
+        # -z 输出格式：path\0line\0content
+        parts = record.split(b"\0", 2)
+        if len(parts) < 3:
+            return True
+        try:
+            line_no = int(parts[1])
+        except ValueError:
+            line_no = 0
+        snippet = _decode_output(parts[2]).strip()
+        if len(snippet) > _SEARCH_MAX_SNIPPET_LENGTH:
+            snippet = snippet[:_SEARCH_MAX_SNIPPET_LENGTH] + "... (truncated)"
+        matches.append({"path": _decode_output(parts[0]), "line": line_no, "snippet": snippet})
+        return len(matches) < capacity
+
+    def _grep(pathspecs: List[str]) -> Optional[str]:
+        """执行一轮 git grep，失败时返回错误信息。"""
+        grep_args = [
+            "-n", "-z", "-I", "--no-color",
+            "-m", str(capacity),
+            "-e", str(query),
+            "--",
+            *pathspecs,
+            *[f":(exclude,glob){pattern}" for pattern in _SEARCH_EXCLUDE_GLOBS],
+        ]
+        returncode, stderr_text, stopped = _stream_git("grep", *grep_args, cwd=cwd, on_record=_on_record)
+        if not stopped and returncode not in (0, 1):  # 返回码 1 表示没有匹配
+            return stderr_text.strip() or "git grep failed"
+        return None
+
+    changed = _changed_paths()
+    searched_first = changed if 0 < len(changed) <= _SEARCH_CHANGED_PATHSPEC_LIMIT else []
     try:
-        result = _run_git_quiet("grep", "-n", "--no-color", query, cwd=cwd)
-        if result.returncode not in (0, 1):  # 返回码 1 表示没有匹配
+        error: Optional[str] = None
+        if searched_first:
+            error = _grep([f":(literal){path}" for path in searched_first])
+        if error is None and len(matches) < capacity:
+            error = _grep([".", *[f":(exclude,literal){path}" for path in searched_first]])
+        if error is not None:
             return json.dumps(
                 {
                     "query": query,
-                    "error": _decode_output(result.stderr).strip() or "git grep failed",
+                    "error": error,
                 },
                 ensure_ascii=False,
                 indent=2,
             )
 
-        matches: List[Dict[str, Any]] = []
-        excluded_count = 0
-        stdout = _decode_output(result.stdout)
-        for line in stdout.splitlines():
-            if ":" not in line:
-                continue
-            path, rest = line.split(":", 1)
-            
-            # 检查是否应该排除该路径
-            if should_exclude(path):
-                excluded_count += 1
-                continue
-                
-            if ":" in rest:
-                line_no_str, snippet = rest.split(":", 1)
-            else:
-                line_no_str, snippet = "0", rest
-            try:
-                line_no = int(line_no_str)
-            except ValueError:
-                line_no = 0
-            
-            # 限制 snippet 长度，防止单行过长
-            snippet = snippet.strip()
-            if len(snippet) > MAX_SNIPPET_LENGTH:
-                snippet = snippet[:MAX_SNIPPET_LENGTH] + "... (truncated)"
-            
-            matches.append({"path": path, "line": line_no, "snippet": snippet})
-            if len(matches) >= max_results:
-                break
-
-        result_data = {"query": query, "matches": matches}
-        
-        # 如果有排除的结果，添加提示信息
-        if excluded_count > 0:
-            result_data["note"] = f"已排除 {excluded_count} 条来自压缩文件/第三方库的匹配结果"
-        
+        truncated = len(matches) > max_results
+        result_data: Dict[str, Any] = {
+            "query": query,
+            "matches": _rank_by_change_proximity(matches[:max_results], changed),
+        }
+        if truncated:
+            result_data["note"] = f"命中数已达上限 {max_results}，搜索已提前终止；如需更精确结果请缩小关键字范围"
         return json.dumps(result_data, ensure_ascii=False, indent=2)
     except Exception as e:
         # Fallback: simple grep-like walk
@@ -789,6 +835,8 @@ def _register_default_tools() -> None:
                 "additionalProperties": False,
             },
             func=_list_project_files,
+            cacheable=True,
+            cache_ttl=_READ_CACHE_TTL_SECONDS,
         )
     )
     register_tool(
@@ -806,6 +854,8 @@ def _register_default_tools() -> None:
                 "additionalProperties": False,
             },
             func=_list_directory,
+            cacheable=True,
+            cache_ttl=_READ_CACHE_TTL_SECONDS,
         )
     )
     register_tool(
@@ -830,6 +880,8 @@ def _register_default_tools() -> None:
                 "required": ["path", "start_line", "end_line"],
             },
             func=_read_file_hunk,
+            cacheable=True,
+            cache_ttl=_READ_CACHE_TTL_SECONDS,
         )
     )
     register_tool(
@@ -844,6 +896,8 @@ def _register_default_tools() -> None:
                 "required": ["path"],
             },
             func=_read_file_info,
+            cacheable=True,
+            cache_ttl=_READ_CACHE_TTL_SECONDS,
         )
     )
     register_tool(
@@ -862,6 +916,8 @@ def _register_default_tools() -> None:
                 "required": ["query"],
             },
             func=_search_in_project,
+            cacheable=True,
+            cache_ttl=_READ_CACHE_TTL_SECONDS,
         )
     )
     register_tool(
@@ -874,6 +930,8 @@ def _register_default_tools() -> None:
                 "additionalProperties": False,
             },
             func=_get_dependencies,
+            cacheable=True,
+            cache_ttl=_READ_CACHE_TTL_SECONDS,
         )
     )
     register_tool(
@@ -29,11 +29,18 @@ from Agent.core.api.session import get_session_manager
 from Agent.core.context.diff_provider import collect_diff_context
 from Agent.tool.registry import default_tool_names, get_tool_schemas
 from Agent.core.state.session import ReviewSession
+from Agent.core.tools.runtime import shutdown_tool_executor
+from Agent.core.llm.http_pool import close_shared_http_clients
+from Agent.core.logging.log_writer import shutdown_log_writer
+from Agent.core.stream.event_queue import BoundedEventQueue
+from Agent.core.stream.review_jobs import ReviewJob, get_review_jobs
+from Agent.core.stream.sse_frames import iter_coalesced_frames
 from UI.dialogs import pick_folder as pick_folder_dialog
 
 app = FastAPI()
 # 使用统一的会话管理器单例
 session_manager = get_session_manager()
+review_jobs = get_review_jobs()
 
 _SCANNER_STATUS_CACHE_TTL_SECONDS = 60.0
 _scanner_status_cache: Dict[str, Dict[str, Any]] = {}
@@ -63,6 +70,17 @@ class NoCacheMiddleware(BaseHTTPMiddleware):
 app.add_middleware(NoCacheMiddleware)
 
 
+@app.on_event("shutdown")
+async def _release_shared_resources() -> None:
+    """服务退出时释放进程级共享资源。"""
+    shutdown_tool_executor(wait=False)
+    await close_shared_http_clients()
+    # 写出后台合并中尚未落盘的会话
+    await asyncio.to_thread(session_manager.close)
+    # 最后刷新后台日志队列，确保关闭过程中产生的日志也落盘
+    await asyncio.to_thread(shutdown_log_writer)
+
+
 def _bootstrap_env() -> None:
     env = {}
     try:
@@ -195,6 +213,7 @@ class ReviewRequest(BaseModel):
     diff_mode: Optional[str] = None
     commit_from: Optional[str] = None  # 历史提交模式的起始commit
     commit_to: Optional[str] = None    # 历史提交模式的结束commit
+    profile: bool = False  # 对本次审查开启采样剖析（结果链接随 final 事件返回）
 
 class IntentAnalyzeStreamRequest(BaseModel):
     project_root: str
@@ -935,26 +954,55 @@ def create_session(req: SessionCreate, background_tasks: BackgroundTasks):
 
 
 @app.get("/api/sessions/list")
-async def list_sessions(
+def list_sessions(
     status: Optional[str] = None,
     project_root: Optional[str] = None,
     limit: int = 50,
-    offset: int = 0
+    offset: int = 0,
+    query: Optional[str] = None,
+    tag: Optional[str] = None,
+    sort: str = "updated_at",
+    order: str = "desc",
 ):
-    """列出所有会话（支持过滤）。"""
+    """列出所有会话（支持过滤、名称搜索、排序与分页）。"""
     try:
         return SessionAPI.list_sessions(
             status=status,
             project_root=project_root,
+            tag=tag,
             limit=limit,
-            offset=offset
+            offset=offset,
+            query=query,
+            sort=sort,
+            order=order,
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/api/sessions/search")
+def search_sessions(
+    query: Optional[str] = None,
+    project_root: Optional[str] = None,
+    status: Optional[str] = None,
+    limit: int = 50,
+    offset: int = 0,
+):
+    """按会话名称搜索会话。"""
+    try:
+        return SessionAPI.list_sessions(
+            status=status,
+            project_root=project_root,
+            limit=limit,
+            offset=offset,
+            query=query,
         )
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.get("/api/sessions/stats")
-async def get_session_stats():
+def get_session_stats():
     """获取会话统计信息。"""
     try:
         return SessionAPI.get_session_stats()
@@ -1024,9 +1072,10 @@ async def chat_send(req: ChatRequest):
         session = session_manager.create_session(req.session_id, req.project_root)
     
     session.add_message("user", req.message)
-    session_manager.save_session(session)
+    session_manager.mark_dirty(session)
 
-    queue: asyncio.Queue[Dict[str, Any]] = asyncio.Queue()
+    # 有界队列：客户端读得慢时合并增量、淘汰低优先级事件，滞后过久则断开
+    queue = BoundedEventQueue(label=f"chat:{req.session_id}")
 
     def stream_callback(evt: Dict[str, Any]) -> None:
         try:
@@ -1040,7 +1089,7 @@ async def chat_send(req: ChatRequest):
                         session.diff_files = df
                     if isinstance(du, list) and du:
                         session.diff_units = du
-                    session_manager.save_session(session)
+                    session_manager.mark_dirty(session)
                 except Exception:
                     pass
                 return
@@ -1083,7 +1132,7 @@ async def chat_send(req: ChatRequest):
                 evt_type2 = evt.get("type", "")
                 if evt_type2 in ("scanner_progress", "scanner_issues_summary", "scanner_init"):
                     session.add_workflow_event(safe_evt)
-                    session_manager.save_session(session)
+                    session_manager.mark_dirty(session)
         except Exception:
             pass
 
@@ -1111,22 +1160,23 @@ async def chat_send(req: ChatRequest):
             )
 
             session.add_message("assistant", str(result))
-            session_manager.save_session(session)
             await queue.put({"type": "final", "content": str(result)})
         except Exception as exc:
             await queue.put({"type": "error", "message": str(exc)})
         finally:
+            # 结束（含出错 / 取消）时立即写出，不等待合并窗口
+            await asyncio.to_thread(session_manager.flush_session, session)
             await queue.put({"type": "done"})
 
     task = asyncio.create_task(run_agent())
+    # 客户端滞后超过阈值时停止后台任务，不再为无人读取的连接继续生成事件
+    queue.on_lag = lambda _lag: task.cancel()
 
     async def event_stream() -> AsyncGenerator[str, None]:
         try:
-            while True:
-                evt = await queue.get()
-                yield f"data: {json.dumps(evt, ensure_ascii=False)}\n\n"
-                if evt.get("type") in {"done"}:
-                    break
+            # 连续的 chunk/thought 增量在短窗口内合并为一帧，其他事件立即刷出
+            async for frame in iter_coalesced_frames(queue):
+                yield frame
         except asyncio.CancelledError:
             raise
         finally:
@@ -1184,6 +1234,11 @@ async def start_review(req: ReviewRequest):
         import time
         import secrets
         session_id = f"sess_{int(time.time())}_{secrets.token_hex(4)}"
+    elif review_jobs.is_running(session_id):
+        raise HTTPException(
+            status_code=409,
+            detail="该会话已有审查在运行，请通过 /api/review/{session_id}/events 重新订阅",
+        )
     
     session = session_manager.get_session(session_id)
     if not session:
@@ -1237,17 +1292,24 @@ async def start_review(req: ReviewRequest):
         except Exception as e:
             print(f"[WARN] Failed to save diff_files snapshot: {e}")
 
-    queue: asyncio.Queue[Dict[str, Any]] = asyncio.Queue()
+    # 审查作为服务端任务运行，事件写入带序号的日志，SSE 连接只是订阅者
+    job = review_jobs.create(session_id)
+    emit = job.emit
 
     static_scan_start_evt: asyncio.Event = asyncio.Event()
     static_scan_done_evt: asyncio.Event = asyncio.Event()
 
     accept_stream_events: bool = True
+    # 采样剖析结果（profile_saved 事件），随 final 事件一并返回
+    profile_info: Dict[str, Any] = {}
 
     def stream_callback(evt: Dict[str, Any]) -> None:
         try:
             evt_type = evt.get("type", "")
 
+            if evt_type == "profile_saved":
+                profile_info.update({k: v for k, v in evt.items() if k != "type"})
+
             if evt_type == "diff_units_snapshot":
                 try:
                     df = evt.get("diff_files")
@@ -1256,7 +1318,7 @@ async def start_review(req: ReviewRequest):
                         session.diff_files = df
                     if isinstance(du, list) and du:
                         session.diff_units = du
-                    session_manager.save_session(session)
+                    session_manager.mark_dirty(session)
                 except Exception:
                     pass
                 return
@@ -1292,7 +1354,7 @@ async def start_review(req: ReviewRequest):
                 reasoning = evt.get("reasoning_delta")
                 if reasoning:
                     workflow_evt = {"type": "thought", "content": reasoning, "stage": stage}
-                    queue.put_nowait(workflow_evt)
+                    emit(workflow_evt)
                     session.add_workflow_event(workflow_evt)
                     # 不保存：高频低优先级事件
                 
@@ -1300,7 +1362,7 @@ async def start_review(req: ReviewRequest):
                 content = evt.get("content_delta")
                 if content:
                     workflow_evt = {"type": "chunk", "content": content, "stage": stage}
-                    queue.put_nowait(workflow_evt)
+                    emit(workflow_evt)
                     session.add_workflow_event(workflow_evt)
                     # 不保存：高频低优先级事件
 
@@ -1327,20 +1389,20 @@ async def start_review(req: ReviewRequest):
                                 except Exception:
                                     detail = None
                                 workflow_evt = {"type": "tool_start", "tool": fn.get("name"), "detail": detail, "stage": stage or "planner"}
-                                queue.put_nowait(workflow_evt)
+                                emit(workflow_evt)
                                 session.add_workflow_event(workflow_evt)
-                                session_manager.save_session(session)  # 工具调用立即保存
+                                session_manager.mark_dirty(session)  # 工具调用：合并后保存
             else:
                 safe_evt = _safe_event(evt)
-                queue.put_nowait(safe_evt)
+                emit(safe_evt)
                 # pipeline 阶段事件 - 立即保存（关键节点）
                 if evt_type in ("pipeline_stage_start", "pipeline_stage_end"):
                     session.add_workflow_event(safe_evt)
-                    session_manager.save_session(session)
+                    session_manager.mark_dirty(session)
                 # 工具调用事件 - 保存用于历史回放（包含完整的工具返回内容）
                 elif evt_type in ("tool_call_start", "tool_result", "tool_call_end"):
                     session.add_workflow_event(safe_evt)
-                    session_manager.save_session(session)  # 立即保存工具事件
+                    session_manager.mark_dirty(session)  # 突发的工具事件由后台合并保存
                 # 监控日志事件 - 保存用于历史回放
                 elif evt_type in ("warning", "usage_summary"):
                     session.add_workflow_event(safe_evt)
@@ -1348,13 +1410,13 @@ async def start_review(req: ReviewRequest):
                 # 扫描器事件 - 保存用于历史回放（使历史会话可回放扫描信息）
                 elif evt_type in ("scanner_progress", "scanner_issues_summary", "scanner_init", "scanner_performance"):
                     session.add_workflow_event(safe_evt)
-                    session_manager.save_session(session)
+                    session_manager.mark_dirty(session)
                 # 静态扫描旁路事件 - 保存用于历史回放
                 elif evt_type in ("static_scan_start", "static_scan_file_start", "static_scan_file_done", "static_scan_complete"):
                     session.add_workflow_event(safe_evt)
                     # 只在关键节点保存
                     if evt_type in ("static_scan_start", "static_scan_complete"):
-                        session_manager.save_session(session)
+                        session_manager.mark_dirty(session)
         except Exception as e:
             print(f"[WARN] Stream callback error: {e}")
 
@@ -1374,12 +1436,13 @@ async def start_review(req: ReviewRequest):
                 diff_mode=req.diff_mode,  # 传递diff模式
                 commit_from=req.commit_from,  # 传递起始commit
                 commit_to=req.commit_to,  # 传递结束commit
+                profile=req.profile,  # 采样剖析开关
             )
             
             # 审查完成后，将结果保存到会话
             session.add_message("assistant", str(result))
             session.metadata.status = "completed"
-            session_manager.save_session(session)
+            await asyncio.to_thread(session_manager.flush_session, session)
 
             final_content: str
             if isinstance(result, str):
@@ -1390,38 +1453,39 @@ async def start_review(req: ReviewRequest):
                 except Exception:
                     final_content = str(result)
 
-            await queue.put({"type": "final", "content": final_content})
+            final_evt: Dict[str, Any] = {"type": "final", "content": final_content}
+            if profile_info:
+                final_evt["profile"] = profile_info
+            emit(final_evt)
             review_ok = True
         except Exception as exc:
-            await queue.put({"type": "error", "message": str(exc)})
+            job.status = "failed"
+            emit({"type": "error", "message": str(exc)})
         finally:
             # 静态扫描属于旁路任务：不阻塞审查完成。
             # 扫描结果可通过 /api/static-scan/issues 或 /api/static-scan/linked 查询。
             accept_stream_events = False
-            await queue.put({"type": "done"})
+            if not review_ok:
+                # 出错 / 取消时立即写出已累积的事件，不等待合并窗口
+                await asyncio.to_thread(session_manager.flush_session, session)
 
-    task = asyncio.create_task(run_agent())
+    # done 事件由任务包装统一补发；断开连接不再取消审查
+    review_jobs.start(job, run_agent)
+    return _review_job_stream(job, after=0)
+
+
+def _review_job_stream(job: ReviewJob, after: int) -> StreamingResponse:
+    """订阅审查任务的事件日志：回放 seq > after 的事件后接续实时事件。"""
+    queue = job.subscribe(after)
 
     async def event_stream() -> AsyncGenerator[str, None]:
         try:
-            while True:
-                evt = await queue.get()
-                yield f"data: {json.dumps(evt, ensure_ascii=False)}\n\n"
-                if evt.get("type") in {"done"}:
-                    break
-        except asyncio.CancelledError:
-            # 客户端断开连接或其他取消信号
-            raise
+            # 连续的 chunk/thought 增量在短窗口内合并为一帧，其他事件立即刷出
+            async for frame in iter_coalesced_frames(queue):
+                yield frame
         finally:
-            # 确保后台任务被取消
-            if not task.done():
-                task.cancel()
-                try:
-                    await asyncio.wait_for(task, timeout=1.0)
-                except asyncio.CancelledError:
-                    pass
-                except asyncio.TimeoutError:
-                    print("[WARN] Review task cleanup timeout")
+            # 只退订：审查继续在服务端运行，取消需显式调用 cancel 接口
+            job.unsubscribe(queue)
 
     return StreamingResponse(
         event_stream(),
@@ -1435,6 +1499,23 @@ async def start_review(req: ReviewRequest):
     )
 
 
+@app.get("/api/review/{session_id}/events")
+async def review_events(session_id: str, after: int = 0):
+    """（重新）订阅审查事件流，after 为客户端已收到的最后一个事件序号。"""
+    job = review_jobs.get(session_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="No review job for this session")
+    return _review_job_stream(job, after=max(0, after))
+
+
+@app.post("/api/review/{session_id}/cancel")
+async def cancel_review(session_id: str):
+    """取消正在运行的审查任务。"""
+    cancelled = review_jobs.cancel(session_id)
+    job = review_jobs.get(session_id)
+    return {"cancelled": cancelled, "status": job.status if job else None}
+
+
 # ==================== 运维API端点 ====================
 
 # --- 健康检查与指标 ---
@@ -1458,6 +1539,15 @@ async def get_metrics():
     return HealthAPI.get_metrics()
 
 
+@app.get("/metrics")
+async def get_prometheus_metrics():
+    """以 Prometheus 文本格式导出运行指标（分阶段耗时直方图、LLM 首包/吞吐、缓存命中等）。"""
+    return Response(
+        content=HealthAPI.get_prometheus_metrics(),
+        media_type="text/plain; version=0.0.4; charset=utf-8",
+    )
+
+
 @app.get("/api/providers/status")
 async def get_provider_status():
     """获取所有LLM提供商状态。"""
@@ -2314,16 +2404,21 @@ async def register_custom_tool(req: CustomToolRequest):
 # --- 日志访问 API ---
 
 @app.get("/api/logs/sessions")
-async def list_log_sessions(limit: int = 50, offset: int = 0):
-    """列出所有日志会话。"""
+def list_log_sessions(
+    limit: int = 50,
+    offset: int = 0,
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+):
+    """列出日志会话（按开始时间倒序分页，日期格式 YYYY-MM-DD）。"""
     try:
-        return LogAPI.list_sessions(limit, offset)
+        return LogAPI.list_sessions(limit, offset, date_from, date_to)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.get("/api/logs/session/{trace_id}")
-async def get_session_log(trace_id: str):
+def get_session_log(trace_id: str):
     """获取指定会话的完整日志。"""
     try:
         result = LogAPI.get_session_log(trace_id)
@@ -2337,7 +2432,7 @@ async def get_session_log(trace_id: str):
 
 
 @app.get("/api/logs/session/{trace_id}/human")
-async def get_human_readable_log(trace_id: str):
+def get_human_readable_log(trace_id: str):
     """获取人类可读格式的日志（Markdown）。"""
     try:
         result = LogAPI.get_session_log(trace_id)
@@ -2355,7 +2450,7 @@ async def get_human_readable_log(trace_id: str):
 
 
 @app.get("/api/logs/session/{trace_id}/api-calls")
-async def get_api_calls(trace_id: str):
+def get_api_calls(trace_id: str):
     """获取指定会话的API调用记录。"""
     try:
         return LogAPI.get_api_calls(trace_id)
@@ -2364,7 +2459,7 @@ async def get_api_calls(trace_id: str):
 
 
 @app.get("/api/logs/session/{trace_id}/pipeline")
-async def get_pipeline_log(trace_id: str):
+def get_pipeline_log(trace_id: str):
     """获取指定会话的流水线日志。"""
     try:
         result = LogAPI.get_session_log(trace_id)
@@ -2382,6 +2477,23 @@ async def get_pipeline_log(trace_id: str):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.get("/api/logs/session/{trace_id}/profile")
+def get_session_profile(trace_id: str):
+    """下载指定会话的采样剖析结果（speedscope JSON，可在 speedscope.app 打开）。"""
+    path = LogAPI.get_profile_path(trace_id)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    try:
+        content = Path(path).read_bytes()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    return Response(
+        content=content,
+        media_type="application/json",
+        headers={"Content-Disposition": f'attachment; filename="{Path(path).name}"'},
+    )
+
+
 @app.get("/api/logs/stats")
 async def get_log_stats():
     """获取日志统计信息。"""
@@ -2405,7 +2517,7 @@ async def delete_old_logs(req: LogCleanupRequest = LogCleanupRequest()):
 
 
 @app.get("/api/logs/export/{trace_id}")
-async def export_session_log(trace_id: str, format: str = "json"):
+def export_session_log(trace_id: str, format: str = "json"):
     """导出会话日志（支持json/markdown格式）。"""
     try:
         result = LogAPI.get_session_log(trace_id)
@@ -2594,26 +2706,6 @@ async def archive_old_sessions(req: ArchiveRequest = ArchiveRequest()):
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@app.get("/api/sessions/search")
-async def search_sessions(
-    query: Optional[str] = None,
-    project_root: Optional[str] = None,
-    status: Optional[str] = None,
-    limit: int = 50
-):
-    """搜索会话。"""
-    try:
-        # 使用 list_sessions 并进行过滤
-        result = SessionAPI.list_sessions(
-            status=status,
-            project_root=project_root,
-            limit=limit
-        )
-        return result
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-
 # ==================== 意图分析API端点 ====================
 
 
@@ -9,14 +9,49 @@ const CONFIG_LABELS = {
     "llm.planner_first_token_timeout_thinking": "规划器首 token 超时-思考模型 (秒)",
     "llm.max_retries": "最大重试次数",
     "llm.retry_delay": "重试延迟 (秒)",
+    "llm.http_max_connections": "连接池最大连接数",
+    "llm.http_max_keepalive": "连接池保活连接数",
+    "llm.http_keepalive_expiry": "保活连接过期 (秒)",
+    "llm.http2": "启用 HTTP/2",
+    "llm.provider_max_concurrency": "单厂商并发请求上限",
+    "llm.provider_rpm": "单厂商每分钟请求上限",
+    "llm.provider_tpm": "单厂商每分钟 Token 上限",
+    "llm.failover_enabled": "启用厂商故障转移",
+    "llm.failover_ttft_timeout": "故障转移首包超时 (秒)",
+    "llm.failover_ttft_timeout_thinking": "故障转移首包超时-思考模型 (秒)",
+    "llm.failover_max_providers": "备用厂商数量",
+    "llm.planner_hedge_after": "规划器对冲等待 (秒)",
     "context.max_context_chars": "单字段最大长度 (字符)",
     "context.full_file_max_lines": "全文件读取限制 (行)",
     "context.callers_max_hits": "调用者最大命中数",
     "context.file_cache_ttl": "文件缓存时间 (秒)",
+    "context.plan_prefetch_workers": "规划期上下文预取并发数",
+    "context.max_conversation_tokens": "审查会话 Token 上限",
+    "context.compaction_keep_turns": "压缩时保留的最近轮数",
     "review.max_units_per_batch": "单次审查最大单元数",
     "review.enable_intent_cache": "启用意图缓存",
     "review.intent_cache_ttl_days": "意图缓存过期天数",
     "review.stream_chunk_sample_rate": "流式日志采样率",
+    "review.enable_llm_response_cache": "启用规划/意图响应缓存",
+    "review.llm_response_cache_ttl_hours": "响应缓存过期时间 (小时)",
+    "review.llm_response_cache_max_mb": "响应缓存容量上限 (MB)",
+    "review.async_log_writer": "后台批量写日志",
+    "review.log_queue_size": "日志队列容量",
+    "review.log_flush_interval_ms": "日志刷新间隔 (毫秒)",
+    "review.log_flush_kb": "日志批量写入阈值 (KB)",
+    "review.sse_coalesce_ms": "流式增量合并窗口 (毫秒)",
+    "review.sse_coalesce_max_bytes": "合并帧最大长度",
+    "review.sse_queue_max_events": "事件队列上限",
+    "review.sse_max_lag_seconds": "客户端最大滞后 (秒)",
+    "review.session_journal_compact_kb": "会话日志压缩阈值 (KB)",
+    "review.session_cache_size": "内存会话缓存数",
+    "review.session_save_debounce_ms": "会话保存合并窗口 (毫秒)",
+    "review.review_job_log_size": "审查事件回放条数",
+    "review.review_job_retention_seconds": "审查事件保留时间 (秒)",
+    "review.log_compression": "日志压缩方式",
+    "review.trace_export": "链路追踪导出",
+    "review.profile_sample_rate": "采样剖析比例",
+    "review.profile_interval_ms": "剖析采样间隔(ms)",
     "fusion_thresholds.high": "高置信度阈值",
     "fusion_thresholds.medium": "中置信度阈值",
     "fusion_thresholds.low": "低置信度阈值"
@@ -29,14 +64,49 @@ const CONFIG_DESCRIPTIONS = {
     "llm.planner_first_token_timeout_thinking": "历史遗留/兼容项：规划阶段从发起请求到收到首个增量输出的超时保护（思考模型）。一般不需要调整。",
     "llm.max_retries": "API 调用失败时的最大重试次数。",
     "llm.retry_delay": "每次重试前的等待时间，避免频繁请求。",
+    "llm.http_max_connections": "同一厂商地址共享连接池的最大并发连接数，跨审查复用。",
+    "llm.http_max_keepalive": "连接池中保持复用的空闲连接数，减少重复 TCP/TLS 握手。",
+    "llm.http_keepalive_expiry": "空闲连接保留时长，超过后关闭。",
+    "llm.http2": "对支持的厂商启用 HTTP/2 多路复用（需要安装 h2 依赖，修改后对新建连接池生效）。",
+    "llm.provider_max_concurrency": "所有审查共享的同一厂商同时在途请求数，超出的请求排队等待（交互式审查优先于后台意图分析）。",
+    "llm.provider_rpm": "同一厂商每分钟最多发起的请求数，0 表示不限制；用于避免触发厂商限流。",
+    "llm.provider_tpm": "同一厂商每分钟最多发送的估算 Token 数（按字符数/4 估算），0 表示不限制。",
+    "llm.failover_enabled": "首选厂商连接失败、限流或首包超时时，自动切换到其他已配置 API Key 的厂商（仅在尚未输出内容时切换）。默认关闭；选择了具体模型（厂商:模型）的审查始终不切换。",
+    "llm.failover_ttft_timeout": "等待首个流式片段的最长时间，超时即切换到备用厂商；0 表示不按首包超时切换。",
+    "llm.failover_ttft_timeout_thinking": "思考模型（模型名含 thinking）在首个片段前可能长时间推理，按该时间判断首包超时。",
+    "llm.failover_max_providers": "除首选厂商外，最多按健康度追加的备用厂商数量。",
+    "llm.planner_hedge_after": "规划阶段首选厂商超过该时间仍无输出时，并行请求备用厂商并采用先返回的一方；0 表示关闭。",
     "context.max_context_chars": "单字段最大字符数；每个上下文字段分别截断。",
     "context.full_file_max_lines": "完整文件模式的最大行数，超过则按行截断或回退。",
     "context.callers_max_hits": "调用方搜索的最大命中数。",
     "context.file_cache_ttl": "文件内容在内存中的缓存时间，减少磁盘 IO。",
+    "context.plan_prefetch_workers": "规划模型流式输出期间，每解析出一个计划条目即提前读取文件/历史版本/调用方；0 表示关闭。",
+    "context.max_conversation_tokens": "多轮工具循环的估算 Token 超过该值时，将较早的工具结果替换为简短摘要（模型可重新调用工具获取）；0 表示不压缩。",
+    "context.compaction_keep_turns": "压缩时保持原样的最近对话轮数。",
     "review.max_units_per_batch": "单次审查任务包含的最大代码单元数量。",
     "review.enable_intent_cache": "启用意图分析缓存。",
     "review.intent_cache_ttl_days": "意图缓存的过期天数。",
     "review.stream_chunk_sample_rate": "流式日志采样率。",
+    "review.enable_llm_response_cache": "对同一份 diff 重跑审查时，规划与意图分析在输入完全相同的情况下直接复用上次的模型输出。",
+    "review.llm_response_cache_ttl_hours": "响应缓存条目的保留时长。",
+    "review.llm_response_cache_max_mb": "响应缓存目录的总大小上限，超出后淘汰最旧的条目。",
+    "review.async_log_writer": "API / 流水线日志先放入内存队列，由后台线程批量写入文件，避免日志 I/O 拖慢流式输出。关闭后每条日志同步写入。",
+    "review.log_queue_size": "后台日志队列的最大条数。接近上限时先丢弃流式片段日志，队列满时丢弃新日志并计数。",
+    "review.log_flush_interval_ms": "日志在内存中最多缓冲的时间，到期后写入文件。",
+    "review.log_flush_kb": "缓冲的日志累计达到该大小时立即写入文件。",
+    "review.sse_coalesce_ms": "审查流式输出时，把该时间窗口内连续的正文/思考片段合并成一帧推送，减少浏览器和代理的压力。设为 0 则逐片推送。",
+    "review.sse_coalesce_max_bytes": "单个合并帧累计的文本达到该长度时立即推送，不再等待窗口结束。",
+    "review.sse_queue_max_events": "每个审查/对话连接最多积压的事件数。超出时先淘汰扫描进度等低优先级事件；最终结果和错误永不丢弃。",
+    "review.sse_max_lag_seconds": "浏览器积压的事件超过该秒数仍未读取时，断开事件流并停止后台审查。设为 0 则不断开。",
+    "review.session_journal_compact_kb": "会话保存时只追加变化部分到事件日志；日志超过该大小后合并为一份新的完整快照。",
+    "review.session_cache_size": "内存中最多保留的已加载会话数量，超出后按最近最少使用淘汰（正在进行的审查不受影响）。",
+    "review.session_save_debounce_ms": "审查流式过程中，同一会话在该时间窗口内的多次保存由后台线程合并为一次写盘；审查结束或出错时立即保存。0 表示每次立即保存。",
+    "review.review_job_log_size": "审查在服务端后台运行，断线后可按序号重新订阅；每个审查最多保留的可回放事件数量。",
+    "review.review_job_retention_seconds": "审查结束后事件日志继续保留的时间，供断线的页面重新连接补齐结果。",
+    "review.log_compression": "审查结束后压缩流水线与 API 日志：none 不压缩，gzip 或 zstd（未安装 zstandard 时使用 gzip）。日志查看接口会自动解压。",
+    "review.trace_export": "每次审查结束后把分层耗时（LLM 调用、工具、git 与扫描器子进程等）导出到 log/traces：none 关闭，chrome 为 Chrome trace-event 格式（可用 Perfetto 打开），otlp 为 OTLP JSON，both 两者都导出。",
+    "review.profile_sample_rate": "按该比例随机对审查开启 CPU 采样剖析（0 关闭，0.01 即 1%），结果以 speedscope 格式写在流水线日志旁边。单次审查也可通过请求参数 profile 开启。",
+    "review.profile_interval_ms": "剖析时读取线程调用栈的间隔，越小越精细、开销越高；默认 10ms。",
     "fusion_thresholds.high": "规则侧置信度≥此值时，以规则建议为主。",
     "fusion_thresholds.medium": "介于低/高之间为中等置信区间。",
     "fusion_thresholds.low": "规则侧置信度≤此值时，优先采纳 LLM 的上下文建议。"
@@ -206,9 +206,13 @@ async function handleSSEResponse(response, expectedSessionId = null) {
         return;
     }
 
-    const reader = response.body.getReader();
+    let reader = response.body.getReader();
     const decoder = new TextDecoder();
     let buffer = "";
+    // 审查事件带递增序号 seq：连接中断后按最后收到的序号重新订阅，服务端审查不会因断线取消
+    let lastSeq = 0;
+    let reconnects = 0;
+    const MAX_RECONNECTS = 5;
 
     // workflowEntries 现在直接暴露，无外层容器
     const workflowEntries = document.getElementById('workflowEntries');
@@ -253,6 +257,8 @@ async function handleSSEResponse(response, expectedSessionId = null) {
     let pendingChunkContent = '';
     let reportFinalized = false;
     let streamEnded = false;
+    // 服务端因客户端接收过慢断开了本次订阅（审查仍在运行），需按 lastSeq 重新订阅
+    let lagDisconnected = false;
     const sid = expectedSessionId || window.currentSessionId;
     stopSessionPolling();
     SessionState.reviewStreamActive = true;
@@ -1012,6 +1018,12 @@ async function handleSSEResponse(response, expectedSessionId = null) {
                 return;
             }
 
+            if (evt.type === 'events_dropped') {
+                // 服务端事件队列已满，部分低优先级进度事件被丢弃（不影响审查结果）
+                console.warn(`[SSE] ${evt.count || 0} progress events dropped (${evt.reason || 'queue_full'})`);
+                return;
+            }
+
             if (evt.type === 'static_scan_file_start') {
                 // 更新 static_scan 总览卡片的当前扫描文件
                 if (typeof ScannerUI !== 'undefined') {
@@ -1320,6 +1332,13 @@ async function handleSSEResponse(response, expectedSessionId = null) {
                 }
             }
 
+            if (evt.type === 'error' && evt.reason === 'client_lag') {
+                // 不是审查失败：忽略随后的 done，走重新订阅补齐缺失事件
+                console.warn('[SSE] 接收过慢被服务端断开，准备重新订阅', evt.message);
+                lagDisconnected = true;
+                return;
+            }
+
             if (evt.type === 'error') {
                 errorSeen = true;
                 if (monitorPanel) {
@@ -1364,65 +1383,90 @@ async function handleSSEResponse(response, expectedSessionId = null) {
         }
     };
 
-    try {
-        while (true) {
-            const { value, done } = await reader.read();
-            if (done) break;
-            buffer += decoder.decode(value, { stream: true });
-
-            const events = buffer.split('\n\n');
-            buffer = events.pop();
-
-            for (const eventStr of events) {
-                if (!eventStr.trim() || streamEnded) continue;
-                const lines = eventStr.split('\n');
-                for (const line of lines) {
-                    const trimmedLine = line.trim();
-                    if (!trimmedLine || trimmedLine.startsWith(':')) continue;
-                    if (trimmedLine.startsWith('data: ')) {
-                        try {
-                            const evt = JSON.parse(trimmedLine.slice(6));
-                            if (window.currentSessionId !== sid) { streamEnded = true; break; }
-                            processEvent(evt);
-                            if (streamEnded) break;
-                        } catch (e) {
-                            console.error('SSE Parse Error', e, trimmedLine);
+    while (true) {
+        try {
+            while (true) {
+                const { value, done } = await reader.read();
+                if (done) break;
+                buffer += decoder.decode(value, { stream: true });
+
+                const events = buffer.split('\n\n');
+                buffer = events.pop();
+
+                for (const eventStr of events) {
+                    if (!eventStr.trim() || streamEnded || lagDisconnected) continue;
+                    const lines = eventStr.split('\n');
+                    for (const line of lines) {
+                        const trimmedLine = line.trim();
+                        if (!trimmedLine || trimmedLine.startsWith(':')) continue;
+                        if (trimmedLine.startsWith('data: ')) {
+                            try {
+                                const evt = JSON.parse(trimmedLine.slice(6));
+                                if (window.currentSessionId !== sid) { streamEnded = true; break; }
+                                if (typeof evt.seq === 'number') lastSeq = evt.seq;
+                                processEvent(evt);
+                                if (streamEnded || lagDisconnected) break;
+                            } catch (e) {
+                                console.error('SSE Parse Error', e, trimmedLine);
+                            }
                         }
                     }
                 }
+                if (streamEnded || lagDisconnected) break;
             }
-            if (streamEnded) break;
-        }
-        if (buffer && buffer.startsWith('data: ')) {
-            try {
-                const evt = JSON.parse(buffer.slice(6));
-                processEvent(evt);
-            } catch (e) { }
-        }
-    } catch (e) {
-        console.error('SSE Stream Error', e);
-        if (workflowEntries) {
-            const errorEl = document.createElement('div');
-            errorEl.className = 'workflow-error';
-            errorEl.innerHTML = `
-                <div class="error-icon">${getIcon('x')}</div>
-                <div class="error-content">
-                    <strong>连接中断</strong>
-                    <p>${escapeHtml(e.message)}</p>
-                    <button class="retry-btn" onclick="startReview()">重试</button>
-                </div>
-            `;
-            workflowEntries.appendChild(errorEl);
-        }
-        if (monitorPanel) {
-            monitorPanel.classList.remove('ok');
-            monitorPanel.classList.add('error');
-            const titleEl = monitorPanel.querySelector('.panel-title');
-            if (titleEl) titleEl.textContent = '日志 · 连接异常';
-            monitorPanel.classList.remove('collapsed');
+            if (lagDisconnected) {
+                lagDisconnected = false;
+                reader.cancel().catch(() => { });
+                throw new Error('客户端接收过慢，事件流已被服务端断开');
+            }
+            if (buffer && buffer.startsWith('data: ')) {
+                try {
+                    const evt = JSON.parse(buffer.slice(6));
+                    if (typeof evt.seq === 'number') lastSeq = evt.seq;
+                    processEvent(evt);
+                } catch (e) { }
+            }
+            if (streamEnded || lastSeq === 0) break;
+            throw new Error('连接意外结束');
+        } catch (e) {
+            if (!streamEnded && lastSeq > 0 && reconnects < MAX_RECONNECTS && window.currentSessionId === sid) {
+                reconnects++;
+                console.warn(`[SSE] 连接中断，第 ${reconnects} 次重新订阅 (after=${lastSeq})`, e);
+                await new Promise(resolve => setTimeout(resolve, 1000 * reconnects));
+                try {
+                    const resumed = await fetch(`/api/review/${encodeURIComponent(sid)}/events?after=${lastSeq}`);
+                    if (resumed.ok && resumed.body) {
+                        reader = resumed.body.getReader();
+                        buffer = "";
+                        continue;
+                    }
+                } catch (_) { }
+            }
+            console.error('SSE Stream Error', e);
+            if (workflowEntries) {
+                const errorEl = document.createElement('div');
+                errorEl.className = 'workflow-error';
+                errorEl.innerHTML = `
+                    <div class="error-icon">${getIcon('x')}</div>
+                    <div class="error-content">
+                        <strong>连接中断</strong>
+                        <p>${escapeHtml(e.message)}</p>
+                        <button class="retry-btn" onclick="startReview()">重试</button>
+                    </div>
+                `;
+                workflowEntries.appendChild(errorEl);
+            }
+            if (monitorPanel) {
+                monitorPanel.classList.remove('ok');
+                monitorPanel.classList.add('error');
+                const titleEl = monitorPanel.querySelector('.panel-title');
+                if (titleEl) titleEl.textContent = '日志 · 连接异常';
+                monitorPanel.classList.remove('collapsed');
+            }
+            setLayoutState(LayoutState.INITIAL);
+            stopReviewTimer();
+            break;
         }
-        setLayoutState(LayoutState.INITIAL);
-        stopReviewTimer();
     }
 
     if (startReviewBtn) {
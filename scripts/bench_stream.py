@@ -0,0 +1,141 @@
+"""流式链路微基准：SSE 分帧解析 + StreamProcessor 聚合。
+
+用法：
+    python scripts/bench_stream.py [--chunks 20000] [--repeat 3]
+
+1. SSE 解析：对同一份合成 SSE 字节流，比较旧的逐行 str 解析与
+   字节级 iter_sse_data + json_loads（orjson 可用时自动启用）。
+2. 聚合：基于 MockMoonshotClient 输出大量推理增量，比较
+   StreamProcessor 保留 / 不保留原始 chunk 时的耗时与峰值内存。
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, List
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from Agent.core.llm.client import MockMoonshotClient
+from Agent.core.stream.sse import JSON_BACKEND, iter_sse_data, json_loads
+from Agent.core.stream.stream_processor import StreamProcessor
+
+
+class BurstMockClient(MockMoonshotClient):
+    """不带 sleep、连续输出大量推理增量的模拟客户端。"""
+
+    def __init__(self, chunks: int) -> None:
+        self.chunks = chunks
+
+    async def stream_chat(self, messages: List[Dict[str, Any]], **kwargs: Any) -> AsyncIterator[Dict[str, Any]]:
+        for i in range(self.chunks):
+            yield {
+                "delta": {"role": "assistant", "reasoning_content": f"step {i} analysing the diff hunk; "},
+                "reasoning_content": f"step {i} analysing the diff hunk; ",
+                "finish_reason": None,
+                "usage": None,
+            }
+        yield {
+            "delta": {"role": "assistant", "content": "done"},
+            "finish_reason": "stop",
+            "usage": {"prompt_tokens": 10, "completion_tokens": self.chunks},
+        }
+
+
+def _build_sse_body(chunks: int) -> bytes:
+    lines = []
+    for i in range(chunks):
+        event = {
+            "id": "chatcmpl-bench",
+            "object": "chat.completion.chunk",
+            "choices": [{"index": 0, "delta": {"reasoning_content": f"step {i} 分析差异片段；"}, "finish_reason": None}],
+        }
+        lines.append("data: " + json.dumps(event, ensure_ascii=False))
+        if i % 500 == 0:
+            lines.append(": keep-alive")
+    lines.append("data: [DONE]")
+    return ("\n\n".join(lines) + "\n\n").encode("utf-8")
+
+
+async def _byte_blocks(body: bytes, size: int = 4096) -> AsyncIterator[bytes]:
+    for i in range(0, len(body), size):
+        yield body[i:i + size]
+
+
+async def _legacy_parse(body: bytes) -> int:
+    """旧实现：解码为 str 后逐行 strip / removeprefix / json.loads。"""
+    count = 0
+    for line in body.decode("utf-8").splitlines():
+        if not line or line.startswith(":"):
+            continue
+        data = line.removeprefix("data:").strip() if line.startswith("data:") else line.strip()
+        if not data or data == "[DONE]":
+            continue
+        json.loads(data)
+        count += 1
+    return count
+
+
+async def _fast_parse(body: bytes) -> int:
+    count = 0
+    async for data in iter_sse_data(_byte_blocks(body)):
+        json_loads(data)
+        count += 1
+    return count
+
+
+async def _collect(chunks: int, keep_raw: bool) -> Dict[str, Any]:
+    client = BurstMockClient(chunks)
+    processor = StreamProcessor(keep_raw_chunks=keep_raw)
+    deltas = 0
+
+    def observer(_event: Dict[str, Any]) -> None:
+        nonlocal deltas
+        deltas += 1
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    message = await processor.collect(client.stream_chat([]), observer=observer)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"elapsed": elapsed, "peak_kb": peak / 1024, "deltas": deltas, "reasoning_len": len(message.get("reasoning") or "")}
+
+
+def _best(fn, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        asyncio.run(fn())
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="流式链路微基准")
+    parser.add_argument("--chunks", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    body = _build_sse_body(args.chunks)
+    print(f"SSE 解析（{args.chunks} 个事件，{len(body) / 1024:.0f} KB，JSON 后端: {JSON_BACKEND}）")
+    legacy = _best(lambda: _legacy_parse(body), args.repeat)
+    fast = _best(lambda: _fast_parse(body), args.repeat)
+    print(f"  逐行 str 解析   : {legacy * 1000:8.1f} ms")
+    print(f"  字节级分帧解析 : {fast * 1000:8.1f} ms  ({legacy / fast if fast else 0:.2f}x)")
+
+    print(f"StreamProcessor 聚合（MockMoonshotClient，{args.chunks} 个增量）")
+    for keep_raw in (True, False):
+        stats = asyncio.run(_collect(args.chunks, keep_raw))
+        label = "保留 raw_chunks" if keep_raw else "不保留 raw_chunks"
+        print(f"  {label:<16}: {stats['elapsed'] * 1000:8.1f} ms  峰值内存 {stats['peak_kb']:8.0f} KB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""冲突记录库（SQLite）与增量分组聚合的单元测试"""
+
+import json
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from Agent.DIFF.issue.conflict_aggregates import ConflictAggregates
+from Agent.DIFF.issue.conflict_tracker import ConflictTracker, ConflictType, RuleConflict
+from Agent.DIFF.issue.rule_analyzer import RuleAnalyzer
+
+
+def _conflict(idx, conflict_type=ConflictType.RULE_LOW_LLM_CONSISTENT, **kwargs):
+    data = dict(
+        conflict_type=conflict_type,
+        unit_id=f"unit-{idx}",
+        file_path=f"pkg{idx}/models.py",
+        language="python",
+        tags=["orm"],
+        metrics={},
+        rule_context_level="function",
+        rule_confidence=0.2,
+        rule_notes="py:model:field",
+        llm_context_level="file_context",
+    )
+    data.update(kwargs)
+    return RuleConflict(**data)
+
+
+class TestConflictStore(unittest.TestCase):
+    """测试旧文件迁移、SQL 汇总、模式导出与提升标记"""
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.base = Path(self._tmp.name)
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_migrate_and_aggregate(self):
+        """旧版 JSON 文件一次性导入，汇总 / 模式 / 趋势直接由 SQL 聚合得到"""
+        legacy_dir = self.base / "conflicts"
+        legacy_dir.mkdir()
+        legacy = _conflict(0, language="unknown").to_dict()
+        (legacy_dir / "20260101_000000_000000_rule_low_llm_consistent.json").write_text(
+            json.dumps(legacy), encoding="utf-8"
+        )
+        promoted = _conflict(9).to_dict()
+        promoted["promoted"] = True
+        (legacy_dir / "20260101_000000_000001_rule_low_llm_consistent.json").write_text(
+            json.dumps(promoted), encoding="utf-8"
+        )
+
+        tracker = ConflictTracker(base_dir=str(self.base))
+        self.assertEqual(list(legacy_dir.glob("*.json")), [])
+        self.assertEqual(len(list((legacy_dir / "migrated").glob("*.json"))), 2)
+        for idx in (1, 2):
+            tracker.record(_conflict(idx))
+        tracker.record(_conflict(3, ConflictType.RULE_HIGH_LLM_SKIP, rule_confidence=0.9, tags=[]))
+        self.assertIsNone(tracker.record(_conflict(4, unit_id="test_unit_1")))
+
+        summary = tracker.get_summary()
+        self.assertEqual(summary["total_conflicts"], 4)
+        self.assertEqual(summary["by_language"], {"python": 4})
+        self.assertEqual(summary["by_rule_notes"], {"py:model": 4})
+
+        patterns = tracker.export_patterns()
+        self.assertEqual([(p["pattern_key"], p["occurrence_count"], p["common_tags"]) for p in patterns],
+                         [("python:models.py:file_context", 3, ["orm"])])
+        self.assertEqual(tracker.get_trend_analysis(days=1)["total_conflicts"], 4)
+        self.assertEqual(
+            [c.conflict_type for c in tracker.get_high_priority_conflicts(limit=2)],
+            [ConflictType.RULE_HIGH_LLM_SKIP, ConflictType.RULE_LOW_LLM_CONSISTENT],
+        )
+
+        marked = tracker.mark_conflicts_as_promoted("python", ["orm"], ConflictType.RULE_LOW_LLM_CONSISTENT.value, "r1")
+        self.assertEqual(marked, 3)
+        self.assertEqual(tracker.get_summary()["total_conflicts"], 1)
+        self.assertEqual(len(tracker._load_all_conflicts(include_promoted=True)), 5)
+
+        old = _conflict(5, timestamp=(datetime.now() - timedelta(days=90)).isoformat())
+        tracker.record(old)
+        self.assertEqual(tracker.cleanup_old_conflicts(max_age_days=30, max_count=3), 3)
+        self.assertEqual(len(tracker._load_all_conflicts(include_promoted=True)), 3)
+
+
+class TestConflictAggregates(unittest.TestCase):
+    """测试增量聚合与全量重建结果一致"""
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.base = Path(self._tmp.name)
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_incremental_matches_full_rebuild(self):
+        """先构建聚合再逐条记录，分析结果与从冲突列表全量计算一致；提升后失效重建"""
+        tracker = ConflictTracker(base_dir=str(self.base))
+        analyzer = RuleAnalyzer(tracker=tracker)
+        tracker.get_aggregates()
+        for idx in range(6):
+            tracker.record(_conflict(idx, tags=["orm", "model"]))
+        for idx in range(3):
+            tracker.record(_conflict(10 + idx, ConflictType.RULE_HIGH_LLM_EXPAND, rule_confidence=0.9))
+
+        rules, hints = analyzer.analyze_all()
+        full_rules, full_hints = analyzer.analyze_all(tracker._load_all_conflicts())
+        self.assertEqual([r.to_dict() for r in rules], [r.to_dict() for r in full_rules])
+        self.assertEqual([h.to_dict() for h in hints], [h.to_dict() for h in full_hints])
+        self.assertEqual(rules[0].sample_count, 6)
+        rebuilt = ConflictAggregates.build(tracker._load_all_conflicts())
+        self.assertEqual(tracker.get_aggregates().signature(), rebuilt.signature())
+        self.assertEqual(
+            sorted(s["type"] for s in tracker.generate_rule_suggestions()),
+            ["new_rule", "upgrade_context_level"],
+        )
+
+        tracker.mark_conflicts_as_promoted("python", ["model", "orm"], ConflictType.RULE_LOW_LLM_CONSISTENT.value)
+        self.assertEqual(analyzer.analyze_all()[0], [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,151 @@
+"""会话状态与前缀缓存标注的单元测试"""
+
+import unittest
+
+from Agent.core.llm.client import DeepSeekLLMClient, OpenRouterLLMClient
+from Agent.core.state.conversation import ConversationState
+
+
+def _bare(client_cls):
+    """跳过构造函数（无需 API Key / HTTP 客户端），只测试纯函数逻辑。"""
+    return client_cls.__new__(client_cls)
+
+
+def _tool_result(call_id, content):
+    return {"tool_call_id": call_id, "name": "read_file_hunk", "content": content}
+
+
+class TestCacheBreakpoints(unittest.TestCase):
+    """测试断点的记录、cache_control 标注位置与压缩后的断点裁剪"""
+
+    def _state_with_prefix(self):
+        state = ConversationState()
+        state.add_system_message("system prompt")
+        state.mark_cache_breakpoint()
+        state.add_user_message("review index")
+        state.mark_cache_breakpoint()
+        return state
+
+    def test_mark_records_last_message_once(self):
+        """断点指向当前最后一条消息，重复标注同一位置不会重复记录"""
+        state = ConversationState()
+        state.mark_cache_breakpoint()
+        self.assertEqual(state.cache_breakpoints, ())
+
+        state = self._state_with_prefix()
+        state.mark_cache_breakpoint()
+        self.assertEqual(state.cache_breakpoints, (0, 1))
+
+    def test_hints_land_on_system_and_user_breakpoints(self):
+        """只在断点处的 system/user 消息上标注，其他消息对象原样复用"""
+        state = self._state_with_prefix()
+        state.add_assistant_message("", [{"id": "c1", "name": "read_file_hunk", "arguments": {}}])
+        state.add_tool_result(_tool_result("c1", "body"))
+        messages = state.messages
+        # 断点 2 落在助手消息上，不应被标注；越界断点被忽略
+        marked = _bare(OpenRouterLLMClient)._apply_cache_hints(messages, state.cache_breakpoints + (2, 99))
+
+        self.assertIsNot(marked, messages)
+        for idx in (0, 1):
+            part = marked[idx]["content"][-1]
+            self.assertEqual(part["cache_control"], {"type": "ephemeral"})
+        self.assertIs(marked[2], messages[2])
+        self.assertIs(marked[3], messages[3])
+        # 原消息不被修改
+        self.assertEqual(messages[0]["content"], "system prompt")
+
+    def test_hints_keep_first_and_last_three(self):
+        """断点超过 4 个时保留首个与最近 3 个"""
+        state = ConversationState()
+        for i in range(6):
+            state.add_user_message(f"u{i}")
+            state.mark_cache_breakpoint()
+        marked = _bare(OpenRouterLLMClient)._apply_cache_hints(state.messages, state.cache_breakpoints)
+        tagged = [i for i, m in enumerate(marked) if isinstance(m["content"], list)]
+        self.assertEqual(tagged, [0, 3, 4, 5])
+
+    def test_no_hints_without_cache_control_support(self):
+        """不支持显式缓存的厂商直接返回原列表"""
+        state = self._state_with_prefix()
+        messages = state.messages
+        self.assertIs(_bare(DeepSeekLLMClient)._apply_cache_hints(messages, state.cache_breakpoints), messages)
+
+    def test_breakpoints_pruned_after_compaction(self):
+        """压缩改写了某条消息后，其后的断点被移除，之前的保留"""
+        state = self._state_with_prefix()
+        for turn in range(3):
+            state.add_assistant_message("", [{"id": f"c{turn}", "name": "read_file_hunk", "arguments": {}}])
+            state.add_tool_result(_tool_result(f"c{turn}", "x" * 2000))
+            state.mark_cache_breakpoint()
+        self.assertEqual(state.cache_breakpoints, (0, 1, 3, 5, 7))
+
+        self.assertIsNotNone(state.compact(max_tokens=100, keep_recent_turns=1))
+        # 第一个被压缩的是下标 3 的工具结果，断点 3 及其后均失效
+        self.assertEqual(state.cache_breakpoints, (0, 1))
+
+    def test_breakpoints_pruned_with_history(self):
+        """裁剪历史后只保留 system 前缀上的断点"""
+        state = self._state_with_prefix()
+        state.add_user_message("more")
+        state.mark_cache_breakpoint()
+        state.set_history_limit(2)
+        state.prune_history()
+        self.assertEqual(state.cache_breakpoints, (0,))
+
+
+class TestCompaction(unittest.TestCase):
+    """测试工具结果压缩的边界与幂等性"""
+
+    def _state(self, turns, size=2000):
+        state = ConversationState()
+        state.add_system_message("system prompt")
+        state.add_user_message("review index")
+        for turn in range(turns):
+            state.add_assistant_message("", [{"id": f"c{turn}", "name": "read_file_hunk", "arguments": {}}])
+            state.add_tool_result(_tool_result(f"c{turn}", f"{turn}" * size))
+        return state
+
+    def test_within_budget_is_noop(self):
+        """未超出预算或轮数不足时不压缩"""
+        state = self._state(turns=4)
+        self.assertIsNone(state.compact(max_tokens=10**6, keep_recent_turns=2))
+        self.assertIsNone(state.compact(max_tokens=0, keep_recent_turns=2))
+        self.assertIsNone(state.compact(max_tokens=100, keep_recent_turns=4))
+
+    def test_boundary_keeps_recent_turns(self):
+        """最近 keep_recent_turns 轮的工具结果保持原样，更早的被替换为摘要"""
+        state = self._state(turns=4)
+        original = [m["content"] for m in state.messages]
+
+        result = state.compact(max_tokens=100, keep_recent_turns=2)
+
+        self.assertEqual(result["compacted_messages"], 2)
+        self.assertGreater(result["bytes_saved"], 0)
+        self.assertLess(result["tokens_after"], result["tokens_before"])
+        tool_idx = [i for i, m in enumerate(state.messages) if m["role"] == "tool"]
+        self.assertEqual(tool_idx, [3, 5, 7, 9])
+        for turn, i in enumerate(tool_idx[:2]):
+            self.assertTrue(state.messages[i]["content"].startswith("[已压缩]"))
+            # 摘要保留 tool_call_id，与助手消息中的调用仍能对齐
+            self.assertEqual(state.messages[i]["tool_call_id"], f"c{turn}")
+        for i in tool_idx[2:]:
+            self.assertEqual(state.messages[i]["content"], original[i])
+        # 非工具消息不被改写
+        self.assertEqual(state.messages[1]["content"], "review index")
+
+    def test_short_and_compacted_results_are_skipped(self):
+        """过短的结果不压缩；已压缩的结果不会被再次压缩"""
+        state = self._state(turns=3)
+        state.messages[3]["content"] = "short"
+        first = state.compact(max_tokens=100, keep_recent_turns=1)
+        self.assertEqual(first["compacted_messages"], 1)
+        self.assertEqual(state.messages[3]["content"], "short")
+        summary = state.messages[5]["content"]
+
+        # 仍超出预算，但旧结果都已压缩过，不再改动前缀
+        self.assertIsNone(state.compact(max_tokens=100, keep_recent_turns=1))
+        self.assertEqual(state.messages[5]["content"], summary)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,77 @@
+"""共享 HTTP 连接池的单元测试"""
+
+import asyncio
+import unittest
+
+from Agent.core.llm.http_pool import acquire_http_client, close_shared_http_clients, http_pool_stats
+
+try:
+    import httpx  # noqa: F401
+except ImportError:  # pragma: no cover
+    httpx = None
+
+
+@unittest.skipIf(httpx is None, "httpx not installed")
+class TestHttpPool(unittest.TestCase):
+    """测试同一事件循环内复用、跨事件循环隔离"""
+
+    def test_reused_within_one_loop(self):
+        """同一事件循环内相同 (provider, base_url) 复用同一客户端"""
+
+        async def _run():
+            first, owned = acquire_http_client("p", "https://a.example")
+            second, _ = acquire_http_client("p", "https://a.example")
+            other, _ = acquire_http_client("p", "https://b.example")
+            stats = http_pool_stats()
+            await close_shared_http_clients()
+            return first, second, other, owned, stats
+
+        first, second, other, owned, stats = asyncio.run(_run())
+        self.assertIs(first, second)
+        self.assertIsNot(first, other)
+        self.assertFalse(owned)
+        self.assertEqual(stats["clients"], 2)
+
+    def test_isolated_across_loops(self):
+        """不同事件循环拿到不同客户端，已关闭循环的条目被清理"""
+
+        async def _acquire(close: bool):
+            client, _ = acquire_http_client("p", "https://a.example")
+            stats = http_pool_stats()
+            if close:
+                await close_shared_http_clients()
+            return client, stats
+
+        first, _ = asyncio.run(_acquire(close=False))
+        second, stats = asyncio.run(_acquire(close=True))
+        self.assertIsNot(first, second)
+        # 第一个循环已关闭，其条目在第二次获取时被清理
+        self.assertEqual(stats["clients"], 1)
+        asyncio.run(first.aclose())
+
+    def test_closed_client_is_replaced(self):
+        """被关闭的共享客户端不会再被返回"""
+
+        async def _run():
+            first, _ = acquire_http_client("p", "https://a.example")
+            await first.aclose()
+            second, _ = acquire_http_client("p", "https://a.example")
+            await close_shared_http_clients()
+            return first, second
+
+        first, second = asyncio.run(_run())
+        self.assertIsNot(first, second)
+
+    def test_owned_client_without_loop(self):
+        """没有运行中的事件循环时返回调用方独占的客户端，不进入共享池"""
+        before = http_pool_stats()["clients"]
+        client, owned = acquire_http_client("p", "https://a.example")
+        try:
+            self.assertTrue(owned)
+            self.assertEqual(http_pool_stats()["clients"], before)
+        finally:
+            asyncio.run(client.aclose())
+
+
+if __name__ == "__main__":
+    unittest.main()
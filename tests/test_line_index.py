@@ -0,0 +1,72 @@
+"""行偏移索引的单元测试"""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from Agent.core.context.line_index import clear_line_index_cache, get_line_index, read_line_range, split_lines
+
+
+class TestLineIndex(unittest.TestCase):
+    """测试行划分与区间读取的边界情况"""
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        clear_line_index_cache()
+
+    def tearDown(self):
+        clear_line_index_cache()
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def _write(self, name, data: bytes) -> str:
+        path = os.path.join(self.root, name)
+        with open(path, "wb") as fh:
+            fh.write(data)
+        return path
+
+    def test_crlf_lines_are_stripped(self):
+        """CRLF 文件去掉行尾 \\r，行数与 LF 文件一致"""
+        path = self._write("crlf.txt", b"a\r\nb\r\nc\r\n")
+        lines, total = read_line_range(path, 1, 3)
+        self.assertEqual(lines, ["a", "b", "c"])
+        self.assertEqual(total, 3)
+        self.assertEqual(read_line_range(path, 2, 2)[0], ["b"])
+
+    def test_no_trailing_newline(self):
+        """最后一行没有换行符时仍计为一行"""
+        path = self._write("tail.txt", b"a\nb\nlast")
+        lines, total = read_line_range(path, 2, 3)
+        self.assertEqual(lines, ["b", "last"])
+        self.assertEqual(total, 3)
+
+    def test_empty_file(self):
+        """空文件没有行，任意区间都返回空列表"""
+        path = self._write("empty.txt", b"")
+        self.assertEqual(read_line_range(path, 1, 10), ([], 0))
+
+    def test_out_of_range_slices(self):
+        """区间自动裁剪到文件范围，完全越界时返回空列表"""
+        path = self._write("three.txt", b"1\n2\n3\n")
+        self.assertEqual(read_line_range(path, 0, 100)[0], ["1", "2", "3"])
+        self.assertEqual(read_line_range(path, 3, 100)[0], ["3"])
+        self.assertEqual(read_line_range(path, 4, 10)[0], [])
+        self.assertEqual(read_line_range(path, 3, 2)[0], [])
+
+    def test_only_newline_splits_lines(self):
+        """换页符等 splitlines 会拆分的字符不构成新行，与 git 的行号一致"""
+        path = self._write("ff.py", "a\x0cb\nc d\n".encode("utf-8"))
+        self.assertEqual(read_line_range(path, 1, 2), (["a\x0cb", "c d"], 2))
+        self.assertEqual(split_lines("a\x0cb\r\nc d\n"), ["a\x0cb", "c d"])
+        self.assertEqual(split_lines(""), [])
+
+    def test_index_rebuilt_after_change(self):
+        """文件内容变化后索引自动重建"""
+        path = self._write("grow.txt", b"a\n")
+        self.assertEqual(get_line_index(path).line_count, 1)
+        self._write("grow.txt", b"a\nbb\nccc\n")
+        self.assertEqual(read_line_range(path, 3, 3), (["ccc"], 3))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,153 @@
+"""多厂商路由客户端的单元测试"""
+
+import asyncio
+import unittest
+from unittest import mock
+
+from Agent.core.api.factory import LLMFactory
+from Agent.core.llm.client import BaseLLMClient
+from Agent.core.llm.router import RoutingLLMClient, get_provider_health
+
+
+class _FakeClient(BaseLLMClient):
+    """按预设延迟/异常产出片段的假客户端，记录是否被取消。"""
+
+    def __init__(self, model="fake-model", delay=0.0, error=None, chunks=("a", "b")):
+        self.model = model
+        self.delay = delay
+        self.error = error
+        self.chunks = chunks
+        self.calls = 0
+        self.cancelled = False
+
+    async def stream_chat(self, messages, **kwargs):
+        self.calls += 1
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        if self.error is not None:
+            raise self.error
+        for text in self.chunks:
+            yield {"choices": [{"delta": {"content": text}}]}
+
+
+async def _collect(client, route_info=None):
+    texts = []
+    async for chunk in client.stream_chat([{"role": "user", "content": "hi"}], route_info=route_info):
+        texts.append(chunk["choices"][0]["delta"]["content"])
+    return texts
+
+
+class TestRoutingLLMClient(unittest.TestCase):
+    """测试故障转移、对冲与实际应答厂商的回传"""
+
+    def setUp(self):
+        get_provider_health().reset()
+
+    def tearDown(self):
+        get_provider_health().reset()
+
+    def test_failover_on_connection_error(self):
+        """首选厂商连接失败时切换到备用厂商，route_info 记录实际应答方"""
+        primary = _FakeClient(model="p-model", error=ConnectionError("refused"))
+        backup = _FakeClient(model="b-model")
+        client = RoutingLLMClient([("p", primary), ("b", backup)])
+        route = {}
+
+        texts = asyncio.run(_collect(client, route))
+
+        self.assertEqual(texts, ["a", "b"])
+        self.assertEqual(route, {"provider": "b", "model": "b-model", "failover": True})
+        # 客户端的 model 始终是首选厂商的模型
+        self.assertEqual(client.model, "p-model")
+
+    def test_non_failover_error_is_raised(self):
+        """非厂商侧错误直接抛出，不尝试备用厂商"""
+        primary = _FakeClient(error=ValueError("bad request"))
+        backup = _FakeClient()
+        client = RoutingLLMClient([("p", primary), ("b", backup)])
+
+        with self.assertRaises(ValueError):
+            asyncio.run(_collect(client))
+        self.assertEqual(backup.calls, 0)
+
+    def test_ttft_timeout_switches_provider(self):
+        """首包超时后取消首选厂商并切换"""
+        primary = _FakeClient(delay=1.0)
+        backup = _FakeClient()
+        client = RoutingLLMClient([("p", primary), ("b", backup)], ttft_timeout=0.05)
+        route = {}
+
+        asyncio.run(_collect(client, route))
+
+        self.assertEqual(route["provider"], "b")
+        self.assertTrue(primary.cancelled)
+
+    def test_thinking_model_uses_longer_ttft(self):
+        """思考模型按 ttft_timeout_thinking 判断首包超时"""
+        primary = _FakeClient(model="kimi-k2-thinking", delay=0.15)
+        backup = _FakeClient()
+        client = RoutingLLMClient(
+            [("p", primary), ("b", backup)], ttft_timeout=0.05, ttft_timeout_thinking=2.0
+        )
+        route = {}
+
+        asyncio.run(_collect(client, route))
+
+        self.assertEqual(route, {"provider": "p", "model": "kimi-k2-thinking", "failover": False})
+        self.assertEqual(backup.calls, 0)
+
+    def test_hedge_cancels_losing_attempt(self):
+        """对冲请求先出首包时采用其结果，并取消仍在等待的首选请求"""
+        primary = _FakeClient(delay=1.0)
+        backup = _FakeClient(chunks=("x",))
+        client = RoutingLLMClient([("p", primary), ("b", backup)], ttft_timeout=0, hedge_after=0.05)
+        route = {}
+
+        texts = asyncio.run(_collect(client, route))
+
+        self.assertEqual(texts, ["x"])
+        self.assertEqual(route["provider"], "b")
+        self.assertEqual(primary.calls, 1)
+        self.assertTrue(primary.cancelled)
+
+
+class TestCreateRouted(unittest.TestCase):
+    """测试工厂何时创建路由客户端"""
+
+    def _settings(self, enabled):
+        return {
+            "enabled": enabled,
+            "ttft_timeout": 20.0,
+            "ttft_timeout_thinking": 120.0,
+            "max_providers": 2,
+            "planner_hedge_after": 0.0,
+        }
+
+    def _create_routed(self, preference, enabled):
+        primary = _FakeClient(model="deepseek-chat")
+        with mock.patch.object(LLMFactory, "create", return_value=(primary, "deepseek")), \
+                mock.patch.object(LLMFactory, "_create_client", return_value=_FakeClient()), \
+                mock.patch("Agent.core.api.config.get_failover_settings", return_value=self._settings(enabled)):
+            client, provider = LLMFactory.create_routed(preference)
+        return client, provider, primary
+
+    def test_routed_only_when_enabled(self):
+        """故障转移需显式开启"""
+        client, provider, primary = self._create_routed("deepseek", enabled=False)
+        self.assertIs(client, primary)
+
+        client, provider, _ = self._create_routed("deepseek", enabled=True)
+        self.assertIsInstance(client, RoutingLLMClient)
+        self.assertEqual(provider, "deepseek")
+
+    def test_pinned_model_never_routed(self):
+        """指定了 provider:model 时即使开启故障转移也不切换厂商"""
+        client, _, primary = self._create_routed("deepseek:deepseek-chat", enabled=True)
+        self.assertIs(client, primary)
+
+
+if __name__ == "__main__":
+    unittest.main()
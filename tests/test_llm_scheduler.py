@@ -0,0 +1,78 @@
+"""LLM 调度器的单元测试"""
+
+import asyncio
+import unittest
+
+from Agent.core.llm.scheduler import LLMScheduler, parse_retry_after
+
+
+class TestLLMScheduler(unittest.TestCase):
+    """测试优先级、会话轮转与 Retry-After 解析"""
+
+    def test_priority_and_session_fairness(self):
+        """交互式请求优先于后台请求，同优先级内按会话轮转"""
+        order = []
+
+        async def _run():
+            scheduler = LLMScheduler()
+            scheduler.reset()
+            scheduler._state("p").max_concurrency = 1
+
+            async def _job(name, priority, session):
+                async with scheduler.slot("p", priority=priority, session_id=session):
+                    order.append(name)
+                    await asyncio.sleep(0.005)
+
+            first = asyncio.create_task(_job("a1", "interactive", "A"))
+            await asyncio.sleep(0)
+            rest = [
+                asyncio.create_task(_job(*spec))
+                for spec in (
+                    ("bg", "background", "C"),
+                    ("a2", "interactive", "A"),
+                    ("a3", "interactive", "A"),
+                    ("b1", "interactive", "B"),
+                )
+            ]
+            await asyncio.gather(first, *rest)
+            stats = scheduler.stats()["p"]
+            scheduler.reset()
+            return stats
+
+        stats = asyncio.run(_run())
+        self.assertEqual(order, ["a1", "a2", "b1", "a3", "bg"])
+        self.assertEqual(stats["dispatched"], 5)
+        self.assertEqual(stats["active"], 0)
+
+    def test_timer_rearmed_after_loop_closed(self):
+        """上一个事件循环关闭后残留的重试定时器不会让后续请求永久挂起"""
+        scheduler = LLMScheduler()
+        scheduler.reset()
+
+        async def _abandoned():
+            # 暂停期间排队的请求在循环结束时被取消，重试定时器留在该循环上
+            scheduler.penalize("p", 0.2)
+            with self.assertRaises(asyncio.TimeoutError):
+                await asyncio.wait_for(scheduler.acquire("p"), timeout=0.01)
+
+        async def _next_run():
+            return await asyncio.wait_for(scheduler.acquire("p"), timeout=2.0)
+
+        try:
+            asyncio.run(_abandoned())
+            self.assertIsNotNone(scheduler._state("p").timer)
+            waited_ms = asyncio.run(_next_run())
+            scheduler.release("p")
+        finally:
+            scheduler.reset()
+        self.assertGreater(waited_ms, 0)
+
+    def test_parse_retry_after(self):
+        """支持秒数与 HTTP 日期两种格式"""
+        self.assertEqual(parse_retry_after("3"), 3.0)
+        self.assertEqual(parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT"), 0.0)
+        self.assertIsNone(parse_retry_after("soon"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,110 @@
+"""后台批量日志写入器的单元测试"""
+
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+from Agent.core.logging.log_catalog import (
+    LogCatalog,
+    compress_file,
+    get_log_catalog,
+    iter_log_lines,
+    log_size,
+)
+from Agent.core.logging.log_writer import get_log_writer
+from Agent.core.logging.pipeline_logger import PipelineLogger
+
+
+class TestLogWriter(unittest.TestCase):
+    """测试批量落盘顺序、flush 语义与文件被删除后的重建"""
+
+    def test_batched_writes_keep_order(self):
+        """多文件交错写入后 flush，各文件内记录顺序不变"""
+        writer = get_log_writer()
+        with tempfile.TemporaryDirectory() as tmp:
+            a = Path(tmp) / "a" / "a.jsonl"
+            b = Path(tmp) / "b.md"
+            for i in range(50):
+                writer.write_json(a, {"i": i, "text": "中文"})
+                writer.write_text(b, f"line {i}\n")
+            self.assertTrue(writer.flush())
+            rows = [json.loads(line) for line in a.read_text(encoding="utf-8").splitlines()]
+            self.assertEqual([r["i"] for r in rows], list(range(50)))
+            self.assertEqual(rows[0]["text"], "中文")
+            self.assertEqual(b.read_text(encoding="utf-8").splitlines()[-1], "line 49")
+
+            # 文件在运行期间被删除后，后续写入会重新创建
+            a.unlink()
+            writer.write_json(a, {"i": 50})
+            self.assertTrue(writer.flush())
+            self.assertEqual(json.loads(a.read_text(encoding="utf-8")), {"i": 50})
+
+    def test_pipeline_logger_goes_through_writer(self):
+        """PipelineLogger 的记录在 flush 后可读"""
+        with tempfile.TemporaryDirectory() as tmp:
+            logger = PipelineLogger(root=tmp, trace_id="t1")
+            path = logger.start("review", {"files": 2})
+            logger.log("planning", {"units": 3})
+            self.assertTrue(get_log_writer().flush())
+            events = [json.loads(line)["event"] for line in path.read_text(encoding="utf-8").splitlines()]
+            self.assertEqual(events, ["session_start", "planning"])
+
+
+class TestLogCatalog(unittest.TestCase):
+    """测试日志索引的登记、分页查询、历史导入与压缩后透明读取"""
+
+    def test_pipeline_logger_registers_and_closes(self):
+        """start 登记 trace，close 记录用量并在落盘后更新文件大小"""
+        with tempfile.TemporaryDirectory() as tmp:
+            logger = PipelineLogger(root=tmp, trace_id="abc123")
+            path = logger.start("review", {"review_provider": "glm", "planner_provider": "moonshot"})
+            logger.log("session_end", {"session_usage": {"in": 10, "out": 5, "total": 15, "cached": 2}})
+            logger.close(usage={"in": 10, "out": 5, "total": 15, "cached": 2})
+            self.assertTrue(get_log_writer().flush())
+
+            row = get_log_catalog(Path(tmp)).get("abc123")
+            self.assertEqual(row["path"], str(path))
+            self.assertEqual(row["status"], "closed")
+            self.assertEqual((row["review_provider"], row["usage_total"]), ("glm", 15))
+            self.assertEqual(row["file_bytes"], log_size(path))
+
+    def test_query_import_and_compressed_read(self):
+        """已有日志首次使用时导入；分页按时间倒序；压缩后逐行读取结果不变"""
+        with tempfile.TemporaryDirectory() as tmp:
+            root = Path(tmp)
+            for i in range(5):
+                lines = [
+                    {"event": "session_start", "meta": {"review_provider": f"p{i}"}},
+                    {"event": "session_end", "payload": {"session_usage": {"total": i}}},
+                ]
+                (root / f"2025120{i + 1}_12000{i}_planning_review_trace{i}.jsonl").write_text(
+                    "".join(json.dumps(x) + "\n" for x in lines), encoding="utf-8"
+                )
+            catalog = LogCatalog(root)
+            self.assertEqual(catalog.ensure_imported(), 5)
+            self.assertEqual(catalog.ensure_imported(), 0)
+
+            rows, total = catalog.query(limit=2, offset=1)
+            self.assertEqual(total, 5)
+            self.assertEqual([r["trace_id"] for r in rows], ["trace3", "trace2"])
+            rows, total = catalog.query(date_from="2025-12-02", limit=10)
+            self.assertEqual(total, 4)
+
+            path = Path(catalog.get("trace4")["path"])
+            before = list(iter_log_lines(path))
+            gz = compress_file(path, "gzip")
+            self.assertFalse(path.exists())
+            self.assertTrue(gz.name.endswith(".jsonl.gz"))
+            self.assertEqual(list(iter_log_lines(path)), before)
+
+            # 压缩后又有追加：新内容排在压缩部分之后
+            path.write_text('{"event": "late"}\n', encoding="utf-8")
+            self.assertEqual(json.loads(list(iter_log_lines(path))[-1])["event"], "late")
+            compress_file(path, "gzip")
+            self.assertEqual(len(list(iter_log_lines(path))), 3)
+            catalog.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,57 @@
+"""运行指标注册表的单元测试"""
+
+import unittest
+
+from Agent.core.logging.metrics import Histogram, get_metrics_registry, observe_stage, record_cache
+
+
+class TestMetricsRegistry(unittest.TestCase):
+    """测试直方图分桶、滚动分位数、缓存命中率与 Prometheus 文本导出"""
+
+    def setUp(self):
+        get_metrics_registry().reset()
+
+    def tearDown(self):
+        get_metrics_registry().reset()
+
+    def test_histogram_buckets_and_quantiles(self):
+        """样本落入对应桶，窗口只保留最近样本"""
+        hist = Histogram((0.1, 1.0), window=10)
+        for value in (0.05, 0.5, 0.5, 2.0):
+            hist.observe(value)
+        self.assertEqual(hist.counts, [1, 2, 1])
+        self.assertEqual(hist.snapshot()["max"], 2.0)
+        for _ in range(10):
+            hist.observe(0.2)
+        snap = hist.snapshot()
+        self.assertEqual(snap["count"], 14)
+        self.assertEqual(snap["p99"], 0.2)
+
+    def test_stage_alias_and_cache_ratio(self):
+        """阶段名按别名归一，缓存命中率按缓存分别统计"""
+        observe_stage("diff_parse", 0.3)
+        record_cache("tool_result", True)
+        record_cache("tool_result", True)
+        record_cache("tool_result", False)
+        registry = get_metrics_registry()
+        self.assertEqual(registry.snapshot()["stage_seconds"]["diff"]["count"], 1)
+        ratios = registry.cache_ratios()["tool_result"]
+        self.assertEqual((ratios["hits"], ratios["misses"]), (2, 1))
+        self.assertAlmostEqual(ratios["hit_ratio"], 0.6667)
+
+    def test_prometheus_text(self):
+        """累计桶、_sum/_count 与附加指标按文本格式输出"""
+        observe_stage("reviewer", 3.0)
+        text = get_metrics_registry().render_prometheus(
+            [("uptime_seconds", "gauge", "运行时长", {}, 12.5)]
+        )
+        self.assertIn("# TYPE deltaconverge_stage_seconds histogram", text)
+        self.assertIn('deltaconverge_stage_seconds_bucket{stage="reviewer",le="2.5"} 0', text)
+        self.assertIn('deltaconverge_stage_seconds_bucket{stage="reviewer",le="5"} 1', text)
+        self.assertIn('deltaconverge_stage_seconds_bucket{stage="reviewer",le="+Inf"} 1', text)
+        self.assertIn('deltaconverge_stage_seconds_count{stage="reviewer"} 1', text)
+        self.assertIn("deltaconverge_uptime_seconds 12.5", text)
+
+
+if __name__ == "__main__":
+    unittest.main()
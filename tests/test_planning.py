@@ -0,0 +1,98 @@
+"""规划阶段流式解析与预取收尾的单元测试"""
+
+import asyncio
+import json
+import unittest
+
+from Agent.agents.planning_agent import PlanStreamParser
+from Agent.core.review_kernel import ReviewKernel
+
+
+def _feed_chunks(text, size):
+    parser = PlanStreamParser()
+    items = []
+    for i in range(0, len(text), size):
+        items.extend(parser.feed(text[i : i + size]))
+    return parser, items
+
+
+class TestPlanStreamParser(unittest.TestCase):
+    """测试任意切分的增量输入、转义、代码围栏与不完整结尾"""
+
+    PLAN = {
+        "plan": [
+            {"unit_id": "u1", "llm_context_level": "function", "reason": "含 \"引号\" 与 {括号} 和 \\ 反斜杠"},
+            {"unit_id": "u2", "llm_context_level": "diff_only", "extra_requests": [{"type": "callers"}]},
+            {"unit_id": "u3", "skip_review": True},
+        ],
+        "note": "[不是 plan] {也不是}",
+    }
+
+    def test_chunk_sizes_do_not_matter(self):
+        """任意切分（包括把转义序列切开）都产出相同条目"""
+        text = json.dumps(self.PLAN, ensure_ascii=False)
+        for size in (1, 2, 3, 7, len(text)):
+            with self.subTest(size=size):
+                _, items = _feed_chunks(text, size)
+                self.assertEqual(items, self.PLAN["plan"])
+
+    def test_split_escape_before_quote(self):
+        """反斜杠与其后的引号分在两段时不会提前结束字符串"""
+        parser = PlanStreamParser()
+        self.assertEqual(parser.feed('{"plan": [{"unit_id": "a\\'), [])
+        self.assertEqual(parser.feed('"}", "x": 1}'), [{"unit_id": 'a"}', "x": 1}])
+        self.assertEqual(parser.feed(', {"unit_id": "b"}]}'), [{"unit_id": "b"}])
+
+    def test_fenced_output_with_preamble(self):
+        """前置说明与 ```json 围栏被跳过，围栏之后的文本被忽略"""
+        text = "好的，计划如下：\n```json\n" + json.dumps(self.PLAN, ensure_ascii=False, indent=2) + "\n```\n补充 {1}"
+        parser, items = _feed_chunks(text, 5)
+        self.assertEqual([i["unit_id"] for i in items], ["u1", "u2", "u3"])
+        self.assertEqual(parser.feed('{"plan": [{"unit_id": "late"}]}'), [])
+
+    def test_plan_key_must_be_top_level(self):
+        """嵌套对象中的 plan 键不被当作计划数组"""
+        text = '{"meta": {"plan": [{"unit_id": "nested"}]}, "plan": [{"unit_id": "top"}]}'
+        _, items = _feed_chunks(text, 4)
+        self.assertEqual(items, [{"unit_id": "top"}])
+
+    def test_malformed_tail(self):
+        """截断或损坏的结尾只丢弃未闭合 / 无法解析的条目"""
+        _, items = _feed_chunks('{"plan": [{"unit_id": "ok"}, {"unit_id": "cut', 3)
+        self.assertEqual(items, [{"unit_id": "ok"}])
+        _, items = _feed_chunks('{"plan": [{"unit_id": "ok"}, {"unit_id": bad}, {"unit_id": "after"}]}', 6)
+        self.assertEqual(items, [{"unit_id": "ok"}, {"unit_id": "after"}])
+        parser = PlanStreamParser()
+        self.assertEqual(parser.feed("没有 JSON"), [])
+        self.assertEqual(parser.feed(None), [])
+
+
+class TestPrefetchCleanup(unittest.TestCase):
+    """测试规划未走到 _await_prefetch 时预取任务被收尾"""
+
+    def test_pending_prefetch_is_cancelled(self):
+        """未完成的任务被取消，已失败任务的异常被取回"""
+        kernel = ReviewKernel.__new__(ReviewKernel)
+
+        async def _run():
+            async def _slow():
+                await asyncio.sleep(10)
+
+            async def _fail():
+                raise RuntimeError("boom")
+
+            slow = asyncio.create_task(_slow())
+            failed = asyncio.create_task(_fail())
+            await asyncio.sleep(0)
+            kernel._prefetch_tasks = [slow, failed]
+            await kernel._cancel_pending_prefetch()
+            return slow, failed
+
+        slow, failed = asyncio.run(_run())
+        self.assertTrue(slow.cancelled())
+        self.assertIsInstance(failed.exception(), RuntimeError)
+        self.assertEqual(kernel._prefetch_tasks, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,64 @@
+"""审查采样剖析的单元测试"""
+
+import json
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from Agent.core.api import api as agent_api
+from Agent.core.api.logs import LogManager
+from Agent.core.logging.profiler import SamplingProfiler, profile_path_for, should_profile
+
+
+def _busy_hotspot(seconds: float) -> int:
+    total = 0
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        total += sum(range(200))
+    return total
+
+
+class TestSamplingProfiler(unittest.TestCase):
+    """测试采样结果、speedscope 输出与文件命名"""
+
+    def test_samples_hotspot_into_speedscope(self):
+        """忙碌函数出现在火焰图中，剖析线程自身不被采样"""
+        profiler = SamplingProfiler(interval=0.002).start()
+        _busy_hotspot(0.2)
+        profiler.stop()
+        self.assertGreater(profiler.samples, 0)
+
+        data = profiler.to_speedscope("t1")
+        names = {frame["name"] for frame in data["shared"]["frames"]}
+        self.assertIn("_busy_hotspot", names)
+        self.assertNotIn("review-profiler", [p["name"] for p in data["profiles"]])
+        for profile in data["profiles"]:
+            self.assertEqual(len(profile["samples"]), len(profile["weights"]))
+            self.assertAlmostEqual(profile["endValue"], sum(profile["weights"]), places=2)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = profile_path_for(Path(tmp) / "20250101_120000_review_abc.jsonl")
+            self.assertEqual(path.name, "20250101_120000_review_abc.speedscope.json")
+            self.assertEqual(profiler.save(path), path)
+            self.assertEqual(json.loads(path.read_text(encoding="utf-8"))["name"], "review")
+
+    def test_should_profile(self):
+        """显式请求总是开启；默认比例为 0 时不自动开启"""
+        self.assertTrue(should_profile(True))
+        self.assertFalse(should_profile(False))
+
+    def test_standalone_profile_found_by_log_api(self):
+        """没有流水线日志时，剖析文件写到日志 API 查找的同一目录"""
+        with tempfile.TemporaryDirectory() as tmp:
+            manager = LogManager(tmp)
+            profiler = SamplingProfiler(interval=0.002).start()
+            with mock.patch.object(agent_api, "get_log_manager", return_value=manager):
+                saved = agent_api.AgentAPI._save_profile(profiler, None, "trace123")
+            self.assertEqual(saved, Path(tmp) / "pipeline" / "trace123.speedscope.json")
+            self.assertEqual(manager.get_profile_path("trace123"), saved)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,64 @@
+"""search_in_project 工具的单元测试"""
+
+import contextvars
+import json
+import os
+import shutil
+import subprocess
+import tempfile
+import unittest
+
+import Agent.core.api  # noqa: F401  先加载 API 包，避免直接导入 registry 时的循环导入
+from Agent.core.context.runtime_context import set_diff_units, set_project_root
+from Agent.tool.registry import _search_in_project
+
+
+@unittest.skipIf(shutil.which("git") is None, "git not available")
+class TestSearchInProject(unittest.TestCase):
+    """测试变更文件优先与截断提示"""
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        # a_other.py 在 git grep 的遍历顺序中排在变更文件之前
+        self._write("a_other.py", "needle\n" * 5)
+        self._write("pkg/z_changed.py", "x = 1\nneedle\nneedle\n")
+        subprocess.run(["git", "init", "-q"], cwd=self.root, check=True)
+        subprocess.run(["git", "add", "."], cwd=self.root, check=True)
+
+    def tearDown(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def _write(self, rel, text):
+        path = os.path.join(self.root, rel)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as fh:
+            fh.write(text)
+
+    def _search(self, **args):
+        def _run():
+            set_project_root(self.root)
+            set_diff_units([{"file_path": "pkg/z_changed.py"}])
+            return json.loads(_search_in_project({"query": "needle", **args}))
+
+        return contextvars.copy_context().run(_run)
+
+    def test_changed_file_hits_survive_limit(self):
+        """名额不足时优先保留变更文件中的命中"""
+        result = self._search(max_results=3)
+        paths = [m["path"] for m in result["matches"]]
+        self.assertEqual(paths, ["pkg/z_changed.py", "pkg/z_changed.py", "a_other.py"])
+        self.assertIn("note", result)
+
+    def test_exact_count_has_no_limit_note(self):
+        """命中数恰好等于上限时不算截断"""
+        result = self._search(max_results=7)
+        self.assertEqual(len(result["matches"]), 7)
+        self.assertNotIn("note", result)
+
+        result = self._search(max_results=6)
+        self.assertEqual(len(result["matches"]), 6)
+        self.assertIn("note", result)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,112 @@
+"""LLM 响应缓存的单元测试"""
+
+import asyncio
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from Agent.agents.planning_agent import PlanningAgent
+from Agent.core.adapter.llm_adapter import OpenAIAdapter
+from Agent.core.llm import response_cache
+from Agent.core.llm.client import BaseLLMClient
+from Agent.core.llm.response_cache import ResponseCache, make_cache_key
+from Agent.core.llm.router import RoutingLLMClient, get_provider_health
+from Agent.core.stream.stream_processor import StreamProcessor
+
+_MESSAGES = [{"role": "system", "content": "plan"}, {"role": "user", "content": "diff"}]
+
+
+class _TextClient(BaseLLMClient):
+    """以单个片段返回固定文本的假客户端。"""
+
+    def __init__(self, text, model="m", error=None):
+        self.text = text
+        self.model = model
+        self.error = error
+        self.calls = 0
+
+    async def stream_chat(self, messages, **kwargs):
+        self.calls += 1
+        if self.error is not None:
+            raise self.error
+        yield {"delta": {"content": self.text}, "finish_reason": "stop"}
+
+
+class TestResponseCache(unittest.TestCase):
+    """测试命中复用、故障转移后的缓存键与规划解析失败时作废"""
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        saved = ResponseCache._instance
+        ResponseCache._instance = None
+        try:
+            self.cache = ResponseCache(Path(self.root))
+        finally:
+            ResponseCache._instance = saved
+        settings = {"enabled": True, "ttl_seconds": 3600, "max_bytes": 1 << 20}
+        self._patches = [
+            mock.patch.object(response_cache, "_response_cache", self.cache),
+            mock.patch.object(response_cache, "_settings", return_value=settings),
+        ]
+        for patch in self._patches:
+            patch.start()
+        get_provider_health().reset()
+
+    def tearDown(self):
+        for patch in self._patches:
+            patch.stop()
+        get_provider_health().reset()
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def _complete(self, adapter):
+        return asyncio.run(adapter.complete(list(_MESSAGES), temperature=1, response_cache=True))
+
+    def test_identical_call_hits_cache(self):
+        """输入相同的第二次调用直接命中缓存，不再请求厂商"""
+        client = _TextClient('{"plan": []}', model="deepseek-chat")
+        adapter = OpenAIAdapter(client, StreamProcessor(), provider_name="deepseek")
+
+        first = self._complete(adapter)
+        second = self._complete(adapter)
+
+        self.assertEqual(first["cache"], "miss")
+        self.assertEqual(second["cache"], "hit")
+        self.assertEqual(second["content"], '{"plan": []}')
+        self.assertEqual(first["cache_key"], make_cache_key("deepseek", "deepseek-chat", _MESSAGES, temperature=1))
+        self.assertEqual(client.calls, 1)
+
+    def test_failover_answer_keyed_by_serving_provider(self):
+        """故障转移后的回复按实际应答的厂商/模型存储，不会被当作首选模型的结果复用"""
+        primary = _TextClient("", model="p-model", error=ConnectionError("down"))
+        backup = _TextClient('{"plan": []}', model="b-model")
+        routed = RoutingLLMClient([("p", primary), ("b", backup)])
+        adapter = OpenAIAdapter(routed, StreamProcessor(), provider_name="p")
+
+        result = self._complete(adapter)
+
+        self.assertEqual(result["provider"], "b")
+        self.assertEqual(result["cache_key"], make_cache_key("b", "b-model", _MESSAGES, temperature=1))
+        primary_key = make_cache_key("p", "p-model", _MESSAGES, temperature=1)
+        self.assertIsNone(self.cache.get(primary_key))
+        self.assertIsNotNone(self.cache.get(result["cache_key"]))
+
+    def test_planner_invalidates_unparseable_response(self):
+        """规划输出无法解析时作废对应缓存，重跑时重新请求"""
+        client = _TextClient("not json at all", model="deepseek-chat")
+        adapter = OpenAIAdapter(client, StreamProcessor(), provider_name="deepseek")
+
+        async def _plan():
+            return await PlanningAgent(adapter).run({"units": []}, use_cache=True)
+
+        first = asyncio.run(_plan())
+        self.assertEqual(first.get("error"), "invalid_json")
+        self.assertEqual(self.cache.stats()["entries"], 0)
+
+        asyncio.run(_plan())
+        self.assertEqual(client.calls, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,168 @@
+"""会话持久化（快照 + 事件日志）与会话目录索引的单元测试"""
+
+import json
+import tempfile
+import time
+import unittest
+from pathlib import Path
+
+from Agent.core.state.session import ReviewSession, SessionManager
+from Agent.core.state.session_writer import SessionWriter
+
+
+class TestSessionJournal(unittest.TestCase):
+    """测试增量保存、重放还原与快照压缩"""
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.storage = Path(self._tmp.name)
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_incremental_saves_replay_to_same_state(self):
+        """追加消息、合并思考增量、替换快照字段后，重新加载得到相同会话"""
+        manager = SessionManager(storage_dir=str(self.storage))
+        session = manager.create_session("s1", "/proj")
+        session.add_message("user", "review please")
+        manager.save_session(session)
+        for piece in ("a", "b", "c"):
+            session.add_workflow_event({"type": "thought", "content": piece, "stage": "planner"})
+            manager.save_session(session)
+        session.add_workflow_event({"type": "tool_result", "tool_name": "read_file"})
+        session.diff_files = [{"path": "x.py"}]
+        session.metadata.name = "renamed"
+        manager.save_session(session)
+
+        journal = self.storage / "s1.journal.jsonl"
+        self.assertEqual(len(journal.read_text(encoding="utf-8").splitlines()), 5)
+
+        reloaded = SessionManager(storage_dir=str(self.storage))
+        self.assertEqual(reloaded.get_session("s1").to_dict(), session.to_dict())
+        self.assertEqual(reloaded.list_sessions()[0]["name"], "renamed")
+
+    def test_truncated_history_and_torn_tail(self):
+        """清空消息触发完整快照；写了一半的日志尾行在加载时被跳过"""
+        manager = SessionManager(storage_dir=str(self.storage))
+        session = manager.create_session("s2")
+        session.add_message("user", "hello")
+        manager.save_session(session)
+        session.conversation.clear()
+        manager.save_session(session)
+        self.assertFalse((self.storage / "s2.journal.jsonl").exists())
+
+        session.add_message("user", "again")
+        manager.save_session(session)
+        with (self.storage / "s2.journal.jsonl").open("a", encoding="utf-8") as fp:
+            fp.write('{"gen": 2, "messages": [')
+
+        loaded = SessionManager(storage_dir=str(self.storage)).get_session("s2")
+        self.assertEqual([m["content"] for m in loaded.conversation.messages], ["again"])
+
+
+class TestSessionCatalog(unittest.TestCase):
+    """测试基于 SQLite 的分页列表、搜索、标签过滤与内存 LRU"""
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.storage = Path(self._tmp.name)
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_paged_filtered_listing(self):
+        """按更新时间分页、按名称搜索与标签过滤，重建索引后结果一致"""
+        manager = SessionManager(storage_dir=str(self.storage))
+        for idx in range(5):
+            session = manager.create_session(f"s{idx}", "/proj" if idx % 2 else "/other")
+            session.metadata.name = f"审查任务 {idx}"
+            session.metadata.updated_at = f"2026-01-0{idx + 1}T00:00:00"
+            if idx == 3:
+                session.metadata.tags = ["hotfix"]
+            session.add_message("user", "hi")
+            manager.save_session(session)
+
+        rows, total = manager.query_sessions(limit=2, offset=1)
+        self.assertEqual(total, 5)
+        self.assertEqual([r["session_id"] for r in rows], ["s3", "s2"])
+        rows, total = manager.query_sessions(project_root="/proj", search="任务 3")
+        self.assertEqual(([r["session_id"] for r in rows], total), (["s3"], 1))
+        rows, _ = manager.query_sessions(tag="hotfix")
+        self.assertEqual([r["session_id"] for r in rows], ["s3"])
+        stats = manager.session_stats()
+        self.assertEqual((stats["total_sessions"], stats["total_messages"]), (5, 5))
+
+        (self.storage / "catalog.db").unlink()
+        rebuilt = SessionManager(storage_dir=str(self.storage))
+        self.assertEqual(rebuilt.query_sessions(search="任务 4")[1], 1)
+
+    def test_migration_indexes_tags_and_counts(self):
+        """首次建立索引时，已有会话的标签与消息 / 事件数（含事件日志中的增量）都被索引"""
+        legacy = ReviewSession("legacy", "/proj")
+        legacy.metadata.tags = ["hot"]
+        legacy.add_message("user", "review please")
+        legacy.add_message("assistant", "done")
+        (self.storage / "legacy.json").write_text(json.dumps(legacy.to_dict(), ensure_ascii=False), encoding="utf-8")
+
+        manager = SessionManager(storage_dir=str(self.storage))
+        journaled = manager.create_session("journaled", "/proj")
+        journaled.add_message("user", "hi")
+        journaled.add_workflow_event({"type": "tool_result", "tool_name": "read_file"})
+        manager.save_session(journaled)
+        self.assertTrue((self.storage / "journaled.journal.jsonl").exists())
+        manager.close()
+        (self.storage / "catalog.db").unlink()
+
+        migrated = SessionManager(storage_dir=str(self.storage))
+        rows, total = migrated.query_sessions(tag="hot")
+        self.assertEqual(([r["session_id"] for r in rows], total), (["legacy"], 1))
+        stats = migrated.session_stats()
+        self.assertEqual((stats["total_sessions"], stats["total_messages"]), (2, 3))
+        row = next(r for r in migrated.list_sessions() if r["session_id"] == "journaled")
+        self.assertEqual((row["message_count"], row["event_count"]), (1, 1))
+
+    def test_lru_keeps_live_sessions(self):
+        """超出缓存容量后淘汰旧会话，但仍被引用的会话返回同一对象"""
+        manager = SessionManager(storage_dir=str(self.storage))
+        manager._cache_size = 2
+        held = manager.create_session("keep")
+        for idx in range(3):
+            manager.create_session(f"tmp{idx}")
+        self.assertNotIn("keep", manager._sessions)
+        self.assertIs(manager.get_session("keep"), held)
+
+
+class TestSessionWriter(unittest.TestCase):
+    """测试后台保存的写合并与强制刷新"""
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.storage = Path(self._tmp.name)
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_coalesce_and_flush(self):
+        """防抖窗口内的多次标脏只写一次；flush_session 立即落盘并取消待写"""
+        manager = SessionManager(storage_dir=str(self.storage))
+        manager._writer = SessionWriter(manager.save_session, debounce=0.05)
+        session = manager.create_session("w1")
+        for idx in range(5):
+            session.add_workflow_event({"type": "tool_result", "tool_name": f"t{idx}"})
+            manager.mark_dirty(session)
+        time.sleep(0.3)
+        stats = manager.writer_stats()
+        self.assertEqual((stats["written"], stats["coalesced"], stats["pending"]), (1, 4, 0))
+        self.assertEqual(len(SessionManager(storage_dir=str(self.storage)).get_session("w1").workflow_events), 5)
+
+        session.add_message("assistant", "done")
+        manager.mark_dirty(session)
+        manager.flush_session(session)
+        self.assertEqual(manager.writer_stats()["pending"], 0)
+        loaded = SessionManager(storage_dir=str(self.storage)).get_session("w1")
+        self.assertEqual(loaded.conversation.messages[-1]["content"], "done")
+        manager.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,236 @@
+"""SSE 分帧解析、流式聚合、服务端帧合并、事件队列背压与审查事件回放的单元测试"""
+
+import asyncio
+import json
+import unittest
+from unittest import mock
+
+from Agent.core.stream import event_queue
+from Agent.core.stream.event_queue import BoundedEventQueue
+from Agent.core.stream.review_jobs import ReviewJob, ReviewJobRegistry
+from Agent.core.stream.sse import iter_sse_data, json_loads
+from Agent.core.stream.sse_frames import iter_coalesced_frames
+from Agent.core.stream.stream_processor import StreamProcessor
+
+
+async def _blocks(parts):
+    for part in parts:
+        yield part
+
+
+class TestSSEFraming(unittest.TestCase):
+    """测试跨块切分、注释行、结束标记与 raw_chunks 保留开关"""
+
+    def test_split_across_blocks(self):
+        """事件行被任意切断时仍能完整重组，注释与 [DONE] 被忽略"""
+        parts = [
+            b'data: {"choices":[{"delta":{"content":"\xe4\xbd',
+            b'\xa0"}}]}\r\n\r\n: OPENROUTER PROCESSING\n',
+            b"data: [DONE]\n",
+            b'{"usage":{"total_tokens":3}}',
+        ]
+
+        async def _run():
+            return [json_loads(data) async for data in iter_sse_data(_blocks(parts))]
+
+        events = asyncio.run(_run())
+        self.assertEqual(len(events), 2)
+        self.assertEqual(events[0]["choices"][0]["delta"]["content"], "你")
+        self.assertEqual(events[1]["usage"]["total_tokens"], 3)
+
+    def test_raw_chunks_opt_in(self):
+        """默认只记录 chunk 数量，显式开启后才保留原始片段"""
+        chunks = [
+            {"delta": {"content": "a"}, "finish_reason": None},
+            {"delta": {"content": "b"}, "finish_reason": "stop", "usage": {"total_tokens": 2}},
+        ]
+
+        async def _run(keep):
+            return await StreamProcessor(keep_raw_chunks=keep).collect(_blocks(chunks))
+
+        lean = asyncio.run(_run(False))
+        self.assertEqual(lean["content"], "ab")
+        self.assertEqual(lean["raw"]["chunks"], [])
+        self.assertEqual(lean["raw"]["chunk_count"], 2)
+        self.assertEqual(lean["usage"], {"total_tokens": 2})
+        debug = asyncio.run(_run(True))
+        self.assertEqual(len(debug["raw"]["chunks"]), 2)
+
+
+class TestSSEFrameCoalescing(unittest.TestCase):
+    """测试服务端增量帧合并"""
+
+    def test_merge_consecutive_deltas_and_keep_order(self):
+        """同阶段同类型增量合并为一帧，非增量事件先刷出缓冲并保持顺序"""
+        events = [
+            {"type": "thought", "content": "a", "stage": "planner"},
+            {"type": "thought", "content": "b", "stage": "planner"},
+            {"type": "chunk", "content": "c", "stage": "planner"},
+            {"type": "chunk", "content": "d", "stage": "planner"},
+            {"type": "tool_call_start", "tool_name": "read_file"},
+            {"type": "chunk", "content": "e", "stage": "review"},
+            {"type": "done"},
+        ]
+
+        async def _run():
+            queue = asyncio.Queue()
+            for evt in events:
+                queue.put_nowait(evt)
+            return [json.loads(f[len("data: "):]) async for f in iter_coalesced_frames(queue, window=0.05, max_bytes=4096)]
+
+        frames = asyncio.run(_run())
+        self.assertEqual(
+            [(f["type"], f.get("content")) for f in frames],
+            [("thought", "ab"), ("chunk", "cd"), ("tool_call_start", None), ("chunk", "e"), ("done", None)],
+        )
+
+
+class TestBoundedEventQueue(unittest.TestCase):
+    """测试事件队列的合并、淘汰与滞后断开策略"""
+
+    def test_backpressure_policy(self):
+        """增量并入队尾，满时淘汰低优先级事件；阶段/工具等事件不丢弃，丢弃时只插入一条标记"""
+
+        async def _run():
+            queue = BoundedEventQueue(label="t", max_events=3, max_lag=0)
+            for piece in ("a", "b", "c"):
+                queue.put_nowait({"type": "chunk", "content": piece, "stage": "review"})
+            queue.put_nowait({"type": "static_scan_file_start", "file": "x.py"})
+            queue.put_nowait({"type": "tool_result", "tool_name": "read_file"})
+            queue.put_nowait({"type": "tool_call_end", "tool_name": "read_file"})  # 淘汰扫描事件并插入丢失标记
+            queue.put_nowait({"type": "pipeline_stage_end", "stage": "review"})  # 无可淘汰事件，仍保留
+            queue.put_nowait({"type": "scanner_progress", "file": "y.py"})  # 低优先级，丢弃，标记计数累加
+            queue.put_nowait({"type": "tool_start", "tool_name": "read_file"})  # 再次丢弃
+            await queue.put({"type": "final", "content": "ok"})
+            items = []
+            while not queue.empty():
+                items.append(queue.get_nowait())
+            # 标记被读取后，再次淘汰会插入新的标记
+            for _ in range(4):
+                queue.put_nowait({"type": "scanner_progress", "file": "z.py"})
+            tail = [queue.get_nowait() for _ in range(queue.qsize())]
+            return items, tail, queue.stats()
+
+        items, tail, stats = asyncio.run(_run())
+        self.assertEqual(
+            [(i["type"], i.get("content") or i.get("count")) for i in items],
+            [
+                ("chunk", "abc"),
+                ("tool_result", None),
+                ("events_dropped", 3),
+                ("tool_call_end", None),
+                ("pipeline_stage_end", None),
+                ("final", "ok"),
+            ],
+        )
+        self.assertEqual(
+            [(i["type"], i.get("count")) for i in tail],
+            [("scanner_progress", None), ("scanner_progress", None), ("events_dropped", 1), ("scanner_progress", None)],
+        )
+        self.assertEqual((stats["coalesced"], stats["evicted"], stats["dropped"]), (2, 2, 2))
+
+    def test_disconnect_after_lag(self):
+        """积压超过滞后阈值后清空队列，只保留错误与 done，并回调通知"""
+        lags = []
+
+        async def _run():
+            queue = BoundedEventQueue(label="t", max_events=100, max_lag=0.01, on_lag=lags.append)
+            queue.put_nowait({"type": "tool_result", "tool_name": "read_file"})
+            await asyncio.sleep(0.03)
+            queue.put_nowait({"type": "tool_result", "tool_name": "read_file"})
+            queue.put_nowait({"type": "final", "content": "late"})
+            return [queue.get_nowait()["type"] for _ in range(queue.qsize())]
+
+        self.assertEqual(asyncio.run(_run()), ["error", "done"])
+        self.assertEqual(len(lags), 1)
+
+
+class TestReviewJobReplay(unittest.TestCase):
+    """测试审查任务的序号回放与断线后重新订阅"""
+
+    def test_resume_after_sequence(self):
+        """断开后按最后序号重新订阅，只收到后续事件；合并帧携带最后一个序号"""
+
+        async def _drain(queue):
+            return [json.loads(f[len("data: "):]) async for f in iter_coalesced_frames(queue, window=0.05, max_bytes=4096)]
+
+        async def _run():
+            registry = ReviewJobRegistry()
+            job = registry.create("test-resume")
+            first = job.subscribe(0)
+            release = asyncio.Event()
+
+            async def runner():
+                job.emit({"type": "chunk", "content": "a", "stage": "review"})
+                job.emit({"type": "chunk", "content": "b", "stage": "review"})
+                job.emit({"type": "tool_result", "tool_name": "read_file"})
+                job.unsubscribe(first)  # 模拟客户端断线：审查继续运行
+                await release.wait()
+                job.emit({"type": "final", "content": "ok"})
+
+            registry.start(job, runner)
+            await asyncio.sleep(0)
+            seen = []
+            while not first.empty():
+                seen.append(first.get_nowait())
+            release.set()
+            await job.task
+            resumed = await _drain(job.subscribe(after=seen[-1]["seq"]))
+            replay = await _drain(job.subscribe(after=0))
+            return seen, resumed, replay, job.status
+
+        seen, resumed, replay, status = asyncio.run(_run())
+        self.assertEqual([(e["type"], e["seq"]) for e in seen], [("chunk", 2), ("tool_result", 3)])
+        self.assertEqual([(e["type"], e["seq"]) for e in resumed], [("final", 4), ("done", 5)])
+        self.assertEqual([(e["type"], e.get("content"), e["seq"]) for e in replay[:1]], [("chunk", "ab", 2)])
+        self.assertEqual(status, "completed")
+
+    def test_replay_not_capped_by_max_events(self):
+        """回放超过 max_events 条非增量事件时全部送达，上限只约束实时事件"""
+
+        async def _run():
+            job = ReviewJob("test-replay-cap")
+            for i in range(150):
+                job.emit({"type": "tool_result", "tool_name": "read_file", "index": i})
+            with mock.patch.object(event_queue, "_settings", return_value={"max_events": 50, "max_lag": 0}):
+                queue = job.subscribe(0)
+            job.emit({"type": "pipeline_stage_end", "stage": "review"})
+            for _ in range(60):
+                job.emit({"type": "scanner_progress", "file": "x.py"})
+            items = [queue.get_nowait() for _ in range(queue.qsize())]
+            return items, queue.stats()
+
+        items, stats = asyncio.run(_run())
+        replayed = [e for e in items if e["type"] == "tool_result"]
+        self.assertEqual([e["seq"] for e in replayed], list(range(1, 151)))
+        self.assertIn("pipeline_stage_end", [e["type"] for e in items])
+        # 实时事件受上限约束：超出部分的低优先级事件被淘汰/丢弃并留下标记
+        self.assertEqual(sum(1 for e in items if e["type"] == "scanner_progress"), 49)
+        self.assertEqual([e["count"] for e in items if e["type"] == "events_dropped"], [11])
+        self.assertEqual(stats["backlog"], 0)
+
+    def test_log_folds_consecutive_deltas(self):
+        """事件日志折叠同阶段的连续增量；从折叠记录中间续传时只回放其后的内容"""
+        job = ReviewJob("test-fold")
+        for piece in ("a", "b", "c"):
+            job.emit({"type": "chunk", "content": piece, "stage": "review"})
+        job.emit({"type": "thought", "content": "t", "stage": "review"})
+        job.emit({"type": "chunk", "content": "d", "stage": "planner"})
+        job.emit({"type": "chunk", "content": "e", "stage": "planner"})
+
+        def _replay(after):
+            queue = job.subscribe(after)
+            return [(e["type"], e.get("content"), e["seq"]) for e in (queue.get_nowait() for _ in range(queue.qsize()))]
+
+        self.assertEqual(len(job._log), 3)
+        self.assertEqual(job.info()["first_seq"], 1)
+        self.assertEqual(
+            _replay(0),
+            [("chunk", "abc", 3), ("thought", "t", 4), ("chunk", "de", 6)],
+        )
+        self.assertEqual(_replay(1), [("chunk", "bc", 3), ("thought", "t", 4), ("chunk", "de", 6)])
+        self.assertEqual(_replay(5), [("chunk", "e", 6)])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,120 @@
+"""工具运行时的单元测试"""
+
+import asyncio
+import contextvars
+import unittest
+
+from Agent.core.tools.runtime import ToolRuntime, get_tool_executor_stats
+
+_probe_var: contextvars.ContextVar = contextvars.ContextVar("probe", default=None)
+
+
+class TestToolRuntime(unittest.TestCase):
+    """测试线程池执行与审查级结果缓存"""
+
+    def test_sync_tool_sees_context_and_times_out(self):
+        """同步工具在线程中可读取 contextvars，超时返回错误"""
+        import time
+
+        def _probe(_args):
+            return str(_probe_var.get())
+
+        def _slow(_args):
+            time.sleep(0.3)
+            return "late"
+
+        async def _run():
+            _probe_var.set("root")
+            runtime = ToolRuntime(fingerprint=lambda: "fp")
+            runtime.register("probe", _probe)
+            runtime.register("slow", _slow, timeout=0.05)
+            return await runtime.execute([
+                {"id": "1", "name": "probe", "arguments": {}},
+                {"id": "2", "name": "slow", "arguments": {}},
+            ])
+
+        probe, slow = asyncio.run(_run())
+        self.assertEqual(probe["content"], "root")
+        self.assertIsNotNone(probe["cpu_time"])
+        self.assertIn("TimeoutError", slow["error"])
+
+    def test_cacheable_tool_reuses_result(self):
+        """可缓存工具的重复调用（参数顺序不同）只执行一次"""
+        calls = []
+
+        def _tool(args):
+            calls.append(args)
+            return "ok"
+
+        fingerprints = []
+
+        def _fingerprint():
+            fingerprints.append(1)
+            return "fp"
+
+        async def _run():
+            runtime = ToolRuntime(fingerprint=_fingerprint)
+            runtime.register("t", _tool, cacheable=True)
+            first = await runtime.execute([{"id": "1", "name": "t", "arguments": {"a": 1, "b": 2}}])
+            second = await runtime.execute([{"id": "2", "name": "t", "arguments": {"b": 2, "a": 1}}])
+            return first + second, runtime.cache_stats()
+
+        results, stats = asyncio.run(_run())
+        self.assertEqual(len(calls), 1)
+        # 仓库指纹每个运行时只计算一次，而不是每个批次
+        self.assertEqual(len(fingerprints), 1)
+        self.assertEqual([r["cache"] for r in results], ["miss", "hit"])
+        self.assertEqual(results[1]["tool_call_id"], "2")
+        self.assertEqual(stats["hits"], 1)
+        self.assertEqual(stats["misses"], 1)
+
+    def test_concurrency_limit_is_shared_and_timeouts_tracked(self):
+        """并发上限跨 ToolRuntime 实例生效；超时后仍在运行的线程被计数"""
+        import threading
+        import time
+
+        active = []
+        peak = []
+        lock = threading.Lock()
+
+        def _tool(_args):
+            with lock:
+                active.append(1)
+                peak.append(len(active))
+            time.sleep(0.05)
+            with lock:
+                active.pop()
+            return "ok"
+
+        def _hang(_args):
+            time.sleep(0.3)
+            return "late"
+
+        async def _run():
+            runtimes = []
+            for limit in (1, 2, 3):
+                # 上限不同的注册共用同一个信号量，总并发不会相加
+                runtime = ToolRuntime(fingerprint=lambda: "fp")
+                runtime.register("shared_limit", _tool, max_concurrency=limit)
+                runtimes.append(runtime)
+            await asyncio.gather(*(
+                r.execute([{"id": str(i), "name": "shared_limit", "arguments": {}}])
+                for i, r in enumerate(runtimes)
+            ))
+
+            hang = ToolRuntime(fingerprint=lambda: "fp")
+            hang.register("hang", _hang, timeout=0.02)
+            before = get_tool_executor_stats()["timed_out_running"]
+            await hang.execute([{"id": "h", "name": "hang", "arguments": {}}])
+            during = get_tool_executor_stats()["timed_out_running"]
+            await asyncio.sleep(0.4)
+            return before, during, get_tool_executor_stats()["timed_out_running"]
+
+        before, during, after = asyncio.run(_run())
+        self.assertEqual(max(peak), 1)
+        self.assertEqual(during, before + 1)
+        self.assertEqual(after, before)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,77 @@
+"""链路追踪的单元测试"""
+
+import asyncio
+import json
+import tempfile
+import unittest
+from unittest import mock
+
+from Agent.core.logging.tracing import add_span, export_trace, span, trace_session, traced
+
+
+@traced("work.async")
+async def _async_work(delay: float) -> str:
+    with span("work.inner"):
+        await asyncio.sleep(delay)
+    return "ok"
+
+
+def _thread_work() -> None:
+    with span("thread.work"):
+        pass
+
+
+class TestTracing(unittest.TestCase):
+    """测试 span 嵌套、跨任务/线程传播与 Chrome / OTLP 导出"""
+
+    def test_disabled_is_noop(self):
+        """未开启导出时不建立记录器，span 空转"""
+        with mock.patch("Agent.core.logging.tracing._settings", return_value={"export": "none"}):
+            with trace_session("t0") as recorder:
+                with span("x") as current:
+                    self.assertIsNone(current)
+            self.assertIsNone(recorder)
+
+    def test_nesting_across_tasks_and_threads(self):
+        """任务与 to_thread 中的 span 挂在创建时的当前 span 之下"""
+
+        async def main():
+            with span("batch"):
+                await asyncio.gather(_async_work(0.02), _async_work(0.02))
+                await asyncio.to_thread(_thread_work)
+
+        with mock.patch("Agent.core.logging.tracing._settings", return_value={"export": "both"}):
+            with trace_session("abc123") as recorder:
+                asyncio.run(main())
+                add_span("stage.reviewer", 0.01)
+        by_name = {}
+        for s in recorder.spans:
+            by_name.setdefault(s.name, []).append(s)
+        root = by_name["review"][0]
+        batch = by_name["batch"][0]
+        self.assertEqual(batch.parent_id, root.span_id)
+        self.assertEqual({s.parent_id for s in by_name["work.async"]}, {batch.span_id})
+        self.assertEqual(by_name["thread.work"][0].parent_id, batch.span_id)
+        self.assertEqual(by_name["stage.reviewer"][0].parent_id, root.span_id)
+        inner_parents = {s.parent_id for s in by_name["work.inner"]}
+        self.assertEqual(inner_parents, {s.span_id for s in by_name["work.async"]})
+
+        chrome = recorder.to_chrome()
+        events = [e for e in chrome["traceEvents"] if e["ph"] == "X"]
+        self.assertEqual(len(events), len(recorder.spans))
+        # 两个并发任务重叠，必须落在不同轨道上
+        lanes = {e["tid"] for e in events if e["name"] == "work.async"}
+        self.assertEqual(len(lanes), 2)
+
+        otlp = recorder.to_otlp()["resourceSpans"][0]["scopeSpans"][0]["spans"]
+        self.assertEqual(otlp[0]["traceId"], "abc123".rjust(32, "0"))
+
+        with tempfile.TemporaryDirectory() as tmp:
+            paths = export_trace(recorder, tmp)
+            self.assertEqual(sorted(p.name for p in paths), ["abc123.otlp.json", "abc123.trace.json"])
+            data = json.loads(paths[0].read_text(encoding="utf-8"))
+            self.assertIn("traceEvents", data)
+
+
+if __name__ == "__main__":
+    unittest.main()